@@ -0,0 +1,31 @@
+"""
+Benchmarks the energy of 1000 conformers of a 30-atom ligand evaluated in one batched pass with
+BatchEnergy against a loop over ForceFieldEnergy.energy.
+"""
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.batch import BatchEnergy
+from common import run
+
+
+class TimeConformers:
+    nconf = 1000
+
+    def setup(self):
+        mol, mm_ff, _ = synthetic.ligand_library(1, (30, 30), seed=0)[0]
+        self.model = ForceFieldEnergy(mol, mm_ff)
+        self.batch = BatchEnergy(self.model)
+        rng = numpy.random.default_rng(0)
+        self.confs = mol.geometry + 0.2 * rng.normal(size=(self.nconf, 30, 3))
+
+    def time_batch(self):
+        self.batch.energy(self.confs)
+
+    def time_loop(self):
+        for conf in self.confs:
+            self.model.energy(conf)
+
+
+if __name__ == "__main__":
+    run(TimeConformers, repeat=3)
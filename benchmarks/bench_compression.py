@@ -0,0 +1,75 @@
+"""
+Benchmarks writing and reading a Molecule of 100k atoms to JSON and msgpack files compressed with
+gzip, bzip2, xz, and zstd (when installed) at a fast and a strong level, reporting the time and
+the compressed file size of each to show the throughput vs. size trade-off.
+"""
+import os
+import shutil
+import tempfile
+from mmelemental.compute import synthetic
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util import compression, serialization
+from common import main
+
+_levels = {".gz": (1, 6), ".bz2": (1, 9), ".xz": (0, 6), ".zst": (1, 19)}
+
+
+class TimeCompression:
+    # Files as format, compression suffix, and level e.g. json.gz:6
+    params = [
+        f"{fmt}{ext}:{level}"
+        for fmt in ["json"] + (["msgpack"] if serialization.msgpack else [])
+        for ext in compression.suffixes()
+        for level in _levels[ext]
+    ]
+    param_names = ["file"]
+    natoms = 100000
+
+    def setup(self, file):
+        self.mol = synthetic.water_box(self.natoms // 3, seed=0).mol
+        name, level = file.split(":")
+        self.level = int(level)
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "mol." + name)
+        self.mol.to_file(self.filename, compresslevel=self.level)
+
+    def teardown(self, file):
+        shutil.rmtree(self.tmpdir)
+
+    def time_write(self, file):
+        self.mol.to_file(self.filename, compresslevel=self.level)
+
+    def time_read(self, file):
+        Molecule.from_file(self.filename)
+
+    def mem_file(self, file):
+        # Compressed file contents, measured as the file size
+        with open(self.filename, "rb") as fp:
+            return fp.read()
+
+
+class TimeThreads:
+    """ Multi-threaded zstd compression, the stdlib codecs being single-threaded. """
+
+    params = [0, 2, -1]
+    param_names = ["threads"]
+    natoms = 1000000
+
+    def setup(self, threads):
+        self.mol = synthetic.water_box(self.natoms // 3, seed=0).mol
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "mol.json.zst")
+
+    def teardown(self, threads):
+        shutil.rmtree(self.tmpdir)
+
+    def time_write(self, threads):
+        self.mol.to_file(self.filename, compresslevel=3, threads=threads)
+
+
+if __name__ == "__main__":
+    main(
+        TimeCompression,
+        *([TimeThreads] if ".zst" in compression.suffixes() else []),
+        repeat=1,
+    )
@@ -0,0 +1,53 @@
+"""
+Benchmarks constraining a box of 100k rigid waters after a perturbation of the size of an MD
+step: analytic SETTLE against colored SHAKE iterations on the same constraints, the RATTLE and
+SETTLE velocity projections, and the one-off cluster setup.
+"""
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.compute.constraints import Constraints
+from common import run
+
+nwaters, tol = 100000, 1e-8
+
+
+class TimeWaterBox:
+    def setup(self):
+        water = synthetic.water_box(nwaters, seed=0).mol
+        # Rigid waters: both O-H bonds and the H-H distance
+        bonds = numpy.array(water.connectivity, dtype=numpy.int64)[:, :2]
+        self.pairs = numpy.concatenate((bonds, bonds[:, 1].reshape(-1, 2)))
+        self.geom, self.masses = water.geometry, water.masses
+        self.lengths = numpy.linalg.norm(
+            self.geom[self.pairs[:, 0]] - self.geom[self.pairs[:, 1]], axis=1
+        )
+        rng = numpy.random.default_rng(0)
+        self.moved = self.geom + rng.standard_normal(self.geom.shape) * 0.01
+        self.vel = rng.standard_normal(self.geom.shape) * 0.01
+        self.settle = Constraints(self.pairs, self.lengths, self.masses, tol=tol)
+        self.shake = Constraints(
+            self.pairs, self.lengths, self.masses, method="shake", tol=tol
+        )
+
+    def time_setup(self):
+        Constraints(self.pairs, self.lengths, self.masses, tol=tol)
+
+    def time_settle(self):
+        self.settle.apply(self.geom, self.moved.copy())
+
+    def time_shake(self):
+        self.shake.apply(self.geom, self.moved.copy())
+
+    def time_settle_velocities(self):
+        self.settle.apply_velocities(self.geom, self.vel.copy())
+
+    def time_rattle_velocities(self):
+        self.shake.apply_velocities(self.geom, self.vel.copy())
+
+
+if __name__ == "__main__":
+    bench = TimeWaterBox()
+    bench.setup()
+    bench.time_shake()
+    print("SHAKE convergence:", bench.shake.stats())
+    run(TimeWaterBox, repeat=3)
@@ -0,0 +1,81 @@
+"""
+Benchmarks the SQLite molecule database with 10k, 100k, and 1M molecules: bulk insertion and
+indexed queries by hash, formula, atom count, and residue, streaming the matching molecules.
+Molecules are drawn from 100 ligands and 10 small proteins with shifted geometries.
+"""
+import os
+import shutil
+import tempfile
+from mmelemental.compute import synthetic
+from mmelemental.util.database import MoleculeDatabase
+from common import main
+
+_pool = []
+
+
+def molecules(nmols):
+    """ Yields nmols distinct molecules, built as needed. """
+    if not _pool:
+        _pool.extend(system.mol for system in synthetic.ligand_library(100, seed=0))
+        _pool.extend(
+            synthetic.random_protein(3, seed=i, residues=["ALA", "GLY", "SER"]).mol
+            for i in range(10)
+        )
+    for i in range(nmols):
+        mol = _pool[i % len(_pool)]
+        shift = 1e-3 * (i // len(_pool))
+        yield mol.copy(update={"geometry": mol.geometry + shift, "name": f"mol{i}"})
+
+
+class _Database:
+    params = [10000, 100000, 1000000]
+    param_names = ["nmols"]
+
+    def setup(self, nmols):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "mols.sqlite")
+
+    def teardown(self, nmols):
+        shutil.rmtree(self.tmpdir)
+
+
+class TimeInsert(_Database):
+    def time_add_many(self, nmols):
+        with MoleculeDatabase(self.path) as db:
+            db.add_many(molecules(nmols))
+        os.remove(self.path)
+
+
+class TimeQuery(_Database):
+    def setup(self, nmols):
+        super().setup(nmols)
+        self.db = MoleculeDatabase(self.path)
+        self.db.add_many(molecules(nmols))
+        self.hash = next(self.db.hashes(name="mol7"))
+        self.formula = _pool[7].get_molecular_formula()
+
+    def teardown(self, nmols):
+        self.db.close()
+        super().teardown(nmols)
+
+    def time_get(self, nmols):
+        self.db.get(self.hash)
+
+    def time_count_formula(self, nmols):
+        self.db.count(formula=self.formula)
+
+    def time_query_natoms(self, nmols):
+        for _ in self.db.query(natoms=(30, 32), limit=100):
+            pass
+
+    def time_query_residues(self, nmols):
+        for _ in self.db.query(residues=["ALA", "SER"], limit=100):
+            pass
+
+    def peakmem_stream(self, nmols):
+        for _ in self.db.query(limit=10000):
+            pass
+
+
+if __name__ == "__main__":
+    main(TimeInsert, TimeQuery, repeat=1)
@@ -0,0 +1,62 @@
+"""
+Benchmarks the contact search (5 angstrom cutoff) of a periodic 200k-atom fluid decomposed into 8
+domains on 1, 2, 4, and 8 worker processes, against a single neighbor search over the whole system.
+The run time should drop with the number of processes up to the number of cores. The worker pool
+is started in setup and kept between runs, as between the steps of a simulation.
+"""
+import numpy
+from mmelemental.compute.neighbors import neighbor_pairs
+from mmelemental.compute.domains import DomainDecomposition, contacts
+from common import run
+
+natoms, density, cutoff, ndomains = 200000, 0.03, 5.0, 8
+
+
+class _Contacts:
+    processes = 1
+
+    def setup(self):
+        rng = numpy.random.default_rng(0)
+        self.box = numpy.full(3, (natoms / density) ** (1.0 / 3.0))
+        self.geometry = rng.random((natoms, 3)) * self.box
+        self.dd = DomainDecomposition(self.geometry, cutoff, ndomains, box=self.box)
+        if self.processes > 1:
+            self.dd.map(contacts, cutoff, processes=self.processes)
+
+    def teardown(self):
+        self.dd.close()
+
+    def time_contacts(self):
+        self.dd.map(contacts, cutoff, processes=self.processes)
+
+
+class TimeSingle(_Contacts):
+    def time_contacts(self):
+        neighbor_pairs(self.geometry, cutoff, self.box)
+
+
+class TimeDomains1(_Contacts):
+    processes = 1
+
+
+class TimeDomains2(_Contacts):
+    processes = 2
+
+
+class TimeDomains4(_Contacts):
+    processes = 4
+
+
+class TimeDomains8(_Contacts):
+    processes = 8
+
+
+if __name__ == "__main__":
+    run(
+        TimeSingle,
+        TimeDomains1,
+        TimeDomains2,
+        TimeDomains4,
+        TimeDomains8,
+        repeat=1,
+    )
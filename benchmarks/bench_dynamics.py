@@ -0,0 +1,63 @@
+"""
+Benchmarks the in-process MD engine: velocity generation for a million atoms, 100 velocity
+Verlet steps of a small molecule with a v-rescale thermostat, and the same run through the
+DynamicsComponent which also streams frames to a file.
+"""
+import os
+import shutil
+import tempfile
+import numpy
+from mmelemental.models.app.dynamics import DynamicsInput
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute import dynamics, synthetic
+from mmelemental.components.sim.dynamics_component import DynamicsComponent
+from common import run
+
+
+class TimeVelocities:
+    def setup(self):
+        self.masses = numpy.random.rand(1000000) * 20 + 1
+
+    def time_maxwell_boltzmann_1M(self):
+        dynamics.maxwell_boltzmann(self.masses, 300.0, seed=0)
+
+
+class TimeSmallMolecule:
+    def setup(self):
+        self.mol, self.ff, _ = synthetic.ligand_library(1, (30, 30), seed=0)[0]
+        self.model = ForceFieldEnergy(self.mol, self.ff)
+        self.tmpdir = tempfile.mkdtemp()
+        self.inputs = DynamicsInput(
+            mol={"ligand": self.mol},
+            forcefield={"ligand": self.ff},
+            nsteps=100,
+            step_size=0.5,
+            freq=10,
+            traj=os.path.join(self.tmpdir, "traj.jsonl"),
+            gen_vel=[True],
+            gen_temp=[300.0],
+            gen_seed=[0],
+            temp=[300.0],
+            temp_method="v-rescale",
+        )
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def time_dynamics_100_steps(self):
+        md = dynamics.Dynamics(
+            lambda x: self.model.compute(x)[:2],
+            self.mol.geometry,
+            self.model.masses,
+            dynamics.maxwell_boltzmann(self.model.masses, 300.0, seed=0),
+            dt=0.5,
+            thermostat=dynamics.VRescale(300.0, seed=0),
+        )
+        md.step(100)
+
+    def time_component_100_steps(self):
+        DynamicsComponent.compute(self.inputs)
+
+
+if __name__ == "__main__":
+    run(TimeVelocities, TimeSmallMolecule)
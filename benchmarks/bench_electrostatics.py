@@ -0,0 +1,53 @@
+"""
+Benchmarks the reciprocal-space Ewald sum computed directly and with smooth PME, and the
+full PME evaluation (neighbor search, real space, reciprocal space) of a water-density
+system of point charges.
+"""
+import numpy
+from mmelemental.compute import electrostatics as es
+from mmelemental.compute import neighbors
+from common import run
+
+rc, density = 9.0, 0.1  # atoms per cubic angstrom
+
+
+def _system(natoms):
+    box = numpy.full(3, (natoms / density) ** (1.0 / 3.0))
+    geom = numpy.random.rand(natoms, 3) * box
+    charges = numpy.random.randn(natoms)
+    return box, geom, charges - charges.mean()
+
+
+class TimeReciprocal:
+    def setup(self):
+        self.box, self.geom, self.charges = _system(3000)
+        self.alpha = es.ewald_alpha(rc)
+        self.pme = es.PME(self.box, self.alpha)
+
+    def time_ewald(self):
+        es.ewald_reciprocal(self.charges, self.geom, self.box, self.alpha, kmax=8)
+
+    def time_pme(self):
+        self.pme.reciprocal(self.charges, self.geom)
+
+
+class TimePME30k:
+    def setup(self):
+        self.box, self.geom, self.charges = _system(30000)
+        self.pme = es.PME(self.box, es.ewald_alpha(rc))
+        self.pairs = neighbors.neighbor_pairs(self.geom, rc, self.box)
+
+    def time_neighbor_pairs(self):
+        neighbors.neighbor_pairs(self.geom, rc, self.box)
+
+    def time_pme_reciprocal(self):
+        self.pme.reciprocal(self.charges, self.geom)
+
+    def time_pme_total(self):
+        es.electrostatic_energy(
+            self.charges, self.geom, rc=rc, box=self.box, pairs=self.pairs, pme=self.pme
+        )
+
+
+if __name__ == "__main__":
+    run(TimeReciprocal, TimePME30k, repeat=3)
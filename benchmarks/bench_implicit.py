@@ -0,0 +1,44 @@
+"""
+Benchmarks Generalized Born (OBC2) solvation energies and forces of a 50-atom ligand (all pairs)
+and of a protein of about 5000 united atoms with a 12 angstrom cutoff.
+"""
+from mmelemental.models.solvent.implicit import Solvent
+from mmelemental.compute import synthetic
+from mmelemental.compute.implicit import GeneralizedBorn
+from common import run
+
+
+class _Solvation:
+    cutoff = None
+
+    def system(self):
+        return synthetic.ligand_library(1, (50, 50), seed=0)[0]
+
+    def setup(self):
+        mol, mm_ff, _ = self.system()
+        self.geometry = mol.geometry
+        self.gb = GeneralizedBorn.from_solvent(
+            Solvent(implicit=True), mol.symbols, mm_ff.charges, cutoff=self.cutoff
+        )
+
+    def time_born_radii(self):
+        self.gb.born_radii(self.geometry)
+
+    def time_energy_forces(self):
+        self.gb.compute(self.geometry)
+
+
+class TimeLigand(_Solvation):
+    cutoff = None
+
+
+class TimeSolute(_Solvation):
+    cutoff = 12.0
+
+    def system(self):
+        # About 7 united atoms per residue
+        return synthetic.random_protein(700, seed=0)
+
+
+if __name__ == "__main__":
+    run(TimeLigand, TimeSolute, repeat=3)
@@ -0,0 +1,66 @@
+"""
+Benchmarks single-residue (10 atom) Monte Carlo moves in Lennard-Jones fluids of 1k and 100k
+atoms: incremental rescoring with IncrementalEnergy against rescoring the whole system. The
+incremental cost per move should be nearly independent of the system size.
+"""
+import numpy
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.models import forcefield as ff
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.incremental import IncrementalEnergy, Move
+from common import run
+
+density, rc = 0.03, 8.0  # atoms per cubic angstrom
+
+
+def _fluid(natoms):
+    rng = numpy.random.default_rng(0)
+    box = numpy.full(3, (natoms / density) ** (1.0 / 3.0))
+    mol = Molecule(symbols=["Ar"] * natoms, geometry=rng.random((natoms, 3)) * box)
+    mm_ff = ff.ForceField(
+        nonbonded=ff.nonbonded.NonBonded(
+            params=ff.nonbonded.potentials.LennardJones(
+                epsilon=numpy.full(natoms, 0.99), sigma=numpy.full(natoms, 3.4)
+            )
+        ),
+        types=["Ar"] * natoms,
+    )
+    model = ForceFieldEnergy(mol, mm_ff, cutoff=rc, box=box)
+    return model, mol.geometry
+
+
+class _Moves:
+    natoms = 1000
+
+    def setup(self):
+        self.model, self.geometry = _fluid(self.natoms)
+        self.inc = IncrementalEnergy(self.model, self.geometry)
+        self.rng = numpy.random.default_rng(1)
+
+    def _move(self):
+        first = self.rng.integers(self.natoms - 10)
+        return Move.translate(
+            self.inc.geometry, numpy.arange(first, first + 10), self.rng.normal(size=3)
+        )
+
+    def time_incremental_move(self):
+        self.inc.propose(self._move())
+        self.inc.reject()
+
+    def time_full_rescore(self):
+        move = self._move()
+        trial = self.inc.geometry.copy()
+        trial[move.atoms] = move.positions
+        self.model.energy(trial)
+
+
+class TimeMoves1k(_Moves):
+    natoms = 1000
+
+
+class TimeMoves100k(_Moves):
+    natoms = 100000
+
+
+if __name__ == "__main__":
+    run(TimeMoves1k, TimeMoves100k, repeat=3)
@@ -0,0 +1,44 @@
+"""
+Benchmarks the overhead of the instrumentation layer on hot paths of a small molecule: construction
+and hashing with instrumentation disabled (default) and enabled with an in-memory sink.
+"""
+from mmelemental.compute import synthetic
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util import instrument
+from common import run
+
+ncalls = 200
+
+
+class _Molecule:
+    enabled = False
+
+    def setup(self):
+        self.mol = synthetic.random_protein(3, seed=0).mol
+        self.data = self.mol.dict()
+        if self.enabled:
+            self.sink = instrument.enable()
+
+    def teardown(self):
+        if self.enabled:
+            instrument.disable(self.sink)
+
+    def time_init(self):
+        for _ in range(ncalls):
+            Molecule(**self.data)
+
+    def time_get_hash(self):
+        for _ in range(ncalls):
+            self.mol.get_hash()
+
+
+class TimeDisabled(_Molecule):
+    enabled = False
+
+
+class TimeEnabled(_Molecule):
+    enabled = True
+
+
+if __name__ == "__main__":
+    run(TimeDisabled, TimeEnabled, repeat=5)
@@ -0,0 +1,72 @@
+"""
+Benchmarks JSON encoding and decoding of Molecule models of 10k, 100k, and 1M atoms with the
+optimized codec of mmelemental.util.serialization (orjson when installed) against pydantic's
+json() and json.load followed by validation, as done before, and the peak memory of decoding JSON
+at once against incrementally into preallocated arrays. msgpack files with binary arrays are
+benchmarked too when msgpack is installed.
+"""
+import json
+import os
+import shutil
+import tempfile
+from mmelemental.compute import synthetic
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util import serialization
+from common import main
+
+
+class _File:
+    params = [10000, 100000, 1000000]
+    param_names = ["natoms"]
+    ext = ".json"
+
+    def setup(self, natoms):
+        self.mol = synthetic.water_box(natoms // 3, seed=0).mol
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "mol" + self.ext)
+        self.mol.to_file(self.filename)
+
+    def teardown(self, natoms):
+        shutil.rmtree(self.tmpdir)
+
+    def time_decode(self, natoms):
+        Molecule.from_file(self.filename)
+
+    def mem_file(self, natoms):
+        # File contents, measured as the file size
+        with open(self.filename, "rb") as fp:
+            return fp.read()
+
+
+class TimeJSON(_File):
+    def time_encode_pydantic(self, natoms):
+        self.mol.json()
+
+    def time_encode(self, natoms):
+        serialization.json_dumps(self.mol)
+
+    def time_decode_stdlib(self, natoms):
+        with open(self.filename) as fp:
+            Molecule(**json.load(fp))
+
+    def time_decode_stream(self, natoms):
+        Molecule(**serialization.json_load_stream(self.filename, Molecule))
+
+    def peakmem_decode_whole(self, natoms):
+        with open(self.filename, "rb") as fp:
+            data = serialization.json_loads(fp.read())
+        Molecule(**serialization.decode_arrays(Molecule, data))
+
+    def peakmem_decode_stream(self, natoms):
+        Molecule(**serialization.json_load_stream(self.filename, Molecule))
+
+
+class TimeMsgpack(_File):
+    ext = ".msgpack"
+
+    def time_encode(self, natoms):
+        serialization.msgpack_dumps(self.mol)
+
+
+if __name__ == "__main__":
+    main(TimeJSON, *([TimeMsgpack] if serialization.msgpack else []), repeat=3)
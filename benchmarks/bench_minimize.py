@@ -0,0 +1,75 @@
+"""
+Benchmarks minimizing a library of 1000 small drug-like molecules in process with the
+MinimizeComponent against calling an external engine per molecule. The engine is the same L-BFGS
+minimizer run the way file-based engines are driven: a new process per molecule that reads the
+OptimInput file, minimizes, and writes the OptimOutput file. Engine calls take over a second each,
+so they are timed on the first 20 molecules only; the per-molecule times are printed at the end.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.models.app.optim import OptimInput
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.components.sim.minimize_component import MinimizeComponent
+from common import run
+
+nligands, nengine, natoms = 1000, 20, 30
+
+# External engine: input file -> minimization -> output file
+_engine = """
+import sys
+from mmelemental.models.app.optim import OptimInput
+from mmelemental.components.sim.minimize_component import MinimizeComponent
+from mmelemental.util import serialization
+
+out = MinimizeComponent.compute(OptimInput.from_file(sys.argv[1]))
+with open(sys.argv[2], "w") as fp:
+    fp.write(serialization.json_dumps(out))
+"""
+
+
+class TimeLigandLibrary:
+    def setup(self):
+        rng = numpy.random.default_rng(0)
+        self.inputs = []
+        for system in synthetic.ligand_library(nligands, (natoms, natoms), seed=0):
+            # Ligands are generated at their bonded minimum, so they are perturbed
+            geometry = system.mol.geometry + rng.normal(scale=0.1, size=(natoms, 3))
+            mol = Molecule(**{**system.mol.dict(), "geometry": geometry})
+            self.inputs.append(
+                OptimInput(
+                    mol={"ligand": mol}, forcefield={"ligand": system.ff}, tol=1.0
+                )
+            )
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.files = []
+        for i, inputs in enumerate(self.inputs[:nengine]):
+            infile = os.path.join(self.tmpdir, f"ligand{i}.json")
+            inputs.to_file(infile)
+            self.files.append((infile, os.path.join(self.tmpdir, f"out{i}.json")))
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def time_in_process_lbfgs(self):
+        for inputs in self.inputs:
+            MinimizeComponent.compute(inputs)
+
+    def time_engine_per_molecule(self):
+        for infile, outfile in self.files:
+            subprocess.run([sys.executable, "-c", _engine, infile, outfile], check=True)
+
+
+if __name__ == "__main__":
+    results = run(TimeLigandLibrary, repeat=1)
+    in_process = results["TimeLigandLibrary.time_in_process_lbfgs"] / nligands
+    engine = results["TimeLigandLibrary.time_engine_per_molecule"] / nengine
+    print(
+        f"\nPer molecule: {in_process * 1e3:.1f} ms in process, {engine * 1e3:.1f} ms "
+        f"with an engine call ({engine / in_process:.1f}x)"
+    )
@@ -0,0 +1,130 @@
+"""
+Benchmarks the core models and I/O on synthetic water boxes of 1k, 100k, and 1M atoms:
+Molecule construction, property access, hashing, JSON round-trip through to_file/from_file,
+ForceField construction with Harmonic bonds and LennardJones parameters, and unit conversion.
+The memory held by the models and the peak memory of building and reading them are measured too.
+Results can be stored as a baseline and compared against one, e.g.
+    python bench_models.py --compare baselines/bench_models.json
+The peak memory of every timed benchmark is measured with --peakmem.
+"""
+import os
+import shutil
+import tempfile
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.models import forcefield as ff
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util.units import convert
+from common import main
+
+scales = [1000, 100000, 1000000]
+
+
+class _System:
+    params = scales
+    param_names = ["natoms"]
+
+    def setup(self, natoms):
+        # Only the atoms and bonds of the water box are used
+        water = synthetic.water_box(natoms // 3, seed=0).mol
+        self.symbols, self.geometry = water.symbols, water.geometry
+        self.bonds = water.connectivity
+        self.mol = Molecule(
+            symbols=self.symbols, geometry=self.geometry, connectivity=self.bonds
+        )
+
+
+class TimeMoleculeInit(_System):
+    def time_init(self, natoms):
+        Molecule(symbols=self.symbols, geometry=self.geometry, connectivity=self.bonds)
+
+
+class MemMolecule(_System):
+    def mem_molecule(self, natoms):
+        return self.mol
+
+    def peakmem_init(self, natoms):
+        Molecule(symbols=self.symbols, geometry=self.geometry, connectivity=self.bonds)
+
+
+class TimeMoleculeProperties(_System):
+    def time_masses(self, natoms):
+        self.mol.masses
+
+    def time_atomic_numbers(self, natoms):
+        self.mol.atomic_numbers
+
+
+class TimeMoleculeHash(_System):
+    def time_get_hash(self, natoms):
+        self.mol.get_hash()
+
+
+class TimeMoleculeJSON(_System):
+    def setup(self, natoms):
+        super().setup(natoms)
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "mol.json")
+        self.mol.to_file(self.filename)
+
+    def teardown(self, natoms):
+        shutil.rmtree(self.tmpdir)
+
+    def time_to_file(self, natoms):
+        self.mol.to_file(self.filename)
+
+    def time_from_file(self, natoms):
+        Molecule.from_file(self.filename)
+
+    def peakmem_from_file(self, natoms):
+        Molecule.from_file(self.filename)
+
+
+class TimeForceField(_System):
+    def setup(self, natoms):
+        super().setup(natoms)
+        rng = numpy.random.default_rng(1)
+        natoms, nbonds = len(self.symbols), len(self.bonds)
+        self.lj = dict(epsilon=rng.random(natoms), sigma=1.0 + rng.random(natoms))
+        self.harmonic = dict(
+            spring=rng.random(nbonds) * 1000.0, lengths=0.9 + 0.1 * rng.random(nbonds)
+        )
+        self.charges = rng.random(natoms) - 0.5
+
+    def time_init(self, natoms):
+        self.mem_forcefield(natoms)
+
+    def mem_forcefield(self, natoms):
+        return ff.ForceField(
+            nonbonded=ff.nonbonded.NonBonded(
+                params=ff.nonbonded.potentials.LennardJones(**self.lj)
+            ),
+            bonds=ff.bonded.Bonds(
+                params=ff.bonded.bonds.potentials.Harmonic(**self.harmonic),
+            ),
+            charges=self.charges,
+        )
+
+
+class TimeUnits:
+    params = scales
+    param_names = ["size"]
+
+    def setup(self, size):
+        self.values = numpy.random.default_rng(2).random(size)
+
+    def time_convert(self, size):
+        convert(self.values, "kcal/mol", "kJ/mol")
+
+
+if __name__ == "__main__":
+    main(
+        TimeMoleculeInit,
+        MemMolecule,
+        TimeMoleculeProperties,
+        TimeMoleculeHash,
+        TimeMoleculeJSON,
+        TimeForceField,
+        TimeUnits,
+        repeat=3,
+    )
@@ -0,0 +1,60 @@
+"""
+Benchmarks the in-place PBC operations on a triclinic cell holding 1M atoms of 3-atom molecules:
+wrapping, minimum images of 1M random pair displacements, and making the molecules whole again.
+The orthorhombic minimum image on the same displacements is the reference.
+"""
+import numpy
+from mmelemental.compute import pbc
+from common import run
+
+natoms, density = 999999, 0.1
+
+
+class _Cell:
+    def setup(self):
+        rng = numpy.random.default_rng(0)
+        side = (natoms / density) ** (1.0 / 3.0)
+        self.vectors = pbc.cell_vectors([side] * 3, [70.0, 80.0, 75.0])
+        centers = rng.random((natoms // 3, 3)) @ self.vectors
+        bonds = rng.normal(size=(natoms // 3, 2, 3))
+        self.geometry = numpy.concatenate(
+            (centers[:, None], centers[:, None] + bonds), axis=1
+        ).reshape(-1, 3)
+        i = numpy.arange(0, natoms, 3)
+        self.connectivity = numpy.stack(
+            (numpy.r_[i, i], numpy.r_[i + 1, i + 2], numpy.ones(2 * len(i))), axis=1
+        )
+        self.levels = pbc.bond_tree(self.connectivity, natoms)
+        i, j = rng.integers(natoms, size=(2, natoms))
+        self.d = self.geometry[j] - self.geometry[i]
+
+
+class TimeWrap(_Cell):
+    def time_wrap(self):
+        pbc.wrap_triclinic(self.geometry, self.vectors)
+
+
+class TimeMinimumImage(_Cell):
+    def time_minimum_image(self):
+        pbc.minimum_image_triclinic(self.d.copy(), self.vectors)
+
+
+class TimeMinimumImageOrthorhombic(_Cell):
+    def time_minimum_image(self):
+        pbc.minimum_image(self.d.copy(), self.vectors.diagonal())
+
+
+class TimeMakeWhole(_Cell):
+    def time_make_whole(self):
+        pbc.wrap_triclinic(self.geometry, self.vectors)
+        pbc.make_whole(self.geometry, None, self.vectors, levels=self.levels)
+
+
+if __name__ == "__main__":
+    run(
+        TimeWrap,
+        TimeMinimumImage,
+        TimeMinimumImageOrthorhombic,
+        TimeMakeWhole,
+        repeat=3,
+    )
@@ -0,0 +1,58 @@
+"""
+Benchmarks temperature replica exchange of 8 replicas of a 100-atom polymer chain (200 steps, exchanges
+every 50 steps) on 1, 2, 4, and 8 worker processes. The run time should drop with the number of
+processes up to the number of replicas or cores.
+"""
+import numpy
+from mmelemental.models.app.dynamics import DynamicsInput
+from mmelemental.compute import synthetic
+from mmelemental.compute.replica import ReplicaExchange
+from common import run
+
+nreplicas, natoms = 8, 100
+
+
+class _Exchange:
+    processes = 1
+
+    def setup(self):
+        mol, mm_ff, _ = synthetic.polymer_chains(1, natoms, seed=0)
+        temps = numpy.geomspace(300.0, 450.0, nreplicas)
+        self.replicas = [
+            DynamicsInput(
+                mol={"chain": mol},
+                forcefield={"chain": mm_ff},
+                nsteps=200,
+                step_size=0.5,
+                gen_vel=[True],
+                gen_temp=[temp],
+                temp=[temp],
+                temp_method="langevin",
+            )
+            for temp in temps
+        ]
+
+    def time_run(self):
+        ReplicaExchange(
+            self.replicas, interval=50, processes=self.processes, seed=0
+        ).run()
+
+
+class TimeExchange1(_Exchange):
+    processes = 1
+
+
+class TimeExchange2(_Exchange):
+    processes = 2
+
+
+class TimeExchange4(_Exchange):
+    processes = 4
+
+
+class TimeExchange8(_Exchange):
+    processes = 8
+
+
+if __name__ == "__main__":
+    run(TimeExchange1, TimeExchange2, TimeExchange4, TimeExchange8, repeat=1)
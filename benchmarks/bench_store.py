@@ -0,0 +1,56 @@
+"""
+Benchmarks the content-addressed model store with 1000 molecules of 100 waters: bulk and single
+puts of new and already stored molecules, existence checks, retrieval, and garbage collection.
+"""
+import shutil
+import tempfile
+from mmelemental.compute import synthetic
+from mmelemental.util.store import ModelStore
+from common import main
+
+
+class TimeStore:
+    nmols = 1000
+
+    def setup(self):
+        self.mols = [synthetic.water_box(100, seed=i).mol for i in range(self.nmols)]
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = ModelStore(self.tmpdir)
+        self.keys = self.store.put_many(self.mols)
+
+    def teardown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_put_many(self):
+        store = ModelStore(tempfile.mkdtemp(dir=self.tmpdir))
+        store.put_many(self.mols)
+        store.close()
+
+    def time_put_many_stored(self):
+        self.store.put_many(self.mols, pin=False)
+
+    def time_put(self):
+        store = ModelStore(tempfile.mkdtemp(dir=self.tmpdir))
+        for mol in self.mols[:100]:
+            store.put(mol)
+        store.close()
+
+    def time_exists_many(self):
+        self.store.exists_many(self.keys)
+
+    def time_get(self):
+        self.store.get(self.keys[0])
+
+    def time_get_many(self):
+        self.store.get_many(self.keys)
+
+    def time_gc(self):
+        store = ModelStore(tempfile.mkdtemp(dir=self.tmpdir))
+        store.put_many(self.mols, pin=False)
+        store.gc()
+        store.close()
+
+
+if __name__ == "__main__":
+    main(TimeStore, repeat=3)
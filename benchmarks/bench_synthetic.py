@@ -0,0 +1,44 @@
+"""
+Benchmarks the synthetic system generators from 1k to 1M atoms, including the validation of the
+generated Molecule and ForceField models, which dominates at 1M atoms. 10M atoms are not
+benchmarked as their models take minutes to validate.
+"""
+from mmelemental.compute import synthetic
+from common import main
+
+scales = [1000, 100000, 1000000]
+
+
+class TimeWaterBox:
+    params = scales
+
+    def time_water_box(self, natoms):
+        synthetic.water_box(natoms // 3, seed=0)
+
+
+class TimePolymerChains:
+    params = scales
+
+    def time_polymer_chains(self, natoms):
+        synthetic.polymer_chains(natoms // 1000, 1000, seed=0)
+
+
+class TimeRandomProtein:
+    params = scales
+
+    def time_random_protein(self, natoms):
+        # About 7 united atoms per residue
+        synthetic.random_protein(natoms // 7, seed=0)
+
+
+class TimeLigandLibrary:
+    params = [100, 1000]
+
+    def time_ligand_library(self, nligands):
+        synthetic.ligand_library(nligands, seed=0)
+
+
+if __name__ == "__main__":
+    main(
+        TimeWaterBox, TimePolymerChains, TimeRandomProtein, TimeLigandLibrary, repeat=1
+    )
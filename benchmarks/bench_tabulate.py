@@ -0,0 +1,47 @@
+"""
+Benchmarks tabulated Lennard-Jones interactions against the analytic expression for a
+million atom pairs. Plain Lennard-Jones is about as cheap as the table lookup itself in
+NumPy; tables pay off for potentials that are expensive to evaluate (EAM, switched or
+shifted forms) since their cost does not depend on the functional form.
+"""
+import numpy
+from mmelemental.models import forcefield as ff
+from mmelemental.compute import mixing, tabulate
+from common import run
+
+natoms, ntypes, npairs = 1000, 8, 10 ** 6
+
+
+class TimeLennardJones:
+    def setup(self):
+        type_ids = numpy.arange(natoms) % ntypes
+        lj = ff.nonbonded.potentials.LennardJones(
+            epsilon=numpy.random.rand(ntypes)[type_ids],
+            sigma=3 + numpy.random.rand(ntypes)[type_ids],
+        )
+        mm_ff = ff.ForceField(
+            nonbonded=ff.nonbonded.NonBonded(params=lj),
+            types=[f"T{i}" for i in type_ids],
+        )
+        self.mixing = mixing.mixing_table(mm_ff)
+        self.table = tabulate.lennard_jones_table(mm_ff, rmin=2.0, rmax=12.0)
+        self.i = numpy.random.randint(natoms, size=npairs)
+        self.j = numpy.random.randint(natoms, size=npairs)
+        self.r = numpy.random.uniform(2.0, 12.0, npairs)
+
+    def time_analytic(self):
+        c6, c12 = self.mixing.lookup(self.i, self.j)
+        ir6 = 1.0 / self.r ** 6
+        energy = (c12 * ir6 - c6) * ir6
+        dedr = (6.0 * c6 - 12.0 * c12 * ir6) * ir6 / self.r
+        return energy, dedr
+
+    def time_tabulated(self):
+        return self.table.evaluate(self.i, self.j, self.r)
+
+    def time_tabulated_energy(self):
+        return self.table.energy(self.i, self.j, self.r)
+
+
+if __name__ == "__main__":
+    run(TimeLennardJones, repeat=3)
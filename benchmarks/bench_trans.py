@@ -0,0 +1,43 @@
+"""
+Benchmarks translator resolution with and without the cached resolution table. A
+lightweight translator module is registered so no toolkit needs to be installed.
+"""
+import importlib
+import sys
+import types
+from mmelemental.util import trans
+from common import run
+
+
+class _TransComponent:
+    @staticmethod
+    def find_trans(dtype):
+        return "bench_translator"
+
+
+def _register():
+    mod = types.ModuleType("bench_translator")
+    mod.__spec__ = importlib.machinery.ModuleSpec("bench_translator", None)
+    mod._classes_map = {"Molecule": object, "ForceField": object}
+    sys.modules["bench_translator"] = mod
+    trans.TransComponent = _TransComponent
+
+
+class TimeTransResolve:
+    def setup(self):
+        _register()
+        trans.invalidate()
+
+    def time_uncached(self):
+        # What every I/O call used to do: search, find_spec, import, and class lookup
+        trans._resolve("data", "bench", "Molecule", None, None)
+
+    def time_cached(self):
+        trans.resolve("data", "bench", "Molecule")
+
+    def time_dict_lookup(self):
+        trans._table.get(("data", "bench", None, "Molecule", None))
+
+
+if __name__ == "__main__":
+    run(TimeTransResolve)
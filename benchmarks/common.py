@@ -0,0 +1,174 @@
+"""
+Helpers shared by the MMElemental benchmarks. Benchmarks are asv-style classes with optional
+``setup``/``teardown`` methods, ``time_*`` methods timed in seconds, ``peakmem_*`` methods whose
+peak allocated memory is measured in bytes, ``mem_*`` methods returning an object (e.g. a model)
+whose memory usage is measured in bytes, and an optional ``params`` list of values passed to all
+of them. They can be run directly as scripts.
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+
+__all__ = ["run", "report", "main", "peakmem", "mem"]
+
+# Relative slowdown against the baseline reported as a regression
+default_threshold = 0.25
+
+
+def _param_values(cls, quick=False):
+    params = getattr(cls, "params", None)
+    if params is None:
+        return [None]
+    return params[:1] if quick else params
+
+
+def peakmem(func, *args):
+    """Returns the peak memory in bytes allocated by a call of func, traced by tracemalloc, which
+    also sees NumPy array buffers. A first untraced call fills the caches and lazy imports."""
+    func(*args)
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return peak - start
+
+
+def mem(obj):
+    """ Returns the bytes held by a model or any other object. """
+    from mmelemental.util.memory import memory_usage
+
+    return memory_usage(obj).total
+
+
+def _unit(key):
+    """ Returns the scale and unit a result is printed in. """
+    method = key.split("(")[0].split(".")[-1]
+    if method.startswith(("peakmem_", "mem_")):
+        return 1.0 / 2 ** 20, "MiB"
+    return 1e6, "us"
+
+
+def run(*classes, repeat=5, quick=False, memory=False):
+    """Runs every benchmark method of the supplied benchmark classes for every parameter, prints
+    the results, and returns them keyed by ``Class.method`` or ``Class.method(param)``: the best
+    time per call in seconds of ``time_*`` methods, and the bytes measured by ``peakmem_*`` and
+    ``mem_*`` methods. Only the first parameter is run if quick. The peak memory of every
+    ``time_*`` method is also measured as ``peakmem_*`` if memory is set."""
+    results = {}
+    for cls in classes:
+        for param in _param_values(cls, quick):
+            args = () if param is None else (param,)
+            bench = cls()
+            if hasattr(bench, "setup"):
+                bench.setup(*args)
+            suffix = "" if param is None else f"({param})"
+            measured = {}
+            for name in sorted(dir(bench)):
+                func = getattr(bench, name)
+                if name.startswith("time_"):
+                    timer = timeit.Timer(lambda: func(*args))
+                    number, _ = timer.autorange()
+                    measured[name] = (
+                        min(timer.repeat(repeat=repeat, number=number)) / number
+                    )
+                    if memory and not hasattr(bench, "peakmem_" + name[5:]):
+                        measured["peakmem_" + name[5:]] = peakmem(func, *args)
+                elif name.startswith("peakmem_"):
+                    measured[name] = peakmem(func, *args)
+                elif name.startswith("mem_"):
+                    measured[name] = mem(func(*args))
+            for name, value in measured.items():
+                key = f"{cls.__name__}.{name}{suffix}"
+                results[key] = value
+                scale, unit = _unit(key)
+                print(f"{key:<60} {value * scale:14.3f} {unit}", flush=True)
+            if hasattr(bench, "teardown"):
+                bench.teardown(*args)
+    return results
+
+
+def report(results, baseline, threshold=default_threshold):
+    """Prints the ratio of every result to its baseline and returns the keys of the
+    benchmarks slower (or using more memory) than the baseline by more than threshold."""
+    regressions = []
+    print(f"\n{'benchmark':<60} {'baseline':>14} {'now':>14} {'unit':>4} {'ratio':>7}")
+    for key, value in results.items():
+        scale, unit = _unit(key)
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<60} {'-':>14} {value * scale:14.3f} {unit:>4} {'new':>7}")
+            continue
+        ratio = value / base if base else (1.0 if value == 0 else float("inf"))
+        flag = ""
+        if ratio > 1.0 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif ratio < 1.0 / (1.0 + threshold):
+            flag = "  improved"
+        print(
+            f"{key:<60} {base * scale:14.3f} {value * scale:14.3f} {unit:>4} {ratio:7.2f}{flag}"
+        )
+    print(
+        f"\n{len(regressions)} regression(s) beyond {threshold:.0%} out of {len(results)} benchmarks."
+    )
+    return regressions
+
+
+def _machine():
+    return {
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+    }
+
+
+def main(*classes, repeat=5, argv=None):
+    """Command line entry point of a benchmark script: runs the benchmarks, optionally saves
+    the results as a baseline, and compares them against a stored baseline. Exits with
+    status 1 if any benchmark regressed."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--save", help="Stores the results as a baseline JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=default_threshold,
+        help=f"Relative slowdown reported as a regression. Defaults to {default_threshold}.",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Runs the smallest parameter only."
+    )
+    parser.add_argument(
+        "--peakmem",
+        action="store_true",
+        help="Also measures the peak memory allocated by every time_* benchmark.",
+    )
+    parser.add_argument("--repeat", type=int, default=repeat)
+    args = parser.parse_args(argv)
+
+    results = run(*classes, repeat=args.repeat, quick=args.quick, memory=args.peakmem)
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump(
+                {"machine": _machine(), "results": results},
+                fp,
+                indent=2,
+                sort_keys=True,
+            )
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)["results"]
+        if report(results, baseline, args.threshold):
+            sys.exit(1)
+    return results
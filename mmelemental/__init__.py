@@ -4,7 +4,7 @@ A short description of the project.
 """
 
 # Add imports here
-from . import models, util, components
+from . import models, util, compute, components
 
 # Handle versioneer
 from ._version import get_versions
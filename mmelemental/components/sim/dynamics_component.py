@@ -0,0 +1,85 @@
+from mmic.components.blueprints.generic_component import GenericComponent
+from typing import Any, Dict, List, Optional, Tuple
+
+from mmelemental.models.app.dynamics import DynamicsInput, DynamicsOutput
+from mmelemental.models.collect.mm_traj import Frame
+from mmelemental.compute.dynamics import Dynamics
+from mmelemental.util.units import convert
+
+
+class DynamicsComponent(GenericComponent):
+    """Runs molecular dynamics of a molecule in process. Frames are written every ``freq`` steps to
+    ``traj`` (traj.jsonl in the working directory if unset) as JSON lines, one Frame per line, and
+    are never retained in memory, so the output holds no trajectory."""
+
+    # Trajectory filename used if SimInput.traj is unset
+    _traj = "traj.jsonl"
+
+    @classmethod
+    def input(cls):
+        return DynamicsInput
+
+    @classmethod
+    def output(cls):
+        return DynamicsOutput
+
+    def execute(
+        self,
+        inputs: DynamicsInput,
+        extra_outfiles: Optional[List[str]] = None,
+        extra_commands: Optional[List[str]] = None,
+        scratch_name: Optional[str] = None,
+        timeout: Optional[int] = None,
+    ) -> Tuple[bool, DynamicsOutput]:
+
+        name, mol, model, md = Dynamics.from_input(inputs)
+        factor = 1.0
+        if mol.geometry_units not in ("angstrom", "angstroms"):
+            factor = convert(1.0, mol.geometry_units, "angstrom")
+        nsteps = inputs.nsteps or 0
+
+        observables = {
+            key: []
+            for key in ("time", "pot_energy", "kin_energy", "tot_energy", "temperature")
+        }
+        stream = open(inputs.traj or self._traj, "w") if inputs.freq else None
+        try:
+            for state in md.run(nsteps, inputs.freq):
+                for key in ("time", "pot_energy", "kin_energy", "temperature"):
+                    observables[key].append(getattr(state, key))
+                observables["tot_energy"].append(state.pot_energy + state.kin_energy)
+                if stream is not None:
+                    frame = Frame(
+                        geometry=state.geometry / factor,
+                        geometry_units=mol.geometry_units,
+                        velocities=state.velocities,
+                        forces=state.forces,
+                        timestep=md.dt,
+                    )
+                    stream.write(frame.json() + "\n")
+        finally:
+            if stream is not None:
+                stream.close()
+
+        # The final molecule only differs by its positions and velocities, so it is not validated again
+        final = mol.copy(
+            update={
+                "geometry": md.geometry / factor,
+                "velocities": md.velocities,
+                "velocities_units": "angstrom/fs",
+                "forces": None,
+            }
+        )
+        return True, DynamicsOutput(
+            simInput=inputs,
+            mol={name: final},
+            pot_energy=observables["pot_energy"],
+            observables=observables,
+            observables_units={
+                "time": "fs",
+                "pot_energy": "kJ/mol",
+                "kin_energy": "kJ/mol",
+                "tot_energy": "kJ/mol",
+                "temperature": "kelvin",
+            },
+        )
@@ -0,0 +1,68 @@
+from mmic.components.blueprints.generic_component import GenericComponent
+from typing import Any, Dict, List, Optional, Tuple
+import numpy
+
+from mmelemental.models.app.optim import OptimInput, OptimOutput
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.minimize import minimize
+from mmelemental.util.units import convert
+
+
+class MinimizeComponent(GenericComponent):
+    """ Minimizes the potential energy of a molecule in process with L-BFGS or FIRE. """
+
+    # Defaults used for unset OptimInput fields
+    _method, _nsteps, _tol = "lbfgs", 1000, 1.0
+
+    @classmethod
+    def input(cls):
+        return OptimInput
+
+    @classmethod
+    def output(cls):
+        return OptimOutput
+
+    def execute(
+        self,
+        inputs: OptimInput,
+        extra_outfiles: Optional[List[str]] = None,
+        extra_commands: Optional[List[str]] = None,
+        scratch_name: Optional[str] = None,
+        timeout: Optional[int] = None,
+    ) -> Tuple[bool, OptimOutput]:
+
+        name, mol, model = ForceFieldEnergy.from_input(inputs)
+
+        geometry = mol.geometry
+        factor = 1.0
+        if mol.geometry_units not in ("angstrom", "angstroms"):
+            factor = convert(1.0, mol.geometry_units, "angstrom")
+            geometry = geometry * factor
+
+        method = inputs.march_method or self._method
+        kwargs = {
+            "nsteps": inputs.nsteps or self._nsteps,
+            "tol": inputs.tol or self._tol,
+        }
+        if inputs.step_size:
+            kwargs["dt" if method.lower() == "fire" else "max_step"] = inputs.step_size
+        if method.lower() == "fire":
+            kwargs["masses"] = model.masses
+
+        result = minimize(
+            lambda x: model.compute(x)[:2], geometry, method=method, **kwargs
+        )
+
+        # The minimized molecule only differs by its geometry, so it is not validated again
+        final = mol.copy(update={"geometry": result.x / factor, "forces": None})
+        return True, OptimOutput(
+            simInput=inputs,
+            mol={name: final},
+            pot_energy=[result.energy],
+            converged=result.converged,
+            observables={"pot_energy": result.energies, "max_force": result.max_forces},
+            observables_units={
+                "pot_energy": "kJ/mol",
+                "max_force": "kJ/(mol*angstrom)",
+            },
+        )
@@ -4,6 +4,7 @@ from mmic.components.blueprints.generic_component import GenericComponent
 from typing import Any, Dict, List, Tuple, Optional, Union
 from mmelemental.models.util.output import CmdOutput
 from mmelemental.models.util.input import CmdInput
+from mmelemental.util.instrument import span
 
 
 class CmdComponent(GenericComponent):
@@ -63,15 +64,23 @@ class CmdComponent(GenericComponent):
         if extra_commands is not None:
             command.extend(extra_commands)
 
-        exe_success, proc = execute(
-            command,
-            infiles=infiles,
-            outfiles=outfiles,
-            scratch_directory=inputs["scratch_directory"],
-            scratch_name=scratch_name,
-            timeout=timeout,
-            environment=inputs.get("environment", None),
-        )
+        with span("CmdComponent.run") as timer:
+            exe_success, proc = execute(
+                command,
+                infiles=infiles,
+                outfiles=outfiles,
+                scratch_directory=inputs["scratch_directory"],
+                scratch_name=scratch_name,
+                timeout=timeout,
+                environment=inputs.get("environment", None),
+            )
+            # Bytes of the input files written and output files collected
+            timer.nbytes = sum(
+                len(data or "")
+                for files in (infiles, proc.get("outfiles"))
+                if files
+                for data in files.values()
+            )
 
         return exe_success, proc
 
@@ -0,0 +1,18 @@
+from . import (
+    pbc,
+    neighbors,
+    mixing,
+    tabulate,
+    electrostatics,
+    implicit,
+    energy,
+    minimize,
+    dynamics,
+    constraints,
+    incremental,
+    batch,
+    parallel,
+    replica,
+    domains,
+    synthetic,
+)
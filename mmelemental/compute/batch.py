@@ -0,0 +1,262 @@
+""" Batched energy evaluation of many conformers of one topology """
+
+__all__ = [
+    "BatchEnergy",
+    "bonded_terms",
+    "term_energies",
+    "stack_geometries",
+]
+
+from typing import Any, Dict, Tuple
+import math
+import numpy
+
+from .energy import ForceFieldEnergy, _to
+from .neighbors import PairList
+from .electrostatics import cutoff as coulomb_cutoff, reaction_field
+from .pbc import minimum_image
+
+
+def _dot(u: numpy.ndarray, v: numpy.ndarray) -> numpy.ndarray:
+    return numpy.einsum("...i,...i->...", u, v)
+
+
+def bonded_terms(
+    model: ForceFieldEnergy,
+) -> Dict[str, Tuple[numpy.ndarray, Tuple[numpy.ndarray, ...]]]:
+    """Flattens the bonded terms of an energy model into one atom index array and one array per
+    parameter for each of bonds (spring, length, quartic), angles (spring, theta0), and dihedrals
+    (spring, phi0). Quartic flags Gromos96 bonds."""
+    terms = {}
+    if model.bonds:
+        for form, *_ in model.bonds:
+            if form not in ("Harmonic", "Gromos96"):
+                raise NotImplementedError(f"Bond potential {form} is not supported.")
+        terms["bonds"] = (
+            numpy.concatenate([ij for _, ij, _, _ in model.bonds]),
+            (
+                numpy.concatenate([spring for _, _, spring, _ in model.bonds]),
+                numpy.concatenate([length for _, _, _, length in model.bonds]),
+                numpy.concatenate(
+                    [
+                        numpy.full(len(ij), form == "Gromos96")
+                        for form, ij, _, _ in model.bonds
+                    ]
+                ),
+            ),
+        )
+    for name in ("angles", "dihedrals"):
+        blocks = getattr(model, name)
+        if blocks:
+            terms[name] = (
+                numpy.concatenate([block[0] for block in blocks]),
+                tuple(
+                    numpy.concatenate([block[n] for block in blocks]) for n in (1, 2)
+                ),
+            )
+    return terms
+
+
+def term_energies(
+    name: str,
+    x: numpy.ndarray,
+    index: numpy.ndarray,
+    params: Tuple[numpy.ndarray, ...],
+) -> numpy.ndarray:
+    """Returns the energy of every bonded term of positions x of shape (..., natoms, 3) as an
+    array of shape (..., nterms).
+    Parameters
+    ----------
+    name: str
+        One of bonds, angles, or dihedrals.
+    x: numpy.ndarray
+        Positions in angstroms, optionally stacked over leading (conformer) dimensions.
+    index: numpy.ndarray
+        Atom indices of the terms as returned by ``bonded_terms``.
+    params: Tuple[numpy.ndarray, ...]
+        Parameters of the terms as returned by ``bonded_terms``.
+    Returns
+    -------
+    numpy.ndarray
+        Term energies in kJ/mol.
+    """
+    if name == "bonds":
+        spring, length, quartic = params
+        d = x[..., index[:, 0], :] - x[..., index[:, 1], :]
+        r2 = _dot(d, d)
+        return numpy.where(
+            quartic,
+            0.25 * spring * (r2 - length ** 2) ** 2,
+            0.5 * spring * (numpy.sqrt(r2) - length) ** 2,
+        )
+    if name == "angles":
+        spring, theta0 = params
+        u = x[..., index[:, 0], :] - x[..., index[:, 1], :]
+        v = x[..., index[:, 2], :] - x[..., index[:, 1], :]
+        cos = _dot(u, v) / numpy.sqrt(_dot(u, u) * _dot(v, v))
+        theta = numpy.arccos(numpy.clip(cos, -1.0, 1.0))
+        return 0.5 * spring * (theta - theta0) ** 2
+    if name == "dihedrals":
+        spring, phi0 = params
+        i, j, k, l = (x[..., index[:, n], :] for n in range(4))
+        r_ij, r_kj, r_kl = i - j, k - j, k - l
+        m, n = numpy.cross(r_ij, r_kj), numpy.cross(r_kj, r_kl)
+        phi = numpy.arctan2(numpy.sqrt(_dot(r_kj, r_kj)) * _dot(r_ij, n), _dot(m, n))
+        dphi = numpy.remainder(phi - phi0 + math.pi, 2.0 * math.pi) - math.pi
+        return 0.5 * spring * dphi ** 2
+    raise ValueError(f"Bonded term {name} not supported.")
+
+
+def stack_geometries(data: Any, units: str = "angstrom") -> numpy.ndarray:
+    """Returns the conformer geometries of shape (nconf, natoms, 3) in angstroms from an array,
+    a ``Trajectory``, an ``Ensemble`` (with a single molecule key), a list of ``Molecule``, or an
+    RDKit molecule with conformers.
+    Parameters
+    ----------
+    data: Any
+        Geometry source.
+    units: str, optional
+        Units of ``data`` if it is an array or an RDKit molecule. Defaults to angstrom.
+    Returns
+    -------
+    numpy.ndarray
+        Geometry stack.
+    """
+    if hasattr(data, "GetConformers"):
+        data = numpy.array([conf.GetPositions() for conf in data.GetConformers()])
+    elif hasattr(data, "frames"):
+        data = list(data.frames or [])
+    elif hasattr(data, "states"):
+        states = data.states or data.mol
+        if not states or len(states) != 1:
+            raise ValueError("Ensemble must hold the states of a single molecule.")
+        data = next(iter(states.values()))
+
+    if isinstance(data, (list, tuple)) and data and hasattr(data[0], "geometry"):
+        natoms = len(numpy.ravel(data[0].geometry)) // 3
+        return numpy.array(
+            [
+                _to(state.geometry, state.geometry_units, "angstrom").reshape(natoms, 3)
+                for state in data
+            ]
+        )
+
+    geometries = numpy.asarray(data, dtype=float)
+    if geometries.ndim == 2:
+        geometries = geometries[None]
+    if geometries.ndim != 3 or geometries.shape[-1] != 3:
+        raise ValueError("Geometries must be of shape (nconf, natoms, 3).")
+    return _to(geometries, units, "angstrom")
+
+
+class BatchEnergy:
+    """Evaluates the energy of many conformers of one topology in vectorized passes over chunks of
+    conformers. Bonded terms and every non-excluded atom pair are evaluated for the whole chunk at
+    once, pairs beyond the cutoff (minimum image if periodic) being masked out, so this targets
+    molecules of up to a few thousand atoms e.g. ligands and peptides. Electrostatics with ewald,
+    pme, or charge groups, and implicit solvent fall back to one evaluation per conformer.
+    Parameters
+    ----------
+    model: ForceFieldEnergy
+        Energy model of the topology.
+    memory: int, optional
+        Approximate memory budget in bytes for the temporary arrays of one chunk. Defaults to 256 MiB.
+    """
+
+    # Approximate number of temporary float64 values per pair and per bonded term and conformer
+    _pair_cost, _term_cost = 12, 24
+
+    def __init__(self, model: ForceFieldEnergy, memory: int = 256 * 2 ** 20):
+        self.model = model
+        self.memory = memory
+        self.terms = bonded_terms(model)
+        self.vectorized = model.charges is None or (
+            model.electrostatics in ("cutoff", "reaction-field")
+            and model.charge_groups is None
+        )
+
+        self.pairs = None
+        if model.lj is not None or model.charges is not None:
+            i, j = numpy.triu_indices(model.natoms, k=1)
+            if len(model.exclusions):
+                keep = ~numpy.isin(i * model.natoms + j, model.exclusions)
+                i, j = i[keep], j[keep]
+            self.pairs = (i, j)
+            if model.lj is not None:
+                self.c6, self.c12 = model.lj.lookup(i, j)
+
+    @property
+    def chunk_size(self) -> int:
+        """ Number of conformers evaluated per vectorized pass. """
+        npairs = 0 if self.pairs is None else len(self.pairs[0])
+        nterms = sum(len(index) for index, _ in self.terms.values())
+        per_conf = 8 * (self._pair_cost * npairs + self._term_cost * nterms) or 1
+        return max(1, int(self.memory // per_conf))
+
+    def compute(
+        self, geometries: Any
+    ) -> Tuple[numpy.ndarray, Dict[str, numpy.ndarray]]:
+        """Returns the total energy and the energy of every term of each conformer.
+        Parameters
+        ----------
+        geometries: Any
+            Conformer geometries, see ``stack_geometries``.
+        Returns
+        -------
+        Tuple[numpy.ndarray, Dict[str, numpy.ndarray]]
+            Energies (kJ/mol) of shape (nconf,) and the energy terms of shape (nconf,).
+        """
+        x = stack_geometries(geometries)
+        if x.shape[1] != self.model.natoms:
+            raise ValueError(
+                f"Geometries have {x.shape[1]} atoms but the topology has {self.model.natoms}."
+            )
+        chunks = [
+            self._chunk(x[start : start + self.chunk_size])
+            for start in range(0, len(x), self.chunk_size)
+        ]
+        names = chunks[0].keys() if chunks else ()
+        terms = {name: numpy.concatenate([c[name] for c in chunks]) for name in names}
+        total = sum(terms.values()) if terms else numpy.zeros(len(x))
+        return numpy.asarray(total, dtype=float), terms
+
+    def energy(self, geometries: Any) -> numpy.ndarray:
+        """ Returns the energies (kJ/mol) of all the conformers. """
+        return self.compute(geometries)[0]
+
+    def _chunk(self, x: numpy.ndarray) -> Dict[str, numpy.ndarray]:
+        model, terms = self.model, {}
+        for name, (index, params) in self.terms.items():
+            terms[name] = term_energies(name, x, index, params).sum(-1)
+        if model.solvent is not None:
+            solvation = [model.solvent.compute(conf)[2] for conf in x]
+            for name in solvation[0]:
+                terms[name] = numpy.array([conf[name] for conf in solvation])
+        if self.pairs is None:
+            return terms
+
+        i, j = self.pairs
+        d = x[:, i] - x[:, j]
+        if model.box is not None:
+            minimum_image(d, model.box, model.periodic)
+        r = numpy.sqrt(_dot(d, d))
+        inside = r < model.cutoff if model.cutoff is not None else None
+
+        if model.lj is not None:
+            ir6 = 1.0 / r ** 6
+            lj = (self.c12 * ir6 - self.c6) * ir6
+            terms["lj"] = (lj if inside is None else numpy.where(inside, lj, 0.0)).sum(
+                -1
+            )
+        if model.charges is not None and self.vectorized:
+            func = (
+                coulomb_cutoff if model.electrostatics == "cutoff" else reaction_field
+            )
+            rc = model.cutoff if model.cutoff is not None else numpy.inf
+            energy, _ = func(model.charges, PairList(i, j, d, r), rc, **model.kwargs)
+            terms["coulomb"] = energy.sum(-1)
+        elif model.charges is not None:
+            terms["coulomb"] = numpy.array(
+                [model.compute(conf)[2]["coulomb"] for conf in x]
+            )
+        return terms
@@ -0,0 +1,383 @@
+""" Vectorized SHAKE, RATTLE, and SETTLE bond constraint solvers """
+
+__all__ = ["Constraints", "constraint_clusters", "color_constraints"]
+
+from typing import Dict, Optional
+import warnings
+import numpy
+
+
+def constraint_clusters(pairs: numpy.ndarray, natoms: int) -> numpy.ndarray:
+    """Returns the cluster label of every constraint: constraints sharing atoms directly or through
+    other constraints belong to the same cluster. Labels are the smallest atom index of the cluster."""
+    pairs = numpy.asarray(pairs, dtype=numpy.int64).reshape(-1, 2)
+    labels = numpy.arange(natoms)
+    while True:
+        # Hook both ends onto the smaller label, then compress the label paths
+        low = numpy.minimum(labels[pairs[:, 0]], labels[pairs[:, 1]])
+        updated = labels.copy()
+        numpy.minimum.at(updated, pairs[:, 0], low)
+        numpy.minimum.at(updated, pairs[:, 1], low)
+        updated = updated[updated]
+        if numpy.array_equal(updated, labels):
+            break
+        labels = updated
+    return labels[pairs[:, 0]]
+
+
+def color_constraints(pairs: numpy.ndarray, natoms: int) -> numpy.ndarray:
+    """Returns a color for every constraint such that constraints of the same color share no atom.
+    Constraints of one color can then be solved simultaneously without write conflicts."""
+    pairs = numpy.asarray(pairs, dtype=numpy.int64).reshape(-1, 2)
+    colors = numpy.full(len(pairs), -1, dtype=numpy.int64)
+    remaining = numpy.arange(len(pairs))
+    color = 0
+    while len(remaining):
+        # A constraint joins the color if it is the first remaining constraint of both its atoms
+        first = numpy.full(natoms, len(pairs))
+        numpy.minimum.at(first, pairs[remaining, 0], remaining)
+        numpy.minimum.at(first, pairs[remaining, 1], remaining)
+        chosen = (first[pairs[remaining, 0]] == remaining) & (
+            first[pairs[remaining, 1]] == remaining
+        )
+        colors[remaining[chosen]] = color
+        remaining = remaining[~chosen]
+        color += 1
+    return colors
+
+
+class Constraints:
+    """Holonomic bond length constraints. Constraints are grouped into independent clusters once:
+    rigid 3-site waters (a triangle of constraints with two equal bond lengths and equal masses on
+    the equivalent atoms) are solved analytically with SETTLE, and all other clusters with SHAKE
+    for positions and RATTLE for velocities. SHAKE constraints are colored so every sweep updates
+    each color with a single vectorized step, and only clusters that have not converged are swept.
+    Parameters
+    ----------
+    pairs: numpy.ndarray
+        Constrained atom pairs of shape (nconstraints, 2).
+    lengths: numpy.ndarray
+        Constrained distances in angstroms.
+    masses: numpy.ndarray
+        Atomic masses in amu.
+    method: str, optional
+        One of shake, rattle (same as shake: velocities are always constrained), or settle. By
+        default (or with settle) waters use SETTLE and all other clusters use SHAKE/RATTLE.
+    tol: float, optional
+        Relative tolerance on the constrained distances. Defaults to 1e-8.
+    max_iter: int, optional
+        Maximum number of SHAKE/RATTLE sweeps. Defaults to 1000.
+    """
+
+    def __init__(
+        self,
+        pairs: numpy.ndarray,
+        lengths: numpy.ndarray,
+        masses: numpy.ndarray,
+        method: Optional[str] = None,
+        tol: float = 1e-8,
+        max_iter: int = 1000,
+    ):
+        method = (method or "settle").lower()
+        if method not in ("shake", "rattle", "settle"):
+            raise NotImplementedError(
+                f"Constraint method {method} not supported. Choose from: shake, rattle, settle."
+            )
+        self.pairs = numpy.asarray(pairs, dtype=numpy.int64).reshape(-1, 2)
+        self.lengths = numpy.asarray(lengths, dtype=float)
+        self.masses = numpy.asarray(masses, dtype=float)
+        self.inv_mass = 1.0 / self.masses
+        self.tol, self.max_iter = tol, max_iter
+
+        # Convergence instrumentation
+        self.ncalls = 0
+        self.iterations = 0
+        self.max_iterations = 0
+        self.last_error = 0.0
+
+        natoms = len(self.masses)
+        self.clusters = constraint_clusters(self.pairs, natoms)
+        water = numpy.zeros(len(self.pairs), dtype=bool)
+        self.waters = numpy.empty((0, 3), dtype=numpy.int64)
+        if method == "settle":
+            water = self._setup_settle()
+        self._setup_shake(~water, natoms)
+
+    @property
+    def nconstraints(self) -> int:
+        return len(self.pairs)
+
+    def stats(self) -> Dict[str, float]:
+        """ Returns the convergence statistics of the SHAKE/RATTLE iterations. """
+        return {
+            "ncalls": self.ncalls,
+            "mean_iterations": self.iterations / max(self.ncalls, 1),
+            "max_iterations": self.max_iterations,
+            "last_error": self.last_error,
+            "nsettle": len(self.waters),
+            "nshake": len(self.shake_pairs),
+        }
+
+    # Setup
+    def _setup_settle(self) -> numpy.ndarray:
+        """ Finds the rigid waters and returns the mask of the constraints they own. """
+        order = numpy.argsort(self.clusters, kind="stable")
+        labels, start, counts = numpy.unique(
+            self.clusters[order], return_index=True, return_counts=True
+        )
+        triangles = order[start[counts == 3, None] + numpy.arange(3)]
+        if not len(triangles):
+            return numpy.zeros(len(self.pairs), dtype=bool)
+
+        # A triangle has 3 distinct atoms; the apex (oxygen) joins the two equal constraints
+        tri_pairs = self.pairs[triangles]
+        tri_lengths = self.lengths[triangles]
+        atoms = numpy.sort(tri_pairs.reshape(-1, 6), axis=1)
+        distinct = (atoms[:, ::2] == atoms[:, 1::2]).all(1) & (
+            numpy.diff(atoms[:, ::2], axis=1) > 0
+        ).all(1)
+
+        # The constraint opposite to the apex is the unequal one (H-H)
+        hh = numpy.argmax(
+            numpy.abs(tri_lengths - numpy.median(tri_lengths, axis=1)[:, None]), axis=1
+        )
+        rows = numpy.arange(len(triangles))
+        others = (hh[:, None] + numpy.array([1, 2])) % 3
+        oh1, oh2 = tri_lengths[rows, others[:, 0]], tri_lengths[rows, others[:, 1]]
+        h1, h2 = tri_pairs[rows, hh, 0], tri_pairs[rows, hh, 1]
+        o = atoms[:, ::2].sum(1) - h1 - h2
+
+        valid = (
+            distinct
+            & numpy.isclose(oh1, oh2)
+            & numpy.isclose(self.masses[h1], self.masses[h2])
+        )
+        self.waters = numpy.stack([o, h1, h2], -1)[valid]
+        self.water_dist = numpy.stack([oh1, tri_lengths[rows, hh]], -1)[valid]
+        mask = numpy.zeros(len(self.pairs), dtype=bool)
+        mask[triangles[valid].ravel()] = True
+
+        # Canonical water geometry relative to its center of mass
+        m_o, m_h = self.masses[self.waters[:, 0]], self.masses[self.waters[:, 1]]
+        total = m_o + 2.0 * m_h
+        d_oh, d_hh = self.water_dist[:, 0], self.water_dist[:, 1]
+        self.settle_rc = 0.5 * d_hh
+        height = numpy.sqrt(d_oh * d_oh - self.settle_rc * self.settle_rc)
+        self.settle_ra = 2.0 * m_h * height / total
+        self.settle_rb = height - self.settle_ra
+        self.settle_w = numpy.stack([m_o, m_h, m_h], -1) / total[:, None]
+        return mask
+
+    def _setup_shake(self, mask: numpy.ndarray, natoms: int) -> None:
+        index = numpy.flatnonzero(mask)
+        self.shake_pairs = self.pairs[index]
+        self.shake_d2 = self.lengths[index] ** 2
+        self.shake_clusters = numpy.unique(self.clusters[index], return_inverse=True)[1]
+        colors = color_constraints(self.shake_pairs, natoms)
+        self.shake_colors = [
+            numpy.flatnonzero(colors == color)
+            for color in range(colors.max(initial=-1) + 1)
+        ]
+        i, j = self.shake_pairs.T
+        self.shake_reduced = self.inv_mass[i] + self.inv_mass[j]
+
+    # Solvers
+    def apply(
+        self, reference: numpy.ndarray, positions: numpy.ndarray
+    ) -> numpy.ndarray:
+        """Constrains positions (in place) after an unconstrained update of reference positions,
+        which must satisfy the constraints, and returns them.
+        Parameters
+        ----------
+        reference: numpy.ndarray
+            Constrained positions before the update of shape (natoms, 3).
+        positions: numpy.ndarray
+            Updated positions of shape (natoms, 3).
+        Returns
+        -------
+        numpy.ndarray
+            The constrained positions.
+        """
+        if len(self.waters):
+            self._settle(reference, positions)
+        if len(self.shake_pairs):
+            self._shake(reference, positions)
+        return positions
+
+    def apply_velocities(
+        self, positions: numpy.ndarray, velocities: numpy.ndarray
+    ) -> numpy.ndarray:
+        """ Removes (in place) the velocity components along the constraints and returns the velocities. """
+        if len(self.waters):
+            self._settle_velocities(positions, velocities)
+        if len(self.shake_pairs):
+            self._rattle(positions, velocities)
+        return velocities
+
+    def _record(self, iterations: int, error: float, name: str) -> None:
+        self.ncalls += 1
+        self.iterations += iterations
+        self.max_iterations = max(self.max_iterations, iterations)
+        self.last_error = error
+        if error > self.tol:
+            warnings.warn(
+                f"{name} did not converge in {iterations} iterations (relative error {error:.3g})."
+            )
+
+    def _shake(self, reference: numpy.ndarray, positions: numpy.ndarray) -> None:
+        i, j = self.shake_pairs.T
+        bond = reference[i] - reference[j]
+        active = numpy.ones(self.shake_clusters.max() + 1, dtype=bool)
+        iterations, error = 0, 0.0
+        while iterations < self.max_iter:
+            iterations += 1
+            for color in self.shake_colors:
+                color = color[active[self.shake_clusters[color]]]
+                if not len(color):
+                    continue
+                ci, cj, b = i[color], j[color], bond[color]
+                s = positions[ci] - positions[cj]
+                diff = self.shake_d2[color] - numpy.einsum("ij,ij->i", s, s)
+                g = diff / (
+                    2.0 * self.shake_reduced[color] * numpy.einsum("ij,ij->i", s, b)
+                )
+                positions[ci] += (g * self.inv_mass[ci])[:, None] * b
+                positions[cj] -= (g * self.inv_mass[cj])[:, None] * b
+
+            s = positions[i] - positions[j]
+            rel = numpy.abs(numpy.einsum("ij,ij->i", s, s) / self.shake_d2 - 1.0) * 0.5
+            error = float(rel.max())
+            if error <= self.tol:
+                break
+            active[:] = False
+            active[self.shake_clusters[rel > self.tol]] = True
+        self._record(iterations, error, "SHAKE")
+
+    def _rattle(self, positions: numpy.ndarray, velocities: numpy.ndarray) -> None:
+        i, j = self.shake_pairs.T
+        bond = positions[i] - positions[j]
+        iterations, error = 0, 0.0
+        # Relative tolerance on the velocity along the bond with respect to the typical speed
+        scale = numpy.sqrt(numpy.mean(velocities * velocities)) or 1.0
+        while iterations < self.max_iter:
+            iterations += 1
+            for color in self.shake_colors:
+                ci, cj, b = i[color], j[color], bond[color]
+                dv = velocities[ci] - velocities[cj]
+                k = numpy.einsum("ij,ij->i", b, dv) / (
+                    self.shake_d2[color] * self.shake_reduced[color]
+                )
+                velocities[ci] -= (k * self.inv_mass[ci])[:, None] * b
+                velocities[cj] += (k * self.inv_mass[cj])[:, None] * b
+
+            dv = velocities[i] - velocities[j]
+            along = numpy.abs(numpy.einsum("ij,ij->i", bond, dv)) / numpy.sqrt(
+                self.shake_d2
+            )
+            error = float(along.max()) / scale
+            if error <= self.tol:
+                break
+        self._record(iterations, error, "RATTLE")
+
+    def _settle(self, reference: numpy.ndarray, positions: numpy.ndarray) -> None:
+        """ Analytic SETTLE of Miyamoto and Kollman (1992) for all the waters at once. """
+        o, h1, h2 = self.waters.T
+        ra, rb, rc = self.settle_ra, self.settle_rb, self.settle_rc
+        w = self.settle_w
+
+        b0 = reference[h1] - reference[o]
+        c0 = reference[h2] - reference[o]
+        a1, b1, c1 = positions[o], positions[h1], positions[h2]
+        com = w[:, :1] * a1 + w[:, 1:2] * b1 + w[:, 2:] * c1
+        a1, b1, c1 = a1 - com, b1 - com, c1 - com
+
+        # Frame with z normal to the old plane and x normal to z and the new oxygen position
+        z = numpy.cross(b0, c0)
+        x = numpy.cross(a1, z)
+        y = numpy.cross(z, x)
+        z /= numpy.linalg.norm(z, axis=1)[:, None]
+        x /= numpy.linalg.norm(x, axis=1)[:, None]
+        y /= numpy.linalg.norm(y, axis=1)[:, None]
+
+        def dot(u, v):
+            return numpy.einsum("ij,ij->i", u, v)
+
+        xb0, yb0, xc0, yc0 = dot(x, b0), dot(y, b0), dot(x, c0), dot(y, c0)
+        za1 = dot(z, a1)
+        xb1, yb1, zb1 = dot(x, b1), dot(y, b1), dot(z, b1)
+        xc1, yc1, zc1 = dot(x, c1), dot(y, c1), dot(z, c1)
+
+        sinphi = za1 / ra
+        cosphi = numpy.sqrt(1.0 - sinphi * sinphi)
+        sinpsi = (zb1 - zc1) / (2.0 * rc * cosphi)
+        cospsi = numpy.sqrt(1.0 - sinpsi * sinpsi)
+
+        ya2 = ra * cosphi
+        xb2 = -rc * cospsi
+        t1, t2 = -rb * cosphi, rc * sinpsi * sinphi
+        yb2, yc2 = t1 - t2, t1 + t2
+
+        alpha = xb2 * (xb0 - xc0) + yb0 * yb2 + yc0 * yc2
+        beta = xb2 * (yc0 - yb0) + xb0 * yb2 + xc0 * yc2
+        gamma = xb0 * yb1 - xb1 * yb0 + xc0 * yc1 - xc1 * yc0
+        al2be2 = alpha * alpha + beta * beta
+        sinthe = (alpha * gamma - beta * numpy.sqrt(al2be2 - gamma * gamma)) / al2be2
+        costhe = numpy.sqrt(1.0 - sinthe * sinthe)
+
+        def place(px, py, pz):
+            return px[:, None] * x + py[:, None] * y + pz[:, None] * z + com
+
+        positions[o] = place(-ya2 * sinthe, ya2 * costhe, za1)
+        positions[h1] = place(
+            xb2 * costhe - yb2 * sinthe, xb2 * sinthe + yb2 * costhe, zb1
+        )
+        positions[h2] = place(
+            -xb2 * costhe - yc2 * sinthe, -xb2 * sinthe + yc2 * costhe, zc1
+        )
+
+    def _settle_velocities(
+        self, positions: numpy.ndarray, velocities: numpy.ndarray
+    ) -> None:
+        """Exact velocity constraint of all the waters: one 3x3 linear solve per water for the
+        impulses along the O-H1, O-H2, and H1-H2 bonds."""
+        o, h1, h2 = self.waters.T
+        atoms = (o, h1, h2)
+        ends = ((0, 1), (0, 2), (1, 2))
+        inv = self.inv_mass[self.waters]
+
+        # Unit bond vectors e_k = x_a - x_b for the bonds (a, b) above
+        bonds = numpy.stack(
+            [positions[atoms[a]] - positions[atoms[b]] for a, b in ends], 1
+        )
+        bonds /= numpy.linalg.norm(bonds, axis=2)[..., None]
+
+        # A[k, l] = e_k . (dv_k per unit impulse along e_l)
+        matrix = numpy.empty((len(o), 3, 3))
+        for k, (a, b) in enumerate(ends):
+            for l, (c, d) in enumerate(ends):
+                coupling = (
+                    (a == c) * inv[:, a]
+                    - (a == d) * inv[:, a]
+                    - (b == c) * inv[:, b]
+                    + (b == d) * inv[:, b]
+                )
+                matrix[:, k, l] = coupling * numpy.einsum(
+                    "ij,ij->i", bonds[:, k], bonds[:, l]
+                )
+        rhs = numpy.stack(
+            [
+                numpy.einsum(
+                    "ij,ij->i",
+                    bonds[:, k],
+                    velocities[atoms[a]] - velocities[atoms[b]],
+                )
+                for k, (a, b) in enumerate(ends)
+            ],
+            -1,
+        )
+        impulse = numpy.linalg.solve(matrix, -rhs[..., None])[..., 0]
+
+        for k, (a, b) in enumerate(ends):
+            step = impulse[:, k, None] * bonds[:, k]
+            velocities[atoms[a]] += inv[:, a, None] * step
+            velocities[atoms[b]] -= inv[:, b, None] * step
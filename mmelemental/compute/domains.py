@@ -0,0 +1,500 @@
+""" Spatial domain decomposition for parallel per-region processing """
+
+__all__ = [
+    "DomainDecomposition",
+    "DomainView",
+    "Grid",
+    "domain_grid",
+    "contacts",
+    "nonbonded",
+]
+
+from itertools import product
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
+import numbers
+import os
+import weakref
+import numpy
+
+from mmelemental.models.app.base import SimInput
+from mmelemental.util.units import convert
+from .neighbors import PairList, neighbor_pairs, pair_forces
+from .electrostatics import cutoff as coulomb_cutoff, reaction_field
+from .parallel import SharedArrays, WorkerPool
+from .pbc import box_from_cell, cell_periodic
+
+# Per-process state set up by _init_worker: grid, shared geometry, kernel, and its arguments
+_worker = {}
+
+
+class Grid(NamedTuple):
+    """ Regular grid of domains: origin, extent, and number of domains along every dimension. """
+
+    lo: numpy.ndarray
+    extent: numpy.ndarray
+    shape: numpy.ndarray
+    periodic: numpy.ndarray
+    halo: float
+
+    @property
+    def width(self) -> numpy.ndarray:
+        return self.extent / self.shape
+
+    @property
+    def split(self) -> numpy.ndarray:
+        """ Dimensions decomposed into more than one domain. """
+        return self.shape > 1
+
+    def owners(self, geometry: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the domain owning every atom. Atoms outside non-periodic bounds go to edge domains. """
+        coords = numpy.floor((geometry - self.lo) / self.width).astype(numpy.int64)
+        coords[:, self.periodic] %= self.shape[self.periodic]
+        coords = numpy.clip(coords, 0, self.shape - 1)
+        return numpy.ravel_multi_index(coords.T, self.shape)
+
+
+class DomainView:
+    """Atoms of one domain: the owned atoms followed by the halo atoms of neighboring domains within
+    ``halo`` of the domain boundaries. Positions of decomposed periodic dimensions are unwrapped
+    around the domain center, so kernels only need periodic boundaries along dimensions that are
+    not decomposed (``box`` and ``periodic``).
+    Parameters
+    ----------
+    index: int
+        Domain index.
+    atoms: numpy.ndarray
+        Global indices of the owned then halo atoms.
+    nowned: int
+        Number of owned atoms.
+    positions: numpy.ndarray
+        Local positions of shape (len(atoms), 3).
+    box: numpy.ndarray, optional
+        Box edge lengths if any dimension that is not decomposed is periodic.
+    periodic: numpy.ndarray
+        Boolean mask of the local periodic dimensions.
+    halo: float
+        Halo width.
+    natoms: int
+        Total number of atoms in the system.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        atoms: numpy.ndarray,
+        nowned: int,
+        positions: numpy.ndarray,
+        box: Optional[numpy.ndarray],
+        periodic: numpy.ndarray,
+        halo: float,
+        natoms: int,
+    ):
+        self.index, self.atoms, self.nowned = index, atoms, nowned
+        self.positions, self.box, self.periodic = positions, box, periodic
+        self.halo, self.natoms = halo, natoms
+
+    @property
+    def owned(self) -> numpy.ndarray:
+        """ Global indices of the owned atoms. """
+        return self.atoms[: self.nowned]
+
+    def pairs(
+        self, cutoff: float, exclusions: Optional[numpy.ndarray] = None
+    ) -> PairList:
+        """Returns the pairs (local indices) within cutoff that this domain is responsible for: pairs
+        of owned atoms, and owned-halo pairs whose owned atom has the lower global index. Every pair
+        of the system is thus found by exactly one domain.
+        Parameters
+        ----------
+        cutoff: float
+            Cutoff distance, at most the halo width.
+        exclusions: numpy.ndarray, optional
+            Sorted global pair keys to exclude as returned by ``exclusion_pairs``.
+        Returns
+        -------
+        PairList
+            Local pair indices, displacements, and distances.
+        """
+        if cutoff > self.halo and len(self.atoms) > self.nowned:
+            raise ValueError(f"Cutoff {cutoff} exceeds the halo width {self.halo}.")
+        found = neighbor_pairs(self.positions, cutoff, self.box, self.periodic)
+        gi, gj = self.atoms[found.i], self.atoms[found.j]
+        oi, oj = found.i < self.nowned, found.j < self.nowned
+        keep = (oi & oj) | (oi & ~oj & (gi < gj)) | (~oi & oj & (gj < gi))
+        if exclusions is not None and len(exclusions):
+            lo, hi = numpy.minimum(gi, gj), numpy.maximum(gi, gj)
+            keep &= ~numpy.isin(lo * self.natoms + hi, exclusions)
+        return PairList(*(val[keep] for val in found))
+
+
+def domain_grid(
+    ndomains: int,
+    extent: numpy.ndarray,
+    halo: float,
+    periodic: Optional[numpy.ndarray] = None,
+) -> numpy.ndarray:
+    """Returns the number of domains along every dimension with a product of ndomains that minimizes
+    the halo volume of the domains. Domains narrower than the halo, or periodic halos overlapping
+    their own images, are not allowed.
+    Parameters
+    ----------
+    ndomains: int
+        Total number of domains.
+    extent: numpy.ndarray
+        Extent of the system along every dimension.
+    halo: float
+        Halo width.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic dimensions. Defaults to none.
+    Returns
+    -------
+    numpy.ndarray
+        Grid shape.
+    """
+    extent = numpy.asarray(extent, dtype=float)
+    ndim = len(extent)
+    if periodic is None:
+        periodic = numpy.zeros(ndim, dtype=bool)
+    divisors = [n for n in range(1, ndomains + 1) if ndomains % n == 0]
+    best, cost = None, numpy.inf
+    for shape in product(divisors, repeat=ndim):
+        if numpy.prod(shape) != ndomains:
+            continue
+        shape = numpy.array(shape)
+        if not _valid(shape, extent, halo, periodic):
+            continue
+        width = extent / shape
+        trial = float(numpy.prod(width + 2.0 * halo * (shape > 1)) - numpy.prod(width))
+        if trial < cost:
+            best, cost = shape, trial
+    if best is None:
+        raise ValueError(
+            f"The system cannot be decomposed into {ndomains} domains with a halo of {halo}."
+        )
+    return best
+
+
+def _valid(shape, extent, halo, periodic) -> bool:
+    width = extent / shape
+    split = shape > 1
+    if numpy.any(width[split] < halo):
+        return False
+    # Periodic halo atoms must have a unique image around the domain center
+    wrap = split & periodic
+    return bool(numpy.all(halo <= 0.5 * width[wrap] * (shape[wrap] - 1)))
+
+
+def _view(
+    grid: Grid,
+    geometry: numpy.ndarray,
+    index: int,
+    box: Optional[numpy.ndarray],
+    owners: Optional[numpy.ndarray] = None,
+) -> DomainView:
+    """ Selects the owned and halo atoms of a domain. """
+    if owners is None:
+        owners = grid.owners(geometry)
+    coords = numpy.array(numpy.unravel_index(index, grid.shape))
+    center = grid.lo + (coords + 0.5) * grid.width
+    split = grid.split
+
+    d = geometry[:, split] - center[split]
+    wrap = grid.periodic[split]
+    d[:, wrap] -= grid.extent[split][wrap] * numpy.round(
+        d[:, wrap] / grid.extent[split][wrap]
+    )
+    inside = numpy.all(numpy.abs(d) <= 0.5 * grid.width[split] + grid.halo, axis=1)
+    owned = numpy.flatnonzero(owners == index)
+    halo = numpy.flatnonzero(inside & (owners != index))
+    atoms = numpy.concatenate([owned, halo])
+
+    positions = geometry[atoms].copy()
+    positions[:, split] = center[split] + d[atoms]
+    periodic = grid.periodic & ~split
+    return DomainView(
+        index,
+        atoms,
+        len(owned),
+        positions,
+        box if periodic.any() else None,
+        periodic,
+        grid.halo,
+        len(geometry),
+    )
+
+
+def _init_worker(spec, grid, box, func, args) -> None:
+    _worker.update(arrays=SharedArrays(spec), grid=grid, box=box, func=func, args=args)
+
+
+def _run(index: int) -> Any:
+    # The geometry and owners are read at every call as the parent updates them between calls
+    arrays = _worker["arrays"]
+    view = _view(
+        _worker["grid"], arrays["geometry"], index, _worker["box"], arrays["owners"]
+    )
+    return _worker["func"](view, *_worker["args"])
+
+
+def _release(resources: dict) -> None:
+    """ Shuts down the worker pool and frees the shared arrays of a decomposition. """
+    for key in ("pool", "shared"):
+        resource = resources.pop(key, None)
+        if resource is not None:
+            resource.close()
+    resources.clear()
+
+
+def _same(a: Any, b: Any) -> bool:
+    """ Returns whether kernel arguments are the same objects, or equal numbers or strings. """
+    if a is b:
+        return True
+    return type(a) is type(b) and isinstance(a, (numbers.Number, str)) and a == b
+
+
+class DomainDecomposition:
+    """Partitions a system into a regular grid of spatial domains with halo regions, and runs
+    per-domain work (neighbor search, energies, analyses) in a process pool. The geometry is shared
+    with the workers through shared memory, and results are returned and merged in domain order so
+    they do not depend on the number of processes. Periodic dimensions span the box from ``origin``
+    and non-periodic dimensions the bounding box of the geometry.
+    The worker pool and shared geometry are kept between calls of ``map`` with the same kernel
+    and arguments, e.g. at every step of a simulation whose positions are set with ``update``,
+    until ``close`` or the end of a ``with`` block.
+    Parameters
+    ----------
+    geometry: numpy.ndarray
+        Atomic positions in angstroms of shape (natoms, 3).
+    halo: float
+        Halo width in angstroms e.g. the cutoff of pairwise kernels.
+    ndomains: int or Sequence[int], optional
+        Number of domains, or grid shape. Defaults to the number of cores.
+    box: numpy.ndarray, optional
+        Orthorhombic box edge lengths in angstroms for periodic systems.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic dimensions. Defaults to all dimensions if ``box`` is set.
+    origin: numpy.ndarray, optional
+        Lower corner of the periodic box. Defaults to zero.
+    """
+
+    def __init__(
+        self,
+        geometry: numpy.ndarray,
+        halo: float,
+        ndomains: Optional[Union[int, Sequence[int]]] = None,
+        box: Optional[numpy.ndarray] = None,
+        periodic: Optional[numpy.ndarray] = None,
+        origin: Optional[numpy.ndarray] = None,
+    ):
+        # A copy, since update() writes the positions in place
+        self.geometry = numpy.array(geometry, dtype=float)
+        ndim = self.geometry.shape[1]
+        self.box = None if box is None else numpy.asarray(box, dtype=float)
+        if periodic is None:
+            periodic = numpy.full(ndim, self.box is not None)
+        periodic = numpy.asarray(periodic, dtype=bool)
+
+        lo = self.geometry.min(0) if len(self.geometry) else numpy.zeros(ndim)
+        extent = self.geometry.max(0) - lo if len(self.geometry) else numpy.ones(ndim)
+        extent = numpy.maximum(extent, 1e-8)
+        if periodic.any():
+            origin = numpy.zeros(ndim) if origin is None else numpy.asarray(origin)
+            lo = numpy.where(periodic, origin, lo)
+            extent = numpy.where(periodic, self.box, extent)
+
+        if ndomains is None:
+            ndomains = os.cpu_count() or 1
+        if numpy.ndim(ndomains) == 0:
+            shape = domain_grid(int(ndomains), extent, halo, periodic)
+        else:
+            shape = numpy.asarray(ndomains, dtype=numpy.int64)
+            if not _valid(shape, extent, halo, periodic):
+                raise ValueError(
+                    f"Domains of grid {tuple(shape)} are too narrow for a halo of {halo}."
+                )
+        self.grid = Grid(lo, extent, shape, periodic, float(halo))
+        # Worker pool, its kernel and arguments, and shared geometry and owners of parallel maps
+        self._resources = {}
+        self._finalizer = weakref.finalize(self, _release, self._resources)
+
+    def __enter__(self) -> "DomainDecomposition":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ Shuts down the worker pool and frees the shared geometry. """
+        if "shared" in self._resources:
+            self.geometry = self.geometry.copy()
+        _release(self._resources)
+
+    @classmethod
+    def from_input(
+        cls, inputs: SimInput, halo: float, **kwargs
+    ) -> "DomainDecomposition":
+        """Decomposes the molecules of a simulation input, concatenated in the order of
+        ``SimInput.mol``, using its cell and boundary conditions.
+        Parameters
+        ----------
+        inputs: SimInput
+            Simulation input e.g. ``DynamicsInput``.
+        halo: float
+            Halo width in angstroms.
+        **kwargs
+            Additional keyword arguments passed to the constructor e.g. ndomains.
+        Returns
+        -------
+        DomainDecomposition
+        """
+        if not inputs.mol:
+            raise ValueError("SimInput.mol must hold at least one molecule.")
+        geometry = []
+        for mol in inputs.mol.values():
+            factor = 1.0
+            if mol.geometry_units not in ("angstrom", "angstroms"):
+                factor = convert(1.0, mol.geometry_units, "angstrom")
+            geometry.append(numpy.reshape(mol.geometry, (-1, 3)) * factor)
+        if inputs.cell is not None and "box" not in kwargs:
+            origin, box = box_from_cell(inputs.cell)
+            kwargs.update(
+                box=box,
+                origin=origin,
+                periodic=cell_periodic(inputs.cell, inputs.boundary, len(box)),
+            )
+        return cls(numpy.concatenate(geometry), halo, **kwargs)
+
+    @property
+    def ndomains(self) -> int:
+        return int(numpy.prod(self.grid.shape))
+
+    def owners(self) -> numpy.ndarray:
+        """ Returns the domain owning every atom. """
+        return self.grid.owners(self.geometry)
+
+    def update(self, geometry: numpy.ndarray) -> None:
+        """Sets the atomic positions in place, shared with the running workers. The grid is kept:
+        atoms leaving non-periodic bounds go to edge domains."""
+        self.geometry[...] = geometry
+
+    def view(self, index: int) -> DomainView:
+        """ Returns the owned and halo atoms of a domain. """
+        return _view(self.grid, self.geometry, index, self.box)
+
+    def map(self, func: Callable, *args, processes: Optional[int] = None) -> List[Any]:
+        """Applies func(view, *args) to the ``DomainView`` of every domain and returns the results
+        in domain order. func and args must be picklable (e.g. module-level functions) to run in
+        worker processes; args are sent once per worker, and again only when func, args, or the
+        number of processes change.
+        Parameters
+        ----------
+        func: Callable
+            Per-domain kernel e.g. ``contacts`` or ``nonbonded``.
+        *args
+            Additional arguments of func.
+        processes: int, optional
+            Number of worker processes. Defaults to the number of cores, at most one per domain.
+        Returns
+        -------
+        List[Any]
+            Results of every domain.
+        """
+        processes = min(processes or os.cpu_count() or 1, self.ndomains)
+        owners = self.owners()
+        if processes <= 1:
+            return [
+                func(_view(self.grid, self.geometry, index, self.box, owners), *args)
+                for index in range(self.ndomains)
+            ]
+
+        resources = self._resources
+        if "shared" not in resources:
+            shared = SharedArrays.create(geometry=self.geometry, owners=owners)
+            resources["shared"] = shared
+            # Positions set from now on go straight to the workers
+            self.geometry = shared["geometry"]
+        else:
+            resources["shared"]["owners"][...] = owners
+
+        task = resources.get("task")
+        if not (
+            task is not None
+            and task[0] is func
+            and task[2] == processes
+            and len(task[1]) == len(args)
+            and all(_same(a, b) for a, b in zip(task[1], args))
+        ):
+            if "pool" in resources:
+                resources.pop("pool").close()
+            initargs = (resources["shared"].spec, self.grid, self.box, func, args)
+            resources["pool"] = WorkerPool(processes, _init_worker, initargs)
+            resources["task"] = (func, args, processes)
+        return resources["pool"].map(_run, range(self.ndomains))
+
+    def accumulate(
+        self, results: Sequence[Tuple[numpy.ndarray, numpy.ndarray]]
+    ) -> numpy.ndarray:
+        """Sums per-atom contributions (global atom indices, values of shape (n, ...)) of every
+        domain, e.g. forces on owned and halo atoms, into an array of shape (natoms, ...)."""
+        natoms = len(self.geometry)
+        atoms = numpy.concatenate([atoms for atoms, _ in results])
+        values = numpy.concatenate([values for _, values in results])
+        flat = values.reshape(len(values), -1)
+        total = numpy.stack(
+            [
+                numpy.bincount(atoms, flat[:, col], minlength=natoms)
+                for col in range(flat.shape[1])
+            ],
+            -1,
+        )
+        return total.reshape((natoms,) + values.shape[1:])
+
+
+def contacts(view: DomainView, cutoff: float) -> numpy.ndarray:
+    """ Returns the global indices (i < j) of shape (npairs, 2) of the atom pairs within cutoff. """
+    pairs = view.pairs(cutoff)
+    gi, gj = view.atoms[pairs.i], view.atoms[pairs.j]
+    return numpy.stack([numpy.minimum(gi, gj), numpy.maximum(gi, gj)], -1)
+
+
+def nonbonded(
+    view: DomainView, model: Any
+) -> Tuple[float, Tuple[numpy.ndarray, numpy.ndarray]]:
+    """Returns the Lennard-Jones and pairwise (cutoff or reaction-field) electrostatic energy of
+    the pairs of a domain, and the forces on its owned and halo atoms (global indices, forces).
+    Parameters
+    ----------
+    view: DomainView
+        Domain atoms. The halo must be at least the model cutoff.
+    model: ForceFieldEnergy
+        Energy model of the whole system with a cutoff.
+    Returns
+    -------
+    Tuple[float, Tuple[numpy.ndarray, numpy.ndarray]]
+        Energy in kJ/mol and per-atom forces in kJ/mol/angstrom to merge with ``accumulate``.
+    """
+    if model.cutoff is None:
+        raise ValueError("Domain decomposition requires a model with a cutoff.")
+    pairs = view.pairs(model.cutoff, model.exclusions)
+    gi, gj = view.atoms[pairs.i], view.atoms[pairs.j]
+    energy, dedr = 0.0, numpy.zeros(len(pairs.r))
+    if model.lj is not None:
+        c6, c12 = model.lj.lookup(gi, gj)
+        ir6 = 1.0 / pairs.r ** 6
+        energy += float(((c12 * ir6 - c6) * ir6).sum())
+        dedr += (6.0 * c6 - 12.0 * c12 * ir6) * ir6 / pairs.r
+    if model.charges is not None:
+        if model.electrostatics not in ("cutoff", "reaction-field"):
+            raise NotImplementedError(
+                "Domain decomposition supports cutoff and reaction-field electrostatics."
+            )
+        func = coulomb_cutoff if model.electrostatics == "cutoff" else reaction_field
+        e, de = func(
+            model.charges,
+            PairList(gi, gj, pairs.d, pairs.r),
+            model.cutoff,
+            **model.kwargs,
+        )
+        energy += float(e.sum())
+        dedr += de
+    return energy, (view.atoms, pair_forces(pairs, dedr, len(view.atoms)))
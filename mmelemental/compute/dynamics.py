@@ -0,0 +1,460 @@
+""" Molecular dynamics integrators, thermostats, and velocity generation """
+
+__all__ = [
+    "KB",
+    "ACCEL",
+    "MDState",
+    "Dynamics",
+    "Berendsen",
+    "VRescale",
+    "Langevin",
+    "thermostat",
+    "maxwell_boltzmann",
+    "kinetic_energy",
+    "temperature",
+]
+
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple, Union
+import numpy
+
+from mmelemental.models.app.dynamics import DynamicsInput
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util.units import convert
+from .constraints import Constraints
+from .energy import ForceFieldEnergy
+
+# Boltzmann constant in kJ/(mol*K)
+KB = 0.0083144626
+# Converts force / mass in kJ/(mol*angstrom*amu) to acceleration in angstrom/fs**2
+ACCEL = 1e-4
+
+# Signature of the force functions: positions -> (energy, forces)
+ForceFunc = Callable[[numpy.ndarray], Tuple[float, numpy.ndarray]]
+
+
+def kinetic_energy(masses: numpy.ndarray, velocities: numpy.ndarray) -> float:
+    """ Returns the kinetic energy in kJ/mol from masses in amu and velocities in angstrom/fs. """
+    return (
+        0.5 * float(numpy.einsum("i,ij,ij->", masses, velocities, velocities)) / ACCEL
+    )
+
+
+def temperature(kinetic: float, ndof: int) -> float:
+    """ Returns the instantaneous temperature in Kelvin from the kinetic energy in kJ/mol. """
+    return 2.0 * kinetic / (ndof * KB)
+
+
+def maxwell_boltzmann(
+    masses: numpy.ndarray,
+    temp: float,
+    seed: Optional[int] = None,
+    remove_com: bool = True,
+    exact: bool = True,
+) -> numpy.ndarray:
+    """Draws atomic velocities in angstrom/fs from the Maxwell-Boltzmann distribution.
+    Parameters
+    ----------
+    masses: numpy.ndarray
+        Atomic masses in amu.
+    temp: float
+        Temperature in Kelvin.
+    seed: int, optional
+        Random seed. Velocities are reproducible for a given seed, and random if unset or negative.
+    remove_com: bool, optional
+        Removes the center of mass velocity. Defaults to True.
+    exact: bool, optional
+        Rescales the velocities so the instantaneous temperature equals ``temp``. Defaults to True.
+    Returns
+    -------
+    numpy.ndarray
+        Velocities of shape (natoms, 3).
+    """
+    masses = numpy.asarray(masses, dtype=float)
+    rng = numpy.random.default_rng(None if seed is None or seed < 0 else seed)
+    sigma = numpy.sqrt(KB * temp * ACCEL / masses)
+    velocities = rng.standard_normal((len(masses), 3)) * sigma[:, None]
+
+    if remove_com:
+        velocities -= masses @ velocities / masses.sum()
+    if exact and temp > 0:
+        ndof = 3 * len(masses) - (3 if remove_com else 0)
+        current = temperature(kinetic_energy(masses, velocities), ndof)
+        if current > 0:
+            velocities *= numpy.sqrt(temp / current)
+    return velocities
+
+
+class Berendsen:
+    """Weak-coupling thermostat: velocities are scaled so the temperature relaxes exponentially
+    to ``temp`` with time constant ``tau`` (fs). Does not sample the canonical ensemble."""
+
+    def __init__(self, temp: float, tau: float = 100.0, seed: Optional[int] = None):
+        self.temp, self.tau = temp, tau
+
+    def apply(
+        self, velocities: numpy.ndarray, masses: numpy.ndarray, dt: float, ndof: int
+    ) -> numpy.ndarray:
+        current = temperature(kinetic_energy(masses, velocities), ndof)
+        if current > 0:
+            scale = numpy.sqrt(1.0 + dt / self.tau * (self.temp / current - 1.0))
+            # Bounded as in GROMACS to avoid large velocity jumps far from equilibrium
+            velocities *= min(max(scale, 0.8), 1.25)
+        return velocities
+
+
+class VRescale:
+    """Stochastic velocity rescaling thermostat (Bussi et al. 2007) with time constant ``tau`` (fs).
+    Samples the canonical ensemble."""
+
+    def __init__(self, temp: float, tau: float = 100.0, seed: Optional[int] = None):
+        self.temp, self.tau = temp, tau
+        self.rng = numpy.random.default_rng(None if seed is None or seed < 0 else seed)
+
+    def apply(
+        self, velocities: numpy.ndarray, masses: numpy.ndarray, dt: float, ndof: int
+    ) -> numpy.ndarray:
+        kinetic = kinetic_energy(masses, velocities)
+        if kinetic <= 0:
+            return velocities
+        target = 0.5 * ndof * KB * self.temp
+        c = numpy.exp(-dt / self.tau)
+        r1 = self.rng.standard_normal()
+        rest = self.rng.chisquare(ndof - 1) if ndof > 1 else 0.0
+        new = (
+            kinetic
+            + (1.0 - c) * (target * (r1 * r1 + rest) / ndof - kinetic)
+            + 2.0 * r1 * numpy.sqrt(c * (1.0 - c) * target * kinetic / ndof)
+        )
+        scale = numpy.sqrt(max(new, 0.0) / kinetic)
+        if r1 + numpy.sqrt(c * ndof * kinetic / ((1.0 - c) * target)) < 0:
+            scale = -scale
+        velocities *= scale
+        return velocities
+
+
+class Langevin:
+    """Langevin thermostat with friction 1 / ``tau`` (fs): an exact Ornstein-Uhlenbeck update of
+    the velocities applied once per step. Samples the canonical ensemble."""
+
+    def __init__(self, temp: float, tau: float = 1000.0, seed: Optional[int] = None):
+        self.temp, self.tau = temp, tau
+        self.rng = numpy.random.default_rng(None if seed is None or seed < 0 else seed)
+
+    def apply(
+        self, velocities: numpy.ndarray, masses: numpy.ndarray, dt: float, ndof: int
+    ) -> numpy.ndarray:
+        c = numpy.exp(-dt / self.tau)
+        sigma = numpy.sqrt((1.0 - c * c) * KB * self.temp * ACCEL / masses)
+        velocities *= c
+        velocities += self.rng.standard_normal(velocities.shape) * sigma[:, None]
+        return velocities
+
+
+Thermostat = Union[Berendsen, VRescale, Langevin]
+
+_thermostats = {
+    "berendsen": Berendsen,
+    "v-rescale": VRescale,
+    "vrescale": VRescale,
+    "bussi": VRescale,
+    "langevin": Langevin,
+    "sd": Langevin,
+}
+
+
+def thermostat(
+    method: Optional[str],
+    temp: float,
+    tau: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> Optional[Thermostat]:
+    """Returns the thermostat named by ``method`` e.g. ``DynamicsInput.temp_method``: one of
+    berendsen, v-rescale, or langevin. None, no, and nve disable temperature coupling."""
+    if method is None or method.lower() in ("no", "none", "nve"):
+        return None
+    try:
+        cls = _thermostats[method.lower()]
+    except KeyError:
+        raise NotImplementedError(
+            f"Thermostat {method} not supported. Choose from: berendsen, v-rescale, langevin."
+        )
+    return cls(temp, seed=seed) if tau is None else cls(temp, tau=tau, seed=seed)
+
+
+class MDState(NamedTuple):
+    """ Snapshot of a simulation. Arrays are copies owned by the snapshot. """
+
+    step: int
+    time: float
+    geometry: numpy.ndarray
+    velocities: numpy.ndarray
+    forces: numpy.ndarray
+    pot_energy: float
+    kin_energy: float
+    temperature: float
+
+
+_integrators = {
+    "velocity-verlet": "velocity-verlet",
+    "velocity verlet": "velocity-verlet",
+    "vv": "velocity-verlet",
+    "md-vv": "velocity-verlet",
+    "leapfrog": "leapfrog",
+    "leap-frog": "leapfrog",
+    "md": "leapfrog",
+}
+
+
+# Defaults used for unset DynamicsInput fields: integrator, timestep (fs), and thermostat time
+# constants (fs)
+_default_method, _default_step_size = "velocity-verlet", 1.0
+_default_tau = {"langevin": 1000.0, "sd": 1000.0}
+
+
+def _input_constraints(
+    inputs: DynamicsInput, name: str, model: ForceFieldEnergy
+) -> Optional[Constraints]:
+    """ Builds the constraints of the bonds listed (by index in ``Molecule.connectivity``) in bond_const. """
+    index = (inputs.bond_const or {}).get(name)
+    if not index:
+        return None
+    if not model.bonds:
+        raise ValueError(f"Constraints require bond parameters for molecule {name}.")
+    pairs = numpy.concatenate([ij for _, ij, _, _ in model.bonds])
+    lengths = numpy.concatenate([length for _, _, _, length in model.bonds])
+    index = numpy.asarray(index, dtype=numpy.int64)
+    kwargs = {"method": inputs.bond_const_method}
+    if inputs.bond_const_tol:
+        kwargs["tol"] = inputs.bond_const_tol
+    return Constraints(pairs[index], lengths[index], model.masses, **kwargs)
+
+
+class Dynamics:
+    """Integrates Newton's equations of motion with velocity Verlet or leapfrog. Units are angstroms,
+    fs, amu, and kJ/mol. With leapfrog, ``velocities`` are the half-step velocities v(t - dt/2) and
+    the kinetic energy is estimated from v(t - dt/2) + dt/2 * a(t).
+    Parameters
+    ----------
+    func: Callable
+        Function of the positions returning the potential energy and forces.
+    geometry: numpy.ndarray
+        Initial positions of shape (natoms, 3).
+    masses: numpy.ndarray
+        Atomic masses of shape (natoms,).
+    velocities: numpy.ndarray, optional
+        Initial velocities. Defaults to zero.
+    dt: float, optional
+        Time step. Defaults to 1 fs.
+    method: str, optional
+        Integrator: velocity-verlet (vv, md-vv) or leapfrog (md). Defaults to velocity-verlet.
+    thermostat: Berendsen, VRescale, or Langevin, optional
+        Temperature coupling applied after every step. NVE if unset.
+    constraints: Constraints, optional
+        Bond constraints applied to the positions (SHAKE/SETTLE) and velocities (RATTLE) every step.
+        The initial positions and velocities are constrained first.
+    ndof: int, optional
+        Number of degrees of freedom. Defaults to 3 * natoms - 3 - nconstraints.
+    """
+
+    def __init__(
+        self,
+        func: ForceFunc,
+        geometry: numpy.ndarray,
+        masses: numpy.ndarray,
+        velocities: Optional[numpy.ndarray] = None,
+        dt: float = 1.0,
+        method: str = "velocity-verlet",
+        thermostat: Optional[Thermostat] = None,
+        constraints: Optional[Constraints] = None,
+        ndof: Optional[int] = None,
+    ):
+        try:
+            self.method = _integrators[method.lower()]
+        except KeyError:
+            raise NotImplementedError(
+                f"Integrator {method} not supported. Choose from: velocity-verlet, leapfrog."
+            )
+        self.func = func
+        self.geometry = numpy.array(geometry, dtype=float)
+        self.masses = numpy.asarray(masses, dtype=float)
+        self.velocities = (
+            numpy.zeros_like(self.geometry)
+            if velocities is None
+            else numpy.array(velocities, dtype=float)
+        )
+        self.dt = dt
+        self.thermostat = thermostat
+        self.constraints = constraints
+        if ndof is None:
+            ndof = 3 * len(self.masses) - 3
+            ndof -= 0 if constraints is None else constraints.nconstraints
+        self.ndof = ndof
+        self.step_count = 0
+
+        self._inv_mass = ACCEL / self.masses[:, None]
+        if constraints is not None:
+            constraints.apply(self.geometry.copy(), self.geometry)
+            constraints.apply_velocities(self.geometry, self.velocities)
+        self.pot_energy, self.forces = func(self.geometry)
+        velocities = self.velocities
+        if self.method == "leapfrog":
+            velocities = self._full_step_velocities()
+        self.kin_energy = kinetic_energy(self.masses, velocities)
+
+    @classmethod
+    def from_input(
+        cls,
+        inputs: DynamicsInput,
+        model: Optional[ForceFieldEnergy] = None,
+        geometry: Optional[numpy.ndarray] = None,
+        velocities: Optional[numpy.ndarray] = None,
+        seed: Optional[int] = None,
+    ) -> Tuple[str, Molecule, ForceFieldEnergy, "Dynamics"]:
+        """Sets up the dynamics of the single molecule in a ``DynamicsInput``: integrator, time step,
+        initial velocities (gen_vel, gen_temp, gen_seed or ``Molecule.velocities``), thermostat,
+        and bond constraints.
+        Parameters
+        ----------
+        inputs: DynamicsInput
+            Simulation input with exactly one molecule and its force field.
+        model: ForceFieldEnergy, optional
+            Energy model of the molecule to reuse. Built with ``ForceFieldEnergy.from_input`` if unset.
+        geometry: numpy.ndarray, optional
+            Positions in angstroms overriding the molecule geometry.
+        velocities: numpy.ndarray, optional
+            Velocities in angstrom/fs overriding the generated or molecule velocities.
+        seed: int, optional
+            Random seed of the velocities and thermostat overriding gen_seed.
+        Returns
+        -------
+        Tuple[str, Molecule, ForceFieldEnergy, Dynamics]
+            The molecule name and model, the energy model, and the dynamics.
+        """
+        if inputs.press_method and inputs.press_method.lower() not in ("no", "none"):
+            raise NotImplementedError("Pressure coupling is not supported.")
+        if model is None:
+            name, mol, model = ForceFieldEnergy.from_input(inputs)
+        else:
+            ((name, mol),) = inputs.mol.items()
+
+        if geometry is None:
+            geometry = mol.geometry
+            if mol.geometry_units not in ("angstrom", "angstroms"):
+                geometry = geometry * convert(1.0, mol.geometry_units, "angstrom")
+        if seed is None and inputs.gen_seed is not None:
+            seed = int(numpy.ravel(inputs.gen_seed)[0])
+        temp = None if inputs.temp is None else float(numpy.ravel(inputs.temp)[0])
+
+        if velocities is not None:
+            pass
+        elif inputs.gen_vel is not None and numpy.any(inputs.gen_vel):
+            gen_temp = numpy.ravel(
+                inputs.gen_temp if inputs.gen_temp is not None else temp
+            )
+            velocities = maxwell_boltzmann(model.masses, float(gen_temp[0]), seed)
+        elif mol.velocities is not None:
+            velocities = mol.velocities
+            if mol.velocities_units not in ("angstrom/fs", "angstroms/fs"):
+                velocities = velocities * convert(
+                    1.0, mol.velocities_units, "angstrom/fs"
+                )
+
+        coupling = None
+        if inputs.temp_method and inputs.temp_method.lower() not in (
+            "no",
+            "none",
+            "nve",
+        ):
+            if temp is None:
+                raise ValueError("Temperature coupling requires DynamicsInput.temp.")
+            tau = _default_tau.get(inputs.temp_method.lower(), 100.0)
+            coupling = thermostat(inputs.temp_method, temp, tau=tau, seed=seed)
+
+        md = cls(
+            lambda x: model.compute(x)[:2],
+            geometry,
+            model.masses,
+            velocities=velocities,
+            dt=inputs.step_size or _default_step_size,
+            method=inputs.march_method or _default_method,
+            thermostat=coupling,
+            constraints=_input_constraints(inputs, name, model),
+        )
+        return name, mol, model, md
+
+    @property
+    def time(self) -> float:
+        return self.step_count * self.dt
+
+    @property
+    def temperature(self) -> float:
+        return temperature(self.kin_energy, self.ndof)
+
+    def state(self) -> MDState:
+        """ Returns a snapshot of the current state. """
+        return MDState(
+            self.step_count,
+            self.time,
+            self.geometry.copy(),
+            self.velocities.copy(),
+            self.forces.copy(),
+            self.pot_energy,
+            self.kin_energy,
+            self.temperature,
+        )
+
+    def step(self, nsteps: int = 1) -> None:
+        """ Advances the system by nsteps time steps. """
+        dt, v, x = self.dt, self.velocities, self.geometry
+        for _ in range(nsteps):
+            if self.method == "velocity-verlet":
+                v += 0.5 * dt * self.forces * self._inv_mass
+                self._drift()
+                self.pot_energy, self.forces = self.func(x)
+                v += 0.5 * dt * self.forces * self._inv_mass
+                if self.thermostat is not None:
+                    self.thermostat.apply(v, self.masses, dt, self.ndof)
+                if self.constraints is not None:
+                    self.constraints.apply_velocities(x, v)
+                self.kin_energy = kinetic_energy(self.masses, v)
+            else:
+                v += dt * self.forces * self._inv_mass
+                if self.thermostat is not None:
+                    self.thermostat.apply(v, self.masses, dt, self.ndof)
+                self._drift()
+                self.pot_energy, self.forces = self.func(x)
+                self.kin_energy = kinetic_energy(
+                    self.masses, self._full_step_velocities()
+                )
+            self.step_count += 1
+
+    def _drift(self) -> None:
+        """ Moves the positions by dt * v. With constraints, the velocities become the constrained displacements / dt. """
+        if self.constraints is None:
+            self.geometry += self.dt * self.velocities
+            return
+        reference = self.geometry.copy()
+        self.geometry += self.dt * self.velocities
+        self.constraints.apply(reference, self.geometry)
+        numpy.subtract(self.geometry, reference, out=self.velocities)
+        self.velocities /= self.dt
+
+    def _full_step_velocities(self) -> numpy.ndarray:
+        """ Estimates the leapfrog velocities at the current positions: v(t - dt/2) + dt/2 * a(t). """
+        velocities = self.velocities + 0.5 * self.dt * self.forces * self._inv_mass
+        if self.constraints is not None:
+            self.constraints.apply_velocities(self.geometry, velocities)
+        return velocities
+
+    def run(self, nsteps: int, freq: Optional[int] = None) -> Iterator[MDState]:
+        """Advances the system by nsteps time steps and yields a snapshot of the initial state and
+        every ``freq`` steps. Snapshots are not retained, so trajectories of any length can be
+        streamed to disk. Only the initial and final states are yielded if freq is unset."""
+        freq = freq or max(nsteps, 1)
+        yield self.state()
+        done = 0
+        while done < nsteps:
+            chunk = min(freq, nsteps - done)
+            self.step(chunk)
+            done += chunk
+            yield self.state()
@@ -0,0 +1,549 @@
+""" Electrostatic interactions: plain cutoff, reaction field, Ewald summation, and smooth particle-mesh Ewald """
+
+__all__ = [
+    "COULOMB",
+    "PME",
+    "cutoff",
+    "reaction_field",
+    "ewald_alpha",
+    "ewald_real",
+    "ewald_self",
+    "ewald_exclusions",
+    "ewald_reciprocal",
+    "electrostatic_energy",
+    "erfc",
+]
+
+from typing import Optional, Sequence, Tuple
+import math
+import numpy
+
+from .neighbors import PairList, neighbor_pairs, pair_forces
+from .pbc import minimum_image
+
+# Optional dependency for the complementary error function
+try:
+    from scipy.special import erfc as _scipy_erfc
+except ImportError:
+    _scipy_erfc = None
+
+# Coulomb constant 1/(4 pi eps0) in kJ/mol * angstrom / e**2
+COULOMB = 1389.35457644382
+
+# Chebyshev coefficients of the erfc approximation in increasing order
+_erfc_coeffs = (
+    -1.26551223,
+    1.00002368,
+    0.37409196,
+    0.09678418,
+    -0.18628806,
+    0.27886807,
+    -1.13520398,
+    1.48851587,
+    -0.82215223,
+    0.17087277,
+)
+
+
+def erfc(x: numpy.ndarray) -> numpy.ndarray:
+    """Returns the complementary error function of x. Uses scipy if available and otherwise a
+    Chebyshev approximation with a fractional error below 1.2e-7 (Numerical Recipes erfcc)."""
+    if _scipy_erfc is not None:
+        return _scipy_erfc(x)
+    x = numpy.asarray(x, dtype=float)
+    z = numpy.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = numpy.zeros_like(t)
+    for coeff in reversed(_erfc_coeffs):
+        poly = coeff + t * poly
+    ans = t * numpy.exp(-z * z + poly)
+    return numpy.where(x >= 0, ans, 2.0 - ans)
+
+
+def _pair_charges(charges: numpy.ndarray, i: numpy.ndarray, j: numpy.ndarray):
+    return COULOMB * charges[i] * charges[j]
+
+
+def cutoff(
+    charges: numpy.ndarray,
+    pairs: PairList,
+    rc: float,
+    epsilon_r: float = 1.0,
+    shift: bool = False,
+    truncate: bool = True,
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Plain Coulomb interactions truncated at rc.
+    Parameters
+    ----------
+    charges: numpy.ndarray
+        Atomic charges in elementary charge units.
+    pairs: PairList
+        Neighbor pairs within (at least) rc.
+    rc: float
+        Cutoff distance in angstroms.
+    epsilon_r: float, optional
+        Relative dielectric constant. Defaults to 1.
+    shift: bool, optional
+        Shifts the potential so that it vanishes at rc. Defaults to False.
+    truncate: bool, optional
+        Discards pairs beyond rc. Set to False if the pairs were already selected e.g. by charge groups.
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Energy (kJ/mol) and dE/dr of every pair.
+    """
+    qq = _pair_charges(charges, pairs.i, pairs.j) / epsilon_r
+    inside = pairs.r < rc if truncate else True
+    energy = numpy.where(inside, qq * (1.0 / pairs.r - (1.0 / rc if shift else 0.0)), 0)
+    dedr = numpy.where(inside, -qq / pairs.r ** 2, 0.0)
+    return energy, dedr
+
+
+def reaction_field(
+    charges: numpy.ndarray,
+    pairs: PairList,
+    rc: float,
+    epsilon_rf: float = 78.5,
+    epsilon_r: float = 1.0,
+    truncate: bool = True,
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Coulomb interactions within rc embedded in a dielectric continuum (reaction field). The
+    potential is shifted to vanish at rc.
+    Parameters
+    ----------
+    charges: numpy.ndarray
+        Atomic charges in elementary charge units.
+    pairs: PairList
+        Neighbor pairs within (at least) rc.
+    rc: float
+        Cutoff distance in angstroms.
+    epsilon_rf: float, optional
+        Dielectric constant of the continuum beyond rc. Use numpy.inf for a conducting continuum.
+        Defaults to 78.5 (water).
+    epsilon_r: float, optional
+        Relative dielectric constant within rc. Defaults to 1.
+    truncate: bool, optional
+        Discards pairs beyond rc. Set to False if the pairs were already selected e.g. by charge groups.
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Energy (kJ/mol) and dE/dr of every pair.
+    """
+    if numpy.isinf(epsilon_rf):
+        k_rf = 0.5 / rc ** 3
+    else:
+        k_rf = (epsilon_rf - epsilon_r) / ((2.0 * epsilon_rf + epsilon_r) * rc ** 3)
+    c_rf = 1.0 / rc + k_rf * rc ** 2
+
+    qq = _pair_charges(charges, pairs.i, pairs.j) / epsilon_r
+    r = pairs.r
+    inside = r < rc if truncate else True
+    energy = numpy.where(inside, qq * (1.0 / r + k_rf * r ** 2 - c_rf), 0.0)
+    dedr = numpy.where(inside, qq * (2.0 * k_rf * r - 1.0 / r ** 2), 0.0)
+    return energy, dedr
+
+
+def ewald_alpha(rc: float, tolerance: float = 1e-5) -> float:
+    """Returns the Ewald splitting parameter alpha (1/angstrom) for which erfc(alpha * rc) equals
+    ``tolerance``, i.e. the relative strength of the real-space interactions at the cutoff."""
+    lo, hi = 0.0, 5.0
+    while erfc(hi * rc) > tolerance:
+        hi *= 2.0
+    for _ in range(60):
+        mid = 0.5 * (lo + hi)
+        lo, hi = (mid, hi) if erfc(mid * rc) > tolerance else (lo, mid)
+    return 0.5 * (lo + hi)
+
+
+def ewald_real(
+    charges: numpy.ndarray, pairs: PairList, rc: float, alpha: float
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """ Returns the real-space Ewald energy and dE/dr of every pair within rc. """
+    qq = _pair_charges(charges, pairs.i, pairs.j)
+    r = pairs.r
+    erfc_ar = erfc(alpha * r)
+    gauss = 2.0 * alpha / math.sqrt(math.pi) * numpy.exp(-((alpha * r) ** 2))
+    inside = r < rc
+    energy = numpy.where(inside, qq * erfc_ar / r, 0.0)
+    dedr = numpy.where(inside, -qq * (erfc_ar / r + gauss) / r, 0.0)
+    return energy, dedr
+
+
+def ewald_self(charges: numpy.ndarray, alpha: float) -> float:
+    """ Returns the Ewald self-interaction energy. """
+    return -COULOMB * alpha / math.sqrt(math.pi) * numpy.dot(charges, charges)
+
+
+def ewald_exclusions(
+    charges: numpy.ndarray, pairs: PairList, alpha: float
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Returns the energy and dE/dr that remove the reciprocal-space interactions of excluded
+    pairs, i.e. -qi * qj * erf(alpha * r) / r."""
+    qq = _pair_charges(charges, pairs.i, pairs.j)
+    r = pairs.r
+    erf_ar = 1.0 - erfc(alpha * r)
+    gauss = 2.0 * alpha / math.sqrt(math.pi) * numpy.exp(-((alpha * r) ** 2))
+    return -qq * erf_ar / r, qq * (erf_ar / r - gauss) / r
+
+
+def ewald_reciprocal(
+    charges: numpy.ndarray,
+    geometry: numpy.ndarray,
+    box: numpy.ndarray,
+    alpha: float,
+    kmax: int = 10,
+) -> Tuple[float, numpy.ndarray]:
+    """Reciprocal-space Ewald energy and forces computed by direct summation over all wave vectors with
+    integer components |m| <= kmax. Scales as natoms * kmax**3 and serves as a reference for ``PME``.
+    Parameters
+    ----------
+    charges: numpy.ndarray
+        Atomic charges in elementary charge units.
+    geometry: numpy.ndarray
+        Atomic positions in angstroms of shape (natoms, 3).
+    box: numpy.ndarray
+        Box edge lengths in angstroms.
+    alpha: float
+        Ewald splitting parameter in 1/angstrom.
+    kmax: int, optional
+        Maximum wave vector component. Defaults to 10.
+    Returns
+    -------
+    Tuple[float, numpy.ndarray]
+        Energy (kJ/mol) and forces (kJ/mol/angstrom) of shape (natoms, 3).
+    """
+    volume = numpy.prod(box)
+    m = numpy.arange(-kmax, kmax + 1)
+    mvec = numpy.stack(numpy.meshgrid(m, m, m, indexing="ij"), -1).reshape(-1, 3)
+    mvec = mvec[numpy.any(mvec != 0, axis=1)] / box
+    m2 = numpy.einsum("ij,ij->i", mvec, mvec)
+    weight = (
+        COULOMB / (math.pi * volume) * numpy.exp(-(math.pi ** 2) * m2 / alpha ** 2) / m2
+    )
+
+    energy, forces = 0.0, numpy.zeros_like(geometry)
+    # Wave vectors are processed in blocks to bound the (natoms, nvectors) phase arrays
+    block = max(1, 2 ** 22 // max(len(charges), 1))
+    for start in range(0, len(mvec), block):
+        phase = 2.0 * math.pi * geometry @ mvec[start : start + block].T
+        cos, sin = numpy.cos(phase), numpy.sin(phase)
+        s_re, s_im = charges @ cos, charges @ sin
+        w = weight[start : start + block]
+        energy += 0.5 * numpy.dot(w, s_re ** 2 + s_im ** 2)
+        dphase = charges[:, None] * (sin * s_re - cos * s_im) * w
+        forces += 2.0 * math.pi * dphase @ mvec[start : start + block]
+    return energy, forces
+
+
+def _bspline(w: numpy.ndarray, order: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Returns the cardinal B-spline values M_n(w + k) and derivatives for k = 0..order-1 and
+    fractional offsets w in [0, 1), each of shape (len(w), order)."""
+    theta = numpy.zeros((len(w), order))
+    theta[:, 0], theta[:, 1] = w, 1.0 - w
+    for p in range(3, order + 1):
+        if p == order:
+            dtheta = theta.copy()
+            dtheta[:, 1:] -= theta[:, :-1]
+        prev = theta.copy()
+        for k in range(p):
+            y = w + k
+            left = prev[:, k] if k < p - 1 else 0.0
+            right = prev[:, k - 1] if k > 0 else 0.0
+            theta[:, k] = (y * left + (p - y) * right) / (p - 1)
+    if order == 2:
+        dtheta = numpy.stack((numpy.ones_like(w), -numpy.ones_like(w)), -1)
+    return theta, dtheta
+
+
+def _bspline_moduli(ngrid: int, order: int) -> numpy.ndarray:
+    """ Returns |b(m)|**2 of the Euler exponential spline for m = 0..ngrid-1. """
+    theta, _ = _bspline(numpy.zeros(1), order)
+    # M_n(k + 1) for k = 0..n-2
+    knots = numpy.zeros(ngrid)
+    knots[: order - 1] = theta[0, 1:order]
+    denom = numpy.abs(numpy.fft.fft(knots)) ** 2
+    # Odd orders vanish at the Nyquist frequency: interpolate from the neighbors
+    for m in numpy.flatnonzero(denom < 1e-10):
+        denom[m] = 0.5 * (denom[m - 1] + denom[(m + 1) % ngrid])
+    return 1.0 / denom
+
+
+def _fft_size(n: int) -> int:
+    """ Returns the smallest integer >= n whose only prime factors are 2, 3, and 5. """
+    while True:
+        k = n
+        for p in (2, 3, 5):
+            while k % p == 0:
+                k //= p
+        if k == 1:
+            return n
+        n += 1
+
+
+class PME:
+    """Smooth particle-mesh Ewald (Essmann et al. 1995) for the reciprocal-space part of the Ewald sum
+    in an orthorhombic box. Charges are spread on a grid with cardinal B-splines, the grid is convolved
+    with the Ewald influence function with ``numpy.fft``, and forces are interpolated back with the
+    spline derivatives. The influence function depends only on the box, grid, and alpha, and is
+    computed once.
+    Parameters
+    ----------
+    box: numpy.ndarray
+        Box edge lengths in angstroms.
+    alpha: float
+        Ewald splitting parameter in 1/angstrom. See ``ewald_alpha``.
+    grid: Sequence[int], optional
+        Number of grid points along every dimension. Chosen from ``spacing`` if unset.
+    spacing: float, optional
+        Maximum grid spacing in angstroms. Defaults to 1.
+    order: int, optional
+        B-spline interpolation order. Defaults to 4 (cubic).
+    """
+
+    def __init__(
+        self,
+        box: numpy.ndarray,
+        alpha: float,
+        grid: Optional[Sequence[int]] = None,
+        spacing: float = 1.0,
+        order: int = 4,
+    ):
+        self.box = numpy.asarray(box, dtype=float)
+        self.alpha = alpha
+        self.order = order
+        if grid is None:
+            grid = [_fft_size(int(math.ceil(length / spacing))) for length in self.box]
+        self.grid = numpy.asarray(grid, dtype=numpy.int64)
+        if numpy.any(self.grid < order):
+            raise ValueError("Every grid dimension must hold at least order points.")
+
+        # Influence function on the half-complex grid used by rfftn
+        freqs = [numpy.fft.fftfreq(n, 1.0 / n) for n in self.grid[:2]]
+        freqs.append(numpy.arange(self.grid[2] // 2 + 1))
+        mx, my, mz = numpy.meshgrid(*freqs, indexing="ij", sparse=True)
+        m2 = (mx / self.box[0]) ** 2 + (my / self.box[1]) ** 2 + (mz / self.box[2]) ** 2
+        bx, by, bz = (_bspline_moduli(n, order) for n in self.grid)
+        moduli = (
+            bx[:, None, None]
+            * by[None, :, None]
+            * bz[None, None, : self.grid[2] // 2 + 1]
+        )
+        m2[0, 0, 0] = 1.0
+        volume = numpy.prod(self.box)
+        self.influence = (
+            COULOMB
+            / (math.pi * volume)
+            * numpy.exp(-(math.pi ** 2) * m2 / alpha ** 2)
+            / m2
+            * moduli
+        )
+        self.influence[0, 0, 0] = 0.0
+
+    def _spread(self, geometry: numpy.ndarray):
+        u = geometry / self.box * self.grid
+        base = numpy.floor(u).astype(numpy.int64)
+        theta, dtheta = zip(
+            *(_bspline(u[:, dim] - base[:, dim], self.order) for dim in range(3))
+        )
+        # Grid index of every (atom, k) spline weight
+        k = numpy.arange(self.order)
+        index = [(base[:, dim, None] - k) % self.grid[dim] for dim in range(3)]
+        return theta, dtheta, index
+
+    def _flat_index(self, index) -> numpy.ndarray:
+        ix, iy, iz = index
+        ny, nz = self.grid[1], self.grid[2]
+        return (
+            ix[:, :, None, None] * ny * nz
+            + iy[:, None, :, None] * nz
+            + iz[:, None, None, :]
+        ).reshape(len(ix), -1)
+
+    def reciprocal(
+        self, charges: numpy.ndarray, geometry: numpy.ndarray
+    ) -> Tuple[float, numpy.ndarray]:
+        """Returns the reciprocal-space energy (kJ/mol) and forces (kJ/mol/angstrom).
+        Parameters
+        ----------
+        charges: numpy.ndarray
+            Atomic charges in elementary charge units.
+        geometry: numpy.ndarray
+            Atomic positions in angstroms of shape (natoms, 3).
+        Returns
+        -------
+        Tuple[float, numpy.ndarray]
+            Energy and forces of shape (natoms, 3).
+        """
+        (tx, ty, tz), (dx, dy, dz), index = self._spread(geometry)
+        flat = self._flat_index(index)
+        weights = (
+            tx[:, :, None, None] * ty[:, None, :, None] * tz[:, None, None, :]
+        ).reshape(len(charges), -1)
+
+        ngrid = int(numpy.prod(self.grid))
+        qgrid = numpy.bincount(
+            flat.ravel(), (charges[:, None] * weights).ravel(), minlength=ngrid
+        ).reshape(self.grid)
+
+        # Potential on the grid: dE/dQ
+        phi = numpy.fft.irfftn(
+            numpy.fft.rfftn(qgrid) * self.influence, s=tuple(self.grid)
+        )
+        phi *= ngrid
+        energy = 0.5 * numpy.vdot(qgrid, phi)
+
+        phi_atoms = phi.ravel()[flat]
+        shape = (len(charges), -1)
+        grads = [
+            (
+                dx[:, :, None, None] * ty[:, None, :, None] * tz[:, None, None, :]
+            ).reshape(shape),
+            (
+                tx[:, :, None, None] * dy[:, None, :, None] * tz[:, None, None, :]
+            ).reshape(shape),
+            (
+                tx[:, :, None, None] * ty[:, None, :, None] * dz[:, None, None, :]
+            ).reshape(shape),
+        ]
+        forces = numpy.stack(
+            [-charges * numpy.einsum("ij,ij->i", phi_atoms, g) for g in grads], -1
+        )
+        forces *= self.grid / self.box
+        return float(energy), forces
+
+
+def electrostatic_energy(
+    charges: numpy.ndarray,
+    geometry: numpy.ndarray,
+    method: str = "pme",
+    rc: float = 10.0,
+    box: Optional[numpy.ndarray] = None,
+    periodic: Optional[numpy.ndarray] = None,
+    pairs: Optional[PairList] = None,
+    excluded: Optional[PairList] = None,
+    charge_groups: Optional[numpy.ndarray] = None,
+    tolerance: float = 1e-5,
+    pme: Optional[PME] = None,
+    **kwargs,
+) -> Tuple[float, numpy.ndarray]:
+    """Computes the total electrostatic energy and forces of a system.
+    Parameters
+    ----------
+    charges: numpy.ndarray
+        Atomic charges in elementary charge units e.g. ``ForceField.charges``.
+    geometry: numpy.ndarray
+        Atomic positions in angstroms of shape (natoms, 3).
+    method: str, optional
+        One of cutoff, reaction-field, ewald, or pme. Defaults to pme.
+    rc: float, optional
+        Real-space cutoff in angstroms. Defaults to 10.
+    box: numpy.ndarray, optional
+        Orthorhombic box edge lengths in angstroms. Required by ewald and pme.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic dimensions. Defaults to all dimensions if ``box`` is set.
+    pairs: PairList, optional
+        Precomputed non-excluded neighbor pairs within rc. Built with ``neighbor_pairs`` if unset.
+    excluded: PairList, optional
+        Excluded pairs. Their reciprocal-space interactions are removed for ewald and pme, and they
+        are left out of the pairs built when ``pairs`` is unset.
+    charge_groups: numpy.ndarray, optional
+        Charge group of every atom e.g. ``ForceField.charge_groups``. With cutoff and reaction-field,
+        atom pairs interact only if the centers of their charge groups are within rc.
+    tolerance: float, optional
+        Relative real-space interaction strength at rc used to choose alpha. Defaults to 1e-5.
+    pme: PME, optional
+        Precomputed PME object to reuse (e.g. across time steps). Built from ``kwargs`` if unset.
+    **kwargs
+        Additional keyword arguments passed to the pair functions or to ``PME`` e.g. epsilon_rf, spacing.
+    Returns
+    -------
+    Tuple[float, numpy.ndarray]
+        Energy (kJ/mol) and forces (kJ/mol/angstrom) of shape (natoms, 3).
+    """
+    charges = numpy.asarray(charges, dtype=float)
+    geometry = numpy.asarray(geometry, dtype=float)
+    natoms = len(charges)
+    method = method.lower()
+
+    if box is not None and periodic is None:
+        periodic = numpy.ones(len(box), dtype=bool)
+    exclusions = None
+    if excluded is not None and len(excluded.i):
+        exclusions = excluded.i * natoms + excluded.j
+
+    if method in ("cutoff", "reaction-field"):
+        search = rc
+        if charge_groups is not None:
+            search += 2.0 * _group_radius(geometry, charge_groups, box, periodic)
+            if box is not None:
+                search = min(search, 0.5 * float(numpy.min(box[periodic])))
+        if pairs is None:
+            pairs = neighbor_pairs(geometry, search, box, periodic, exclusions)
+        if charge_groups is not None:
+            # Group-based truncation keeps every atom pair of interacting groups
+            pairs = _group_filter(pairs, geometry, charge_groups, rc, box, periodic)
+            kwargs["truncate"] = False
+        func = cutoff if method == "cutoff" else reaction_field
+        energy, dedr = func(charges, pairs, rc, **kwargs)
+        return float(energy.sum()), pair_forces(pairs, dedr, natoms)
+
+    elif method in ("ewald", "pme"):
+        if box is None:
+            raise ValueError("Ewald summation requires a periodic box.")
+        if not periodic.all():
+            raise NotImplementedError(
+                "Ewald summation requires 3D periodic boundaries."
+            )
+        alpha = pme.alpha if pme is not None else ewald_alpha(rc, tolerance)
+        if pairs is None:
+            pairs = neighbor_pairs(geometry, rc, box, periodic, exclusions)
+
+        energy, dedr = ewald_real(charges, pairs, rc, alpha)
+        total = energy.sum() + ewald_self(charges, alpha)
+        forces = pair_forces(pairs, dedr, natoms)
+
+        if excluded is not None and len(excluded.i):
+            energy, dedr = ewald_exclusions(charges, excluded, alpha)
+            total += energy.sum()
+            forces += pair_forces(excluded, dedr, natoms)
+
+        if method == "ewald":
+            energy, rforces = ewald_reciprocal(
+                charges, geometry, box, alpha, kwargs.get("kmax", 10)
+            )
+        else:
+            pme = pme or PME(box, alpha, **kwargs)
+            energy, rforces = pme.reciprocal(charges, geometry)
+        return float(total + energy), forces + rforces
+
+    raise ValueError(
+        f"Electrostatics method {method} not supported. Choose from: cutoff, reaction-field, ewald, pme."
+    )
+
+
+def _group_centers(geometry, groups, box, periodic):
+    # Groups are unwrapped relative to their first atom before averaging
+    _, first, inverse = numpy.unique(groups, return_index=True, return_inverse=True)
+    d = geometry - geometry[first][inverse]
+    if box is not None:
+        minimum_image(d, box, periodic)
+    counts = numpy.bincount(inverse)
+    centers = numpy.stack(
+        [numpy.bincount(inverse, d[:, dim]) / counts for dim in range(3)], -1
+    )
+    centers += geometry[first]
+    return centers, inverse, d - (centers - geometry[first])[inverse]
+
+
+def _group_radius(geometry, groups, box, periodic) -> float:
+    _, _, offsets = _group_centers(geometry, groups, box, periodic)
+    return float(numpy.sqrt(numpy.einsum("ij,ij->i", offsets, offsets).max()))
+
+
+def _group_filter(pairs, geometry, groups, rc, box, periodic) -> PairList:
+    centers, inverse, _ = _group_centers(geometry, groups, box, periodic)
+    d = centers[inverse[pairs.i]] - centers[inverse[pairs.j]]
+    if box is not None:
+        minimum_image(d, box, periodic)
+    keep = numpy.einsum("ij,ij->i", d, d) < rc * rc
+    return PairList(*(val[keep] for val in pairs))
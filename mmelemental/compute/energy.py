@@ -0,0 +1,443 @@
+""" Vectorized force field energy and force evaluation """
+
+__all__ = ["ForceFieldEnergy", "accumulate"]
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import numpy
+
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.models.forcefield import ForceField
+from mmelemental.models.app.base import SimInput
+from mmelemental.models.solvent.implicit import Solvent
+from mmelemental.util.units import convert
+from .mixing import mixing_table
+from .neighbors import (
+    PairList,
+    exclusion_depth,
+    exclusion_pairs,
+    neighbor_pairs,
+    pair_forces,
+)
+from .electrostatics import electrostatic_energy
+from .implicit import GeneralizedBorn
+from .pbc import box_from_cell, cell_periodic, minimum_image
+
+# Internal units: kJ/mol, angstrom, radian, elementary charge, amu
+_aliases = {
+    "kJ/mol": ("kJ/mol", "kilojoule/mol"),
+    "angstrom": ("angstrom", "angstroms", "Angstrom"),
+    "radians": ("radians", "radian", "rad"),
+    "kJ/(mol*angstrom**2)": ("kJ/(mol*angstrom**2)", "kJ/(mol*angstroms**2)"),
+    "kJ/(mol*radians**2)": ("kJ/(mol*radians**2)", "kJ/(mol*radian**2)"),
+    "e": ("e", "elementary_charge"),
+    "amu": ("amu", "dalton"),
+}
+
+_dims = numpy.arange(3)
+
+
+@lru_cache(maxsize=None)
+def _factor(units: str, target: str) -> float:
+    return convert(1.0, units, target)
+
+
+def _to(value: numpy.ndarray, units: Optional[str], target: str) -> numpy.ndarray:
+    """ Converts value to the target internal units. Conversion factors are computed once per pair of units. """
+    value = numpy.asarray(value, dtype=float)
+    if units is None or units in _aliases[target]:
+        return value
+    return value * _factor(units, target)
+
+
+def accumulate(
+    natoms: int, indices: Sequence[numpy.ndarray], vectors: Sequence[numpy.ndarray]
+) -> numpy.ndarray:
+    """ Sums per-term vectors of shape (nterms, 3) into per-atom arrays of shape (natoms, 3). """
+    index = numpy.concatenate(indices)
+    vec = numpy.concatenate(vectors)
+    # One bincount over the flattened (atom, dimension) index instead of one per dimension
+    flat = (3 * index[:, None] + _dims).ravel()
+    return numpy.bincount(flat, vec.ravel(), minlength=3 * natoms).reshape(natoms, 3)
+
+
+def _cross(a: numpy.ndarray, b: numpy.ndarray) -> numpy.ndarray:
+    """ Row-wise cross product of arrays of shape (n, 3), without the axis handling overhead of numpy.cross. """
+    out = numpy.empty_like(a)
+    out[:, 0] = a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1]
+    out[:, 1] = a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2]
+    out[:, 2] = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    return out
+
+
+def _params(section) -> List:
+    if section is None:
+        return []
+    return section.params if isinstance(section.params, list) else [section.params]
+
+
+class ForceFieldEnergy:
+    """Evaluates the potential energy and forces of a molecule with a force field. Bonded terms
+    follow ``Molecule.connectivity``, ``angles``, and ``dihedrals`` in the order of the force field
+    parameters. Non-bonded terms are Lennard-Jones (with mixing tables) and electrostatics over
+    non-excluded pairs. All parameters are converted once to kJ/mol, angstroms, and radians.
+    Parameters
+    ----------
+    mol: Molecule
+        Molecule defining the topology.
+    ff: ForceField
+        Force field parameters for every atom and term in ``mol``.
+    cutoff: float, optional
+        Non-bonded cutoff in angstroms. All pairs interact if unset (small molecules in vacuum).
+    box: numpy.ndarray, optional
+        Orthorhombic box edge lengths in angstroms for periodic systems.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic dimensions. Defaults to all dimensions if ``box`` is set.
+    electrostatics: str, optional
+        Electrostatics method. See :func:``electrostatics.electrostatic_energy``. Defaults to
+        cutoff (plain Coulomb when ``cutoff`` is unset).
+    skin: float, optional
+        Verlet buffer in angstroms: neighbor pairs are searched within cutoff + skin and only
+        rebuilt once an atom moved by more than skin / 2. Defaults to 1.
+    rule: str, optional
+        Lennard-Jones combination rule. Defaults to lorentz-berthelot.
+    solvent: Solvent, optional
+        Implicit solvent model. Adds the Generalized Born (gb) and nonpolar (sa) terms if implicit.
+    **kwargs
+        Additional keyword arguments passed to :func:``electrostatics.electrostatic_energy``.
+    """
+
+    def __init__(
+        self,
+        mol: Molecule,
+        ff: ForceField,
+        cutoff: Optional[float] = None,
+        box: Optional[numpy.ndarray] = None,
+        periodic: Optional[numpy.ndarray] = None,
+        electrostatics: str = "cutoff",
+        skin: float = 1.0,
+        rule: str = "lorentz-berthelot",
+        solvent: Optional[Solvent] = None,
+        **kwargs,
+    ):
+        self.natoms = len(mol.symbols)
+        self.cutoff = cutoff
+        self.box = None if box is None else numpy.asarray(box, dtype=float)
+        if self.box is not None and periodic is None:
+            periodic = numpy.ones(len(self.box), dtype=bool)
+        self.periodic = periodic
+        self.electrostatics = electrostatics
+        self.skin = skin
+        self.kwargs = kwargs
+
+        masses = ff.masses if ff.masses is not None else mol.masses
+        units = ff.masses_units if ff.masses is not None else mol.masses_units
+        self.masses = _to(masses, units, "amu")
+
+        self._setup_bonded(mol, ff)
+        self._setup_nonbonded(mol, ff, rule)
+
+        self.solvent = None
+        if solvent is not None and solvent.implicit:
+            self.solvent = GeneralizedBorn.from_solvent(
+                solvent,
+                mol.symbols,
+                self.charges,
+                mol.connectivity,
+                cutoff=cutoff,
+                box=self.box,
+                periodic=self.periodic,
+            )
+
+    @classmethod
+    def from_input(
+        cls, inputs: SimInput, **kwargs
+    ) -> Tuple[str, Molecule, "ForceFieldEnergy"]:
+        """Builds the energy model of the single molecule in a simulation input e.g. ``OptimInput``.
+        Periodic cells use a cutoff of half the smallest periodic box length, at most 10 angstroms.
+        An implicit ``SimInput.solvent`` adds Generalized Born solvation.
+        Parameters
+        ----------
+        inputs: SimInput
+            Simulation input with exactly one molecule and its force field.
+        **kwargs
+            Additional keyword arguments passed to the constructor.
+        Returns
+        -------
+        Tuple[str, Molecule, ForceFieldEnergy]
+            The molecule name and model, and the energy model.
+        """
+        if not inputs.mol or len(inputs.mol) != 1:
+            raise NotImplementedError(
+                "In-process simulations require a single molecule in SimInput.mol."
+            )
+        ((name, mol),) = inputs.mol.items()
+        ff = (inputs.forcefield or {}).get(name)
+        if ff is None:
+            raise ValueError(f"No force field supplied for molecule {name}.")
+
+        if inputs.solvent is not None:
+            kwargs.setdefault("solvent", inputs.solvent)
+        if inputs.cell is not None and "box" not in kwargs:
+            _, box = box_from_cell(inputs.cell)
+            periodic = cell_periodic(inputs.cell, inputs.boundary, len(box))
+            kwargs.update(box=box, periodic=periodic)
+            if periodic.any():
+                kwargs.setdefault("cutoff", min(10.0, 0.5 * float(box[periodic].min())))
+        return name, mol, cls(mol, ff, **kwargs)
+
+    # Setup
+    def _setup_bonded(self, mol: Molecule, ff: ForceField) -> None:
+        self.bonds, self.angles, self.dihedrals = [], [], []
+
+        if mol.connectivity and ff.bonds is not None:
+            index = numpy.asarray(mol.connectivity)[:, :2].astype(numpy.int64)
+            offset = 0
+            for params in _params(ff.bonds):
+                n = len(params.lengths)
+                self.bonds.append(
+                    (
+                        params.__class__.__name__,
+                        index[offset : offset + n],
+                        _to(params.spring, params.spring_units, "kJ/(mol*angstrom**2)"),
+                        _to(params.lengths, params.lengths_units, "angstrom"),
+                    )
+                )
+                offset += n
+
+        if mol.angles and ff.angles is not None:
+            index = numpy.asarray(mol.angles, dtype=numpy.int64)[:, :3]
+            offset = 0
+            for params in _params(ff.angles):
+                n = len(params.angles)
+                self.angles.append(
+                    (
+                        index[offset : offset + n],
+                        _to(params.spring, params.spring_units, "kJ/(mol*radians**2)"),
+                        _to(params.angles, params.angles_units, "radians"),
+                    )
+                )
+                offset += n
+
+        if mol.dihedrals and ff.dihedrals is not None:
+            index = numpy.asarray(mol.dihedrals, dtype=numpy.int64)[:, :4]
+            offset = 0
+            for params in _params(ff.dihedrals):
+                n = len(params.spring)
+                self.dihedrals.append(
+                    (
+                        index[offset : offset + n],
+                        _to(params.spring, params.spring_units, "kJ/(mol*radians**2)"),
+                        _to(params.angles, params.angles_units, "radians"),
+                    )
+                )
+                offset += n
+
+    def _setup_nonbonded(self, mol: Molecule, ff: ForceField, rule: str) -> None:
+        self.lj = None
+        if ff.nonbonded is not None and ff.nonbonded.form == "LennardJones":
+            self.lj = mixing_table(ff, rule=rule)
+        elif ff.nonbonded is not None:
+            raise NotImplementedError(
+                f"Non-bonded potential {ff.nonbonded.form} is not supported."
+            )
+
+        self.charges = None
+        if ff.charges is not None and numpy.any(ff.charges):
+            self.charges = _to(ff.charges, ff.charges_units, "e")
+        self.charge_groups = ff.charge_groups
+
+        # Pairs separated by up to 3 bonds are excluded unless the force field says otherwise
+        depth = 3 if ff.exclusions is None else exclusion_depth(ff.exclusions)
+        self.exclusions = exclusion_pairs(mol.connectivity, self.natoms, depth)
+
+        # Without a cutoff the pair list and its Lennard-Jones coefficients are fixed by the topology
+        self._pairs = self._lj_pairs = None
+        if self.cutoff is None:
+            i, j = numpy.triu_indices(self.natoms, k=1)
+            if len(self.exclusions):
+                keep = ~numpy.isin(i * self.natoms + j, self.exclusions)
+                i, j = i[keep], j[keep]
+            self._pairs = (i, j)
+            if self.lj is not None:
+                self._lj_pairs = self.lj.lookup(i, j)
+        self._reference = None
+        # Excluded atom pairs, whose reciprocal-space interactions are removed with ewald and pme
+        self._excluded = numpy.divmod(self.exclusions, self.natoms)
+
+    # Neighbor pairs
+    def pairs(self, geometry: numpy.ndarray) -> PairList:
+        """ Returns the non-excluded pairs within the cutoff (all of them if no cutoff is set). """
+        if self.cutoff is not None and self._moved(geometry):
+            candidates = neighbor_pairs(
+                geometry,
+                self.cutoff + self.skin,
+                self.box,
+                self.periodic,
+                self.exclusions,
+            )
+            self._pairs = (candidates.i, candidates.j)
+            self._reference = geometry.copy()
+
+        i, j = self._pairs
+        d = geometry[i] - geometry[j]
+        if self.box is not None:
+            minimum_image(d, self.box, self.periodic)
+        r = numpy.sqrt(numpy.einsum("ij,ij->i", d, d))
+        if self.cutoff is not None:
+            keep = r < self.cutoff
+            return PairList(i[keep], j[keep], d[keep], r[keep])
+        return PairList(i, j, d, r)
+
+    def excluded_pairs(self, geometry: numpy.ndarray) -> PairList:
+        """ Returns the excluded pairs e.g. bonded atoms, with minimum-image displacements. """
+        i, j = self._excluded
+        d = geometry[i] - geometry[j]
+        if self.box is not None:
+            minimum_image(d, self.box, self.periodic)
+        return PairList(i, j, d, numpy.sqrt(numpy.einsum("ij,ij->i", d, d)))
+
+    def _moved(self, geometry: numpy.ndarray) -> bool:
+        """ Checks whether any atom moved by more than half the skin since the last pair search. """
+        if self._reference is None:
+            return True
+        disp = geometry - self._reference
+        return numpy.einsum("ij,ij->i", disp, disp).max() > (0.5 * self.skin) ** 2
+
+    # Evaluation
+    def compute(
+        self, geometry: numpy.ndarray
+    ) -> Tuple[float, numpy.ndarray, Dict[str, float]]:
+        """Returns the potential energy (kJ/mol), the forces (kJ/mol/angstrom) of shape (natoms, 3),
+        and the energy of every term.
+        Parameters
+        ----------
+        geometry: numpy.ndarray
+            Atomic positions in angstroms of shape (natoms, 3).
+        Returns
+        -------
+        Tuple[float, numpy.ndarray, Dict[str, float]]
+            Total energy, forces, and energy terms.
+        """
+        geometry = numpy.asarray(geometry, dtype=float).reshape(self.natoms, 3)
+        terms, forces = {}, numpy.zeros((self.natoms, 3))
+
+        if self.bonds:
+            terms["bonds"], f = self._bond_terms(geometry)
+            forces += f
+        if self.angles:
+            terms["angles"], f = self._angle_terms(geometry)
+            forces += f
+        if self.dihedrals:
+            terms["dihedrals"], f = self._dihedral_terms(geometry)
+            forces += f
+
+        if self.lj is not None or self.charges is not None:
+            pairs = self.pairs(geometry)
+            if self.lj is not None:
+                if self._lj_pairs is not None:
+                    c6, c12 = self._lj_pairs
+                else:
+                    c6, c12 = self.lj.lookup(pairs.i, pairs.j)
+                ir6 = 1.0 / pairs.r ** 6
+                terms["lj"] = float(((c12 * ir6 - c6) * ir6).sum())
+                dedr = (6.0 * c6 - 12.0 * c12 * ir6) * ir6 / pairs.r
+                forces += pair_forces(pairs, dedr, self.natoms)
+            if self.charges is not None:
+                method = self.electrostatics
+                rc = self.cutoff if self.cutoff is not None else numpy.inf
+                excluded = None
+                if method.lower() in ("ewald", "pme"):
+                    excluded = self.excluded_pairs(geometry)
+                terms["coulomb"], f = electrostatic_energy(
+                    self.charges,
+                    geometry,
+                    method,
+                    rc=rc,
+                    box=self.box,
+                    periodic=self.periodic,
+                    pairs=pairs,
+                    excluded=excluded,
+                    charge_groups=self.charge_groups,
+                    **self.kwargs,
+                )
+                forces += f
+
+        if self.solvent is not None:
+            _, f, solvation = self.solvent.compute(geometry)
+            terms.update(solvation)
+            forces += f
+
+        return sum(terms.values()), forces, terms
+
+    def energy(self, geometry: numpy.ndarray) -> float:
+        """ Returns the potential energy in kJ/mol. """
+        return self.compute(geometry)[0]
+
+    # Bonded terms
+    def _bond_terms(self, x: numpy.ndarray) -> Tuple[float, numpy.ndarray]:
+        energy, index, vectors = 0.0, [], []
+        for form, ij, spring, length in self.bonds:
+            d = x[ij[:, 0]] - x[ij[:, 1]]
+            r = numpy.sqrt(numpy.einsum("ij,ij->i", d, d))
+            if form == "Harmonic":
+                energy += 0.5 * numpy.dot(spring, (r - length) ** 2)
+                dedr = spring * (r - length)
+            elif form == "Gromos96":
+                energy += 0.25 * numpy.dot(spring, (r ** 2 - length ** 2) ** 2)
+                dedr = spring * (r ** 2 - length ** 2) * r
+            else:
+                raise NotImplementedError(f"Bond potential {form} is not supported.")
+            fvec = (dedr / r)[:, None] * d
+            index.extend((ij[:, 0], ij[:, 1]))
+            vectors.extend((-fvec, fvec))
+        return float(energy), accumulate(self.natoms, index, vectors)
+
+    def _angle_terms(self, x: numpy.ndarray) -> Tuple[float, numpy.ndarray]:
+        energy, index, vectors = 0.0, [], []
+        for ijk, spring, theta0 in self.angles:
+            u = x[ijk[:, 0]] - x[ijk[:, 1]]
+            v = x[ijk[:, 2]] - x[ijk[:, 1]]
+            uu = numpy.einsum("ij,ij->i", u, u)
+            vv = numpy.einsum("ij,ij->i", v, v)
+            ruv = numpy.sqrt(uu * vv)
+            cos = numpy.clip(numpy.einsum("ij,ij->i", u, v) / ruv, -1.0, 1.0)
+            theta = numpy.arccos(cos)
+            dtheta = theta - theta0
+            energy += 0.5 * numpy.dot(spring, dtheta ** 2)
+            # -dE/dcos = -dE/dtheta * dtheta/dcos
+            g = spring * dtheta / numpy.maximum(numpy.sin(theta), 1e-8)
+            gc = g * cos
+            g /= ruv
+            fi = g[:, None] * v - (gc / uu)[:, None] * u
+            fk = g[:, None] * u - (gc / vv)[:, None] * v
+            index.extend((ijk[:, 0], ijk[:, 2], ijk[:, 1]))
+            vectors.extend((fi, fk, -fi - fk))
+        return float(energy), accumulate(self.natoms, index, vectors)
+
+    def _dihedral_terms(self, x: numpy.ndarray) -> Tuple[float, numpy.ndarray]:
+        energy, index, vectors = 0.0, [], []
+        for ijkl, spring, phi0 in self.dihedrals:
+            i, j, k, l = ijkl.T
+            r_ij, r_kj, r_kl = x[i] - x[j], x[k] - x[j], x[k] - x[l]
+            m, n = _cross(r_ij, r_kj), _cross(r_kj, r_kl)
+            mm, nn = numpy.einsum("ij,ij->i", m, m), numpy.einsum("ij,ij->i", n, n)
+            kj2 = numpy.einsum("ij,ij->i", r_kj, r_kj)
+            kj = numpy.sqrt(kj2)
+            # Signed angle between the planes (i, j, k) and (j, k, l)
+            phi = numpy.arctan2(
+                kj * numpy.einsum("ij,ij->i", r_ij, n), numpy.einsum("ij,ij->i", m, n)
+            )
+            dphi = numpy.remainder(phi - phi0 + math.pi, 2.0 * math.pi) - math.pi
+            energy += 0.5 * numpy.dot(spring, dphi ** 2)
+            dedphi = spring * dphi
+
+            fi = (-dedphi * kj / mm)[:, None] * m
+            fl = (dedphi * kj / nn)[:, None] * n
+            p = numpy.einsum("ij,ij->i", r_ij, r_kj) / kj2
+            q = numpy.einsum("ij,ij->i", r_kl, r_kj) / kj2
+            s = p[:, None] * fi - q[:, None] * fl
+            index.extend((i, j, k, l))
+            vectors.extend((fi, s - fi, -fl - s, fl))
+        return float(energy), accumulate(self.natoms, index, vectors)
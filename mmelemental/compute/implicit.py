@@ -0,0 +1,291 @@
+""" Generalized Born implicit solvent with HCT and OBC effective Born radii """
+
+__all__ = ["GeneralizedBorn", "descreening"]
+
+from typing import Dict, Optional, Sequence, Tuple
+import math
+import numpy
+
+from mmelemental.models.solvent.implicit import Solvent
+from mmelemental.util.units import convert
+from .neighbors import PairList, neighbor_pairs, pair_forces
+from .electrostatics import COULOMB
+from .pbc import minimum_image
+
+# OBC rescaling coefficients (alpha, beta, gamma) of Onufriev, Bashford & Case 2004
+_obc = {"obc1": (0.8, 0.0, 2.909125), "obc2": (1.0, 0.8, 4.85)}
+
+# HCT Born radii are capped (angstroms) where the descreening exceeds the intrinsic radius
+_max_radius = 30.0
+
+
+def _to(value, units: Optional[str], target: str):
+    if units is None or units == target:
+        return value
+    return value * convert(1.0, units, target)
+
+
+def descreening(
+    r: numpy.ndarray, rho: numpy.ndarray, sr: numpy.ndarray
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Returns the HCT pairwise descreening integral of atoms of offset radius rho by atoms of
+    scaled radius sr at distance r, and its derivative with respect to r.
+    Parameters
+    ----------
+    r: numpy.ndarray
+        Pair distances in angstroms.
+    rho: numpy.ndarray
+        Offset intrinsic radii of the descreened atoms.
+    sr: numpy.ndarray
+        Scaled offset radii of the descreening atoms.
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Integrals (1/angstrom) and their derivatives with respect to r.
+    """
+    active = rho < r + sr
+    upper = r + sr
+    lower = numpy.maximum(rho, numpy.abs(r - sr))
+    u, l = 1.0 / upper, 1.0 / lower
+    log = numpy.log(lower / upper)
+    sr2_r = sr ** 2 / r
+    term = (
+        l
+        - u
+        + 0.25 * r * (u ** 2 - l ** 2)
+        + 0.5 * log / r
+        + 0.25 * sr2_r * (l ** 2 - u ** 2)
+    )
+    # The descreened atom lies entirely within the descreening sphere
+    inner = rho < sr - r
+    term += numpy.where(inner, 2.0 * (1.0 / rho - l), 0.0)
+
+    dl = numpy.where(rho >= numpy.abs(r - sr), 0.0, -(l ** 2) * numpy.sign(r - sr))
+    dterm = (
+        0.25 * (u ** 2 - l ** 2) * (1.0 + sr2_r / r)
+        - 0.5 * log / r ** 2
+        + (-1.0 + 0.5 * r * u + 0.5 / (r * u) - 0.5 * sr2_r * u) * -(u ** 2)
+        + (1.0 - 0.5 * r * l - 0.5 / (r * l) + 0.5 * sr2_r * l) * dl
+        - numpy.where(inner, 2.0 * dl, 0.0)
+    )
+    return numpy.where(active, term, 0.0), numpy.where(active, dterm, 0.0)
+
+
+class GeneralizedBorn:
+    """Evaluates the Generalized Born solvation energy and forces of a solute. Effective Born radii
+    follow the pairwise descreening of Hawkins, Cramer & Truhlar (hct) optionally rescaled as in
+    Onufriev, Bashford & Case (obc1, obc2). The nonpolar term uses the ACE surface area
+    approximation. All atom pairs interact, including bonded ones, unless a cutoff is set in which
+    case Born radii and pair energies are truncated at the cutoff.
+    Parameters
+    ----------
+    charges: numpy.ndarray, optional
+        Atomic charges in elementary charge units. Only the nonpolar term is computed if unset.
+    radii: numpy.ndarray
+        Intrinsic Born radii in angstroms.
+    screen: numpy.ndarray
+        Screening factors of the radii.
+    model: str, optional
+        One of hct, obc1, or obc2. Defaults to obc2.
+    offset: float, optional
+        Dielectric offset in angstroms. Defaults to 0.09.
+    solute_dielectric: float, optional
+        Defaults to 1.
+    solvent_dielectric: float, optional
+        Defaults to 78.5.
+    surface_tension: float, optional
+        ACE surface tension in kJ/mol/angstrom**2. Defaults to 0.0225936.
+    probe_radius: float, optional
+        Solvent probe radius in angstroms. Defaults to 1.4.
+    cutoff: float, optional
+        Cutoff in angstroms. All pairs interact if unset.
+    box: numpy.ndarray, optional
+        Orthorhombic box edge lengths in angstroms for periodic systems.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic dimensions. Defaults to all dimensions if ``box`` is set.
+    """
+
+    def __init__(
+        self,
+        charges: Optional[numpy.ndarray],
+        radii: numpy.ndarray,
+        screen: numpy.ndarray,
+        model: str = "obc2",
+        offset: float = 0.09,
+        solute_dielectric: float = 1.0,
+        solvent_dielectric: float = 78.5,
+        surface_tension: float = 0.0225936,
+        probe_radius: float = 1.4,
+        cutoff: Optional[float] = None,
+        box: Optional[numpy.ndarray] = None,
+        periodic: Optional[numpy.ndarray] = None,
+    ):
+        self.radii = numpy.asarray(radii, dtype=float)
+        self.natoms = len(self.radii)
+        self.charges = (
+            numpy.zeros(self.natoms)
+            if charges is None
+            else numpy.asarray(charges, dtype=float)
+        )
+        self.model = model.lower()
+        if self.model not in ("hct", "obc1", "obc2"):
+            raise ValueError(
+                f"Generalized Born model {model} not supported. Choose from: hct, obc1, obc2."
+            )
+        self.rho = self.radii - offset
+        self.scaled = numpy.asarray(screen, dtype=float) * self.rho
+        self.prefactor = -COULOMB * (1.0 / solute_dielectric - 1.0 / solvent_dielectric)
+        self.surface = (
+            4.0 * math.pi * surface_tension * (self.radii + probe_radius) ** 2
+            if surface_tension
+            else None
+        )
+        self.cutoff = cutoff
+        self.box = None if box is None else numpy.asarray(box, dtype=float)
+        if self.box is not None and periodic is None:
+            periodic = numpy.ones(len(self.box), dtype=bool)
+        self.periodic = periodic
+        self._pairs = None
+        if cutoff is None:
+            self._pairs = numpy.triu_indices(self.natoms, k=1)
+
+    @classmethod
+    def from_solvent(
+        cls,
+        solvent: Solvent,
+        symbols: Sequence[str],
+        charges: Optional[numpy.ndarray] = None,
+        connectivity=None,
+        **kwargs,
+    ) -> "GeneralizedBorn":
+        """Builds the evaluator of an implicit solvent model e.g. ``SimInput.solvent``.
+        Parameters
+        ----------
+        solvent: Solvent
+            Implicit solvent model.
+        symbols: Sequence[str]
+            Atomic elemental symbols e.g. ``Molecule.symbols``.
+        charges: numpy.ndarray, optional
+            Atomic charges in elementary charge units.
+        connectivity: List[Tuple[int, int, float]], optional
+            Bonds e.g. ``Molecule.connectivity``.
+        **kwargs
+            Additional keyword arguments passed to the constructor e.g. cutoff, box.
+        Returns
+        -------
+        GeneralizedBorn
+        """
+        radii, screen = solvent.parameters(symbols, connectivity)
+        units = solvent.radii_units
+        return cls(
+            charges,
+            _to(radii, units, "angstrom"),
+            screen,
+            model=solvent.model or "obc2",
+            offset=_to(solvent.offset, units, "angstrom"),
+            solute_dielectric=solvent.solute_dielectric,
+            solvent_dielectric=solvent.solvent_dielectric,
+            surface_tension=_to(
+                solvent.surface_tension or 0.0,
+                solvent.surface_tension_units,
+                "kJ/(mol*angstrom**2)",
+            ),
+            probe_radius=_to(solvent.probe_radius, units, "angstrom"),
+            **kwargs,
+        )
+
+    def pairs(self, geometry: numpy.ndarray) -> PairList:
+        """ Returns all the atom pairs (within the cutoff if set), bonded pairs included. """
+        if self._pairs is None:
+            return neighbor_pairs(geometry, self.cutoff, self.box, self.periodic)
+        i, j = self._pairs
+        d = geometry[i] - geometry[j]
+        if self.box is not None:
+            minimum_image(d, self.box, self.periodic)
+        return PairList(i, j, d, numpy.sqrt(numpy.einsum("ij,ij->i", d, d)))
+
+    def _born_radii(
+        self, pairs: PairList
+    ) -> Tuple[numpy.ndarray, numpy.ndarray, Tuple[numpy.ndarray, numpy.ndarray]]:
+        """ Returns the Born radii, their derivatives dR/dS, and the pair descreening derivatives. """
+        i, j, r = pairs.i, pairs.j, pairs.r
+        term_ij, dterm_ij = descreening(r, self.rho[i], self.scaled[j])
+        term_ji, dterm_ji = descreening(r, self.rho[j], self.scaled[i])
+        total = numpy.bincount(i, term_ij, minlength=self.natoms) + numpy.bincount(
+            j, term_ji, minlength=self.natoms
+        )
+
+        if self.model == "hct":
+            inverse = 1.0 / self.rho - 0.5 * total
+            capped = inverse < 1.0 / _max_radius
+            radii = 1.0 / numpy.maximum(inverse, 1.0 / _max_radius)
+            dradii = numpy.where(capped, 0.0, 0.5 * radii ** 2)
+        else:
+            alpha, beta, gamma = _obc[self.model]
+            psi = 0.5 * total * self.rho
+            tanh = numpy.tanh(alpha * psi - beta * psi ** 2 + gamma * psi ** 3)
+            radii = 1.0 / (1.0 / self.rho - tanh / self.radii)
+            dradii = (
+                radii ** 2
+                * (1.0 - tanh ** 2)
+                * (alpha - 2.0 * beta * psi + 3.0 * gamma * psi ** 2)
+                * 0.5
+                * self.rho
+                / self.radii
+            )
+        return radii, dradii, (dterm_ij, dterm_ji)
+
+    def born_radii(self, geometry: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the effective Born radii in angstroms of shape (natoms,). """
+        geometry = numpy.asarray(geometry, dtype=float).reshape(self.natoms, 3)
+        return self._born_radii(self.pairs(geometry))[0]
+
+    def compute(
+        self, geometry: numpy.ndarray
+    ) -> Tuple[float, numpy.ndarray, Dict[str, float]]:
+        """Returns the solvation energy (kJ/mol), the forces (kJ/mol/angstrom) of shape (natoms, 3),
+        and the polar (gb) and nonpolar (sa) energy terms.
+        Parameters
+        ----------
+        geometry: numpy.ndarray
+            Atomic positions in angstroms of shape (natoms, 3).
+        Returns
+        -------
+        Tuple[float, numpy.ndarray, Dict[str, float]]
+            Total energy, forces, and energy terms.
+        """
+        geometry = numpy.asarray(geometry, dtype=float).reshape(self.natoms, 3)
+        pairs = self.pairs(geometry)
+        i, j, r = pairs.i, pairs.j, pairs.r
+        radii, dradii, (dterm_ij, dterm_ji) = self._born_radii(pairs)
+        q, pref = self.charges, self.prefactor
+
+        # Polar energy: self terms and every pair once
+        terms = {"gb": 0.5 * pref * float(numpy.dot(q ** 2, 1.0 / radii))}
+        dedb = -0.5 * pref * q ** 2 / radii ** 2
+
+        rr = radii[i] * radii[j]
+        r2 = r ** 2
+        damp = numpy.exp(-r2 / (4.0 * rr))
+        f = numpy.sqrt(r2 + rr * damp)
+        qq = pref * q[i] * q[j]
+        terms["gb"] += float((qq / f).sum())
+        dedr = -qq * r * (1.0 - 0.25 * damp) / f ** 3
+        dedrr = -qq * damp * (1.0 + r2 / (4.0 * rr)) / (2.0 * f ** 3)
+        dedb += numpy.bincount(i, dedrr * radii[j], minlength=self.natoms)
+        dedb += numpy.bincount(j, dedrr * radii[i], minlength=self.natoms)
+
+        # Nonpolar ACE energy
+        if self.surface is not None:
+            sa = self.surface * (self.radii / radii) ** 6
+            terms["sa"] = float(sa.sum())
+            dedb -= 6.0 * sa / radii
+
+        # Chain rule through the Born radii: dE/dS_i = dE/dR_i * dR_i/dS_i
+        chain = dedb * dradii
+        dedr += chain[i] * dterm_ij + chain[j] * dterm_ji
+        return sum(terms.values()), pair_forces(pairs, dedr, self.natoms), terms
+
+    def energy(self, geometry: numpy.ndarray) -> float:
+        """ Returns the solvation energy in kJ/mol. """
+        return self.compute(geometry)[0]
@@ -0,0 +1,323 @@
+""" Incremental energy evaluation for local (Monte Carlo, docking) moves """
+
+__all__ = ["Move", "IncrementalEnergy"]
+
+from itertools import product
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+import math
+import numpy
+
+from .energy import ForceFieldEnergy
+from .batch import bonded_terms, term_energies
+from .neighbors import PairList, _ranges
+from .electrostatics import cutoff as coulomb_cutoff, reaction_field
+from .pbc import minimum_image
+
+
+class Move(NamedTuple):
+    """ New positions (angstroms) of a subset of atoms. """
+
+    atoms: numpy.ndarray
+    positions: numpy.ndarray
+
+    @classmethod
+    def translate(
+        cls, geometry: numpy.ndarray, atoms: Sequence[int], vector: numpy.ndarray
+    ) -> "Move":
+        """ Rigid translation of the atoms by vector. """
+        atoms = numpy.asarray(atoms, dtype=numpy.int64)
+        return cls(atoms, geometry[atoms] + vector)
+
+    @classmethod
+    def rotate(
+        cls,
+        geometry: numpy.ndarray,
+        atoms: Sequence[int],
+        axis: numpy.ndarray,
+        angle: float,
+        center: Optional[numpy.ndarray] = None,
+    ) -> "Move":
+        """ Rigid rotation of the atoms by angle (radians) around axis through center (their centroid by default). """
+        atoms = numpy.asarray(atoms, dtype=numpy.int64)
+        x = geometry[atoms]
+        center = x.mean(0) if center is None else numpy.asarray(center, dtype=float)
+        k = numpy.asarray(axis, dtype=float) / numpy.linalg.norm(axis)
+        cross = numpy.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+        rot = (
+            numpy.eye(3)
+            + math.sin(angle) * cross
+            + (1.0 - math.cos(angle)) * cross @ cross
+        )
+        return cls(atoms, (x - center) @ rot.T + center)
+
+
+def _incidence(
+    index: numpy.ndarray, natoms: int
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """ CSR map from every atom to the terms (rows of index) it belongs to. """
+    terms = numpy.repeat(numpy.arange(len(index)), index.shape[1])
+    atoms = index.ravel()
+    order = numpy.argsort(atoms, kind="stable")
+    start = numpy.searchsorted(atoms[order], numpy.arange(natoms + 1))
+    return start, terms[order]
+
+
+def _terms_of(csr: Tuple[numpy.ndarray, numpy.ndarray], atoms: numpy.ndarray):
+    start, terms = csr
+    counts = start[atoms + 1] - start[atoms]
+    return numpy.unique(terms[_ranges(start[atoms], counts)])
+
+
+class IncrementalEnergy:
+    """Tracks the energy of a molecule under local moves. Energies of every bonded term are cached
+    and only the terms and non-bonded pairs involving the moved atoms are recomputed, so the cost of
+    a move scales with the size of the moved fragment. Non-bonded neighbors are found with a cell
+    list that is only rebuilt once enough atoms moved. Moves are evaluated with ``propose`` and then
+    committed with ``accept`` or discarded with ``reject``.
+    Parameters
+    ----------
+    model: ForceFieldEnergy
+        Energy model of the molecule. Electrostatics must be pairwise (cutoff or reaction-field)
+        without charge groups. Without a cutoff, every moved atom interacts with all the others.
+    geometry: numpy.ndarray
+        Initial positions in angstroms of shape (natoms, 3).
+    rebuild: int, optional
+        Number of moved atoms after which the cell list is rebuilt. Defaults to max(64, natoms / 100).
+    """
+
+    def __init__(
+        self,
+        model: ForceFieldEnergy,
+        geometry: numpy.ndarray,
+        rebuild: Optional[int] = None,
+    ):
+        if model.charges is not None and (
+            model.electrostatics not in ("cutoff", "reaction-field")
+            or model.charge_groups is not None
+        ):
+            raise NotImplementedError(
+                "Incremental energies require pairwise electrostatics (cutoff or reaction-field) "
+                "without charge groups."
+            )
+        if model.solvent is not None:
+            raise NotImplementedError(
+                "Incremental energies do not support implicit solvent (Born radii are non-local)."
+            )
+        self.model = model
+        self.natoms = model.natoms
+        self.geometry = numpy.array(geometry, dtype=float).reshape(self.natoms, 3)
+        self.rebuild = rebuild or max(64, self.natoms // 100)
+        self.cutoff = model.cutoff if model.cutoff is not None else numpy.inf
+        self.refresh()
+
+    # Setup
+    def _setup_bonded(self) -> None:
+        """ Flattens the bonded terms and caches their energies. """
+        x = self.geometry
+        self._bonded, self._params, self._incidence = {}, {}, {}
+        for name, (index, params) in bonded_terms(self.model).items():
+            self._params[name] = params
+            self._bonded[name] = (term_energies(name, x, index, params), index)
+            self._incidence[name] = _incidence(index, self.natoms)
+
+    def _build_cells(self) -> None:
+        """ Bins the atoms into cells of at least the cutoff size (sorted, CSR layout). """
+        x, model = self.geometry, self.model
+        self._moved = numpy.zeros(self.natoms, dtype=bool)
+        self._moved_list = []
+        if not numpy.isfinite(self.cutoff):
+            return
+
+        box = model.box
+        periodic = model.periodic if box is not None else numpy.zeros(3, dtype=bool)
+        self._lo = x.min(0)
+        ncells = numpy.ones(3, dtype=numpy.int64)
+        size = numpy.ones(3)
+        for dim in range(3):
+            if periodic[dim]:
+                n = int(box[dim] // self.cutoff)
+                # Periodic dimensions with fewer than 3 cells are not binned
+                if n >= 3:
+                    ncells[dim], size[dim] = n, box[dim] / n
+                self._lo[dim] = 0.0
+            else:
+                extent = x[:, dim].max() - self._lo[dim]
+                ncells[dim] = max(int(extent // self.cutoff), 1)
+                size[dim] = max(extent / ncells[dim], self.cutoff)
+        self._ncells, self._size, self._periodic = ncells, size, periodic
+        self._strides = numpy.array([ncells[1] * ncells[2], ncells[2], 1])
+        self._offsets = numpy.array(
+            list(product(*[(-1, 0, 1) if n > 1 else (0,) for n in ncells]))
+        )
+
+        cell = self._cell_coords(x) @ self._strides
+        self._order = numpy.argsort(cell, kind="stable")
+        self._start = numpy.searchsorted(
+            cell[self._order], numpy.arange(ncells.prod() + 1)
+        )
+
+    def _cell_coords(self, x: numpy.ndarray) -> numpy.ndarray:
+        coords = numpy.floor((x - self._lo) / self._size).astype(numpy.int64)
+        for dim in range(3):
+            if self._periodic[dim]:
+                coords[:, dim] %= self._ncells[dim]
+        # Atoms outside the initial bounds are clamped to the edge cells
+        return numpy.clip(coords, 0, self._ncells - 1)
+
+    # Energies
+    def _term_energies(
+        self, name: str, x: numpy.ndarray, terms: numpy.ndarray
+    ) -> numpy.ndarray:
+        index = self._bonded[name][1][terms]
+        params = tuple(val[terms] for val in self._params[name])
+        return term_energies(name, x, index, params)
+
+    def _pair_energies(self, pairs: PairList) -> Dict[str, float]:
+        model, terms = self.model, {}
+        if model.lj is not None:
+            c6, c12 = model.lj.lookup(pairs.i, pairs.j)
+            ir6 = 1.0 / pairs.r ** 6
+            terms["lj"] = float(((c12 * ir6 - c6) * ir6).sum())
+        if model.charges is not None:
+            func = (
+                coulomb_cutoff if model.electrostatics == "cutoff" else reaction_field
+            )
+            energy, _ = func(model.charges, pairs, self.cutoff, **model.kwargs)
+            terms["coulomb"] = float(energy.sum())
+        return terms
+
+    def _fragment_pairs(self, atoms: numpy.ndarray, x: numpy.ndarray) -> PairList:
+        """Returns the non-excluded pairs within the cutoff that involve the fragment atoms, each
+        pair once, with positions x."""
+        inside = numpy.zeros(self.natoms, dtype=bool)
+        inside[atoms] = True
+
+        # Pairs within the fragment
+        a, b = numpy.triu_indices(len(atoms), k=1)
+        i, j = [atoms[a]], [atoms[b]]
+
+        # Pairs with the rest of the system
+        if not numpy.isfinite(self.cutoff):
+            others = numpy.flatnonzero(~inside)
+            i.append(numpy.repeat(atoms, len(others)))
+            j.append(numpy.tile(others, len(atoms)))
+        else:
+            coords = self._cell_coords(x[atoms])
+            near = coords[:, None, :] + self._offsets
+            for dim in range(3):
+                if self._periodic[dim]:
+                    near[..., dim] %= self._ncells[dim]
+            valid = ((near >= 0) & (near < self._ncells)).all(-1)
+            cells = numpy.where(valid, near @ self._strides, 0)
+            counts = numpy.where(
+                valid, self._start[cells + 1] - self._start[cells], 0
+            ).ravel()
+            owner = numpy.repeat(numpy.repeat(atoms, len(self._offsets)), counts)
+            found = self._order[_ranges(self._start[cells].ravel(), counts)]
+            # Moved atoms are stale in the cell list and checked directly instead
+            keep = ~inside[found] & ~self._moved[found]
+            i.append(owner[keep])
+            j.append(found[keep])
+            if self._moved_list:
+                moved = numpy.array(self._moved_list)
+                moved = moved[~inside[moved]]
+                i.append(numpy.repeat(atoms, len(moved)))
+                j.append(numpy.tile(moved, len(atoms)))
+
+        i, j = numpy.concatenate(i), numpy.concatenate(j)
+        lo, hi = numpy.minimum(i, j), numpy.maximum(i, j)
+        if len(self.model.exclusions):
+            keep = ~numpy.isin(lo * self.natoms + hi, self.model.exclusions)
+            lo, hi = lo[keep], hi[keep]
+        d = x[lo] - x[hi]
+        if self.model.box is not None:
+            minimum_image(d, self.model.box, self.model.periodic)
+        r = numpy.sqrt(numpy.einsum("ij,ij->i", d, d))
+        keep = r < self.cutoff
+        return PairList(lo[keep], hi[keep], d[keep], r[keep])
+
+    def _local_terms(self, atoms: numpy.ndarray) -> Dict[str, Tuple]:
+        """ Energies of the bonded terms and non-bonded pairs that involve the atoms at the current positions. """
+        local = {}
+        for name in self._bonded:
+            terms = _terms_of(self._incidence[name], atoms)
+            local[name] = (terms, self._term_energies(name, self.geometry, terms))
+        for name, energy in self._pair_energies(
+            self._fragment_pairs(atoms, self.geometry)
+        ).items():
+            local[name] = (None, energy)
+        return local
+
+    # Moves
+    def propose(self, move: Move) -> float:
+        """Evaluates a move without applying it and returns the energy change (kJ/mol).
+        Parameters
+        ----------
+        move: Move
+            Moved atoms and their new positions, e.g. from ``Move.translate`` or ``Move.rotate``.
+        Returns
+        -------
+        float
+            Energy of the moved state minus the current energy.
+        """
+        atoms, unique = numpy.unique(
+            numpy.asarray(move.atoms, dtype=numpy.int64), return_index=True
+        )
+        positions = numpy.asarray(move.positions, dtype=float).reshape(-1, 3)[unique]
+
+        old = self._local_terms(atoms)
+        saved = self.geometry[atoms].copy()
+        self.geometry[atoms] = positions
+        try:
+            new = self._local_terms(atoms)
+        finally:
+            self.geometry[atoms] = saved
+
+        delta = {}
+        for name, (terms, energies) in new.items():
+            delta[name] = float(numpy.sum(energies) - numpy.sum(old[name][1]))
+        self._pending = (atoms, positions, new, delta)
+        return sum(delta.values())
+
+    def accept(self) -> float:
+        """ Applies the last proposed move and returns the new energy. """
+        if self._pending is None:
+            raise ValueError("No move to accept: call propose first.")
+        atoms, positions, new, delta = self._pending
+        self.geometry[atoms] = positions
+        for name, (terms, energies) in new.items():
+            if terms is not None:
+                self._bonded[name][0][terms] = energies
+            self.terms[name] += delta[name]
+        self.energy = sum(self.terms.values())
+
+        fresh = atoms[~self._moved[atoms]]
+        self._moved[fresh] = True
+        self._moved_list.extend(fresh.tolist())
+        if len(self._moved_list) > self.rebuild:
+            self._build_cells()
+        self._pending = None
+        return self.energy
+
+    def reject(self) -> float:
+        """ Discards the last proposed move and returns the (unchanged) energy. """
+        self._pending = None
+        return self.energy
+
+    def refresh(self) -> float:
+        """ Recomputes all the cached energies from scratch, which removes accumulated round-off, and returns the energy. """
+        self._setup_bonded()
+        self._build_cells()
+        self._pending = None
+
+        self.terms = {
+            name: float(energies.sum()) for name, (energies, _) in self._bonded.items()
+        }
+        self.terms.update(self._pair_energies(self.model.pairs(self.geometry)))
+        self.energy = sum(self.terms.values())
+        return self.energy
+
+    @property
+    def term_energies(self) -> Dict[str, numpy.ndarray]:
+        """ Cached energy of every bonded term. """
+        return {name: energies for name, (energies, _) in self._bonded.items()}
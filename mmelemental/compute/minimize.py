@@ -0,0 +1,197 @@
+""" Energy minimization with L-BFGS and FIRE """
+
+__all__ = ["MinimizeResult", "lbfgs", "fire", "minimize"]
+
+from typing import Callable, List, NamedTuple, Optional, Tuple
+import numpy
+
+# Signature of the functions to minimize: positions -> (energy, forces)
+EnergyFunc = Callable[[numpy.ndarray], Tuple[float, numpy.ndarray]]
+
+
+class MinimizeResult(NamedTuple):
+    """ Final positions, energy history, and convergence status of a minimization. """
+
+    x: numpy.ndarray
+    energies: List[float]
+    max_forces: List[float]
+    converged: bool
+
+    @property
+    def energy(self) -> float:
+        return self.energies[-1]
+
+    @property
+    def nsteps(self) -> int:
+        return len(self.energies) - 1
+
+
+def _max_force(forces: numpy.ndarray) -> float:
+    return float(numpy.sqrt(numpy.einsum("ij,ij->i", forces, forces).max()))
+
+
+def lbfgs(
+    func: EnergyFunc,
+    x0: numpy.ndarray,
+    nsteps: int = 1000,
+    tol: float = 1.0,
+    max_step: float = 0.2,
+    memory: int = 10,
+) -> MinimizeResult:
+    """Limited-memory BFGS with a backtracking (Armijo) line search.
+    Parameters
+    ----------
+    func: Callable
+        Function of the positions of shape (natoms, 3) returning the energy and forces.
+    x0: numpy.ndarray
+        Initial positions of shape (natoms, 3).
+    nsteps: int, optional
+        Maximum number of iterations. Defaults to 1000.
+    tol: float, optional
+        Convergence threshold on the largest atomic force norm. Defaults to 1 (kJ/mol/angstrom).
+    max_step: float, optional
+        Largest displacement of any atom per iteration. Defaults to 0.2 (angstrom).
+    memory: int, optional
+        Number of correction pairs kept for the inverse Hessian estimate. Defaults to 10.
+    Returns
+    -------
+    MinimizeResult
+        Final positions, energy and max force histories, and convergence flag.
+    """
+    x = numpy.array(x0, dtype=float)
+    energy, forces = func(x)
+    energies, max_forces = [energy], [_max_force(forces)]
+    s_hist, y_hist, rho_hist = [], [], []
+
+    for _ in range(nsteps):
+        if max_forces[-1] < tol:
+            break
+
+        # Two-loop recursion for the search direction
+        q = -forces.ravel()
+        alphas = []
+        for s, y, rho in reversed(list(zip(s_hist, y_hist, rho_hist))):
+            a = rho * numpy.dot(s, q)
+            q -= a * y
+            alphas.append(a)
+        if s_hist:
+            q *= numpy.dot(s_hist[-1], y_hist[-1]) / numpy.dot(y_hist[-1], y_hist[-1])
+        for (s, y, rho), a in zip(zip(s_hist, y_hist, rho_hist), reversed(alphas)):
+            q += (a - rho * numpy.dot(y, q)) * s
+        direction = -q.reshape(x.shape)
+
+        slope = -numpy.vdot(forces, direction)
+        if slope >= 0:
+            # Not a descent direction: restart from steepest descent
+            s_hist, y_hist, rho_hist = [], [], []
+            direction, slope = forces.copy(), -numpy.vdot(forces, forces)
+
+        step = min(1.0, max_step / max(_max_force(direction), 1e-12))
+        while True:
+            x_new = x + step * direction
+            energy_new, forces_new = func(x_new)
+            if energy_new <= energy + 1e-4 * step * slope or step < 1e-10:
+                break
+            step *= 0.5
+
+        s = (x_new - x).ravel()
+        y = (forces - forces_new).ravel()
+        sy = numpy.dot(s, y)
+        if sy > 1e-12:
+            s_hist.append(s)
+            y_hist.append(y)
+            rho_hist.append(1.0 / sy)
+            if len(s_hist) > memory:
+                s_hist.pop(0), y_hist.pop(0), rho_hist.pop(0)
+
+        x, energy, forces = x_new, energy_new, forces_new
+        energies.append(energy)
+        max_forces.append(_max_force(forces))
+
+    return MinimizeResult(x, energies, max_forces, max_forces[-1] < tol)
+
+
+def fire(
+    func: EnergyFunc,
+    x0: numpy.ndarray,
+    nsteps: int = 1000,
+    tol: float = 1.0,
+    dt: float = 0.01,
+    max_step: float = 0.2,
+    masses: Optional[numpy.ndarray] = None,
+) -> MinimizeResult:
+    """Fast inertial relaxation engine (Bitzek et al. 2006).
+    Parameters
+    ----------
+    func: Callable
+        Function of the positions of shape (natoms, 3) returning the energy and forces.
+    x0: numpy.ndarray
+        Initial positions of shape (natoms, 3).
+    nsteps: int, optional
+        Maximum number of iterations. Defaults to 1000.
+    tol: float, optional
+        Convergence threshold on the largest atomic force norm. Defaults to 1 (kJ/mol/angstrom).
+    dt: float, optional
+        Initial fictitious time step. Grows up to 10 * dt while the system moves downhill.
+    max_step: float, optional
+        Largest displacement of any atom per iteration. Defaults to 0.2 (angstrom).
+    masses: numpy.ndarray, optional
+        Fictitious atomic masses. Defaults to 1 for every atom.
+    Returns
+    -------
+    MinimizeResult
+        Final positions, energy and max force histories, and convergence flag.
+    """
+    n_min, f_inc, f_dec, alpha0, f_alpha = 5, 1.1, 0.5, 0.1, 0.99
+    dt_max = 10.0 * dt
+
+    x = numpy.array(x0, dtype=float)
+    inv_mass = 1.0 if masses is None else 1.0 / numpy.asarray(masses)[:, None]
+    energy, forces = func(x)
+    energies, max_forces = [energy], [_max_force(forces)]
+    v = numpy.zeros_like(x)
+    alpha, uphill = alpha0, 0
+
+    for _ in range(nsteps):
+        if max_forces[-1] < tol:
+            break
+
+        power = numpy.vdot(forces, v)
+        if power > 0:
+            fnorm = numpy.linalg.norm(forces)
+            v = (1.0 - alpha) * v + alpha * numpy.linalg.norm(v) * forces / fnorm
+            uphill += 1
+            if uphill > n_min:
+                dt, alpha = min(dt * f_inc, dt_max), alpha * f_alpha
+        else:
+            v[:] = 0.0
+            dt, alpha, uphill = dt * f_dec, alpha0, 0
+
+        # Semi-implicit Euler step with a bounded displacement
+        v += dt * forces * inv_mass
+        dx = dt * v
+        largest = _max_force(dx)
+        if largest > max_step:
+            dx *= max_step / largest
+        x = x + dx
+        energy, forces = func(x)
+        energies.append(energy)
+        max_forces.append(_max_force(forces))
+
+    return MinimizeResult(x, energies, max_forces, max_forces[-1] < tol)
+
+
+_methods = {"lbfgs": lbfgs, "l-bfgs": lbfgs, "fire": fire}
+
+
+def minimize(
+    func: EnergyFunc, x0: numpy.ndarray, method: str = "lbfgs", **kwargs
+) -> MinimizeResult:
+    """ Minimizes ``func`` from ``x0`` with one of lbfgs or fire. See ``lbfgs`` and ``fire`` for the keyword arguments. """
+    try:
+        minimizer = _methods[method.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Minimization method {method} not supported. Choose from: lbfgs, fire."
+        )
+    return minimizer(func, x0, **kwargs)
@@ -0,0 +1,203 @@
+""" Lennard-Jones combination (mixing) rules and precomputed type-pair tables """
+
+__all__ = ["MixingTable", "combine", "mixing_table"]
+
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+import hashlib
+import numpy
+
+from mmelemental.models.forcefield import ForceField, CompressedForceField, ParamTable
+from mmelemental.util.cache import LRUCache
+from mmelemental.util.units import convert
+
+
+def _lorentz_berthelot(eps_i, sig_i, eps_j, sig_j):
+    return numpy.sqrt(eps_i * eps_j), 0.5 * (sig_i + sig_j)
+
+
+def _geometric(eps_i, sig_i, eps_j, sig_j):
+    return numpy.sqrt(eps_i * eps_j), numpy.sqrt(sig_i * sig_j)
+
+
+def _waldman_hagler(eps_i, sig_i, eps_j, sig_j):
+    sig6_i, sig6_j = sig_i ** 6, sig_j ** 6
+    sig6 = 0.5 * (sig6_i + sig6_j)
+    eps = numpy.sqrt(eps_i * eps_j) * numpy.sqrt(sig6_i * sig6_j) / sig6
+    return eps, sig6 ** (1.0 / 6.0)
+
+
+_rules = {
+    "lorentz-berthelot": _lorentz_berthelot,
+    "geometric": _geometric,
+    "waldman-hagler": _waldman_hagler,
+}
+
+# Tables are stored per (force field, combination rule, overrides)
+_tables = LRUCache(maxsize=16)
+
+
+def combine(
+    eps_i: numpy.ndarray,
+    sig_i: numpy.ndarray,
+    eps_j: numpy.ndarray,
+    sig_j: numpy.ndarray,
+    rule: Union[str, Callable] = "lorentz-berthelot",
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Combines the epsilon and sigma parameters of particles i and j.
+    Parameters
+    ----------
+    eps_i, sig_i, eps_j, sig_j: numpy.ndarray
+        Broadcastable Lennard-Jones parameters of particles i and j.
+    rule: str or Callable, optional
+        One of lorentz-berthelot, geometric, waldman-hagler, or a function with the same
+        signature as this one returning (epsilon, sigma). Defaults to lorentz-berthelot.
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Combined epsilon and sigma.
+    """
+    if callable(rule):
+        return rule(eps_i, sig_i, eps_j, sig_j)
+    try:
+        return _rules[rule.lower()](eps_i, sig_i, eps_j, sig_j)
+    except KeyError:
+        raise ValueError(
+            f"Combination rule {rule} not supported. Choose from: {list(_rules)}."
+        )
+
+
+class MixingTable:
+    """Precomputed (ntypes, ntypes) Lennard-Jones tables in kJ/mol and angstroms. Atoms are mapped
+    to table rows with ``type_index`` so pair coefficients are looked up with fancy indexing."""
+
+    def __init__(
+        self,
+        epsilon: numpy.ndarray,
+        sigma: numpy.ndarray,
+        type_index: numpy.ndarray,
+        labels: Optional[Sequence[str]] = None,
+    ):
+        self.epsilon = epsilon
+        self.sigma = sigma
+        self.type_index = type_index
+        self.labels = labels
+        sig6 = sigma ** 6
+        self.c6 = 4.0 * epsilon * sig6
+        self.c12 = self.c6 * sig6
+
+    @property
+    def ntypes(self) -> int:
+        return len(self.epsilon)
+
+    def lookup(
+        self, i: numpy.ndarray, j: numpy.ndarray
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """ Returns the C6 and C12 coefficients of every (i[k], j[k]) atom pair. """
+        ti, tj = self.type_index[i], self.type_index[j]
+        return self.c6[ti, tj], self.c12[ti, tj]
+
+    def lookup_params(
+        self, i: numpy.ndarray, j: numpy.ndarray
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """ Returns the epsilon and sigma of every (i[k], j[k]) atom pair. """
+        ti, tj = self.type_index[i], self.type_index[j]
+        return self.epsilon[ti, tj], self.sigma[ti, tj]
+
+    def energy(
+        self, i: numpy.ndarray, j: numpy.ndarray, r2: numpy.ndarray
+    ) -> numpy.ndarray:
+        """ Returns the Lennard-Jones energy of every atom pair given their squared distances. """
+        c6, c12 = self.lookup(i, j)
+        ir6 = 1.0 / r2 ** 3
+        return (c12 * ir6 - c6) * ir6
+
+
+def _lj_table(ff: Union[ForceField, CompressedForceField]) -> Any:
+    """ Returns the non-bonded parameters of a force field tabulated on its atom types. """
+    if isinstance(ff, CompressedForceField):
+        return ff.nonbonded
+    # Only the non-bonded parameters are tabulated, not the whole force field
+    params = getattr(ff.nonbonded, "params", None)
+    if params is None or isinstance(params, list):
+        return None
+    return ParamTable.from_params(params, ff.types)
+
+
+def _table_key(lj: ParamTable) -> str:
+    """ Digest of a parameter table, the same for a force field and its compressed form. """
+    m = hashlib.sha1(lj.values.tobytes())
+    m.update(lj.index.tobytes())
+    for items in (lj.columns, lj.labels or [], sorted((lj.units or {}).items())):
+        m.update(repr(items).encode("utf-8"))
+    return m.hexdigest()
+
+
+def mixing_table(
+    ff: Union[ForceField, CompressedForceField],
+    rule: Union[str, Callable] = "lorentz-berthelot",
+    overrides: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None,
+) -> MixingTable:
+    """Builds (or returns the cached) Lennard-Jones type-pair table of a force field.
+    Parameters
+    ----------
+    ff: ForceField or CompressedForceField
+        Force field with :class:``LennardJones`` non-bonded parameters. Rows are keyed on
+        ``ForceField.types`` if available.
+    rule: str or Callable, optional
+        Combination rule. See ``combine``. Defaults to lorentz-berthelot.
+    overrides: Dict[Tuple[str, str], Tuple[float, float]], optional
+        Explicit (epsilon, sigma) for specific pairs of atom types (NBFIX-style) in the units of
+        the force field parameters. E.g. overrides={('OW', 'NA'): (0.5, 2.8)}.
+    Returns
+    -------
+    MixingTable
+        Pair tables for all the atom types in the force field.
+    """
+    lj = _lj_table(ff)
+    if getattr(lj, "form", None) != "LennardJones":
+        raise NotImplementedError(
+            "Mixing tables are only supported for a single set of LennardJones parameters."
+        )
+
+    key = (
+        _table_key(lj),
+        rule if callable(rule) else rule.lower(),
+        tuple(sorted((overrides or {}).items())),
+    )
+    table = _tables.get(key)
+    if table is not None:
+        return table
+
+    units = lj.units or {}
+    eps = lj.values[:, lj.columns.index("epsilon")]
+    sig = lj.values[:, lj.columns.index("sigma")]
+    eps_ij, sig_ij = combine(
+        eps[:, None], sig[:, None], eps[None, :], sig[None, :], rule
+    )
+    eps_ij, sig_ij = numpy.array(eps_ij), numpy.array(sig_ij)
+
+    if overrides:
+        if lj.labels is None:
+            raise ValueError("Pair overrides require the force field atom types.")
+        labels = numpy.asarray(lj.labels)
+        for (type_i, type_j), (eps_o, sig_o) in overrides.items():
+            rows_i = numpy.flatnonzero(labels == type_i)
+            rows_j = numpy.flatnonzero(labels == type_j)
+            if not len(rows_i) or not len(rows_j):
+                raise KeyError(f"Atom type pair {(type_i, type_j)} not found.")
+            for rows_a, rows_b in ((rows_i, rows_j), (rows_j, rows_i)):
+                eps_ij[numpy.ix_(rows_a, rows_b)] = eps_o
+                sig_ij[numpy.ix_(rows_a, rows_b)] = sig_o
+
+    eps_units = units.get("epsilon", "kJ/mol")
+    sig_units = units.get("sigma", "angstrom")
+    if eps_units != "kJ/mol":
+        eps_ij = convert(eps_ij, eps_units, "kJ/mol")
+    if sig_units not in ("angstrom", "angstroms"):
+        sig_ij = convert(sig_ij, sig_units, "angstrom")
+
+    table = MixingTable(
+        epsilon=eps_ij, sigma=sig_ij, type_index=lj.index, labels=lj.labels
+    )
+    _tables.put(key, table, nbytes=4 * eps_ij.nbytes)
+    return table
@@ -0,0 +1,234 @@
+""" Cell-list neighbor search and pair accumulation helpers """
+
+__all__ = [
+    "PairList",
+    "neighbor_pairs",
+    "exclusion_pairs",
+    "exclusion_depth",
+    "pair_forces",
+]
+
+from itertools import product
+from typing import List, NamedTuple, Optional, Tuple
+import numpy
+
+
+class PairList(NamedTuple):
+    """ Unique (i < j) atom pairs with displacements d = x[i] - x[j] (minimum image) and distances r. """
+
+    i: numpy.ndarray
+    j: numpy.ndarray
+    d: numpy.ndarray
+    r: numpy.ndarray
+
+
+def exclusion_depth(exclusions: Optional[str]) -> int:
+    """Returns the number of bonds separating excluded atom pairs from ``ForceField.exclusions``
+    e.g. 1-3 -> 2. None excludes nothing, and scaled1-4 excludes up to 1-3 pairs."""
+    if exclusions is None or str(exclusions).lower() == "none":
+        return 0
+    rule = exclusions.lower().replace("scaled", "")
+    try:
+        first, last = (int(val) for val in rule.split("-"))
+    except ValueError:
+        raise ValueError(f"Exclusion rule {exclusions} not supported.")
+    depth = last - first
+    return depth - 1 if exclusions.lower().startswith("scaled") else depth
+
+
+def exclusion_pairs(
+    connectivity: Optional[List[Tuple[int, int, float]]], natoms: int, depth: int = 3
+) -> numpy.ndarray:
+    """Returns the sorted keys ``i * natoms + j`` (i < j) of all the atom pairs separated by at most
+    ``depth`` bonds, e.g. depth=3 for 1-2, 1-3, and 1-4 exclusions.
+    Parameters
+    ----------
+    connectivity: List[Tuple[int, int, float]]
+        Bonds of the form ``Molecule.connectivity``.
+    natoms: int
+        Number of atoms.
+    depth: int, optional
+        Maximum number of bonds separating excluded pairs. Defaults to 3.
+    Returns
+    -------
+    numpy.ndarray
+        Excluded pair keys.
+    """
+    if not connectivity or depth < 1:
+        return numpy.empty(0, dtype=numpy.int64)
+
+    bonds = numpy.asarray(connectivity)[:, :2].astype(numpy.int64)
+    # Directed bond list sorted on the first atom for CSR-style neighbor lookup
+    src = numpy.concatenate((bonds[:, 0], bonds[:, 1]))
+    dst = numpy.concatenate((bonds[:, 1], bonds[:, 0]))
+    order = numpy.argsort(src, kind="stable")
+    src, dst = src[order], dst[order]
+    start = numpy.searchsorted(src, numpy.arange(natoms + 1))
+
+    # Walk paths bond by bond: paths are (origin, current) pairs
+    origin, current = src, dst
+    keys = [origin * natoms + current]
+    for _ in range(depth - 1):
+        counts = start[current + 1] - start[current]
+        origin = numpy.repeat(origin, counts)
+        offsets = numpy.arange(counts.sum()) - numpy.repeat(
+            numpy.cumsum(counts) - counts, counts
+        )
+        current = dst[numpy.repeat(start[current], counts) + offsets]
+        keep = origin != current
+        origin, current = origin[keep], current[keep]
+        # Paths are deduplicated to keep the walk from growing combinatorially
+        path = numpy.unique(origin * natoms + current)
+        origin, current = path // natoms, path % natoms
+        keys.append(path)
+
+    keys = numpy.concatenate(keys)
+    i, j = keys // natoms, keys % natoms
+    return numpy.unique(numpy.minimum(i, j) * natoms + numpy.maximum(i, j))
+
+
+def _ranges(start: numpy.ndarray, counts: numpy.ndarray) -> numpy.ndarray:
+    """ Concatenates arange(start[k], start[k] + counts[k]) for all k. """
+    offsets = numpy.arange(counts.sum()) - numpy.repeat(
+        numpy.cumsum(counts) - counts, counts
+    )
+    return numpy.repeat(start, counts) + offsets
+
+
+def neighbor_pairs(
+    geometry: numpy.ndarray,
+    cutoff: float,
+    box: Optional[numpy.ndarray] = None,
+    periodic: Optional[numpy.ndarray] = None,
+    exclusions: Optional[numpy.ndarray] = None,
+) -> PairList:
+    """Finds all the unique atom pairs within a cutoff with a cell list. Atoms are binned into cells
+    no smaller than the cutoff and only the half shell of neighboring cells is searched, so the cost
+    scales linearly with the number of atoms.
+    Parameters
+    ----------
+    geometry: numpy.ndarray
+        Atomic positions of shape (natoms, 3).
+    cutoff: float
+        Cutoff distance in the units of ``geometry``.
+    box: numpy.ndarray, optional
+        Box edge lengths of an orthorhombic periodic box. Non-periodic if unset.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic dimensions. Defaults to all dimensions if ``box`` is set.
+    exclusions: numpy.ndarray, optional
+        Sorted pair keys to exclude as returned by ``exclusion_pairs``.
+    Returns
+    -------
+    PairList
+        Pair indices, minimum-image displacements, and distances.
+    """
+    geometry = numpy.asarray(geometry, dtype=float)
+    natoms, ndim = geometry.shape
+    if box is None:
+        periodic = numpy.zeros(ndim, dtype=bool)
+    elif periodic is None:
+        periodic = numpy.ones(ndim, dtype=bool)
+    if box is not None and numpy.any(cutoff > 0.5 * box[periodic]):
+        raise ValueError("Cutoff must not exceed half the periodic box length.")
+
+    # Bin atoms into cells of at least the cutoff size. Periodic dimensions with fewer than 3 cells
+    # are not binned since neighboring cells would then be visited more than once.
+    ncells = numpy.ones(ndim, dtype=numpy.int64)
+    coords = numpy.zeros((natoms, ndim), dtype=numpy.int64)
+    for dim in range(ndim):
+        x = geometry[:, dim]
+        if periodic[dim]:
+            n = int(box[dim] // cutoff)
+            if n >= 3:
+                coords[:, dim] = (x % box[dim]) * (n / box[dim])
+                ncells[dim] = n
+        elif natoms:
+            lo, extent = x.min(), x.max() - x.min()
+            n = max(int(extent // cutoff), 1)
+            coords[:, dim] = (x - lo) * (n / extent) if extent > 0 else 0
+            ncells[dim] = n
+    coords = numpy.minimum(coords, ncells - 1)
+
+    strides = numpy.cumprod(numpy.concatenate(([1], ncells[:0:-1])))[::-1]
+    cell = coords @ strides
+    order = numpy.argsort(cell, kind="stable")
+    counts = numpy.bincount(cell, minlength=ncells.prod())
+    start = numpy.cumsum(counts) - counts
+
+    # Half shell: the home cell and the neighbor offsets that are lexicographically positive
+    choices = [(-1, 0, 1) if n > 1 else (0,) for n in ncells]
+    offsets = [off for off in product(*choices) if off > (0,) * ndim]
+
+    # Work on cell-sorted coordinate columns for memory locality. Candidates are filtered per
+    # offset to bound memory usage.
+    if box is not None:
+        geometry = geometry.copy()
+        geometry[:, periodic] %= box[periodic]
+    columns = [numpy.ascontiguousarray(geometry[order, dim]) for dim in range(ndim)]
+    sorted_coords = coords[order]
+    sorted_start, sorted_counts = start[cell[order]], counts[cell[order]]
+    # Periodic dimensions that are not binned need an explicit minimum image
+    unbinned = [dim for dim in range(ndim) if periodic[dim] and ncells[dim] == 1]
+    cutoff2 = cutoff * cutoff
+    found = []
+
+    def collect(si: numpy.ndarray, sj: numpy.ndarray, shifted: List) -> None:
+        d = [shifted[dim][si] - columns[dim][sj] for dim in range(ndim)]
+        for dim in unbinned:
+            d[dim] -= box[dim] * numpy.round(d[dim] / box[dim])
+        r2 = sum(val * val for val in d)
+        keep = r2 < cutoff2
+        found.append(
+            (si[keep], sj[keep], numpy.stack([val[keep] for val in d], -1), r2[keep])
+        )
+
+    # Pairs within each cell
+    si = numpy.repeat(numpy.arange(natoms), sorted_counts)
+    sj = _ranges(sorted_start, sorted_counts)
+    keep = si < sj
+    collect(si[keep], sj[keep], columns)
+
+    for off in offsets:
+        other = sorted_coords + off
+        valid = numpy.ones(natoms, dtype=bool)
+        shifted = list(columns)
+        for dim in range(ndim):
+            if periodic[dim] and ncells[dim] > 1:
+                # Neighbor cells across the boundary hold the periodic images
+                wrap = other[:, dim] // ncells[dim]
+                other[:, dim] -= wrap * ncells[dim]
+                shifted[dim] = columns[dim] - wrap * box[dim]
+            elif not periodic[dim]:
+                valid &= (other[:, dim] >= 0) & (other[:, dim] < ncells[dim])
+        atoms = numpy.flatnonzero(valid)
+        ocell = other[atoms] @ strides
+        collect(
+            numpy.repeat(atoms, counts[ocell]),
+            _ranges(start[ocell], counts[ocell]),
+            shifted,
+        )
+
+    si, sj, d, r2 = (numpy.concatenate(val) for val in zip(*found))
+    i, j = order[si], order[sj]
+
+    # Report every pair as i < j
+    swap = i > j
+    i[swap], j[swap] = j[swap], i[swap]
+    d[swap] *= -1
+
+    if exclusions is not None and len(exclusions):
+        keep = ~numpy.isin(i * natoms + j, exclusions, assume_unique=False)
+        i, j, d, r2 = i[keep], j[keep], d[keep], r2[keep]
+
+    return PairList(i, j, d, numpy.sqrt(r2))
+
+
+def pair_forces(pairs: PairList, dedr: numpy.ndarray, natoms: int) -> numpy.ndarray:
+    """ Returns the per-atom forces of shape (natoms, 3) from dE/dr of every pair. """
+    fvec = (dedr / pairs.r)[:, None] * pairs.d
+    forces = numpy.empty((natoms, pairs.d.shape[1]))
+    for dim in range(pairs.d.shape[1]):
+        forces[:, dim] = numpy.bincount(
+            pairs.j, fvec[:, dim], minlength=natoms
+        ) - numpy.bincount(pairs.i, fvec[:, dim], minlength=natoms)
+    return forces
@@ -0,0 +1,116 @@
+""" Shared-memory arrays and process pools for node-level parallelism """
+
+__all__ = ["SharedArrays", "WorkerPool"]
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import numpy
+
+
+class SharedArrays:
+    """NumPy arrays backed by shared memory blocks. The owner creates the blocks and worker processes
+    attach to them by ``spec`` without copying, so large coordinate buffers are never pickled.
+    Parameters
+    ----------
+    spec: Dict[str, Tuple[str, Tuple[int, ...], str]]
+        Block name, shape, and dtype of every array.
+    owner: bool, optional
+        Whether this instance owns (and unlinks on close) the blocks. Defaults to False. Worker
+        processes share the resource tracker of the owner, so blocks are freed once even if the
+        owner exits abnormally.
+    """
+
+    def __init__(
+        self, spec: Dict[str, Tuple[str, Tuple[int, ...], str]], owner: bool = False
+    ):
+        self.spec, self.owner = spec, owner
+        self._blocks, self._arrays = {}, {}
+        for key, (name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=name)
+            self._blocks[key] = block
+            self._arrays[key] = numpy.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    @classmethod
+    def create(cls, **arrays: numpy.ndarray) -> "SharedArrays":
+        """ Creates shared blocks initialized with copies of the given arrays. """
+        spec, blocks = {}, []
+        for key, value in arrays.items():
+            value = numpy.ascontiguousarray(value)
+            block = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+            numpy.ndarray(value.shape, value.dtype, buffer=block.buf)[...] = value
+            spec[key] = (block.name, value.shape, value.dtype.str)
+            blocks.append(block)
+        shared = cls(spec, owner=True)
+        for block in blocks:
+            block.close()
+        return shared
+
+    def __getitem__(self, key: str) -> numpy.ndarray:
+        return self._arrays[key]
+
+    def keys(self):
+        return self._arrays.keys()
+
+    def close(self) -> None:
+        """ Releases the arrays, and frees the blocks if owned. """
+        self._arrays.clear()
+        for block in self._blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class WorkerPool:
+    """Process pool whose workers are set up once by ``initializer`` e.g. to attach shared arrays
+    and build energy models. ``map`` returns results in the order of its inputs so merged results
+    do not depend on scheduling. With a single process, work runs serially in the calling process.
+    Parameters
+    ----------
+    processes: int, optional
+        Number of worker processes. Defaults to the number of cores.
+    initializer: Callable, optional
+        Function called once in every worker.
+    initargs: Tuple, optional
+        Arguments of ``initializer``.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+    ):
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = None
+        if self.processes > 1:
+            self._executor = ProcessPoolExecutor(
+                self.processes, initializer=initializer, initargs=initargs
+            )
+        elif initializer is not None:
+            initializer(*initargs)
+
+    def map(self, func: Callable, items: Iterable[Any]) -> List[Any]:
+        """ Applies func to every item and returns the results in order. """
+        if self._executor is None:
+            return [func(item) for item in items]
+        return list(self._executor.map(func, items))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
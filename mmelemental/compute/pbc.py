@@ -0,0 +1,377 @@
+""" Periodic boundary conditions for orthorhombic and triclinic simulation boxes """
+
+__all__ = [
+    "box_from_cell",
+    "periodic_mask",
+    "cell_periodic",
+    "minimum_image",
+    "wrap",
+    "cell_vectors",
+    "cell_parameters",
+    "cell_widths",
+    "minimum_image_triclinic",
+    "wrap_triclinic",
+    "bond_tree",
+    "make_whole",
+]
+
+from itertools import product
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy
+from mmelemental.util.units import convert
+
+# Number of coordinate rows transformed at a time by the in-place triclinic routines, which bounds
+# the size of the temporaries regardless of the size of the geometry.
+_chunk_rows = 65536
+
+# Fractional lattice offsets of the neighboring images
+_offsets = numpy.array(list(product((-1, 0, 1), repeat=3)), dtype=float)
+
+
+def box_from_cell(
+    cell: Union[Tuple[Sequence[float], Sequence[float]], "Cell"]
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Returns the origin and edge lengths of a cell defined as ((xmin, ymin, zmin), (xmax, ymax, zmax))
+    e.g. ``SimInput.cell``, or of an orthorhombic :class:``Cell`` converted to angstroms."""
+    if hasattr(cell, "vectors"):
+        if not cell.orthorhombic or cell.nframes is not None:
+            raise NotImplementedError(
+                "Only a single orthorhombic cell is supported by this engine."
+            )
+        factor = 1.0
+        if cell.vectors_units not in ("angstrom", "angstroms"):
+            factor = convert(1.0, cell.vectors_units, "angstrom")
+        vectors = numpy.asarray(cell.vectors, dtype=float) * factor
+        origin = numpy.zeros(3) if cell.origin is None else cell.origin * factor
+        return numpy.asarray(origin, dtype=float), vectors.diagonal().copy()
+    lo, hi = numpy.asarray(cell[0], dtype=float), numpy.asarray(cell[1], dtype=float)
+    if lo.shape != hi.shape or numpy.any(hi <= lo):
+        raise ValueError("Cell must be of the form ((xmin, ...), (xmax, ...)).")
+    return lo, hi - lo
+
+
+def periodic_mask(boundary: Optional[Sequence[str]], ndim: int = 3) -> numpy.ndarray:
+    """Returns a boolean mask of the periodic dimensions from boundary conditions e.g.
+    ``SimInput.boundary``. All dimensions are periodic if boundary is None."""
+    if boundary is None:
+        return numpy.ones(ndim, dtype=bool)
+    if len(boundary) != ndim:
+        raise ValueError(f"Boundary conditions must be supplied for {ndim} dimensions.")
+    return numpy.array([bc.lower() == "periodic" for bc in boundary])
+
+
+def cell_periodic(
+    cell: Union[Tuple[Sequence[float], Sequence[float]], "Cell"],
+    boundary: Optional[Sequence[str]] = None,
+    ndim: int = 3,
+) -> numpy.ndarray:
+    """Returns a boolean mask of the periodic dimensions of a simulation cell e.g. ``SimInput.cell``:
+    ``Cell.periodic`` for a :class:``Cell``, else from the boundary conditions e.g.
+    ``SimInput.boundary``. See :func:``periodic_mask``."""
+    if hasattr(cell, "periodic"):
+        return numpy.array(cell.periodic, dtype=bool)
+    return periodic_mask(boundary, ndim)
+
+
+def minimum_image(
+    d: numpy.ndarray, box: numpy.ndarray, periodic: Optional[numpy.ndarray] = None
+) -> numpy.ndarray:
+    """Replaces (in place) displacement vectors of shape (..., 3) by their minimum images and returns them.
+    Parameters
+    ----------
+    d: numpy.ndarray
+        Displacement vectors.
+    box: numpy.ndarray
+        Box edge lengths.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic dimensions. Defaults to all dimensions.
+    Returns
+    -------
+    numpy.ndarray
+        The modified displacement vectors.
+    """
+    if periodic is None or periodic.all():
+        d -= box * numpy.round(d / box)
+    else:
+        d[..., periodic] -= box[..., periodic] * numpy.round(
+            d[..., periodic] / box[..., periodic]
+        )
+    return d
+
+
+def wrap(
+    geometry: numpy.ndarray,
+    box: numpy.ndarray,
+    origin: Optional[numpy.ndarray] = None,
+    periodic: Optional[numpy.ndarray] = None,
+) -> numpy.ndarray:
+    """ Returns the coordinates wrapped into the box [origin, origin + box) along the periodic dimensions. """
+    origin = numpy.zeros_like(box) if origin is None else origin
+    wrapped = geometry - origin
+    if periodic is None:
+        periodic = numpy.ones(len(box), dtype=bool)
+    wrapped[..., periodic] %= box[periodic]
+    return wrapped + origin
+
+
+def cell_vectors(lengths: Sequence[float], angles: Sequence[float]) -> numpy.ndarray:
+    """Returns the box vectors (rows a, b, c) of a cell from its edge lengths (a, b, c) and angles
+    (alpha, beta, gamma) in degrees, with a along x and b in the xy plane. Both may be of shape
+    (nframes, 3) for one cell per frame."""
+    lengths, angles = numpy.asarray(lengths, dtype=float), numpy.asarray(
+        angles, dtype=float
+    )
+    cos = numpy.cos(numpy.radians(angles))
+    # Right angles are set exactly so that orthorhombic cells have diagonal vectors
+    cos[numpy.isclose(angles, 90.0)] = 0.0
+    cosa, cosb, cosg = cos[..., 0], cos[..., 1], cos[..., 2]
+    sing = numpy.sqrt(1.0 - cosg ** 2)
+    cy = (cosa - cosb * cosg) / sing
+    cz = numpy.sqrt(1.0 - cosb ** 2 - cy ** 2)
+    vectors = numpy.zeros(lengths.shape[:-1] + (3, 3))
+    vectors[..., 0, 0] = 1.0
+    vectors[..., 1, 0], vectors[..., 1, 1] = cosg, sing
+    vectors[..., 2, 0], vectors[..., 2, 1], vectors[..., 2, 2] = cosb, cy, cz
+    return vectors * lengths[..., None]
+
+
+def cell_parameters(vectors: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """ Returns the edge lengths and angles (alpha, beta, gamma) in degrees of box vectors of shape (..., 3, 3). """
+    vectors = numpy.asarray(vectors, dtype=float)
+    lengths = numpy.linalg.norm(vectors, axis=-1)
+    a, b, c = vectors[..., 0, :], vectors[..., 1, :], vectors[..., 2, :]
+    pairs = ((b, c, 1, 2), (a, c, 0, 2), (a, b, 0, 1))
+    angles = numpy.stack(
+        [
+            numpy.degrees(
+                numpy.arccos(
+                    numpy.clip(
+                        (u * v).sum(-1) / (lengths[..., i] * lengths[..., j]), -1, 1
+                    )
+                )
+            )
+            for u, v, i, j in pairs
+        ],
+        axis=-1,
+    )
+    return lengths, angles
+
+
+def cell_widths(vectors: numpy.ndarray) -> numpy.ndarray:
+    """Returns the perpendicular widths of a cell i.e. the distances between opposite faces, of shape
+    (..., 3). Minimum images are unique within half the smallest width."""
+    vectors = numpy.asarray(vectors, dtype=float)
+    volume = numpy.abs(numpy.linalg.det(vectors))
+    faces = numpy.stack(
+        [
+            numpy.cross(vectors[..., 1, :], vectors[..., 2, :]),
+            numpy.cross(vectors[..., 2, :], vectors[..., 0, :]),
+            numpy.cross(vectors[..., 0, :], vectors[..., 1, :]),
+        ],
+        axis=-2,
+    )
+    return volume[..., None] / numpy.linalg.norm(faces, axis=-1)
+
+
+def _row_chunks(x: numpy.ndarray, vectors: numpy.ndarray):
+    """Yields (view, vectors) blocks of at most _chunk_rows coordinate rows of x. A single cell lets
+    contiguous arrays be split freely, otherwise the leading (frame) axes are kept whole."""
+    if vectors.ndim == 2 and x.flags.c_contiguous:
+        flat = x.reshape(-1, x.shape[-1])
+        for start in range(0, len(flat), _chunk_rows):
+            yield flat[start : start + _chunk_rows], vectors
+    else:
+        yield x, vectors
+
+
+def minimum_image_triclinic(
+    d: numpy.ndarray,
+    vectors: numpy.ndarray,
+    periodic: Optional[numpy.ndarray] = None,
+) -> numpy.ndarray:
+    """Replaces (in place) displacement vectors of shape (..., 3) by their minimum images in a
+    triclinic cell and returns them. Displacements are first reduced in fractional coordinates;
+    those longer than half the smallest cell width, the only ones whose reduced image may not be the
+    nearest, are then compared against the 26 neighboring images. This is exact for cells in reduced
+    form as written by simulation engines, with non-periodic box vectors (e.g. of slabs) normal to the
+    periodic ones.
+    Parameters
+    ----------
+    d: numpy.ndarray
+        Displacement vectors e.g. ``geometry[j] - geometry[i]`` for arbitrary pair arrays i, j.
+    vectors: numpy.ndarray
+        Box vectors (rows a, b, c) of shape (3, 3), or of shape (nframes, 3, 3) for displacements
+        of shape (nframes, npairs, 3).
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic box vectors. Defaults to all vectors.
+    Returns
+    -------
+    numpy.ndarray
+        The modified displacement vectors.
+    """
+    vectors = numpy.asarray(vectors, dtype=float)
+    if periodic is None:
+        periodic = numpy.ones(3, dtype=bool)
+    if not periodic.any():
+        return d
+    diagonal = numpy.diagonal(vectors, axis1=-2, axis2=-1)
+    if numpy.count_nonzero(vectors) == numpy.count_nonzero(diagonal):
+        return minimum_image(
+            d, diagonal if vectors.ndim == 2 else diagonal[..., None, :], periodic
+        )
+    offsets = _offsets[(_offsets[:, ~periodic] == 0).all(1)]
+    for block, box in _row_chunks(d, vectors):
+        s = block @ numpy.linalg.inv(box)
+        s[..., periodic] -= numpy.round(s[..., periodic])
+        numpy.matmul(s, box, out=block)
+        # Reduced displacements beyond half the smallest width may have a nearer image
+        half = 0.5 * cell_widths(box)[..., periodic].min(-1)
+        if box.ndim > 2:
+            half = half[..., None]
+        far = (block ** 2).sum(-1) > half ** 2
+        if far.any():
+            # |d + L|^2 - |d|^2 = (2 d + L).L over the neighboring lattice translations L
+            near = block[far]
+            if box.ndim > 2:
+                box = box[..., None, :, :]
+                box = numpy.broadcast_to(box, block.shape[:-1] + (3, 3))[far]
+                shifts = offsets @ box
+                gain = numpy.einsum("ik,ijk->ij", 2.0 * near, shifts)
+                gain += numpy.einsum("ijk,ijk->ij", shifts, shifts)
+                near += shifts[numpy.arange(len(near)), gain.argmin(-1)]
+            else:
+                shifts = offsets @ box
+                gain = (2.0 * near) @ shifts.T + (shifts ** 2).sum(-1)
+                near += shifts[gain.argmin(-1)]
+            block[far] = near
+    return d
+
+
+def wrap_triclinic(
+    geometry: numpy.ndarray,
+    vectors: numpy.ndarray,
+    origin: Optional[numpy.ndarray] = None,
+    periodic: Optional[numpy.ndarray] = None,
+) -> numpy.ndarray:
+    """Wraps (in place) coordinates of shape (..., 3) into a triclinic cell i.e. to fractional
+    coordinates in [0, 1) along the periodic box vectors, and returns them.
+    Parameters
+    ----------
+    geometry: numpy.ndarray
+        Coordinates e.g. of shape (natoms, 3) or (nframes, natoms, 3).
+    vectors: numpy.ndarray
+        Box vectors (rows a, b, c) of shape (3, 3), or (nframes, 3, 3) for one cell per frame.
+    origin: numpy.ndarray, optional
+        Cell origin. Defaults to 0.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic box vectors. Defaults to all vectors.
+    Returns
+    -------
+    numpy.ndarray
+        The modified coordinates.
+    """
+    vectors = numpy.asarray(vectors, dtype=float)
+    if periodic is None:
+        periodic = numpy.ones(3, dtype=bool)
+    for block, box in _row_chunks(geometry, vectors):
+        if origin is not None:
+            block -= origin
+        s = block @ numpy.linalg.inv(box)
+        s[..., periodic] -= numpy.floor(s[..., periodic])
+        numpy.matmul(s, box, out=block)
+        if origin is not None:
+            block += origin
+    return geometry
+
+
+def bond_tree(
+    connectivity: Union[numpy.ndarray, List[Tuple[int, int, float]]], natoms: int
+) -> List[Tuple[numpy.ndarray, numpy.ndarray]]:
+    """Returns a breadth-first spanning forest of the bond graph as a list of levels (child, parent)
+    of atom index arrays, rooted at the lowest atom index of every molecule. Every level is
+    processed at once for all molecules, so the number of levels is the largest molecular radius
+    in bonds rather than the number of molecules.
+    Parameters
+    ----------
+    connectivity: numpy.ndarray or List[Tuple[int, int, float]]
+        Bonds e.g. ``Molecule.connectivity``.
+    natoms: int
+        Number of atoms.
+    Returns
+    -------
+    List[Tuple[numpy.ndarray, numpy.ndarray]]
+        Child and parent atom indices of every level.
+    """
+    if connectivity is None or len(connectivity) == 0:
+        return []
+    ij = numpy.asarray(connectivity)[:, :2].astype(numpy.int64)
+    src = numpy.concatenate((ij[:, 0], ij[:, 1]))
+    dst = numpy.concatenate((ij[:, 1], ij[:, 0]))
+    order = numpy.argsort(src, kind="stable")
+    src, dst = src[order], dst[order]
+    start = numpy.searchsorted(src, numpy.arange(natoms + 1))
+
+    # Molecule labels by min-label propagation with pointer jumping
+    labels = numpy.arange(natoms)
+    while True:
+        previous = labels.copy()
+        numpy.minimum.at(labels, src, labels[dst])
+        labels = labels[labels]
+        if numpy.array_equal(labels, previous):
+            break
+
+    visited = labels == numpy.arange(natoms)
+    frontier, levels = numpy.flatnonzero(visited), []
+    while len(frontier):
+        counts = start[frontier + 1] - start[frontier]
+        edges = numpy.repeat(start[frontier], counts) + (
+            numpy.arange(counts.sum())
+            - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        )
+        parents = numpy.repeat(frontier, counts)
+        children = dst[edges]
+        new = ~visited[children]
+        children, first = numpy.unique(children[new], return_index=True)
+        if len(children) == 0:
+            break
+        visited[children] = True
+        levels.append((children, parents[new][first]))
+        frontier = children
+    return levels
+
+
+def make_whole(
+    geometry: numpy.ndarray,
+    connectivity: Union[numpy.ndarray, List[Tuple[int, int, float]]],
+    vectors: numpy.ndarray,
+    periodic: Optional[numpy.ndarray] = None,
+    levels: Optional[List[Tuple[numpy.ndarray, numpy.ndarray]]] = None,
+) -> numpy.ndarray:
+    """Unwraps (in place) molecules split across periodic boundaries by placing every bonded atom at
+    the minimum image of its parent in the bond tree, and returns the coordinates. Roots keep their
+    positions.
+    Parameters
+    ----------
+    geometry: numpy.ndarray
+        Coordinates of shape (natoms, 3) or (nframes, natoms, 3).
+    connectivity: numpy.ndarray or List[Tuple[int, int, float]]
+        Bonds e.g. ``Molecule.connectivity``.
+    vectors: numpy.ndarray
+        Box vectors (rows a, b, c) of shape (3, 3), or (nframes, 3, 3) for one cell per frame.
+    periodic: numpy.ndarray, optional
+        Boolean mask of the periodic box vectors. Defaults to all vectors.
+    levels: List[Tuple[numpy.ndarray, numpy.ndarray]], optional
+        Precomputed :func:``bond_tree`` to reuse across frames.
+    Returns
+    -------
+    numpy.ndarray
+        The modified coordinates.
+    """
+    if levels is None:
+        levels = bond_tree(connectivity, geometry.shape[-2])
+    for child, parent in levels:
+        d = geometry[..., child, :] - geometry[..., parent, :]
+        minimum_image_triclinic(d, vectors, periodic)
+        d += geometry[..., parent, :]
+        geometry[..., child, :] = d
+    return geometry
@@ -0,0 +1,341 @@
+""" Temperature and Hamiltonian replica exchange with process-pool replicas """
+
+__all__ = ["ReplicaExchange", "ExchangeStats", "metropolis"]
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import os
+import numpy
+
+from mmelemental.models.app.dynamics import DynamicsInput
+from mmelemental.models.app.base import SimInput, SimOutput
+from mmelemental.models.collect.mm_traj import Frame, Trajectory
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util.units import convert
+from .dynamics import KB, Dynamics
+from .energy import ForceFieldEnergy
+from .parallel import SharedArrays, WorkerPool
+
+# Per-process replica state set up by _init_worker: inputs, shared arrays, engine, and models
+_worker: Dict[str, Any] = {}
+
+
+class ExchangeStats(NamedTuple):
+    """Exchange statistics between neighboring states k and k + 1, and the replica (index of its
+    initial state) currently in every state."""
+
+    attempts: numpy.ndarray
+    accepted: numpy.ndarray
+    permutation: numpy.ndarray
+
+    @property
+    def acceptance(self) -> numpy.ndarray:
+        """ Acceptance ratio of every neighbor pair. """
+        return self.accepted / numpy.maximum(self.attempts, 1)
+
+
+def metropolis(
+    energies: numpy.ndarray,
+    beta: numpy.ndarray,
+    parity: int,
+    rng: numpy.random.Generator,
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Attempts exchanges between all the neighboring states (k, k + 1) with k of the given parity
+    at once.
+    Parameters
+    ----------
+    energies: numpy.ndarray
+        Energies of shape (nstates, 3): U_k(x_k), U_k-1(x_k), and U_k+1(x_k) in kJ/mol.
+    beta: numpy.ndarray
+        Inverse temperatures 1 / (kB T_k) in mol/kJ.
+    parity: int
+        0 for the pairs (0, 1), (2, 3), ... and 1 for (1, 2), (3, 4), ...
+    rng: numpy.random.Generator
+        Random number generator.
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Lower state index k of every attempted pair and whether the exchange was accepted.
+    """
+    i = numpy.arange(parity, len(beta) - 1, 2)
+    j = i + 1
+    delta = beta[i] * (energies[j, 1] - energies[i, 0]) + beta[j] * (
+        energies[i, 2] - energies[j, 0]
+    )
+    return i, numpy.log(rng.random(len(i))) < -delta
+
+
+def _init_worker(inputs, spec, engine) -> None:
+    _worker.update(
+        inputs=inputs, arrays=SharedArrays(spec), engine=engine, models={}, mols={}
+    )
+
+
+def _model(k: int) -> ForceFieldEnergy:
+    models = _worker["models"]
+    if k not in models:
+        _, _worker["mols"][k], models[k] = ForceFieldEnergy.from_input(
+            _worker["inputs"][k]
+        )
+    return models[k]
+
+
+def _advance(task: Tuple[int, int, int, Optional[int]]) -> Dict[str, Any]:
+    """Runs state k from global step start for nsteps with the configuration in shared memory,
+    writes back the final configuration and its energies under the neighboring Hamiltonians, and
+    returns the observables and in-memory frames of the segment."""
+    k, start, nsteps, seed = task
+    inputs, arrays = _worker["inputs"][k], _worker["arrays"]
+    geometry, velocities = arrays["geometry"], arrays["velocities"]
+    model = _model(k)
+    _, mol, _, md = _worker["engine"](
+        inputs,
+        model=model,
+        geometry=geometry[k],
+        velocities=velocities[k],
+        seed=seed,
+    )
+    md.step_count = start
+    factor = 1.0
+    if mol.geometry_units not in ("angstrom", "angstroms"):
+        factor = convert(1.0, mol.geometry_units, "angstrom")
+
+    freq = inputs.freq
+    keys = ("time", "pot_energy", "kin_energy", "temperature")
+    observables, frames = {key: [] for key in keys}, []
+
+    def record():
+        for key in keys:
+            observables[key].append(float(getattr(md, key)))
+        if freq and md.step_count % freq == 0:
+            frames.append(
+                Frame(
+                    geometry=md.geometry / factor,
+                    geometry_units=mol.geometry_units,
+                    velocities=md.velocities.copy(),
+                    forces=md.forces.copy(),
+                    timestep=md.dt,
+                )
+            )
+
+    if start == 0:
+        record()
+    end = start + nsteps
+    while md.step_count < end:
+        chunk = end - md.step_count
+        if freq:
+            chunk = min(chunk, freq - md.step_count % freq)
+        md.step(chunk)
+        if freq and md.step_count % freq == 0 or md.step_count == end:
+            record()
+
+    if inputs.traj is not None and frames:
+        with open(inputs.traj, "a") as stream:
+            for frame in frames:
+                stream.write(frame.json() + "\n")
+        frames = []
+
+    geometry[k] = md.geometry
+    velocities[k] = md.velocities
+    nstates = len(_worker["inputs"])
+    arrays["energies"][k] = [
+        md.pot_energy,
+        _model(k - 1).energy(md.geometry) if k > 0 else numpy.nan,
+        _model(k + 1).energy(md.geometry) if k < nstates - 1 else numpy.nan,
+    ]
+    return {"observables": observables, "frames": frames}
+
+
+class ReplicaExchange:
+    """Replica exchange molecular dynamics between thermodynamic states defined by a list of
+    ``DynamicsInput``, ordered e.g. by increasing temperature (temperature replica exchange) or force
+    field lambda (Hamiltonian replica exchange), or both. Replicas run in a process pool and exchange
+    configurations through shared-memory coordinate buffers. Every ``interval`` steps, exchanges
+    between neighboring states are attempted at once with the Metropolis criterion, alternating
+    between even and odd pairs, and accepted velocities are rescaled by sqrt(T_new / T_old).
+    Observables and frames (every ``freq`` steps) are recorded per state. Frames are streamed as JSON
+    lines to the state ``traj`` file if set, and exchange attempts to ``log`` as JSON lines.
+    Parameters
+    ----------
+    replicas: Sequence[DynamicsInput]
+        Inputs of the states, each with the same molecule, a temperature, and the same nsteps.
+    interval: int, optional
+        Number of steps between exchange attempts. Defaults to 100.
+    processes: int, optional
+        Number of worker processes. Defaults to the number of cores, at most one per replica.
+    seed: int, optional
+        Random seed of the exchanges, and of the velocities and thermostats of every segment.
+        Results do not depend on the number of processes for a given seed.
+    log: str, optional
+        Filename of the JSON lines exchange log.
+    engine: Callable, optional
+        In-process integrator setup with the signature of ``Dynamics.from_input``. Defaults to it.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[DynamicsInput],
+        interval: int = 100,
+        processes: Optional[int] = None,
+        seed: Optional[int] = None,
+        log: Optional[str] = None,
+        engine: Callable = Dynamics.from_input,
+    ):
+        if len(replicas) < 2:
+            raise ValueError("Replica exchange requires at least 2 replicas.")
+        if any(inputs.temp is None for inputs in replicas):
+            raise ValueError(
+                "Every replica requires a temperature (DynamicsInput.temp)."
+            )
+        if len({inputs.nsteps or 0 for inputs in replicas}) != 1:
+            raise ValueError("Every replica must run the same number of steps.")
+        self.replicas = list(replicas)
+        self.interval = interval
+        self.processes = min(processes or os.cpu_count() or 1, len(replicas))
+        self.seed = seed
+        self.log = log
+        self.engine = engine
+
+        self.temps = numpy.array(
+            [float(numpy.ravel(inputs.temp)[0]) for inputs in replicas]
+        )
+        self.beta = 1.0 / (KB * self.temps)
+        nstates = len(replicas)
+        self.stats = ExchangeStats(
+            numpy.zeros(nstates - 1, dtype=numpy.int64),
+            numpy.zeros(nstates - 1, dtype=numpy.int64),
+            numpy.arange(nstates),
+        )
+        self._rng = numpy.random.default_rng(seed)
+
+    def _seed(self, k: int, segment: int) -> Optional[int]:
+        if self.seed is None:
+            return None
+        sequence = numpy.random.SeedSequence([self.seed, k, segment + 1])
+        return int(sequence.generate_state(1)[0])
+
+    def _initial_states(self) -> Tuple[numpy.ndarray, numpy.ndarray, List[Molecule]]:
+        geometry, velocities, mols = [], [], []
+        for k, inputs in enumerate(self.replicas):
+            _, mol, _, md = self.engine(inputs, seed=self._seed(k, -1))
+            geometry.append(md.geometry)
+            velocities.append(md.velocities)
+            mols.append(mol)
+        return numpy.array(geometry), numpy.array(velocities), mols
+
+    def exchange(self, arrays: SharedArrays, segment: int) -> Dict[str, Any]:
+        """ Attempts exchanges after a segment and swaps the accepted configurations in place. """
+        i, accepted = metropolis(arrays["energies"], self.beta, segment % 2, self._rng)
+        self.stats.attempts[i] += 1
+        self.stats.accepted[i[accepted]] += 1
+
+        a, b = i[accepted], i[accepted] + 1
+        if len(a):
+            src, dst = numpy.concatenate([b, a]), numpy.concatenate([a, b])
+            scale = numpy.sqrt(self.temps[dst] / self.temps[src])
+            geometry, velocities = arrays["geometry"], arrays["velocities"]
+            geometry[dst] = geometry[src]
+            velocities[dst] = velocities[src] * scale[:, None, None]
+            self.stats.permutation[dst] = self.stats.permutation[src]
+        return {
+            "segment": segment,
+            "step": (segment + 1) * self.interval,
+            "pairs": i.tolist(),
+            "accepted": accepted.tolist(),
+            "permutation": self.stats.permutation.tolist(),
+        }
+
+    def run(self) -> List[SimOutput]:
+        """Runs all the replicas and returns the output of every state: final molecule, trajectory
+        (unless streamed), and observables. Exchange statistics are available in ``stats``."""
+        nsteps = self.replicas[0].nsteps or 0
+        nsegments = -(-nsteps // self.interval)
+        for inputs in self.replicas:
+            if inputs.traj is not None:
+                open(inputs.traj, "w").close()
+
+        geometry, velocities, mols = self._initial_states()
+        nstates = len(self.replicas)
+        keys = ("time", "pot_energy", "kin_energy", "temperature")
+        observables = [{key: [] for key in keys} for _ in range(nstates)]
+        frames = [[] for _ in range(nstates)]
+
+        log = None if self.log is None else open(self.log, "w")
+        arrays = SharedArrays.create(
+            geometry=geometry,
+            velocities=velocities,
+            energies=numpy.zeros((nstates, 3)),
+        )
+        try:
+            with WorkerPool(
+                self.processes,
+                _init_worker,
+                (self.replicas, arrays.spec, self.engine),
+            ) as pool:
+                for segment in range(nsegments):
+                    start = segment * self.interval
+                    tasks = [
+                        (
+                            k,
+                            start,
+                            min(self.interval, nsteps - start),
+                            self._seed(k, segment),
+                        )
+                        for k in range(nstates)
+                    ]
+                    for k, result in enumerate(pool.map(_advance, tasks)):
+                        for key in keys:
+                            observables[k][key].extend(result["observables"][key])
+                        frames[k].extend(result["frames"])
+                    if segment < nsegments - 1:
+                        record = self.exchange(arrays, segment)
+                        if log is not None:
+                            log.write(json.dumps(record) + "\n")
+                            log.flush()
+            geometry = arrays["geometry"].copy()
+            velocities = arrays["velocities"].copy()
+        finally:
+            arrays.close()
+            if log is not None:
+                log.close()
+            _worker.clear()
+
+        return [
+            self._output(
+                k, mols[k], geometry[k], velocities[k], observables[k], frames[k]
+            )
+            for k in range(nstates)
+        ]
+
+    def _output(self, k, mol, geometry, velocities, observables, frames) -> SimOutput:
+        inputs = self.replicas[k]
+        factor = 1.0
+        if mol.geometry_units not in ("angstrom", "angstroms"):
+            factor = convert(1.0, mol.geometry_units, "angstrom")
+        observables["tot_energy"] = list(
+            numpy.add(observables["pot_energy"], observables["kin_energy"])
+        )
+        ((name, _),) = inputs.mol.items()
+        final = Molecule(
+            **{
+                **mol.dict(),
+                "geometry": geometry / factor,
+                "velocities": velocities,
+                "velocities_units": "angstrom/fs",
+                "forces": None,
+            }
+        )
+        return SimOutput(
+            simInput=SimInput(**inputs.dict(include=set(SimInput.__fields__))),
+            mol={name: final},
+            trajectory=Trajectory(mol=mol, frames=frames) if frames else None,
+            pot_energy=observables["pot_energy"],
+            observables=observables,
+            observables_units={
+                "time": "fs",
+                "pot_energy": "kJ/mol",
+                "kin_energy": "kJ/mol",
+                "tot_energy": "kJ/mol",
+                "temperature": "kelvin",
+            },
+        )
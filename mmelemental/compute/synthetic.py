@@ -0,0 +1,648 @@
+"""Synthetic molecular systems for scaling tests and benchmarks, of 10^3 to 10^6 atoms. Larger
+systems are generated at the same speed per atom but validating their models takes minutes."""
+
+__all__ = [
+    "SyntheticSystem",
+    "residue_templates",
+    "topology_terms",
+    "water_box",
+    "polymer_chains",
+    "random_protein",
+    "ligand_library",
+]
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy
+import qcelemental
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.models.cell import Cell
+from mmelemental.models import forcefield as ff
+from .neighbors import _ranges
+
+# United-atom Lennard-Jones sigma (angstroms) and epsilon (kJ/mol) per element
+_lj = {
+    "H": (1.07, 0.066),
+    "C": (3.4, 0.36),
+    "N": (3.25, 0.71),
+    "O": (2.96, 0.88),
+    "S": (3.56, 1.05),
+}
+
+# TIP3P water
+_water_lj = {"O": (3.15061, 0.6364), "H": (1.0, 0.0)}
+_water_charges = (-0.834, 0.417, 0.417)
+_water_oh, _water_hoh = 0.9572, 104.52
+
+# Spring constants of the bonded terms in kJ/(mol*angstrom**2) and kJ/(mol*radians**2)
+_springs = {"bonds": 2000.0, "angles": 400.0, "dihedrals": 10.0}
+_water_springs = {"bonds": 4627.5, "angles": 836.8}
+
+# Backbone of the residue templates in a frame with the chain along x: atom name, element,
+# position, and charge. Consecutive residues are 3.8 angstroms apart, which places the C of a
+# residue 1.3 angstroms from the N of the next one.
+_rise = 3.8
+_backbone = [
+    ("N", "N", (-1.2, 0.3, 0.0), -0.3),
+    ("CA", "C", (0.0, 0.0, 0.0), 0.3),
+    ("C", "C", (1.3, 0.4, 0.0), 0.5),
+    ("O", "O", (1.6, 1.6, 0.0), -0.5),
+]
+_backbone_bonds = [("N", "CA"), ("CA", "C"), ("C", "O")]
+
+# Distances between the straight segments of random proteins. Side chains point along z.
+# Turns between segments are closed by correspondingly stretched peptide bonds.
+_lane_spacing, _layer_spacing = 6.0, 11.0
+
+
+def _ring(center: Tuple[float, float, float], radius: float = 1.4):
+    """ Hexagon positions in the yz plane, starting at the bottom vertex. """
+    t = numpy.radians(numpy.arange(6) * 60.0 - 90.0)
+    return [
+        (
+            center[0],
+            center[1] + radius * numpy.cos(a),
+            center[2] + radius * numpy.sin(a),
+        )
+        for a in t
+    ]
+
+
+_phe = _ring((0.0, -0.4, 4.2))
+
+# Side chains: atoms (name, element, position, charge) and bonds. Side chains extend in the yz
+# plane to keep clear of the neighboring residues along the chain.
+residue_templates: Dict[str, Tuple[List, List]] = {
+    "GLY": ([], []),
+    "ALA": ([("CB", "C", (0.0, -0.4, 1.45), 0.0)], [("CA", "CB")]),
+    "SER": (
+        [("CB", "C", (0.0, -0.4, 1.45), 0.2), ("OG", "O", (0.0, -0.9, 2.8), -0.2)],
+        [("CA", "CB"), ("CB", "OG")],
+    ),
+    "VAL": (
+        [
+            ("CB", "C", (0.0, -0.4, 1.45), 0.0),
+            ("CG1", "C", (0.0, 0.8, 2.2), 0.0),
+            ("CG2", "C", (0.0, -1.6, 2.2), 0.0),
+        ],
+        [("CA", "CB"), ("CB", "CG1"), ("CB", "CG2")],
+    ),
+    "LEU": (
+        [
+            ("CB", "C", (0.0, -0.4, 1.45), 0.0),
+            ("CG", "C", (0.0, -0.9, 2.85), 0.0),
+            ("CD1", "C", (0.0, 0.3, 3.6), 0.0),
+            ("CD2", "C", (0.0, -2.1, 3.6), 0.0),
+        ],
+        [("CA", "CB"), ("CB", "CG"), ("CG", "CD1"), ("CG", "CD2")],
+    ),
+    "LYS": (
+        [
+            ("CB", "C", (0.0, -0.4, 1.45), 0.0),
+            ("CG", "C", (0.0, 0.1, 2.9), 0.0),
+            ("CD", "C", (0.0, -0.4, 4.35), 0.0),
+            ("CE", "C", (0.0, 0.1, 5.8), 0.0),
+            ("NZ", "N", (0.0, -0.4, 7.2), 1.0),
+        ],
+        [("CA", "CB"), ("CB", "CG"), ("CG", "CD"), ("CD", "CE"), ("CE", "NZ")],
+    ),
+    "ASP": (
+        [
+            ("CB", "C", (0.0, -0.4, 1.45), 0.0),
+            ("CG", "C", (0.0, -0.9, 2.85), 0.0),
+            ("OD1", "O", (0.0, 0.2, 3.45), -0.5),
+            ("OD2", "O", (0.0, -2.0, 3.45), -0.5),
+        ],
+        [("CA", "CB"), ("CB", "CG"), ("CG", "OD1"), ("CG", "OD2")],
+    ),
+    "PHE": (
+        [("CB", "C", (0.0, -0.4, 1.45), 0.0)]
+        + [
+            (name, "C", tuple(pos), 0.0)
+            for name, pos in zip(("CG", "CD1", "CE1", "CZ", "CE2", "CD2"), _phe)
+        ],
+        [("CA", "CB"), ("CB", "CG"), ("CG", "CD1"), ("CD1", "CE1"), ("CE1", "CZ")]
+        + [("CZ", "CE2"), ("CE2", "CD2"), ("CD2", "CG")],
+    ),
+}
+
+
+# Number of random directions tried for every new ligand atom, at the supplement of the
+# tetrahedral angle to the parent bond
+_ncandidates = 12
+_cos_tetrahedral = numpy.cos(numpy.radians(180.0 - 109.47))
+
+
+class SyntheticSystem(NamedTuple):
+    """ A molecule, its force field, and its simulation cell (None if not periodic). """
+
+    mol: Molecule
+    ff: ff.ForceField
+    cell: Optional[Cell]
+
+
+def topology_terms(
+    bonds: numpy.ndarray, natoms: int
+) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Returns all the angles (i, j, k) and proper dihedrals (i, j, k, l) implied by the bonds of
+    shape (nbonds, 2), found at once for all atoms from the sorted adjacency lists.
+    Parameters
+    ----------
+    bonds: numpy.ndarray
+        Bonded atom pairs.
+    natoms: int
+        Number of atoms.
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Angles of shape (nangles, 3) and dihedrals of shape (ndihedrals, 4).
+    """
+    bonds = numpy.asarray(bonds, dtype=numpy.int64).reshape(-1, 2)
+    src = numpy.concatenate((bonds[:, 0], bonds[:, 1]))
+    dst = numpy.concatenate((bonds[:, 1], bonds[:, 0]))
+    order = numpy.lexsort((dst, src))
+    src, dst = src[order], dst[order]
+    start = numpy.searchsorted(src, numpy.arange(natoms + 1))
+    degree = numpy.diff(start)
+
+    # Angles: every pair of neighbors of a center atom
+    position = numpy.arange(len(src)) - start[src]
+    counts = degree[src] - 1 - position
+    first = numpy.repeat(numpy.arange(len(src)), counts)
+    second = _ranges(numpy.arange(len(src)) + 1, counts)
+    angles = numpy.stack((dst[first], src[first], dst[second]), axis=1)
+
+    # Dihedrals: neighbors i of j and l of k around every bond (j, k)
+    j, k = bonds[:, 0], bonds[:, 1]
+    rep = numpy.repeat(numpy.arange(len(bonds)), degree[j])
+    i = dst[_ranges(start[j], degree[j])]
+    keep = i != k[rep]
+    rep, i = rep[keep], i[keep]
+    rep2 = numpy.repeat(numpy.arange(len(rep)), degree[k[rep]])
+    l = dst[_ranges(start[k[rep]], degree[k[rep]])]
+    b = rep[rep2]
+    keep = (l != j[b]) & (l != i[rep2])
+    dihedrals = numpy.stack((i[rep2], j[b], k[b], l), axis=1)[keep]
+    return angles, dihedrals
+
+
+def _measure(
+    x: numpy.ndarray,
+    bonds: numpy.ndarray,
+    angles: numpy.ndarray,
+    dihedrals: numpy.ndarray,
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """Returns the bond lengths, angles, and signed dihedral angles (in degrees, with the
+    convention of :class:``ForceFieldEnergy``) of a geometry."""
+    lengths = numpy.linalg.norm(x[bonds[:, 0]] - x[bonds[:, 1]], axis=1)
+
+    u, v = x[angles[:, 0]] - x[angles[:, 1]], x[angles[:, 2]] - x[angles[:, 1]]
+    cos = numpy.einsum("ij,ij->i", u, v) / (
+        numpy.linalg.norm(u, axis=1) * numpy.linalg.norm(v, axis=1)
+    )
+    theta = numpy.degrees(numpy.arccos(numpy.clip(cos, -1.0, 1.0)))
+
+    i, j, k, l = dihedrals.T
+    r_ij, r_kj, r_kl = x[i] - x[j], x[k] - x[j], x[k] - x[l]
+    m, n = numpy.cross(r_ij, r_kj), numpy.cross(r_kj, r_kl)
+    kj = numpy.linalg.norm(r_kj, axis=1)
+    phi = numpy.degrees(
+        numpy.arctan2(
+            kj * numpy.einsum("ij,ij->i", r_ij, n), numpy.einsum("ij,ij->i", m, n)
+        )
+    )
+    return lengths, theta, phi
+
+
+def _rotations(rng: numpy.random.Generator, n: int) -> numpy.ndarray:
+    """ Uniformly random rotation matrices of shape (n, 3, 3) from random unit quaternions. """
+    q = rng.normal(size=(n, 4))
+    q /= numpy.linalg.norm(q, axis=1, keepdims=True)
+    w, x, y, z = q.T
+    return numpy.stack(
+        [
+            numpy.stack(
+                [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], -1
+            ),
+            numpy.stack(
+                [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], -1
+            ),
+            numpy.stack(
+                [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], -1
+            ),
+        ],
+        axis=1,
+    )
+
+
+def _grid(n: int, spacing: Sequence[float]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """ Returns n points of the smallest near-cubic grid holding them, and the grid box. """
+    spacing = numpy.asarray(spacing, dtype=float)
+    side = numpy.ceil((n * spacing.prod()) ** (1.0 / 3.0) / spacing).astype(int)
+    side = numpy.maximum(side, 1)
+    while side.prod() < n:
+        side[numpy.argmin(side * spacing)] += 1
+    index = numpy.stack(numpy.unravel_index(numpy.arange(n), side), axis=1)
+    return (index + 0.5) * spacing, side * spacing
+
+
+def _system(
+    symbols: numpy.ndarray,
+    geometry: numpy.ndarray,
+    bonds: numpy.ndarray,
+    charges: numpy.ndarray,
+    lj: Dict[str, Tuple[float, float]],
+    springs: Dict[str, float],
+    box: Optional[numpy.ndarray] = None,
+    types: Optional[numpy.ndarray] = None,
+    residues: Optional[List[Tuple[str, int]]] = None,
+    name: Optional[str] = None,
+) -> SyntheticSystem:
+    """Builds a molecule with all the angles and dihedrals implied by its bonds, and a force field
+    whose equilibrium values are those of the input geometry. All the per-atom and per-term
+    parameters are passed as arrays, but the topology and residues of Molecule, and the types
+    and symbols of ForceField, are lists validated item by item: this takes most of the time
+    of large systems, e.g. 8 s of the 9 s of a 1M-atom water box."""
+    natoms = len(symbols)
+    angles, dihedrals = topology_terms(bonds, natoms)
+    if "angles" not in springs:
+        angles = angles[:0]
+    if "dihedrals" not in springs:
+        dihedrals = dihedrals[:0]
+    lengths, theta, phi = _measure(geometry, bonds, angles, dihedrals)
+
+    # Per-element tables are looked up once per unique element
+    elements, inverse = numpy.unique(symbols, return_inverse=True)
+    masses = numpy.array([qcelemental.periodictable.to_mass(e) for e in elements])
+    numbers = numpy.array([qcelemental.periodictable.to_Z(e) for e in elements])
+    sigma = numpy.array([lj[e][0] for e in elements])[inverse]
+    epsilon = numpy.array([lj[e][1] for e in elements])[inverse]
+
+    mol = Molecule(
+        name=name,
+        symbols=symbols,
+        geometry=geometry,
+        masses=masses[inverse],
+        atomic_numbers=numbers[inverse].astype(numpy.int16),
+        connectivity=[(a, b, 1.0) for a, b in bonds.tolist()] or None,
+        angles=angles.tolist() or None,
+        dihedrals=[(a, b, c, d, 1) for a, b, c, d in dihedrals.tolist()] or None,
+        residues=residues,
+    )
+
+    def params(potential, n, key, **kwargs):
+        return potential(spring=numpy.full(n, springs[key]), **kwargs)
+
+    forcefield = ff.ForceField(
+        name=name,
+        nonbonded=ff.nonbonded.NonBonded(
+            params=ff.nonbonded.potentials.LennardJones(epsilon=epsilon, sigma=sigma)
+        ),
+        bonds=ff.bonded.Bonds(
+            params=params(
+                ff.bonded.bonds.potentials.Harmonic,
+                len(bonds),
+                "bonds",
+                lengths=lengths,
+            )
+        )
+        if len(bonds)
+        else None,
+        angles=ff.bonded.Angles(
+            params=params(
+                ff.bonded.angles.potentials.Harmonic,
+                len(angles),
+                "angles",
+                angles=theta,
+                spring_units="kJ/(mol*radians**2)",
+            )
+        )
+        if len(angles)
+        else None,
+        dihedrals=ff.bonded.Dihedrals(
+            params=params(
+                ff.bonded.dihedrals.potentials.Harmonic,
+                len(dihedrals),
+                "dihedrals",
+                angles=phi,
+                spring_units="kJ/(mol*radians**2)",
+            )
+        )
+        if len(dihedrals)
+        else None,
+        charges=charges,
+        masses=masses[inverse],
+        types=list(symbols if types is None else types),
+        symbols=list(symbols),
+    )
+    cell = None if box is None else Cell(vectors=numpy.diag(box))
+    return SyntheticSystem(mol, forcefield, cell)
+
+
+def water_box(
+    nwaters: int, density: float = 0.0334, seed: Optional[int] = None
+) -> SyntheticSystem:
+    """Returns a periodic box of randomly oriented rigid-geometry TIP3P waters placed on a cubic
+    lattice at the given density, with flexible TIP3P-like bonds and angles.
+    Parameters
+    ----------
+    nwaters: int
+        Number of water molecules, i.e. 3 * nwaters atoms.
+    density: float, optional
+        Number density in molecules per cubic angstrom. Defaults to that of liquid water.
+    seed: int, optional
+        Seed of the random orientations.
+    Returns
+    -------
+    SyntheticSystem
+        Molecule, force field, and cubic cell.
+    """
+    rng = numpy.random.default_rng(seed)
+    half = numpy.radians(_water_hoh / 2.0)
+    template = _water_oh * numpy.array(
+        [
+            [0.0, 0.0, 0.0],
+            [numpy.sin(half), numpy.cos(half), 0.0],
+            [-numpy.sin(half), numpy.cos(half), 0.0],
+        ]
+    )
+    centers, box = _grid(nwaters, [density ** (-1.0 / 3.0)] * 3)
+    geometry = centers[:, None, :] + template @ _rotations(rng, nwaters).transpose(
+        0, 2, 1
+    )
+    oxygen = numpy.arange(0, 3 * nwaters, 3)
+    bonds = numpy.stack(
+        (numpy.repeat(oxygen, 2), (oxygen[:, None] + [1, 2]).ravel()), axis=1
+    )
+    symbols = numpy.tile(["O", "H", "H"], nwaters)
+    return _system(
+        symbols,
+        geometry.reshape(-1, 3),
+        bonds,
+        numpy.tile(_water_charges, nwaters),
+        _water_lj,
+        _water_springs,
+        box=box,
+        types=numpy.tile(["OW", "HW", "HW"], nwaters),
+        residues=[
+            ("HOH", n) for n in numpy.repeat(numpy.arange(1, nwaters + 1), 3).tolist()
+        ],
+        name="water",
+    )
+
+
+def polymer_chains(
+    nchains: int,
+    length: int,
+    seed: Optional[int] = None,
+    spacing: float = 4.5,
+    noise: float = 0.05,
+) -> SyntheticSystem:
+    """Returns parallel united-atom polyethylene-like chains in the all-trans conformation, packed
+    on a square lattice, with full connectivity, angles, and dihedrals.
+    Parameters
+    ----------
+    nchains: int
+        Number of chains.
+    length: int
+        Number of monomers (atoms) per chain.
+    seed: int, optional
+        Seed of the random displacements.
+    spacing: float, optional
+        Distance between neighboring chains in angstroms. Defaults to 4.5.
+    noise: float, optional
+        Standard deviation of the random atomic displacements in angstroms. Defaults to 0.05.
+    Returns
+    -------
+    SyntheticSystem
+        Molecule, force field, and cell, periodic across the chains only.
+    """
+    rng = numpy.random.default_rng(seed)
+    bond, angle = 1.53, numpy.radians(111.0)
+    step = bond * numpy.sin(angle / 2.0)
+    zigzag = numpy.zeros((length, 3))
+    zigzag[:, 0] = numpy.arange(length) * step
+    zigzag[1::2, 1] = bond * numpy.cos(angle / 2.0)
+
+    ny = int(numpy.ceil(numpy.sqrt(nchains)))
+    nz = int(numpy.ceil(nchains / ny))
+    y, z = numpy.divmod(numpy.arange(nchains), nz)
+    offsets = numpy.stack((numpy.zeros(nchains), y + 0.5, z + 0.5), axis=1) * spacing
+    geometry = (
+        offsets[:, None, :] + zigzag + noise * rng.normal(size=(nchains, length, 3))
+    )
+
+    index = numpy.arange(nchains * length).reshape(nchains, length)
+    bonds = numpy.stack((index[:, :-1].ravel(), index[:, 1:].ravel()), axis=1)
+    system = _system(
+        numpy.full(nchains * length, "C"),
+        geometry.reshape(-1, 3),
+        bonds,
+        numpy.zeros(nchains * length),
+        _lj,
+        _springs,
+        types=numpy.full(nchains * length, "CH2"),
+        name="polymer",
+    )
+    cell = Cell(
+        vectors=numpy.diag([length * step + 10.0, ny * spacing, nz * spacing]),
+        origin=[-5.0, 0.0, 0.0],
+        periodic=(False, True, True),
+    )
+    return system._replace(cell=cell)
+
+
+def random_protein(
+    nresidues: int,
+    seed: Optional[int] = None,
+    residues: Optional[Sequence[str]] = None,
+    width: int = 20,
+) -> SyntheticSystem:
+    """Returns a single chain of random sequence built from united-atom residue templates, folded
+    as a serpentine filling a box so that residues do not overlap. Residues are replicated at once
+    per template.
+    Parameters
+    ----------
+    nresidues: int
+        Number of residues.
+    seed: int, optional
+        Seed of the random sequence.
+    residues: Sequence[str], optional
+        Residue names to draw from. Defaults to all of ``residue_templates``.
+    width: int, optional
+        Number of residues per straight segment of the serpentine. Defaults to 20.
+    Returns
+    -------
+    SyntheticSystem
+        Molecule (with residues) and force field, not periodic.
+    """
+    rng = numpy.random.default_rng(seed)
+    names = sorted(residue_templates) if residues is None else list(residues)
+    unknown = set(names) - set(residue_templates)
+    if unknown:
+        raise ValueError(
+            f"Unknown residues {sorted(unknown)}. Choose among {sorted(residue_templates)}."
+        )
+    sequence = rng.integers(len(names), size=nresidues)
+
+    # Residue frames: position along the serpentine and direction of the chain (+x or -x).
+    # Straight segments run in lanes along y, and lanes fill layers along z back and forth so
+    # that consecutive segments are always adjacent.
+    row, col = numpy.divmod(numpy.arange(nresidues), width)
+    forward = row % 2 == 0
+    nlanes = int(numpy.ceil(numpy.sqrt(row.max() + 1)))
+    layer, lane = numpy.divmod(row, nlanes)
+    lane = numpy.where(layer % 2 == 0, lane, nlanes - 1 - lane)
+    origin = numpy.stack(
+        (
+            numpy.where(forward, col, width - 1 - col) * _rise,
+            lane * _lane_spacing,
+            layer * _layer_spacing,
+        ),
+        axis=1,
+    )
+    sign = numpy.where(forward, 1.0, -1.0)
+
+    # Atoms of every residue template replicated at once over the residues using it
+    natoms_of = numpy.array(
+        [len(_backbone) + len(residue_templates[name][0]) for name in names]
+    )
+    counts = natoms_of[sequence]
+    first = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    natoms = int(counts.sum())
+    symbols = numpy.empty(natoms, dtype="<U2")
+    geometry = numpy.empty((natoms, 3))
+    charges = numpy.empty(natoms)
+    types = numpy.empty(natoms, dtype="<U4")
+    bonds = []
+    for t, name in enumerate(names):
+        atoms = _backbone + residue_templates[name][0]
+        labels = [atom[0] for atom in atoms]
+        where = numpy.flatnonzero(sequence == t)
+        if not len(where):
+            continue
+        index = first[where][:, None] + numpy.arange(len(atoms))
+        local = numpy.array([atom[2] for atom in atoms])
+        # Flipping x and y keeps the template chirality in the reversed segments
+        geometry[index] = (
+            origin[where][:, None, :]
+            + local
+            * numpy.stack((sign[where], sign[where], numpy.ones(len(where))), axis=1)[
+                :, None, :
+            ]
+        )
+        symbols[index] = [atom[1] for atom in atoms]
+        types[index] = labels
+        charges[index] = [atom[3] for atom in atoms]
+        pairs = numpy.array(
+            [
+                (labels.index(a), labels.index(b))
+                for a, b in _backbone_bonds + residue_templates[name][1]
+            ]
+        )
+        bonds.append((first[where][:, None, None] + pairs).reshape(-1, 2))
+
+    # Peptide bonds C(i)-N(i+1), within straight segments or across the turns
+    c = first[:-1] + 2
+    bonds.append(numpy.stack((c, first[1:]), axis=1))
+    bonds = numpy.concatenate(bonds)
+    return _system(
+        symbols,
+        geometry,
+        bonds,
+        charges,
+        _lj,
+        _springs,
+        types=types,
+        residues=[
+            (names[s], n)
+            for s, n in zip(
+                numpy.repeat(sequence, counts).tolist(),
+                numpy.repeat(numpy.arange(1, nresidues + 1), counts).tolist(),
+            )
+        ],
+        name="protein",
+    )
+
+
+def ligand_library(
+    nligands: int,
+    natoms: Tuple[int, int] = (10, 40),
+    seed: Optional[int] = None,
+) -> List[SyntheticSystem]:
+    """Returns random united-atom ligands: branched trees of heavy atoms grown outwards with bond
+    lengths of 1.5 angstroms, generated at once for all ligands one atom index at a time.
+    Parameters
+    ----------
+    nligands: int
+        Number of ligands.
+    natoms: Tuple[int, int], optional
+        Smallest and largest number of atoms per ligand. Defaults to (10, 40).
+    seed: int, optional
+        Seed of the random compositions and shapes.
+    Returns
+    -------
+    List[SyntheticSystem]
+        Molecule and force field of every ligand, not periodic.
+    """
+    rng = numpy.random.default_rng(seed)
+    sizes = rng.integers(natoms[0], natoms[1] + 1, size=nligands)
+    nmax = int(sizes.max())
+    elements = numpy.array(["C", "N", "O", "S"])
+    symbols = elements[rng.choice(4, size=(nligands, nmax), p=[0.72, 0.12, 0.13, 0.03])]
+
+    # Every atom is bonded to its predecessor or, to branch, to a random earlier atom with
+    # fewer than 4 bonds
+    parent = numpy.zeros((nligands, nmax), dtype=numpy.int64)
+    degree = numpy.zeros((nligands, nmax), dtype=numpy.int64)
+    geometry = numpy.zeros((nligands, nmax, 3))
+    rows = numpy.arange(nligands)
+    for k in range(1, nmax):
+        p = numpy.where(
+            rng.random(nligands) < 0.7, k - 1, rng.integers(0, k, size=nligands)
+        )
+        full = degree[rows, p] >= 4
+        p[full] = k - 1
+        parent[:, k] = p
+        degree[rows, p] += 1
+        degree[:, k] = 1
+        # Candidate bonds at the tetrahedral angle to the parent bond (any direction for the
+        # first bond), keeping the one farthest from the other atoms placed so far
+        outward = geometry[rows, p] - geometry[rows, parent[rows, p]]
+        norm = numpy.linalg.norm(outward, axis=1, keepdims=True)
+        outward = numpy.divide(
+            outward, norm, out=numpy.zeros_like(outward), where=norm > 0
+        )
+        side = rng.normal(size=(nligands, _ncandidates, 3))
+        side -= numpy.einsum("ijk,ik->ij", side, outward)[..., None] * outward[:, None]
+        side /= numpy.linalg.norm(side, axis=2, keepdims=True)
+        direction = numpy.where(
+            norm[:, None] > 0,
+            _cos_tetrahedral * outward[:, None]
+            + numpy.sqrt(1.0 - _cos_tetrahedral ** 2) * side,
+            side,
+        )
+        candidates = geometry[rows, p][:, None, :] + 1.5 * direction
+        d = candidates[:, :, None, :] - geometry[:, None, :k, :]
+        d2 = numpy.einsum("ijkl,ijkl->ijk", d, d)
+        d2[rows, :, p] = numpy.inf
+        d2[rows, :, parent[rows, p]] = numpy.inf
+        geometry[:, k] = candidates[rows, d2.min(-1).argmax(-1)]
+
+    library = []
+    for n, size in enumerate(sizes.tolist()):
+        sym = symbols[n, :size]
+        charges = rng.normal(scale=0.2, size=size)
+        charges -= charges.mean()
+        bonds = numpy.stack((parent[n, 1:size], numpy.arange(1, size)), axis=1)
+        library.append(
+            _system(
+                sym,
+                geometry[n, :size],
+                bonds,
+                charges,
+                _lj,
+                _springs,
+                name=f"ligand{n}",
+            )
+        )
+    return library
@@ -0,0 +1,415 @@
+""" Tabulated cubic-spline evaluation of nonbonded potentials """
+
+__all__ = [
+    "CubicSpline",
+    "PairTable",
+    "EAMTable",
+    "tabulate",
+    "eam_table",
+    "lennard_jones_table",
+]
+
+from typing import Callable, Optional, Tuple, Union
+import hashlib
+import numpy
+
+from mmelemental.models.forcefield import ForceField, CompressedForceField
+from mmelemental.models.forcefield.nonbonded.potentials import EAM
+from mmelemental.util.cache import LRUCache
+from mmelemental.util.units import convert
+from .mixing import MixingTable, mixing_table
+
+# Splines built by eam_table and lennard_jones_table
+_tables = LRUCache(maxsize=32, maxbytes=2 ** 28)
+
+
+class CubicSpline:
+    """Piecewise cubic polynomials defined on the knots ``x`` for one or more tabulated
+    functions (columns). On segment k, f(x) = a + t * (b + t * (c + t * d)) with t = x - x[k].
+    Parameters
+    ----------
+    x: numpy.ndarray
+        Increasing knots of shape (nknots,).
+    coeffs: numpy.ndarray
+        Polynomial coefficients (a, b, c, d) of shape (ncols, nknots - 1, 4).
+    """
+
+    def __init__(self, x: numpy.ndarray, coeffs: numpy.ndarray):
+        self.x = numpy.asarray(x, dtype=float)
+        self.coeffs = numpy.ascontiguousarray(coeffs, dtype=float)
+        if self.coeffs.shape[1:] != (len(self.x) - 1, 4):
+            raise ValueError(
+                f"Coefficients must be of shape (ncols, {len(self.x) - 1}, 4)."
+            )
+        # Coefficient planes of shape (4, ncols * nsegments) for contiguous gathers
+        self._planes = numpy.ascontiguousarray(self.coeffs.reshape(-1, 4).T)
+        # Uniform grids are indexed arithmetically, others with a binary search
+        h = numpy.diff(self.x)
+        self._inv_dx = 1.0 / h[0] if numpy.allclose(h, h[0], rtol=1e-10) else None
+
+    @property
+    def ncols(self) -> int:
+        return self.coeffs.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.x.nbytes + self.coeffs.nbytes
+
+    # Constructors
+    @classmethod
+    def from_values(cls, x: numpy.ndarray, y: numpy.ndarray) -> "CubicSpline":
+        """
+        Constructs a natural cubic spline (zero second derivatives at both ends) through tabulated values.
+        Parameters
+        ----------
+        x: numpy.ndarray
+            Increasing knots of shape (nknots,).
+        y: numpy.ndarray
+            Function values of shape (nknots,) or (ncols, nknots).
+        Returns
+        -------
+        CubicSpline
+            A constructed CubicSpline object.
+        """
+        x = numpy.asarray(x, dtype=float)
+        y = numpy.atleast_2d(numpy.asarray(y, dtype=float))
+        n = len(x)
+        if n < 3 or y.shape[1] != n:
+            raise ValueError("At least 3 knots with a value per knot are required.")
+
+        h = numpy.diff(x)
+        slope = numpy.diff(y, axis=1) / h
+        rhs = 6.0 * numpy.diff(slope, axis=1)
+
+        # Thomas algorithm for the tridiagonal system of second derivatives, vectorized over columns
+        diag = 2.0 * (h[:-1] + h[1:])
+        cp = numpy.empty(n - 2)
+        dp = numpy.empty_like(rhs)
+        cp[0], dp[:, 0] = h[1] / diag[0], rhs[:, 0] / diag[0]
+        for k in range(1, n - 2):
+            denom = diag[k] - h[k] * cp[k - 1]
+            cp[k] = h[k + 1] / denom
+            dp[:, k] = (rhs[:, k] - h[k] * dp[:, k - 1]) / denom
+        m = numpy.zeros_like(y)
+        m[:, n - 2] = dp[:, -1]
+        for k in range(n - 4, -1, -1):
+            m[:, k + 1] = dp[:, k] - cp[k] * m[:, k + 2]
+
+        coeffs = numpy.empty((len(y), n - 1, 4))
+        coeffs[..., 0] = y[:, :-1]
+        coeffs[..., 1] = slope - h * (2.0 * m[:, :-1] + m[:, 1:]) / 6.0
+        coeffs[..., 2] = 0.5 * m[:, :-1]
+        coeffs[..., 3] = (m[:, 1:] - m[:, :-1]) / (6.0 * h)
+        return cls(x, coeffs)
+
+    @classmethod
+    def from_derivatives(
+        cls, x: numpy.ndarray, y: numpy.ndarray, dydx: numpy.ndarray
+    ) -> "CubicSpline":
+        """
+        Constructs a cubic Hermite spline from tabulated values and first derivatives.
+        Parameters
+        ----------
+        x: numpy.ndarray
+            Increasing knots of shape (nknots,).
+        y: numpy.ndarray
+            Function values of shape (nknots,) or (ncols, nknots).
+        dydx: numpy.ndarray
+            First derivatives of the same shape as ``y``.
+        Returns
+        -------
+        CubicSpline
+            A constructed CubicSpline object.
+        """
+        x = numpy.asarray(x, dtype=float)
+        y = numpy.atleast_2d(numpy.asarray(y, dtype=float))
+        dydx = numpy.atleast_2d(numpy.asarray(dydx, dtype=float))
+        if y.shape != dydx.shape or y.shape[1] != len(x):
+            raise ValueError("Values and derivatives must be supplied for every knot.")
+
+        h = numpy.diff(x)
+        slope = numpy.diff(y, axis=1) / h
+        m0, m1 = dydx[:, :-1], dydx[:, 1:]
+
+        coeffs = numpy.empty((len(y), len(x) - 1, 4))
+        coeffs[..., 0] = y[:, :-1]
+        coeffs[..., 1] = m0
+        coeffs[..., 2] = (3.0 * slope - 2.0 * m0 - m1) / h
+        coeffs[..., 3] = (m0 + m1 - 2.0 * slope) / h ** 2
+        return cls(x, coeffs)
+
+    # Evaluation
+    def _segments(self, r: numpy.ndarray) -> numpy.ndarray:
+        nseg = len(self.x) - 1
+        if self._inv_dx is not None:
+            seg = ((r - self.x[0]) * self._inv_dx).astype(numpy.intp)
+            return numpy.clip(seg, 0, nseg - 1, out=seg)
+        return numpy.searchsorted(self.x[1:-1], r, side="right")
+
+    def _gather(
+        self, r: numpy.ndarray, column: Optional[Union[int, numpy.ndarray]]
+    ) -> Tuple[numpy.ndarray, ...]:
+        seg = self._segments(r)
+        t = r - self.x[seg]
+        if column is not None:
+            seg = seg + numpy.asarray(column) * (len(self.x) - 1)
+        return (t,) + tuple(numpy.take(plane, seg) for plane in self._planes)
+
+    def evaluate(
+        self, r: numpy.ndarray, column: Optional[Union[int, numpy.ndarray]] = None
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the values and first derivatives at ``r``. Points outside the knots are
+        extrapolated from the end segments.
+        Parameters
+        ----------
+        r: numpy.ndarray
+            Evaluation points of any shape.
+        column: int or numpy.ndarray, optional
+            Tabulated function to evaluate, either a single column or one column per point.
+            Defaults to the first column.
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Values and derivatives of the same shape as ``r``.
+        """
+        t, a, b, c, d = self._gather(numpy.asarray(r, dtype=float), column)
+        return a + t * (b + t * (c + t * d)), b + t * (2.0 * c + t * (3.0 * d))
+
+    def __call__(
+        self, r: numpy.ndarray, column: Optional[Union[int, numpy.ndarray]] = None
+    ) -> numpy.ndarray:
+        """ Returns the values at ``r``. See ``evaluate``. """
+        t, a, b, c, d = self._gather(numpy.asarray(r, dtype=float), column)
+        return a + t * (b + t * (c + t * d))
+
+
+def tabulate(
+    func: Callable,
+    rmin: float,
+    rmax: float,
+    npoints: int = 2048,
+    dfunc: Optional[Callable] = None,
+) -> CubicSpline:
+    """Tabulates an analytic function on a uniform grid for fast repeated evaluation.
+    Parameters
+    ----------
+    func: Callable
+        Function of r returning values of shape (npoints,) or (ncols, npoints).
+    rmin, rmax: float
+        Tabulation range.
+    npoints: int, optional
+        Number of knots. Defaults to 2048.
+    dfunc: Callable, optional
+        Analytic first derivative of ``func``. If supplied, a cubic Hermite spline is built,
+        otherwise a natural cubic spline.
+    Returns
+    -------
+    CubicSpline
+        Tabulated function.
+    """
+    r = numpy.linspace(rmin, rmax, npoints)
+    if dfunc is not None:
+        return CubicSpline.from_derivatives(r, func(r), dfunc(r))
+    return CubicSpline.from_values(r, func(r))
+
+
+class PairTable:
+    """Tabulated pair potential with one spline column per pair of atom types, in kJ/mol and angstroms.
+    Atoms are mapped to types with ``type_index``. Energies beyond ``rmax`` are zero."""
+
+    def __init__(self, spline: CubicSpline, type_index: numpy.ndarray, ntypes: int):
+        self.spline = spline
+        self.type_index = type_index
+        self.ntypes = ntypes
+
+    @property
+    def rmax(self) -> float:
+        return self.spline.x[-1]
+
+    def evaluate(
+        self, i: numpy.ndarray, j: numpy.ndarray, r: numpy.ndarray
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """ Returns the energy and its derivative dE/dr of every (i[k], j[k]) atom pair at distance r[k]. """
+        column = self.type_index[i] * self.ntypes + self.type_index[j]
+        energy, dedr = self.spline.evaluate(r, column)
+        outside = r >= self.rmax
+        energy[outside] = dedr[outside] = 0.0
+        return energy, dedr
+
+    def energy(
+        self, i: numpy.ndarray, j: numpy.ndarray, r: numpy.ndarray
+    ) -> numpy.ndarray:
+        """ Returns the energy of every (i[k], j[k]) atom pair at distance r[k]. """
+        column = self.type_index[i] * self.ntypes + self.type_index[j]
+        return numpy.where(r < self.rmax, self.spline(r, column), 0.0)
+
+
+def lennard_jones_table(
+    ff: Union[ForceField, CompressedForceField, MixingTable],
+    rmin: float,
+    rmax: float,
+    npoints: int = 2048,
+    rule: Union[str, Callable] = "lorentz-berthelot",
+) -> PairTable:
+    """Tabulates the Lennard-Jones interactions of every pair of atom types. Hermite splines are built
+    from the exact energies and forces so the interpolation error decays as (grid spacing)**4.
+    Parameters
+    ----------
+    ff: ForceField, CompressedForceField, or MixingTable
+        Force field with :class:``LennardJones`` non-bonded parameters or its precomputed mixing table.
+    rmin, rmax: float
+        Tabulation range in angstroms. ``rmax`` is the cutoff.
+    npoints: int, optional
+        Number of knots. Defaults to 2048.
+    rule: str or Callable, optional
+        Combination rule used if ``ff`` is a force field. See :func:``mixing.combine``.
+    Returns
+    -------
+    PairTable
+        Tabulated Lennard-Jones interactions.
+    """
+    table = ff if isinstance(ff, MixingTable) else mixing_table(ff, rule=rule)
+    m = hashlib.sha1(table.c6.tobytes())
+    m.update(table.c12.tobytes())
+    key = ("LennardJones", m.hexdigest(), float(rmin), float(rmax), npoints)
+
+    spline = _tables.get(key)
+    if spline is None:
+        c6, c12 = table.c6.reshape(-1, 1), table.c12.reshape(-1, 1)
+
+        def func(r):
+            ir6 = 1.0 / r ** 6
+            return (c12 * ir6 - c6) * ir6
+
+        def dfunc(r):
+            ir6 = 1.0 / r ** 6
+            return (6.0 * c6 - 12.0 * c12 * ir6) * ir6 / r
+
+        spline = tabulate(func, rmin, rmax, npoints, dfunc=dfunc)
+        _tables.put(key, spline, nbytes=spline.nbytes)
+
+    return PairTable(spline, table.type_index, table.ntypes)
+
+
+class EAMTable:
+    """Tabulated embedded-atom method potential. E = sum_i F(rho_i) + sum_{i<j} phi(r_ij) with
+    rho_i = sum_j f(r_ij), where F is the embedding energy, f the electron density, and phi the pair
+    potential. Energies are in kJ/mol and distances in angstroms."""
+
+    def __init__(self, embed: CubicSpline, density: CubicSpline, pair: CubicSpline):
+        self.embed = embed
+        self.density = density
+        self.pair = pair
+
+    @property
+    def rmax(self) -> float:
+        return min(self.density.x[-1], self.pair.x[-1])
+
+    def evaluate(
+        self,
+        i: numpy.ndarray,
+        j: numpy.ndarray,
+        r: numpy.ndarray,
+        natoms: int,
+        pair_index: Optional[Union[int, numpy.ndarray]] = None,
+    ) -> Tuple[float, numpy.ndarray]:
+        """Returns the total energy and dE/dr of every neighbor pair.
+        Parameters
+        ----------
+        i, j: numpy.ndarray
+            Atom indices of every unique (i < j) neighbor pair.
+        r: numpy.ndarray
+            Distance of every neighbor pair.
+        natoms: int
+            Number of atoms.
+        pair_index: int or numpy.ndarray, optional
+            Row of ``EAM.pair`` to use for every pair. Defaults to the first row.
+        Returns
+        -------
+        Tuple[float, numpy.ndarray]
+            Total energy and its derivative with respect to every pair distance.
+        """
+        inside = r < self.rmax
+        dens, ddens = self.density.evaluate(r)
+        phi, dphi = self.pair.evaluate(r, pair_index)
+        dens[~inside] = ddens[~inside] = phi[~inside] = dphi[~inside] = 0.0
+
+        rho = numpy.bincount(i, dens, minlength=natoms) + numpy.bincount(
+            j, dens, minlength=natoms
+        )
+        embed, dembed = self.embed.evaluate(rho)
+        dedr = dphi + (dembed[i] + dembed[j]) * ddens
+        return embed.sum() + phi.sum(), dedr
+
+    def energy(
+        self,
+        i: numpy.ndarray,
+        j: numpy.ndarray,
+        r: numpy.ndarray,
+        natoms: int,
+        pair_index: Optional[Union[int, numpy.ndarray]] = None,
+    ) -> float:
+        """ Returns the total energy. See ``evaluate``. """
+        return self.evaluate(i, j, r, natoms, pair_index)[0]
+
+
+def eam_table(
+    params: EAM, dr: float, drho: float, rmin: float = 0.0, rhomin: float = 0.0
+) -> EAMTable:
+    """Builds (or returns the cached) spline tables of EAM parameters. ``density`` and every row of
+    ``pair`` are sampled on the same uniform distance grid, and ``embed`` on a uniform density grid.
+    Parameters
+    ----------
+    params: EAM
+        EAM potential parameters.
+    dr: float
+        Distance grid spacing in angstroms.
+    drho: float
+        Electron density grid spacing.
+    rmin: float, optional
+        First point of the distance grid. Defaults to 0.
+    rhomin: float, optional
+        First point of the density grid. Defaults to 0.
+    Returns
+    -------
+    EAMTable
+        Tabulated EAM potential.
+    """
+    m = hashlib.sha1()
+    for name in ("embed", "density", "pair"):
+        m.update(getattr(params, name).tobytes())
+    key = (
+        "EAM",
+        m.hexdigest(),
+        params.embed_units,
+        params.pair_units,
+        dr,
+        drho,
+        rmin,
+        rhomin,
+    )
+
+    table = _tables.get(key)
+    if table is not None:
+        return table
+
+    embed, pair = params.embed, params.pair
+    if params.embed_units != "kJ/mol":
+        embed = convert(embed, params.embed_units, "kJ/mol")
+    if params.pair_units != "kJ/mol":
+        pair = convert(pair, params.pair_units, "kJ/mol")
+
+    rho_grid = rhomin + drho * numpy.arange(len(embed))
+    table = EAMTable(
+        embed=CubicSpline.from_values(rho_grid, embed),
+        density=CubicSpline.from_values(
+            rmin + dr * numpy.arange(len(params.density)), params.density
+        ),
+        pair=CubicSpline.from_values(rmin + dr * numpy.arange(pair.shape[1]), pair),
+    )
+    _tables.put(
+        key,
+        table,
+        nbytes=table.embed.nbytes + table.density.nbytes + table.pair.nbytes,
+    )
+    return table
@@ -1 +1 @@
-from . import collect, chem, molecule, app, solvent, util, forcefield
+from . import cell, collect, chem, molecule, app, solvent, util, forcefield
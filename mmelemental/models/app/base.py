@@ -3,9 +3,11 @@ from mmelemental.models.molecule.mm_mol import Molecule
 from mmelemental.models.collect.sm_ensem import Ensemble
 from mmelemental.models.collect.mm_traj import Trajectory
 from mmelemental.models.solvent.implicit import Solvent
+from mmelemental.models.cell.box import Cell
 from mmelemental.models.forcefield import ForceField
+from mmelemental.util import serialization
 from pydantic import Field
-from typing import Tuple, List, Union, Dict, Optional
+from typing import Any, Tuple, List, Union, Dict, Optional
 
 __all__ = ["SimInput", "SimOutput"]
 
@@ -19,17 +21,22 @@ class SimInput(ProtoModel):
         description="Molecular mechanics molecule object(s). See the :class:``Molecule`` class. "
         "Example: mol = {'ligand': Molecule, 'receptor': Molecule, 'solvent': Molecule}.",
     )
-    cell: Tuple[Tuple[float], Tuple[float]] = Field(
+    cell: Union[Cell, Tuple[Tuple[float, ...], Tuple[float, ...]]] = Field(
         None,
-        description="Cell dimensions in the form: ((xmin, ymin, ...), (xmax, ymax, ...))",
+        description="Simulation cell, see the :class:``Cell`` class for triclinic cells, or orthorhombic cell "
+        "dimensions in the form: ((xmin, ymin, ...), (xmax, ymax, ...))",
     )
     forcefield: Dict[str, ForceField] = Field(
         None, description='Forcefield object(s) for every Molecule defined in "mol".'
     )
-    boundary: Tuple[str] = Field(
+    boundary: Tuple[str, ...] = Field(
         None,
         description="Boundary conditions in all dimensions e.g. (periodic, periodic, periodic) imposes periodic boundaries in 3D.",
     )
+    solvent: Optional[Solvent] = Field(
+        None,
+        description="Implicit solvent model. See the :class:``Solvent`` class.",
+    )
 
     # Temporal fields
     march_method: str = Field(
@@ -85,6 +92,34 @@ class SimInput(ProtoModel):
     )
     restart_file: str = Field(None, description="Name of restart output file.")
 
+    @classmethod
+    def from_file(cls, filename: str, **kwargs: Dict[str, Any]) -> "SimInput":
+        """Constructs a simulation input from a JSON or msgpack file, e.g. written by
+        :meth:``to_file``, decompressed on the fly if it ends with .gz, .bz2, .xz, or .zst.
+        Parameters
+        ----------
+        filename: str
+            Input filename with a .json or .msgpack extension.
+        **kwargs: Dict[str, Any], optional
+            Additional fields, taking precedence over the file.
+        Returns
+        -------
+        SimInput
+            A constructed simulation input of this class.
+        """
+        return serialization.load_model(cls, filename, **kwargs)
+
+    def to_file(
+        self, filename: str, compresslevel: Optional[int] = None, threads: int = 0
+    ) -> None:
+        """Writes the simulation input with its molecules and force fields to a JSON or msgpack
+        file, depending on the filename extension, compressed if it ends with .gz, .bz2, .xz, or
+        .zst e.g. sim.json.gz. See :func:``mmelemental.util.compression.open_file`` for the
+        compression level and threads."""
+        serialization.dump_model(
+            self, filename, compresslevel=compresslevel, threads=threads
+        )
+
 
 class SimOutput(ProtoModel):
     """ Basic model for molecular simulation output."""
@@ -92,6 +127,10 @@ class SimOutput(ProtoModel):
     simInput: SimInput = Field(
         ..., description="Simulation input used to generate the output."
     )
+    mol: Optional[Dict[str, Molecule]] = Field(
+        None,
+        description="Final state of the molecule(s) e.g. the minimized structure, keyed as in ``SimInput.mol``.",
+    )
     ensemble: Ensemble = Field(
         None,
         description="Ensemble output for a series of microstates of molecules. "
@@ -1,4 +1,4 @@
-from mmelemental.models.app.base import SimInput
+from mmelemental.models.app.base import SimInput, SimOutput
 from mmelemental.models.molecule.mm_mol import Molecule
 from pydantic import Field
 from typing import Tuple, Union
@@ -50,3 +50,11 @@ class DynamicsInput(SimInput):
         None,
         description="Which reference coordinates to scale the matrix of the pressure coupling with. Options: no, all, or com.",
     )
+
+
+class DynamicsOutput(SimOutput):
+    """ Molecular dynamics output schema."""
+
+    simInput: DynamicsInput = Field(
+        ..., description="Dynamics input used to generate the output."
+    )
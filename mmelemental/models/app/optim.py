@@ -1,4 +1,4 @@
-from mmelemental.models.app.base import SimInput
+from mmelemental.models.app.base import SimInput, SimOutput
 from pydantic import Field
 from typing import Tuple, Union
 
@@ -8,3 +8,13 @@ class OptimInput(SimInput):
         None,
         description="Tolerance used to indicate when the optimization scheme has converd.",
     )
+
+
+class OptimOutput(SimOutput):
+    simInput: OptimInput = Field(
+        ..., description="Optimization input used to generate the output."
+    )
+    converged: bool = Field(
+        None,
+        description="Whether the optimization converged within ``OptimInput.tol`` before running out of steps.",
+    )
@@ -1,7 +1,8 @@
 from qcelemental import models
-from pydantic import Field, ValidationError, validator
+from pydantic import Field, PrivateAttr, ValidationError, validator
 from typing import Dict, Optional
 from mmelemental.extras import get_information
+from mmelemental.util.memory import MemoryUsage, memory_usage
 from typing import Optional
 
 
@@ -38,6 +39,13 @@ class ProtoModel(models.ProtoModel):
         description="The provenance information about how this object (and its attributes) were generated, "
         "provided, and manipulated.",
     )
+    # Memoized digest of the model data, see mmelemental.util.cache.content_key
+    _content_key: Optional[str] = PrivateAttr(None)
+
+    def copy(self, *args, **kwargs):
+        model = super().copy(*args, **kwargs)
+        model._content_key = None  # the data may be updated
+        return model
 
     def dict(self, *args, **kwargs):
         kwargs["by_alias"] = True
@@ -52,3 +60,13 @@ class ProtoModel(models.ProtoModel):
             for key, val in cls.__fields__.items()
             if val.name.endswith("_units")
         }
+
+    def memory_usage(self) -> MemoryUsage:
+        """Returns the bytes held by the model: array buffers, string arrays, and Python objects
+        such as lists of tuples, split into owned and shared buffers and by top-level field."""
+        return memory_usage(self)
+
+    @property
+    def nbytes(self) -> int:
+        """ Total bytes held by the model. See :meth:``memory_usage``. """
+        return memory_usage(self).total
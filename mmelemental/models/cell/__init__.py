@@ -0,0 +1 @@
+from .box import *
@@ -0,0 +1,188 @@
+from mmelemental.models.base import ProtoModel
+from pydantic import Field, validator
+from qcelemental.models.types import Array
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy
+
+
+__all__ = ["Cell"]
+
+
+class Cell(ProtoModel):
+    """Periodic simulation cell defined by its box vectors, which may be triclinic. A cell varying
+    per frame e.g. in NPT trajectories stores one set of box vectors per frame."""
+
+    vectors: Array[float] = Field(
+        ...,
+        description="Box vectors a, b, c as the rows of an array of shape (3, 3), or (nframes, 3, 3) "
+        "for one cell per frame. Default unit is Angstroms.",
+    )
+    vectors_units: Optional[str] = Field(
+        "angstrom", description="Units of the box vectors and origin."
+    )
+    origin: Optional[Array[float]] = Field(
+        None, description="Position of the cell corner of shape (3,). Defaults to 0."
+    )
+    periodic: Optional[Tuple[bool, bool, bool]] = Field(
+        (True, True, True),
+        description="Whether the cell is periodic along each box vector.",
+    )
+
+    @validator("vectors")
+    def _valid_vectors(cls, v):
+        try:
+            v = v.reshape(-1, 3, 3)
+        except ValueError:
+            raise ValueError("Box vectors must be castable to shape (nframes, 3, 3)!")
+        if numpy.any(numpy.abs(numpy.linalg.det(v)) == 0):
+            raise ValueError("Box vectors must be linearly independent.")
+        return v[0] if len(v) == 1 else v
+
+    @validator("origin")
+    def _valid_origin(cls, v):
+        if v is not None and v.size != 3:
+            raise ValueError("Cell origin must be of shape (3,).")
+        return v if v is None else v.reshape(3)
+
+    # Constructors
+    @classmethod
+    def from_lengths_angles(
+        cls,
+        lengths: Union[Sequence[float], numpy.ndarray],
+        angles: Union[Sequence[float], numpy.ndarray] = (90.0, 90.0, 90.0),
+        **kwargs,
+    ) -> "Cell":
+        """Constructs a Cell from its edge lengths (a, b, c) and angles (alpha, beta, gamma) in degrees,
+        with a along x and b in the xy plane.
+        Parameters
+        ----------
+        lengths: Sequence[float] or numpy.ndarray
+            Edge lengths of shape (3,), or (nframes, 3) for one cell per frame.
+        angles: Sequence[float] or numpy.ndarray, optional
+            Angles between b and c, a and c, and a and b, of shape (3,) or (nframes, 3). Defaults to
+            right angles.
+        **kwargs: Dict[str, Any]
+            Additional fields e.g. origin, periodic, or vectors_units.
+        Returns
+        -------
+        Cell
+            A constructed Cell object.
+        """
+        from mmelemental.compute.pbc import cell_vectors
+
+        lengths = numpy.asarray(lengths, dtype=float)
+        angles = numpy.broadcast_to(numpy.asarray(angles, dtype=float), lengths.shape)
+        return cls(vectors=cell_vectors(lengths, angles), **kwargs)
+
+    @classmethod
+    def from_bounds(
+        cls,
+        cell: Tuple[Sequence[float], Sequence[float]],
+        boundary: Optional[Sequence[str]] = None,
+        **kwargs,
+    ) -> "Cell":
+        """Constructs an orthorhombic Cell from its bounds ((xmin, ymin, zmin), (xmax, ymax, zmax)) and
+        boundary conditions e.g. ``SimInput.cell`` and ``SimInput.boundary``."""
+        from mmelemental.compute.pbc import box_from_cell, periodic_mask
+
+        origin, box = box_from_cell(cell)
+        return cls(
+            vectors=numpy.diag(box),
+            origin=origin,
+            periodic=tuple(bool(p) for p in periodic_mask(boundary, len(box))),
+            **kwargs,
+        )
+
+    # Properties
+    @property
+    def nframes(self) -> Optional[int]:
+        """ Number of frames of a cell varying per frame, None otherwise. """
+        return None if self.vectors.ndim == 2 else len(self.vectors)
+
+    @property
+    def lengths(self) -> numpy.ndarray:
+        """ Edge lengths (a, b, c) of shape (3,) or (nframes, 3). """
+        return numpy.linalg.norm(self.vectors, axis=-1)
+
+    @property
+    def angles(self) -> numpy.ndarray:
+        """ Angles (alpha, beta, gamma) in degrees of shape (3,) or (nframes, 3). """
+        from mmelemental.compute.pbc import cell_parameters
+
+        return cell_parameters(self.vectors)[1]
+
+    @property
+    def volume(self) -> Union[float, numpy.ndarray]:
+        """ Cell volume, per frame for a cell varying per frame. """
+        return numpy.abs(numpy.linalg.det(self.vectors))
+
+    @property
+    def orthorhombic(self) -> bool:
+        """ Whether the box vectors are along the x, y, and z axes. """
+        diagonal = numpy.diagonal(self.vectors, axis1=-2, axis2=-1)
+        return numpy.count_nonzero(self.vectors) == numpy.count_nonzero(diagonal)
+
+    def frame(self, index: int) -> "Cell":
+        """ Returns the cell of a single frame. """
+        if self.nframes is None:
+            return self
+        return self.copy(update={"vectors": self.vectors[index]})
+
+    # PBC operations
+    def _vectors_for(self, x: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the box vectors broadcastable against coordinates of shape (nframes, natoms, 3). """
+        if self.nframes is None:
+            return self.vectors
+        if x.ndim != 3 or len(x) != self.nframes:
+            raise ValueError(
+                f"Coordinates must be of shape ({self.nframes}, natoms, 3) for a cell varying per frame."
+            )
+        return self.vectors
+
+    def wrap(self, geometry: numpy.ndarray) -> numpy.ndarray:
+        """Wraps (in place) coordinates of shape (natoms, 3), or (nframes, natoms, 3), in vectors_units
+        into the cell along its periodic vectors and returns them."""
+        from mmelemental.compute.pbc import wrap_triclinic
+
+        return wrap_triclinic(
+            geometry,
+            self._vectors_for(geometry),
+            self.origin,
+            numpy.array(self.periodic),
+        )
+
+    def minimum_image(self, d: numpy.ndarray) -> numpy.ndarray:
+        """Replaces (in place) displacement vectors of shape (npairs, 3), or (nframes, npairs, 3), in
+        vectors_units by their minimum images and returns them."""
+        from mmelemental.compute.pbc import minimum_image_triclinic
+
+        return minimum_image_triclinic(
+            d, self._vectors_for(d), numpy.array(self.periodic)
+        )
+
+    def make_whole(
+        self,
+        geometry: numpy.ndarray,
+        connectivity: Union[numpy.ndarray, List[Tuple[int, int, float]]],
+    ) -> numpy.ndarray:
+        """Unwraps (in place) molecules split across the periodic boundaries so that bonded atoms are
+        adjacent, and returns the coordinates.
+        Parameters
+        ----------
+        geometry: numpy.ndarray
+            Coordinates of shape (natoms, 3), or (nframes, natoms, 3), in vectors_units.
+        connectivity: numpy.ndarray or List[Tuple[int, int, float]]
+            Bonds e.g. ``Molecule.connectivity``.
+        Returns
+        -------
+        numpy.ndarray
+            The modified coordinates.
+        """
+        from mmelemental.compute.pbc import make_whole
+
+        return make_whole(
+            geometry,
+            connectivity,
+            self._vectors_for(geometry),
+            numpy.array(self.periodic),
+        )
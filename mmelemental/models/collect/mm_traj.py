@@ -4,6 +4,8 @@ from mmelemental.models.util.input import FileInput
 from qcelemental.models.types import Array
 from mmelemental.models.molecule.mm_mol import Molecule
 from mmelemental.models.base import ProtoModel
+from mmelemental.models.cell.box import Cell
+from mmelemental.util import compression, serialization
 from .sm_ensem import Microstate
 
 __all__ = ["Trajectory", "Frame"]
@@ -23,6 +25,11 @@ class Frame(Microstate):
     timestep_units: Optional[str] = Field(
         "fs", description="Timestep size units. Defaults to femtoseconds."
     )
+    cell: Optional[Cell] = Field(
+        None,
+        description="Simulation cell of the frame, which changes between frames at constant pressure. "
+        "See the :class:``Cell`` class.",
+    )
 
 
 class Trajectory(ProtoModel):
@@ -75,6 +82,11 @@ class Trajectory(ProtoModel):
         Trajectory
             A constructed Trajectory class.
         """
+        path = traj.path if isinstance(traj, FileInput) else traj
+        dtype = dtype or compression.split_ext(path)[0].strip(".")
+        if dtype in ("json", "msgpack"):
+            return serialization.load_model(cls, path, dtype, **kwargs)
+
         traj_input = TrajectoryReaderInput(traj=traj, top=top)
 
         if all_frames:
@@ -128,16 +140,27 @@ class Trajectory(ProtoModel):
                 f"Data type {dtype} not supported by mmelemental."
             )
 
-    def to_file(self, filename: str, dtype: Optional[str] = None) -> None:
-        """Writes the Trajectory to a file.
+    def to_file(
+        self,
+        filename: str,
+        dtype: Optional[str] = None,
+        compresslevel: Optional[int] = None,
+        threads: int = 0,
+    ) -> None:
+        """Writes the Trajectory to a JSON or msgpack file, compressed if the filename ends with
+        .gz, .bz2, .xz, or .zst e.g. traj.json.gz. Frame arrays are flattened in JSON files.
         Parameters
         ----------
         filename : str
             The filename to write to
         dtype : str, optional
             The type of file to write, attempts to infer dtype from the filename if not provided.
+        compresslevel: int, optional
+            Compression level of compressed files. See :func:``mmelemental.util.compression.open_file``.
+        threads: int, optional
+            Number of compression threads, for zstd only. Defaults to 0 i.e. the calling thread.
         """
-        raise NotImplementedError(f"Data type {dtype} not available.")
+        serialization.dump_model(self, filename, dtype, compresslevel, threads)
 
     def to_data(self, dtype: str):
         """ Converts Trajectory to toolkit-specific trajectory object. """
@@ -3,6 +3,7 @@ from typing import Union, Optional, List, Dict, Any
 from qcelemental.models.types import Array
 from mmelemental.models.molecule.mm_mol import Molecule
 from mmelemental.models.base import ProtoModel
+from mmelemental.util import serialization
 
 
 __all__ = ["Microstate", "Ensemble"]
@@ -42,3 +43,32 @@ class Ensemble(ProtoModel):
         description="Similar to Molecule but without the connectivity. Provides improved efficiency over the \
             latter. See :class:``Microstate``.",
     )
+
+    # Constructors
+    @classmethod
+    def from_file(cls, filename: str, **kwargs: Dict[str, Any]) -> "Ensemble":
+        """Constructs an Ensemble from a JSON or msgpack file, e.g. written by :meth:``to_file``,
+        decompressed on the fly if it ends with .gz, .bz2, .xz, or .zst.
+        Parameters
+        ----------
+        filename: str
+            Input filename with a .json or .msgpack extension.
+        **kwargs: Dict[str, Any], optional
+            Additional fields, taking precedence over the file.
+        Returns
+        -------
+        Ensemble
+            A constructed Ensemble object.
+        """
+        return serialization.load_model(cls, filename, **kwargs)
+
+    def to_file(
+        self, filename: str, compresslevel: Optional[int] = None, threads: int = 0
+    ) -> None:
+        """Writes the Ensemble to a JSON or msgpack file, depending on the filename extension,
+        compressed if it ends with .gz, .bz2, .xz, or .zst e.g. ensemble.msgpack.zst. Microstate
+        arrays are flattened in JSON files. See :func:``mmelemental.util.compression.open_file``
+        for the compression level and threads."""
+        serialization.dump_model(
+            self, filename, compresslevel=compresslevel, threads=threads
+        )
@@ -1 +1,2 @@
 from .mm_ff import *
+from .tables import *
@@ -3,6 +3,8 @@ from mmelemental.models.base import ProtoModel
 from mmelemental.models.util import FileOutput
 import qcelemental
 from .angle_params import AngleParams
+from . import potentials
+from mmelemental.models.forcefield.params import resolve_params
 from typing import Optional, Dict, Any, Union, List
 
 __all__ = ["Angles"]
@@ -13,6 +15,10 @@ class Angles(ProtoModel):
         ..., description="Angles parameters model."
     )
 
+    @validator("params", pre=True)
+    def _params_form(cls, v):
+        return resolve_params(v, potentials)
+
     # Constructors
     @classmethod
     def from_file(
@@ -1,6 +1,8 @@
 from pydantic import Field, constr, validator
 from mmelemental.models.base import ProtoModel
 from .bond_params import BondParams
+from . import potentials
+from mmelemental.models.forcefield.params import resolve_params
 from typing import Optional, Dict, Any, Union, List
 
 __all__ = ["Bonds"]
@@ -11,6 +13,10 @@ class Bonds(ProtoModel):
         ..., description="Bonded parameters model."
     )
 
+    @validator("params", pre=True)
+    def _params_form(cls, v):
+        return resolve_params(v, potentials)
+
     # Constructors
     @classmethod
     def from_file(
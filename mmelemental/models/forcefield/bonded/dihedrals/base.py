@@ -2,6 +2,8 @@ from pydantic import Field, constr, validator
 from mmelemental.models.base import ProtoModel
 from mmelemental.models.util import FileOutput
 from .di_params import DihedralParams
+from . import potentials
+from mmelemental.models.forcefield.params import resolve_params
 import hashlib
 from typing import Optional, Dict, Any, Union, List
 
@@ -13,6 +15,10 @@ class Dihedrals(ProtoModel):
         ..., description="Dihedral parameters model."
     )
 
+    @validator("params", pre=True)
+    def _params_form(cls, v):
+        return resolve_params(v, potentials)
+
     # Constructors
     @classmethod
     def from_file(
@@ -1,5 +1,4 @@
 from pydantic import Field, constr, validator
-import importlib
 import hashlib
 import json
 from typing import Any, List, Dict, Optional
@@ -9,18 +8,17 @@ import numpy
 # MM models
 from mmelemental.models.base import ProtoModel, Provenance, provenance_stamp
 from mmelemental.models.util.output import FileOutput
+from mmelemental.util import compression, serialization, trans
+from mmelemental.util.cache import cached_from_schema
+from mmelemental.util.instrument import instrumented, span
 from .nonbonded import NonBonded
 from .bonded import Bonds, Angles, Dihedrals
 
 # Generic translator component
 try:
-    from mmic_translator.components import TransComponent
     from mmic_translator.models.base import ToolkitModel
 except Exception:
-    TransComponent, ToolkitModel = None, "ToolkitModel"
-
-_trans_nfound_msg = "MMElemental translation requires mmic_translator. \
-Solve by: pip install mmic_translator"
+    ToolkitModel = "ToolkitModel"
 
 
 mmschema_forcefield_default = "mmschema_forcefield"
@@ -174,7 +172,8 @@ class ForceField(ProtoModel):
             Translator name e.g. mmic_parmed. Takes precedence over dtype. If unset, MMElemental attempts
             to find an appropriate translator if it is registered in the :class:``TransComponent`` class.
         **kwargs: Optional[Dict[str, Any]], optional
-            Any additional keywords to pass to the constructor.
+            Any additional keywords to pass to the constructor, taking precedence over JSON and
+            msgpack files.
         Returns
         -------
         ForceField
@@ -182,23 +181,27 @@ class ForceField(ProtoModel):
         """
 
         fileobj = FileOutput(path=filename)
-        dtype = dtype or fileobj.ext.strip(".")
+        file_ext, compressed = compression.split_ext(filename)
+        dtype = dtype or file_ext.strip(".")
         ext = "." + dtype
 
-        if not translator:
-            if not TransComponent:
-                raise ModuleNotFoundError(_trans_nfound_msg)
-            translator = TransComponent.find_ffread_tk(ext)
+        if ext in (".json", ".msgpack") and not translator:
+            return serialization.load_model(cls, filename, dtype, **kwargs)
+        elif compressed:
+            raise NotImplementedError(
+                f"Compressed {ext} files are not supported, only JSON and msgpack."
+            )
+
+        with span("ForceField.from_file.resolve"):
+            translator, tkff_class = trans.resolve(
+                "ffread", ext, "ForceField", translator=translator
+            )
 
         if not translator:
             raise ValueError(
                 f"Could not read file with ext {dtype}. Please install an appropriate TransComponent."
             )
 
-        if importlib.util.find_spec(translator):
-            mod = importlib.import_module(translator)
-            tkff_class = mod._classes_map.get("ForceField")
-
         if not tkff_class:
             raise ValueError(
                 f"No ForceField model found while looking in translator: {translator}."
@@ -230,9 +233,12 @@ class ForceField(ProtoModel):
         filename: str,
         dtype: Optional[str] = None,
         translator: Optional[str] = None,
+        compresslevel: Optional[int] = None,
+        threads: int = 0,
         **kwargs: Dict[str, Any],
     ) -> None:
-        """Writes the ForceField to a file.
+        """Writes the ForceField to a file. JSON and msgpack files are compressed on the fly if the
+        filename ends with .gz, .bz2, .xz, or .zst (requires zstandard) e.g. ff.json.gz.
         Parameters
         ----------
         filename : str
@@ -243,43 +249,50 @@ class ForceField(ProtoModel):
         translator: Optional[str], optional
             Translator name e.g. mmic_parmed. Takes precedence over dtype. If unset, MMElemental attempts
             to find an appropriate translator if it is registered in the :class:``TransComponent`` class.
+        compresslevel: Optional[int], optional
+            Compression level of compressed files. See :func:``mmelemental.util.compression.open_file``.
+        threads: int, optional
+            Number of compression threads, for zstd only. Defaults to 0 i.e. the calling thread.
         **kwargs: Optional[str, Dict], optional
             Additional kwargs to pass to the constructor.
         """
-        if not dtype:
-            from pathlib import Path
-
-            ext = Path(filename).suffix
-        else:
+        ext, compressed = compression.split_ext(filename)
+        if dtype:
             ext = "." + dtype
 
-        mode = kwargs.pop("mode", "w")
-
-        if ext == ".json":
-            stringified = self.json(**kwargs)
-
-            with open(filename, mode) as fp:
-                fp.write(stringified)
+        mode = kwargs.pop("mode", None)
 
+        if ext in (".json", ".msgpack"):
+            # The file mode only applies to JSON, msgpack is always written as bytes
+            mode = mode if ext == ".json" else None
+            serialization.dump_model(
+                self, filename, ext.strip("."), compresslevel, threads, mode, **kwargs
+            )
             return
 
+        if compressed:
+            raise NotImplementedError(
+                f"Compressed {ext} files are not supported, only JSON and msgpack."
+            )
+
         if not translator:
-            if not TransComponent:
-                raise ModuleNotFoundError(_trans_nfound_msg)
-            translator = TransComponent.find_ffwrite_tk(ext)
+            translator, _ = trans.resolve("ffwrite", ext, "ForceField")
 
         if not translator:
             raise NotImplementedError(
                 f"File extension {ext} not supported with any installed translators."
             )
 
-        tkff = self.to_data(translator=translator, **kwargs)
+        tkff = self.to_data(translator=translator, copy=False, **kwargs)
         tkff.to_file(filename, dtype=dtype, **kwargs)  # pass dtype?
 
+    @instrumented("ForceField.to_data")
     def to_data(
         self,
         dtype: Optional[str] = None,
         translator: Optional[str] = None,
+        cache: Optional[bool] = True,
+        copy: Optional[bool] = True,
         **kwargs: Dict[str, Any],
     ) -> ToolkitModel:
         """
@@ -292,6 +305,12 @@ class ForceField(ProtoModel):
             to find an appropriate translator if it is registered in the :class:``TransComponent`` class.
         dtype: Optional[str], optional
             Data type e.g. MDAnalysis, parmed, etc.
+        cache: Optional[bool], optional
+            Reuses the toolkit object built by a previous call for identical data and translator.
+            See ``mmelemental.util.cache.tkmodel_cache``. Defaults to True.
+        copy: Optional[bool], optional
+            Returns a copy of the cached toolkit object so it can be safely modified. Set to False
+            to share the cached object when it is only read. Defaults to True.
         **kwargs: Optional[Dict[str, Any]]
             Additional kwargs to pass to the constructors.
         Results
@@ -300,30 +319,43 @@ class ForceField(ProtoModel):
             Toolkit-specific ForceField object
         """
 
-        if not translator:
-            if not dtype:
-                raise ValueError(
-                    f"Either translator or dtype must be supplied when calling {__name__}."
-                )
-            if not TransComponent:
-                raise ModuleNotFoundError(_trans_nfound_msg)
-            translator = TransComponent.find_trans(dtype)
-
-        if importlib.util.find_spec(translator):
-            mod = importlib.import_module(translator)
-            tkff = mod._classes_map.get("ForceField")
+        if not translator and not dtype:
+            raise ValueError(
+                f"Either translator or dtype must be supplied when calling {__name__}."
+            )
 
-            if not tkff:
-                raise ValueError(
-                    f"No ForceField model found while looking in translator: {translator}."
-                )
+        tk_name, tkff = trans.resolve(
+            "data", dtype, "ForceField", translator=translator
+        )
 
-            return tkff.from_schema(self)
-        else:
+        if not tk_name:
             raise NotImplementedError(
-                f"Translator {translator} not available. Make sure it is properly installed."
+                f"Translator {translator or dtype} not available. Make sure it is properly installed."
             )
 
+        if not tkff:
+            raise ValueError(
+                f"No ForceField model found while looking in translator: {tk_name}."
+            )
+
+        if not cache:
+            return tkff.from_schema(self)
+
+        return cached_from_schema(tkff, self, tk_name, copy=copy)
+
+    def compress(self) -> "CompressedForceField":
+        """
+        Returns a memory-efficient copy of the force field in which per-atom and per-term parameters
+        are deduplicated and keyed on the atom types. See :class:``CompressedForceField``.
+        Returns
+        -------
+        CompressedForceField
+            Compressed force field. Call its ``expand`` method to recover the ForceField.
+        """
+        from .tables import CompressedForceField
+
+        return CompressedForceField.from_forcefield(self)
+
     def __eq__(self, other):
         """
         Checks if two models are identical. This is a molecular identity defined
@@ -369,7 +401,12 @@ class ForceField(ProtoModel):
                 # if field == "nonbonded":
                 #    data = qcelemental.models.molecule.float_prep(data, GEOMETRY_NOISE)
 
-                concat += json.dumps(data, default=lambda x: x.ravel().tolist())
+                concat += json.dumps(
+                    data,
+                    default=lambda x: x.dict()
+                    if isinstance(x, ProtoModel)
+                    else x.ravel().tolist(),
+                )
 
         m.update(concat.encode("utf-8"))
         return m.hexdigest()
@@ -2,6 +2,8 @@ from pydantic import Field, constr, validator
 from mmelemental.models.base import ProtoModel
 import qcelemental
 from .nb_params import NonBondedParams
+from . import potentials
+from mmelemental.models.forcefield.params import resolve_params
 from typing import Optional, Dict, Any, List, Union
 
 __all__ = ["NonBonded"]
@@ -14,6 +16,10 @@ class NonBonded(ProtoModel):
         ..., description="Non-bonded short potential parameters model."
     )
 
+    @validator("params", pre=True)
+    def _params_form(cls, v):
+        return resolve_params(v, potentials)
+
     # Constructors
     @classmethod
     def from_file(
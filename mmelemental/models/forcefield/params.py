@@ -1,9 +1,14 @@
 from pydantic import root_validator
 from mmelemental.models.base import ProtoModel
+from types import ModuleType
+from typing import Any, Tuple
+import functools
 import ast
 import glob
 import os
 
+__all__ = ["Params", "resolve_params"]
+
 
 class Params(ProtoModel):
     _path_name: str
@@ -22,18 +27,35 @@ class Params(ProtoModel):
 
     @classmethod
     def supported_potentials(cls):
-        files = glob.glob(cls._path_name)
-        classes = []
-        for file in files:
-            with open(file, "r") as fp:
-                src = fp.read()
-                p = ast.parse(src)
-                classes.extend(
-                    [
-                        node.name
-                        for node in ast.walk(p)
-                        if isinstance(node, ast.ClassDef)
-                    ]
-                )
-
-        return classes
+        return list(_potential_classes(cls._path_name))
+
+
+@functools.lru_cache(maxsize=None)
+def _potential_classes(path_name: str) -> Tuple[str, ...]:
+    """ Returns the names of the classes defined in the potential files. Parsed once per path. """
+    files = glob.glob(path_name)
+    classes = []
+    for file in files:
+        with open(file, "r") as fp:
+            src = fp.read()
+            p = ast.parse(src)
+            classes.extend(
+                [node.name for node in ast.walk(p) if isinstance(node, ast.ClassDef)]
+            )
+
+    return tuple(classes)
+
+
+def resolve_params(value: Any, potentials: ModuleType) -> Any:
+    """Converts (a list of) dicts of potential parameters e.g. from ``Params.dict()`` to the potential
+    models in ``potentials`` named by their ``name`` field. Any other value is returned unchanged."""
+    if isinstance(value, list):
+        return [resolve_params(item, potentials) for item in value]
+    if isinstance(value, dict) and value.get("name"):
+        model = getattr(potentials, value["name"], None)
+        if model is None:
+            raise NotImplementedError(
+                f"{value['name']} is not supported in MMElemental."
+            )
+        return model(**value)
+    return value
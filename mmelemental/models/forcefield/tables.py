@@ -0,0 +1,328 @@
+from pydantic import Field, validator
+from typing import Any, List, Dict, Optional, Sequence, Union
+import qcelemental
+import numpy
+
+from mmelemental.models.base import ProtoModel
+from .mm_ff import ForceField, ImproperDihedrals
+from .nonbonded import NonBonded
+from .bonded import Bonds, Angles, Dihedrals
+from .nonbonded import potentials as nb_potentials
+from .bonded.bonds import potentials as bond_potentials
+from .bonded.angles import potentials as angle_potentials
+from .bonded.dihedrals import potentials as di_potentials
+
+__all__ = ["ParamTable", "CompressedForceField"]
+
+# Containers and potential modules for every compressible ForceField section
+_sections = {
+    "nonbonded": (NonBonded, nb_potentials),
+    "bonds": (Bonds, bond_potentials),
+    "angles": (Angles, angle_potentials),
+    "dihedrals": (Dihedrals, di_potentials),
+}
+
+
+class ParamTable(ProtoModel):
+    """Deduplicated per-atom or per-term parameters stored as unique parameter rows and
+    an index that maps every atom/term to its row."""
+
+    form: Optional[str] = Field(
+        None,
+        description="Potential form of the parameters e.g. LennardJones, Harmonic.",
+    )
+    columns: List[str] = Field(
+        ...,
+        description="Parameter names of the columns in ``values`` e.g. epsilon, sigma.",
+    )
+    units: Optional[Dict[str, str]] = Field(
+        None, description="Units of every parameter column e.g. {'sigma': 'angstrom'}."
+    )
+    labels: Optional[List[str]] = Field(
+        None,
+        description="Atom type (or any other label) of every row. Rows are unique in (label, values).",
+    )
+    values: qcelemental.models.types.Array[float] = Field(
+        ..., description="Unique parameter rows of shape (nrows, ncolumns)."
+    )
+    index: qcelemental.models.types.Array[int] = Field(
+        ...,
+        description="Row index of shape (nitems,) for every atom/term. Stored as int16 when "
+        "the number of rows allows it and as int32 otherwise.",
+    )
+
+    # Validators
+    @validator("values")
+    def _values_2d(cls, v, values):
+        if len(values["columns"]):
+            return v.reshape(-1, len(values["columns"]))
+        # Label-only tables have one (empty) row per label
+        return numpy.empty((len(values.get("labels") or []), 0))
+
+    @validator("index")
+    def _index_dtype(cls, v):
+        v = v.ravel()
+        if len(v) and v.max() >= numpy.iinfo(numpy.int16).max:
+            return v.astype(numpy.int32)
+        return v.astype(numpy.int16)
+
+    # Properties
+    @property
+    def nrows(self) -> int:
+        return len(self.values)
+
+    @property
+    def nitems(self) -> int:
+        return len(self.index)
+
+    # Constructors
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, numpy.ndarray],
+        labels: Optional[Sequence[str]] = None,
+        **kwargs: Dict[str, Any],
+    ) -> "ParamTable":
+        """
+        Constructs a ParamTable from equal-length per-atom/per-term arrays.
+        Parameters
+        ----------
+        arrays: Dict[str, numpy.ndarray]
+            Parameter arrays of shape (nitems,) keyed by their names.
+        labels: Sequence[str], optional
+            Label (e.g. atom type) of every item. Rows are then unique per label.
+        **kwargs: Dict[str, Any], optional
+            Additional fields to pass to the constructor e.g. form, units.
+        Returns
+        -------
+        ParamTable
+            A constructed ParamTable object.
+        """
+        columns = list(arrays)
+        data = [numpy.asarray(arrays[col], dtype=float).ravel() for col in columns]
+
+        if labels is not None:
+            names, label_index = numpy.unique(
+                numpy.asarray(labels), return_inverse=True
+            )
+            data.insert(0, label_index.ravel().astype(float))
+
+        if not len(data):
+            raise ValueError("Either arrays or labels must be supplied.")
+
+        rows, index = numpy.unique(
+            numpy.column_stack(data), axis=0, return_inverse=True
+        )
+
+        if labels is not None:
+            kwargs["labels"] = names[rows[:, 0].astype(int)].tolist()
+            rows = rows[:, 1:]
+
+        return cls(columns=columns, values=rows, index=index.ravel(), **kwargs)
+
+    @classmethod
+    def from_params(
+        cls, params: "Params", labels: Optional[Sequence[str]] = None
+    ) -> Optional["ParamTable"]:
+        """Constructs a ParamTable from a potential parameters model e.g. :class:``LennardJones``.
+        Returns None if the parameters are not 1D arrays of equal length (e.g. :class:``EAM``)."""
+        arrays, units = {}, {}
+        for name in params.__fields__:
+            val = getattr(params, name)
+            if isinstance(val, numpy.ndarray):
+                arrays[name] = val
+            elif name.endswith("_units") and val is not None:
+                units[name[: -len("_units")]] = val
+
+        lengths = {val.shape for val in arrays.values()}
+        if len(lengths) != 1 or len(lengths.pop()) != 1:
+            return None
+
+        return cls.from_arrays(
+            arrays,
+            labels=labels,
+            form=params.__class__.__name__,
+            units={key: val for key, val in units.items() if key in arrays},
+        )
+
+    # Expansion
+    def column(self, name: str) -> numpy.ndarray:
+        """ Returns the per-atom/per-term array of parameter ``name``. """
+        return self.values[self.index, self.columns.index(name)]
+
+    def expand(self) -> Dict[str, numpy.ndarray]:
+        """ Returns the per-atom/per-term arrays of all parameters. """
+        rows = self.values[self.index]
+        return {col: rows[:, i] for i, col in enumerate(self.columns)}
+
+    def expand_labels(self) -> Optional[List[str]]:
+        """ Returns the label of every atom/term. """
+        if self.labels is None:
+            return None
+        return numpy.asarray(self.labels)[self.index].tolist()
+
+    def to_params(self, potentials: Any) -> "Params":
+        """ Returns the expanded potential parameters model found by ``form`` in module ``potentials``. """
+        units = {f"{key}_units": val for key, val in (self.units or {}).items()}
+        return getattr(potentials, self.form)(**self.expand(), **units)
+
+
+class CompressedForceField(ProtoModel):
+    """A memory-efficient representation of :class:``ForceField`` in which per-atom and per-term
+    parameters are stored as :class:``ParamTable`` objects keyed on the atom types. Use ``expand``
+    to recover the per-atom view."""
+
+    schema_version: int = Field(  # type: ignore
+        0,
+        description="The version number of the ForceField schema of the compressed model.",
+    )
+    name: Optional[str] = Field(  # type: ignore
+        None, description="Forcefield name e.g. charmm27, amber99, etc."
+    )
+    nonbonded: Union[ParamTable, List[ParamTable], NonBonded] = Field(  # type: ignore
+        ...,
+        description="Non-bonded parameters keyed on the atom types. Parameters that cannot be tabulated "
+        "(e.g. EAM) are stored uncompressed as a :class:``NonBonded`` model.",
+    )
+    bonds: Optional[Union[ParamTable, List[ParamTable], Bonds]] = Field(  # type: ignore
+        None, description="Bond parameters."
+    )
+    angles: Optional[Union[ParamTable, List[ParamTable], Angles]] = Field(  # type: ignore
+        None, description="Angle parameters."
+    )
+    dihedrals: Optional[Union[ParamTable, List[ParamTable], Dihedrals]] = Field(  # type: ignore
+        None, description="Dihedral parameters."
+    )
+    im_dihedrals: Optional[ImproperDihedrals] = Field(  # type: ignore
+        None, description="Improper dihedral bond model."
+    )
+    charges: Optional[ParamTable] = Field(  # type: ignore
+        None, description="Atomic charges."
+    )
+    masses: Optional[ParamTable] = Field(  # type: ignore
+        None, description="Atomic masses keyed on the atom types."
+    )
+    types: Optional[ParamTable] = Field(  # type: ignore
+        None, description="Atom types stored as labels."
+    )
+    symbols: Optional[ParamTable] = Field(  # type: ignore
+        None, description="Atomic elemental symbols stored as labels."
+    )
+    atomic_numbers: Optional[ParamTable] = Field(  # type: ignore
+        None, description="Atomic numbers keyed on the atom types, when explicitly set."
+    )
+    charge_groups: Optional[qcelemental.models.types.Array[int]] = Field(
+        None, description="Charge groups per atom. Length of the array must be natoms."
+    )
+    exclusions: Optional[str] = Field(  # type: ignore
+        None, description="See the :class:``ForceField`` model."
+    )
+    inclusions: Optional[str] = Field(  # type: ignore
+        None, description="See the :class:``ForceField`` model."
+    )
+    extras: Dict[str, Any] = Field(  # type: ignore
+        None,
+        description="Additional information to bundle with the force field. Use for schema development and scratch space.",
+    )
+
+    # Constructors
+    @classmethod
+    def from_forcefield(cls, ff: ForceField) -> "CompressedForceField":
+        """
+        Constructs a CompressedForceField object from a ForceField.
+        Parameters
+        ----------
+        ff: ForceField
+            Force field to compress.
+        Returns
+        -------
+        CompressedForceField
+            A constructed CompressedForceField object.
+        """
+        data = {
+            "schema_version": ff.schema_version,
+            "name": ff.name,
+            "im_dihedrals": ff.im_dihedrals,
+            "charge_groups": ff.charge_groups,
+            "exclusions": ff.exclusions,
+            "inclusions": ff.inclusions,
+            "extras": ff.extras,
+            "provenance": ff.provenance,
+        }
+
+        for section in _sections:
+            model = getattr(ff, section)
+            if model is None:
+                continue
+            # Only the nonbonded parameters are per-atom and hence keyed on the atom types
+            labels = ff.types if section == "nonbonded" else None
+            if isinstance(model.params, list):
+                tables = [ParamTable.from_params(p, labels) for p in model.params]
+            else:
+                tables = ParamTable.from_params(model.params, labels)
+            compressible = (
+                all(tables) if isinstance(tables, list) else tables is not None
+            )
+            data[section] = tables if compressible else model
+
+        if ff.charges is not None:
+            data["charges"] = ParamTable.from_arrays(
+                {"charges": ff.charges}, units={"charges": ff.charges_units}
+            )
+        if ff.masses is not None:
+            data["masses"] = ParamTable.from_arrays(
+                {"masses": ff.masses},
+                labels=ff.types,
+                units={"masses": ff.masses_units},
+            )
+        if ff.types is not None:
+            data["types"] = ParamTable.from_arrays({}, labels=ff.types)
+        if ff.symbols is not None:
+            data["symbols"] = ParamTable.from_arrays({}, labels=ff.symbols)
+        if ff.atomic_numbers_ is not None:
+            data["atomic_numbers"] = ParamTable.from_arrays(
+                {"atomic_numbers": ff.atomic_numbers_}, labels=ff.types
+            )
+
+        return cls(**data)
+
+    def expand(self) -> ForceField:
+        """ Returns the equivalent :class:``ForceField`` with per-atom/per-term parameter arrays. """
+        data = {
+            "schema_version": self.schema_version,
+            "name": self.name,
+            "im_dihedrals": self.im_dihedrals,
+            "charge_groups": self.charge_groups,
+            "exclusions": self.exclusions,
+            "inclusions": self.inclusions,
+            "extras": self.extras,
+            "provenance": self.provenance,
+        }
+
+        for section, (container, potentials) in _sections.items():
+            tables = getattr(self, section)
+            if tables is None or isinstance(tables, container):
+                data[section] = tables
+            elif isinstance(tables, list):
+                data[section] = container(
+                    params=[table.to_params(potentials) for table in tables]
+                )
+            else:
+                data[section] = container(params=tables.to_params(potentials))
+
+        if self.charges is not None:
+            data["charges"] = self.charges.column("charges")
+            data["charges_units"] = self.charges.units["charges"]
+        if self.masses is not None:
+            data["masses"] = self.masses.column("masses")
+            data["masses_units"] = self.masses.units["masses"]
+        if self.types is not None:
+            data["types"] = self.types.expand_labels()
+        if self.symbols is not None:
+            data["symbols"] = self.symbols.expand_labels()
+        if self.atomic_numbers is not None:
+            data["atomic_numbers"] = self.atomic_numbers.column(
+                "atomic_numbers"
+            ).astype(numpy.int16)
+
+        return ForceField(**{key: val for key, val in data.items() if val is not None})
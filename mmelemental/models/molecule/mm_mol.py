@@ -2,26 +2,25 @@ import qcelemental
 import numpy
 from typing import List, Tuple, Optional, Any, Dict, Union
 from pydantic import Field, constr, validator
-import importlib
 from pathlib import Path
 import hashlib
 import json
+import os
 
 
 # MM models
 from mmelemental.models.util.output import FileOutput
 from mmelemental.models.chem.codes import ChemCode
 from mmelemental.models.base import Provenance, provenance_stamp, ProtoModel
+from mmelemental.util import compression, serialization, trans
+from mmelemental.util.cache import cached_from_schema
+from mmelemental.util.instrument import instrumented, span
 
 # Generic translator component
 try:
-    from mmic_translator.components import TransComponent
     from mmic_translator.models.base import ToolkitModel
 except Exception:
-    TransComponent, ToolkitModel = None, "ToolkitModel"
-
-_trans_nfound_msg = "MMElemental translation requires mmic_translator. \
-Solve by: pip install mmic_translator"
+    ToolkitModel = "ToolkitModel"
 
 __all__ = ["Molecule"]
 
@@ -266,6 +265,7 @@ class Molecule(ProtoModel):
         }
         schema_extra = "http://json-schema.org/draft-04/schema#"
 
+    @instrumented("Molecule.__init__")
     def __init__(self, **kwargs: Optional[Dict[str, Any]]) -> None:
         """
         Initializes the molecule object from dictionary-like values.
@@ -515,6 +515,12 @@ class Molecule(ProtoModel):
         """
 
         m = hashlib.sha1()
+        m.update(self._hash_data())
+        return m.hexdigest()
+
+    @instrumented("Molecule.get_hash", nbytes=lambda encoded, self: len(encoded))
+    def _hash_data(self) -> bytes:
+        """ Returns the serialized hash fields hashed by get_hash. """
         concat = ""
 
         # np.set_printoptions(precision=16)
@@ -536,8 +542,7 @@ class Molecule(ProtoModel):
 
                 concat += json.dumps(data, default=lambda x: x.ravel().tolist())
 
-        m.update(concat.encode("utf-8"))
-        return m.hexdigest()
+        return concat.encode("utf-8")
 
     # Constructors
     @classmethod
@@ -570,7 +575,13 @@ class Molecule(ProtoModel):
         Molecule
             A constructed Molecule class.
         """
-        file_ext = Path(filename).suffix if filename else None
+        file_ext, compressed = (
+            compression.split_ext(filename) if filename else (None, None)
+        )
+        if compressed and file_ext not in (".json", ".msgpack"):
+            raise NotImplementedError(
+                f"Compressed {file_ext} files are not supported, only JSON and msgpack."
+            )
 
         if file_ext in qcelemental.models.molecule._extension_map:
             if top_filename:
@@ -578,15 +589,34 @@ class Molecule(ProtoModel):
                     "Molecule topology must be supplied in a single JSON (or similar) file."
                 )
 
-            import json
-
             if dtype is None:
                 dtype = qcelemental.models.molecule._extension_map[file_ext]
 
             # Raw string type, read and pass through
             if dtype == "json":
-                with open(filename, "r") as infile:
-                    data = json.load(infile)
+                nbytes = os.path.getsize(filename)
+                if nbytes >= serialization.stream_threshold:
+                    # Arrays are decoded into NumPy buffers without holding the whole file
+                    with span("Molecule.from_file.json_stream") as timer:
+                        timer.nbytes = nbytes
+                        data = serialization.json_load_stream(filename, cls)
+                else:
+                    with span(
+                        "Molecule.from_file.json"
+                    ) as timer, compression.open_file(filename, "rb") as infile:
+                        raw = infile.read()
+                        timer.nbytes = len(raw)
+                        data = serialization.decode_arrays(
+                            cls, serialization.json_loads(raw)
+                        )
+                dtype = "dict"
+            elif dtype in ("msgpack", "msgpack-ext"):
+                with span("Molecule.from_file.msgpack") as timer, compression.open_file(
+                    filename, "rb"
+                ) as infile:
+                    raw = infile.read()
+                    timer.nbytes = len(raw)
+                    data = serialization.msgpack_loads(raw)
                 dtype = "dict"
             else:
                 raise KeyError(f"Data type not supported: {dtype}.")
@@ -598,39 +628,22 @@ class Molecule(ProtoModel):
 
         dtype = dtype or fileobj.ext.strip(".")
         ext = "." + dtype
+        top_ext = top_fileobj.ext if top_fileobj else None
 
-        if not translator:
-            if not TransComponent:
-                raise ModuleNotFoundError(_trans_nfound_msg)
-            from mmic_translator.components.supported import reg_trans
-
-            reg_trans = list(reg_trans)
-
-            while not translator:
-                translator = TransComponent.find_molread_tk(ext, trans=reg_trans)
-                if not translator:
-                    raise ValueError(
-                        f"Could not read xyz file with ext {ext}. Please install an appropriate translator."
-                    )
-                # Make sure we can import the translator module
-                if importlib.util.find_spec(translator):
-                    mod = importlib.import_module(translator)
-
-                # If top if supplied, make sure the translator supports the top file extension
-                if top_fileobj:
-                    top_ext = top_fileobj.ext
-                    if top_ext not in mod.ffread_ext_maps:
-                        reg_trans.remove(translator)
-                        translator = None
-                    if not len(reg_trans):
-                        raise ValueError(
-                            f"Could not read xyz and top files with exts {ext} and {top_ext}. \
-                            Please install an appropriate translator."
-                        )
-        elif importlib.util.find_spec(translator):
-            mod = importlib.import_module(translator)
+        with span("Molecule.from_file.resolve"):
+            translator, tkmol_class = trans.resolve(
+                "molread", ext, "Molecule", top_ext=top_ext, translator=translator
+            )
 
-        tkmol_class = mod._classes_map.get("Molecule")
+        if not translator:
+            if top_ext:
+                raise ValueError(
+                    f"Could not read xyz and top files with exts {ext} and {top_ext}. \
+                    Please install an appropriate translator."
+                )
+            raise ValueError(
+                f"Could not read xyz file with ext {ext}. Please install an appropriate translator."
+            )
 
         if not tkmol_class:
             raise ValueError(
@@ -691,9 +704,12 @@ class Molecule(ProtoModel):
         filename: str,
         dtype: Optional[str] = None,
         translator: Optional[str] = None,
+        compresslevel: Optional[int] = None,
+        threads: int = 0,
         **kwargs: Optional[Dict[str, Any]],
     ) -> None:
-        """Writes the Molecule to a file.
+        """Writes the Molecule to a file. JSON and msgpack files are compressed on the fly if the
+        filename ends with .gz, .bz2, .xz, or .zst (requires zstandard) e.g. mol.json.gz.
         Parameters
         ----------
         filename : str
@@ -705,39 +721,58 @@ class Molecule(ProtoModel):
             Translator name e.g. mmic_rdkit. Takes precedence over dtype. If unset,
             MMElemental attempts to find an appropriate translator if it is registered
             in the :class:``TransComponent`` class.
+        compresslevel: Optional[int], optional
+            Compression level of compressed files. See :func:``mmelemental.util.compression.open_file``.
+        threads: int, optional
+            Number of compression threads, for zstd only. Defaults to 0 i.e. the calling thread.
         **kwargs: Optional[Dict[str, Any]], optional
             Additional kwargs to pass to the constructor.
         """
-        if not dtype:
-            from pathlib import Path
-
-            ext = Path(filename).suffix
-        else:
+        ext, compressed = compression.split_ext(filename)
+        if dtype:
             ext = "." + dtype
 
         mode = kwargs.pop("mode", "w")
 
         if ext == ".json":
-            stringified = self.json(**kwargs)
-            with open(filename, mode) as fp:
+            with span("Molecule.to_file.json") as timer:
+                stringified = serialization.json_dumps(
+                    self.dict(**kwargs) if kwargs else self
+                )
+                timer.nbytes = len(stringified)
+            with compression.open_file(filename, mode, compresslevel, threads) as fp:
                 fp.write(stringified)
+        elif ext == ".msgpack":
+            with span("Molecule.to_file.msgpack") as timer:
+                packed = serialization.msgpack_dumps(
+                    self.dict(**kwargs) if kwargs else self
+                )
+                timer.nbytes = len(packed)
+            with compression.open_file(filename, "wb", compresslevel, threads) as fp:
+                fp.write(packed)
+        elif compressed:
+            raise NotImplementedError(
+                f"Compressed {ext} files are not supported, only JSON and msgpack."
+            )
         else:  # look for an installed mmic_translator
-            if not TransComponent:
-                raise ModuleNotFoundError(_trans_nfound_msg)
-            translator = TransComponent.find_molwrite_tk(ext)
+            if not translator:
+                translator, _ = trans.resolve("molwrite", ext, "Molecule")
 
             if not translator:
                 raise NotImplementedError(
                     f"File extension {ext} not supported with any installed translators."
                 )
 
-            tkmol = self.to_data(translator=translator, **kwargs)
+            tkmol = self.to_data(translator=translator, copy=False, **kwargs)
             tkmol.to_file(filename, dtype=dtype, **kwargs)  # pass dtype?
 
+    @instrumented("Molecule.to_data")
     def to_data(
         self,
         dtype: Optional[str] = None,
         translator: Optional[str] = None,
+        cache: Optional[bool] = True,
+        copy: Optional[bool] = True,
         **kwargs: Optional[Dict[str, Any]],
     ) -> ToolkitModel:
         """Converts Molecule to toolkit-specific molecule (e.g. rdkit, MDAnalysis, parmed).
@@ -749,6 +784,12 @@ class Molecule(ProtoModel):
             Translator name e.g. mmic_rdkit. Takes precedence over dtype. If unset,
             MMElemental attempts to find an appropriate translator if it is registered
             in the :class:``TransComponent`` class.
+        cache: Optional[bool], optional
+            Reuses the toolkit object built by a previous call for identical data and translator.
+            See ``mmelemental.util.cache.tkmodel_cache``. Defaults to True.
+        copy: Optional[bool], optional
+            Returns a copy of the cached toolkit object so it can be safely modified. Set to False
+            to share the cached object when it is only read. Defaults to True.
         **kwargs: Optional[Dict[str, Any]], optional
             Additional kwargs to pass to the constructor.
         Returns
@@ -757,31 +798,30 @@ class Molecule(ProtoModel):
             Toolkit-specific molecule model
         """
 
-        if not translator:
-            if not TransComponent:
-                raise ModuleNotFoundError(_trans_nfound_msg)
-            if not dtype:
-                raise ValueError(
-                    f"Either translator or dtype must be supplied when calling {__name__}."
-                )
-            translator = TransComponent.find_trans(dtype)
+        if not translator and not dtype:
+            raise ValueError(
+                f"Either translator or dtype must be supplied when calling {__name__}."
+            )
 
         if translator == "qcelemental":
             qmol = qcelemental.models.molecule.Molecule.to_data(
                 data, orient=False, validate=False, **kwargs
             )
             return Molecule(orient=orient, validate=validate, **qmol.to_dict())
-        elif importlib.util.find_spec(translator):
-            mod = importlib.import_module(translator)
-            tkmol = mod._classes_map.get("Molecule")
 
-            if not tkmol:
-                raise ValueError(
-                    f"No Molecule model found while looking in translator: {translator}."
-                )
+        tk_name, tkmol = trans.resolve("data", dtype, "Molecule", translator=translator)
 
-            return tkmol.from_schema(self)
-        else:
+        if not tk_name:
             raise NotImplementedError(
-                f"translator {translator} not available. Make sure it is properly installed."
+                f"translator {translator or dtype} not available. Make sure it is properly installed."
+            )
+
+        if not tkmol:
+            raise ValueError(
+                f"No Molecule model found while looking in translator: {tk_name}."
             )
+
+        if not cache:
+            return tkmol.from_schema(self)
+
+        return cached_from_schema(tkmol, self, tk_name, copy=copy)
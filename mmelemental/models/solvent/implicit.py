@@ -1,8 +1,61 @@
 from mmelemental.models.base import ProtoModel
-from pydantic import Field
+from pydantic import Field, validator
+from typing import Dict, List, Optional, Sequence, Tuple
+import qcelemental
+import numpy
 
 
-__all__ = ["Solvent"]
+__all__ = ["Solvent", "gb_radii", "gb_screen"]
+
+# Intrinsic Born radii (angstroms) per element
+gb_radii: Dict[str, Dict[str, float]] = {
+    "bondi": {
+        "H": 1.2,
+        "C": 1.7,
+        "N": 1.55,
+        "O": 1.52,
+        "F": 1.47,
+        "P": 1.8,
+        "S": 1.8,
+        "Cl": 1.75,
+        "Br": 1.85,
+        "I": 1.98,
+    },
+    "mbondi": {
+        "H": 1.2,
+        "C": 1.7,
+        "N": 1.55,
+        "O": 1.5,
+        "F": 1.5,
+        "Si": 2.1,
+        "P": 1.85,
+        "S": 1.8,
+        "Cl": 1.7,
+        "Br": 1.85,
+        "I": 1.98,
+    },
+}
+gb_radii["mbondi2"] = dict(gb_radii["mbondi"])
+
+# Radii of hydrogens depending on the element they are bonded to
+_hydrogen_radii = {
+    "mbondi": {"C": 1.3, "N": 1.3, "O": 0.8, "S": 0.8},
+    "mbondi2": {"N": 1.3},
+}
+
+# HCT/OBC screening (overlap) factors per element
+gb_screen: Dict[str, float] = {
+    "H": 0.85,
+    "C": 0.72,
+    "N": 0.79,
+    "O": 0.85,
+    "F": 0.88,
+    "P": 0.86,
+    "S": 0.96,
+}
+
+# Radius and screening factor of elements missing from the parameter sets
+_default_radius, _default_screen = 1.5, 0.8
 
 
 class Solvent(ProtoModel):
@@ -10,3 +63,99 @@ class Solvent(ProtoModel):
         ...,
         description="Sets the solvent to be implicitly represented in a simulation.",
     )
+    model: Optional[str] = Field(
+        "obc2",
+        description="Generalized Born model used to compute the effective Born radii: hct, obc1, or obc2.",
+    )
+    radii_set: Optional[str] = Field(
+        "mbondi2",
+        description="Intrinsic Born radii parameter set used for atoms without explicit radii: bondi, mbondi, or mbondi2.",
+    )
+    radii: Optional[qcelemental.models.types.Array[float]] = Field(
+        None,
+        description="Intrinsic Born radii of shape (natoms,). Overrides radii_set.",
+    )
+    radii_units: Optional[str] = Field(
+        "angstrom", description="Units of the Born radii and offset."
+    )
+    screen: Optional[qcelemental.models.types.Array[float]] = Field(
+        None,
+        description="Screening factors of shape (natoms,). Defaults to the per-element HCT/OBC values.",
+    )
+    offset: Optional[float] = Field(
+        0.09, description="Dielectric offset subtracted from the intrinsic radii."
+    )
+    solute_dielectric: Optional[float] = Field(
+        1.0, description="Relative dielectric constant of the solute."
+    )
+    solvent_dielectric: Optional[float] = Field(
+        78.5, description="Relative dielectric constant of the solvent."
+    )
+    surface_tension: Optional[float] = Field(
+        0.0225936,
+        description="Surface tension of the ACE nonpolar term. Set to 0 to compute polar solvation only.",
+    )
+    surface_tension_units: Optional[str] = Field(
+        "kJ/(mol*angstrom**2)", description="Units of the surface tension."
+    )
+    probe_radius: Optional[float] = Field(
+        1.4, description="Solvent probe radius of the ACE nonpolar term in radii_units."
+    )
+
+    @validator("model")
+    def _valid_model(cls, v):
+        if v is not None and v.lower() not in ("hct", "obc1", "obc2"):
+            raise ValueError(
+                f"Generalized Born model {v} not supported. Choose from: hct, obc1, obc2."
+            )
+        return v
+
+    @validator("radii_set")
+    def _valid_radii_set(cls, v):
+        if v is not None and v not in gb_radii:
+            raise ValueError(
+                f"Born radii set {v} not supported. Choose from: {', '.join(gb_radii)}."
+            )
+        return v
+
+    def parameters(
+        self,
+        symbols: Sequence[str],
+        connectivity: Optional[List[Tuple[int, int, float]]] = None,
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the intrinsic Born radii (in radii_units) and screening factors of every atom.
+        Parameters
+        ----------
+        symbols: Sequence[str]
+            Atomic elemental symbols e.g. ``Molecule.symbols``.
+        connectivity: List[Tuple[int, int, float]], optional
+            Bonds e.g. ``Molecule.connectivity``. Used by mbondi and mbondi2 for hydrogen radii.
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Radii and screening factors of shape (natoms,).
+        """
+        symbols = [sym.capitalize() for sym in symbols]
+        if self.radii is not None:
+            radii = numpy.asarray(self.radii, dtype=float)
+        else:
+            radii_set = self.radii_set or "mbondi2"
+            table = gb_radii[radii_set]
+            radii = numpy.array([table.get(sym, _default_radius) for sym in symbols])
+            if radii_set in _hydrogen_radii and connectivity:
+                ij = numpy.asarray(connectivity)[:, :2].astype(numpy.int64)
+                sym = numpy.array(symbols)
+                for a, b in (ij.T, ij[:, ::-1].T):
+                    for element, radius in _hydrogen_radii[radii_set].items():
+                        radii[a[(sym[a] == "H") & (sym[b] == element)]] = radius
+        if self.screen is not None:
+            screen = numpy.asarray(self.screen, dtype=float)
+        else:
+            screen = numpy.array(
+                [gb_screen.get(sym, _default_screen) for sym in symbols]
+            )
+        if len(radii) != len(symbols) or len(screen) != len(symbols):
+            raise ValueError(
+                "Born radii and screening factors must be given for every atom."
+            )
+        return radii, screen
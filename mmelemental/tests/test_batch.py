@@ -0,0 +1,61 @@
+"""
+Batched energy tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.models.collect.mm_traj import Frame, Trajectory
+from mmelemental.models.collect.sm_ensem import Ensemble, Microstate
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.batch import BatchEnergy, stack_geometries
+from .test_energy import build_chain
+
+
+def _conformers(mol, nconf=20, seed=0):
+    rng = numpy.random.default_rng(seed)
+    return mol.geometry + 0.2 * rng.normal(size=(nconf, len(mol.symbols), 3))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"cutoff": 6.0},
+        {"cutoff": 6.0, "box": numpy.array([60.0, 15.0, 15.0])},
+        {"cutoff": 6.0, "electrostatics": "reaction-field"},
+    ],
+)
+def test_batch_energy(kwargs):
+    mol, mm_ff = build_chain(30)
+    model = ForceFieldEnergy(mol, mm_ff, **kwargs)
+    confs = _conformers(mol)
+    energies, terms = BatchEnergy(model).compute(confs)
+    assert energies.shape == (len(confs),)
+    for conf, energy, index in zip(confs, energies, range(len(confs))):
+        ref, _, ref_terms = model.compute(conf)
+        assert numpy.isclose(energy, ref)
+        for name, value in ref_terms.items():
+            assert numpy.isclose(terms[name][index], value)
+
+
+def test_batch_chunks():
+    mol, mm_ff = build_chain(20)
+    model = ForceFieldEnergy(mol, mm_ff)
+    confs = _conformers(mol, nconf=50)
+    batch, small = BatchEnergy(model), BatchEnergy(model, memory=1)
+    assert small.chunk_size == 1 and batch.chunk_size >= len(confs)
+    assert numpy.allclose(batch.energy(confs), small.energy(confs))
+
+
+def test_batch_sources():
+    mol, mm_ff = build_chain(10)
+    confs = _conformers(mol, nconf=3)
+    traj = Trajectory(
+        mol=mol,
+        frames=[Frame(geometry=conf / 10.0, geometry_units="nm") for conf in confs],
+    )
+    ensemble = Ensemble(states={"chain": [Microstate(geometry=conf) for conf in confs]})
+    assert numpy.allclose(stack_geometries(traj), confs)
+    assert numpy.allclose(stack_geometries(ensemble), confs)
+    assert numpy.allclose(stack_geometries(confs[0]), confs[:1])
+    with pytest.raises(ValueError):
+        BatchEnergy(ForceFieldEnergy(mol, mm_ff)).energy(confs[:, :5])
@@ -0,0 +1,118 @@
+"""
+Cache tests for the mmelemental package.
+"""
+import pytest
+import importlib
+import sys
+import types
+import numpy
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.models import forcefield as ff
+from mmelemental.util import trans
+from mmelemental.util.cache import LRUCache, content_key, tkmodel_cache
+
+
+class FakeToolkitModel:
+    nbuilds = 0
+
+    def __init__(self, model):
+        self.model = model
+
+    @classmethod
+    def from_schema(cls, model):
+        cls.nbuilds += 1
+        return cls(model)
+
+
+@pytest.fixture
+def fake_translator(monkeypatch):
+    mod = types.ModuleType("fake_translator")
+    mod.__spec__ = importlib.machinery.ModuleSpec("fake_translator", None)
+    mod._classes_map = {"Molecule": FakeToolkitModel, "ForceField": FakeToolkitModel}
+    monkeypatch.setitem(sys.modules, "fake_translator", mod)
+    FakeToolkitModel.nbuilds = 0
+    tkmodel_cache.clear()
+    yield mod
+    tkmodel_cache.clear()
+    trans.invalidate()
+
+
+def test_lru_size():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts b
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.info()["hits"] == 1
+    assert cache.info()["misses"] == 1
+    assert cache.info()["evictions"] == 1
+
+
+def test_lru_bytes():
+    cache = LRUCache(maxsize=10, maxbytes=100)
+    cache.put("a", 1, nbytes=60)
+    cache.put("b", 2, nbytes=30)
+    cache.put("c", 3, nbytes=30)  # evicts a
+    assert len(cache) == 2 and cache.nbytes == 60
+    assert not cache.put("d", 4, nbytes=101)
+    cache.resize(maxbytes=40)
+    assert len(cache) == 1 and "c" in cache
+
+
+def test_mol_to_data_cached(fake_translator):
+    mol = Molecule(symbols=["C", "H"], geometry=numpy.random.rand(2, 3))
+
+    tkmol1 = mol.to_data(translator="fake_translator")
+    tkmol2 = mol.to_data(translator="fake_translator")
+    shared1 = mol.to_data(translator="fake_translator", copy=False)
+    shared2 = mol.to_data(translator="fake_translator", copy=False)
+
+    assert FakeToolkitModel.nbuilds == 1
+    assert tkmol1 is not tkmol2
+    assert shared1 is shared2
+    assert tkmodel_cache.info()["hits"] == 3
+
+    mol.to_data(translator="fake_translator", cache=False)
+    assert FakeToolkitModel.nbuilds == 2
+
+
+def test_mol_to_data_content(fake_translator):
+    geom = numpy.random.rand(2, 3)
+    mol1 = Molecule(symbols=["C", "H"], geometry=geom, residues=[("ALA", 1)] * 2)
+    mol2 = Molecule(symbols=["C", "H"], geometry=geom, residues=[("GLY", 1)] * 2)
+    assert mol1.get_hash() == mol2.get_hash()
+    assert content_key(mol1) != content_key(mol2)
+
+    mol1.to_data(translator="fake_translator")
+    mol2.to_data(translator="fake_translator")
+    assert FakeToolkitModel.nbuilds == 2
+
+    # The digest is memoized per instance and reset by updated copies
+    assert mol1._content_key == content_key(mol1)
+    mol3 = mol1.copy(update={"residues": mol2.residues})
+    assert mol3._content_key is None
+    assert content_key(mol3) == content_key(mol2)
+
+
+def test_to_data_miss(fake_translator):
+    mol = Molecule(symbols=["C", "H"], geometry=numpy.random.rand(2, 3))
+    # The object built on a miss is cached, the caller getting a copy it can modify
+    tkmol = mol.to_data(translator="fake_translator")
+    tkmol.model = None
+    cached = mol.to_data(translator="fake_translator", copy=False)
+    assert cached is not tkmol and cached.model is not None
+    assert mol.to_data(translator="fake_translator") is not cached
+    assert FakeToolkitModel.nbuilds == 1
+
+
+def test_ff_to_data_cached(fake_translator):
+    lj = ff.nonbonded.potentials.LennardJones(
+        epsilon=numpy.random.rand(3), sigma=numpy.random.rand(3)
+    )
+    mm_ff = ff.ForceField(nonbonded=ff.nonbonded.NonBonded(params=lj))
+
+    for _ in range(3):
+        mm_ff.to_data(translator="fake_translator")
+    assert FakeToolkitModel.nbuilds == 1
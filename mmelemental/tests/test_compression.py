@@ -0,0 +1,86 @@
+"""
+Compressed model file tests for the mmelemental package.
+"""
+import os
+import pytest
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.models.app.base import SimInput
+from mmelemental.models.collect.mm_traj import Frame, Trajectory
+from mmelemental.models.collect.sm_ensem import Ensemble, Microstate
+from mmelemental.models.forcefield import ForceField
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util import compression
+
+
+def test_split_ext():
+    assert compression.split_ext("mol.json.gz") == (".json", ".gz")
+    assert compression.split_ext("dir.v1/mol.msgpack.zst") == (".msgpack", ".zst")
+    assert compression.split_ext("mol.json") == (".json", None)
+    assert compression.split_ext("mol.pdb") == (".pdb", None)
+
+
+@pytest.mark.parametrize("suffix", compression.suffixes())
+def test_roundtrip(suffix, tmp_path):
+    system = synthetic.water_box(50, seed=0)
+    for ext in ("json", "msgpack"):
+        if ext == "msgpack":
+            pytest.importorskip("msgpack")
+        filename = str(tmp_path / f"mol.{ext}{suffix}")
+        system.mol.to_file(filename)
+        assert Molecule.from_file(filename).get_hash() == system.mol.get_hash()
+        assert os.path.getsize(filename) < len(system.mol.json())
+
+        filename = str(tmp_path / f"ff.{ext}{suffix}")
+        system.ff.to_file(filename)
+        assert ForceField.from_file(filename).get_hash() == system.ff.get_hash()
+
+        filename = str(tmp_path / f"sim.{ext}{suffix}")
+        SimInput(mol={"water": system.mol}).to_file(filename)
+        copy = SimInput.from_file(filename)
+        assert copy.mol["water"].get_hash() == system.mol.get_hash()
+
+        frames = [Frame(geometry=system.mol.geometry, timestep=i) for i in range(2)]
+        filename = str(tmp_path / f"traj.{ext}{suffix}")
+        Trajectory(mol=system.mol, frames=frames).to_file(filename)
+        traj = Trajectory.from_file(filename)
+        assert traj.mol.get_hash() == system.mol.get_hash()
+        # Arrays are flattened in JSON
+        numpy.testing.assert_array_equal(
+            traj.frames[1].geometry.ravel(), frames[1].geometry.ravel()
+        )
+
+        states = [Microstate(geometry=system.mol.geometry * i) for i in range(2)]
+        filename = str(tmp_path / f"ensemble.{ext}{suffix}")
+        Ensemble(mol={"water": [system.mol]}, states={"water": states}).to_file(
+            filename
+        )
+        ensemble = Ensemble.from_file(filename)
+        assert ensemble.mol["water"][0].get_hash() == system.mol.get_hash()
+        numpy.testing.assert_array_equal(
+            ensemble.states["water"][1].geometry.ravel(), states[1].geometry.ravel()
+        )
+
+
+def test_level(tmp_path):
+    mol = synthetic.water_box(200, seed=0).mol
+    fast, best = str(tmp_path / "fast.json.gz"), str(tmp_path / "best.json.gz")
+    mol.to_file(fast, compresslevel=1)
+    mol.to_file(best, compresslevel=9)
+    assert os.path.getsize(best) < os.path.getsize(fast)
+    assert Molecule.from_file(best).get_hash() == mol.get_hash()
+
+
+def test_threads(tmp_path):
+    pytest.importorskip("zstandard")
+    mol = synthetic.water_box(200, seed=0).mol
+    filename = str(tmp_path / "mol.json.zst")
+    mol.to_file(filename, threads=2)
+    assert Molecule.from_file(filename).get_hash() == mol.get_hash()
+
+
+def test_unsupported(tmp_path):
+    with pytest.raises(NotImplementedError):
+        synthetic.water_box(5, seed=0).mol.to_file(str(tmp_path / "mol.pdb.gz"))
+    with pytest.raises(NotImplementedError):
+        Ensemble().to_file(str(tmp_path / "ensemble.pdb"))
@@ -0,0 +1,122 @@
+"""
+Bond constraint tests for the mmelemental package.
+"""
+import warnings
+import pytest
+import numpy
+from mmelemental.models.app.dynamics import DynamicsInput
+from mmelemental.compute import constraints, dynamics, synthetic
+from mmelemental.components.sim.dynamics_component import DynamicsComponent
+from .test_energy import build_chain
+
+
+def distances(geom, pairs):
+    return numpy.linalg.norm(geom[pairs[:, 0]] - geom[pairs[:, 1]], axis=1)
+
+
+def rigid_waters(nwaters, seed=0):
+    """ Geometry, constrained O-H and H-H pairs and their lengths, and masses of a water box. """
+    water = synthetic.water_box(nwaters, seed=seed).mol
+    bonds = numpy.array(water.connectivity, dtype=numpy.int64)[:, :2]
+    pairs = numpy.concatenate((bonds, bonds[:, 1].reshape(-1, 2)))
+    return water.geometry, pairs, distances(water.geometry, pairs), water.masses
+
+
+def test_clusters():
+    pairs = numpy.array([[0, 1], [1, 2], [3, 4], [5, 6], [6, 4]])
+    labels = constraints.constraint_clusters(pairs, 8)
+    assert labels.tolist() == [0, 0, 3, 3, 3]
+
+    colors = constraints.color_constraints(pairs, 8)
+    for color in numpy.unique(colors):
+        atoms = pairs[colors == color].ravel()
+        assert len(atoms) == len(numpy.unique(atoms))
+
+
+@pytest.mark.parametrize("method", ["settle", "shake"])
+def test_water_positions(method):
+    geom, pairs, lengths, masses = rigid_waters(200)
+    solver = constraints.Constraints(pairs, lengths, masses, method=method, tol=1e-10)
+    assert solver.stats()["nsettle"] == (200 if method == "settle" else 0)
+
+    moved = geom + numpy.random.default_rng(1).standard_normal(geom.shape) * 0.02
+    fixed = solver.apply(geom, moved.copy())
+    assert numpy.allclose(distances(fixed, pairs), lengths, atol=1e-8)
+    # Constraint forces do not move the center of mass of any water
+    com = lambda x: (masses[:, None] * x).reshape(-1, 3, 3).sum(1)
+    assert numpy.allclose(com(fixed), com(moved), atol=1e-8)
+
+    vel = numpy.random.default_rng(2).standard_normal(geom.shape)
+    momentum = masses @ vel
+    solver.apply_velocities(fixed, vel)
+    bonds = fixed[pairs[:, 0]] - fixed[pairs[:, 1]]
+    rel = vel[pairs[:, 0]] - vel[pairs[:, 1]]
+    assert numpy.allclose(numpy.einsum("ij,ij->i", bonds, rel), 0.0, atol=1e-8)
+    assert numpy.allclose(masses @ vel, momentum)
+
+
+def test_shake_chain():
+    mol, _ = build_chain(10)
+    pairs = numpy.array([(i, i + 1) for i in range(9)])
+    lengths = numpy.full(9, 1.5)
+    masses = numpy.full(10, 12.0)
+    solver = constraints.Constraints(pairs, lengths, masses, tol=1e-10)
+    geom = solver.apply(mol.geometry.copy(), mol.geometry.copy())
+    assert numpy.allclose(distances(geom, pairs), lengths, atol=1e-8)
+    stats = solver.stats()
+    assert stats["ncalls"] == 1 and stats["nshake"] == 9 and stats["nsettle"] == 0
+    assert stats["last_error"] <= 1e-10
+
+    solver = constraints.Constraints(pairs, lengths, masses, tol=1e-12, max_iter=2)
+    with pytest.warns(UserWarning):
+        solver.apply(mol.geometry.copy(), mol.geometry.copy())
+
+    with pytest.raises(NotImplementedError):
+        constraints.Constraints(pairs, lengths, masses, method="lincs")
+
+
+@pytest.mark.parametrize("method", ["velocity-verlet", "leapfrog"])
+def test_constrained_dynamics(method):
+    geom, pairs, lengths, masses = rigid_waters(50)
+    center = geom.copy()
+
+    def func(x):
+        # Atoms tethered to their initial positions
+        return 50.0 * float(((x - center) ** 2).sum()), -100.0 * (x - center)
+
+    solver = constraints.Constraints(pairs, lengths, masses)
+    md = dynamics.Dynamics(
+        func,
+        geom,
+        masses,
+        dynamics.maxwell_boltzmann(masses, 300.0, seed=0),
+        dt=1.0,
+        method=method,
+        constraints=solver,
+    )
+    assert md.ndof == 3 * 150 - 3 - 150
+    states = list(md.run(500, freq=50))
+    assert numpy.allclose(distances(md.geometry, pairs), lengths, atol=1e-6)
+    total = [s.pot_energy + s.kin_energy for s in states]
+    assert numpy.std(total) < 0.01 * numpy.mean([s.kin_energy for s in states])
+
+
+def test_component_constraints():
+    mol, mm_ff = build_chain(10)
+    inputs = DynamicsInput(
+        mol={"chain": mol},
+        forcefield={"chain": mm_ff},
+        step_size=1.0,
+        nsteps=100,
+        gen_vel=[True],
+        gen_temp=[300.0],
+        gen_seed=[5],
+        temp_method="nve",
+        bond_const={"chain": [0, 1, 2, 7]},
+        bond_const_method="shake",
+        bond_const_tol=1e-10,
+    )
+    out = DynamicsComponent.compute(inputs)
+    final = out.mol["chain"].geometry
+    pairs = numpy.array([(0, 1), (1, 2), (2, 3), (7, 8)])
+    assert numpy.allclose(distances(final, pairs), 1.5, atol=1e-6)
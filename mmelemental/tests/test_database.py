@@ -0,0 +1,77 @@
+"""
+SQLite molecule database tests for the mmelemental package.
+"""
+import threading
+import pytest
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.models.molecule.mm_mol import Identifiers
+from mmelemental.util.database import MoleculeDatabase
+
+
+@pytest.fixture(params=["msgpack", "json"])
+def mols(request, tmp_path):
+    if request.param == "msgpack":
+        pytest.importorskip("msgpack")
+    ligands = [system.mol for system in synthetic.ligand_library(10, seed=0)]
+    ligands[0] = ligands[0].copy(
+        update={"identifiers": Identifiers(smiles="CCO", inchi="InChI=1S/C2H6O")}
+    )
+    protein = synthetic.random_protein(4, seed=0, residues=["ALA", "GLY"]).mol
+    path = str(tmp_path / "mols.sqlite")
+    with MoleculeDatabase(path, codec=request.param) as db:
+        assert db.add_many(ligands + [protein], batch_size=4) == 11
+        yield db, ligands, protein
+
+
+def test_add(mols):
+    db, ligands, protein = mols
+    assert not db.add(protein)
+    assert len(db) == 11
+    assert protein.get_hash() in db
+    assert db.get(protein.get_hash()).get_hash() == protein.get_hash()
+    assert db.get("0" * 40) is None
+
+
+def test_query(mols):
+    db, ligands, protein = mols
+    assert [mol.name for mol in db.query(smiles="CCO")] == [ligands[0].name]
+    assert db.count(inchi="InChI=1S/C2H6O") == 1
+
+    formula = ligands[3].get_molecular_formula()
+    assert ligands[3].get_hash() in db.hashes(formula=formula)
+    assert db.count(natoms=len(protein.symbols)) >= 1
+    assert db.count(natoms=numpy.int64(len(protein.symbols))) >= 1
+    sizes = [len(mol.symbols) for mol in db.query(natoms=numpy.array([10, 25]))]
+    assert sizes and all(10 <= size <= 25 for size in sizes)
+
+    assert [mol.name for mol in db.query(residues="ALA")] == [protein.name]
+    assert db.count(residues=["ALA", "GLY"]) == 1
+    assert db.count(residues=["ALA", "SER"]) == 0
+
+    stream = db.query(limit=3)
+    assert next(stream).get_hash() == ligands[0].get_hash()
+    assert len(list(stream)) == 2
+    with pytest.raises(TypeError):
+        db.count(payload=b"")
+
+
+def test_concurrent_readers(mols):
+    db, ligands, protein = mols
+    readers = [MoleculeDatabase(db.path, readonly=True) for _ in range(4)]
+    counts = []
+
+    def read(reader):
+        counts.append(sum(1 for _ in reader.query(natoms=(0, 10 ** 6))))
+
+    threads = [threading.Thread(target=read, args=(reader,)) for reader in readers]
+    for thread in threads:
+        thread.start()
+    db.add(synthetic.water_box(5, seed=0).mol)
+    for thread in threads:
+        thread.join()
+    # Readers see the database before or after the insert, never a partial one
+    assert all(count in (11, 12) for count in counts) and len(counts) == 4
+    assert readers[0].count() == 12
+    for reader in readers:
+        reader.close()
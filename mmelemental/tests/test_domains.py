@@ -0,0 +1,109 @@
+"""
+Domain decomposition tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.models.app.base import SimInput
+from mmelemental.models import forcefield as ff
+from mmelemental.compute.neighbors import neighbor_pairs
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.domains import (
+    DomainDecomposition,
+    contacts,
+    domain_grid,
+    nonbonded,
+)
+
+
+def _fluid(natoms=600, length=25.0, seed=0):
+    rng = numpy.random.default_rng(seed)
+    mol = Molecule(symbols=["Ar"] * natoms, geometry=rng.random((natoms, 3)) * length)
+    mm_ff = ff.ForceField(
+        nonbonded=ff.nonbonded.NonBonded(
+            params=ff.nonbonded.potentials.LennardJones(
+                epsilon=numpy.full(natoms, 0.99), sigma=numpy.full(natoms, 3.4)
+            )
+        ),
+        charges=rng.uniform(-0.5, 0.5, natoms),
+        types=["Ar"] * natoms,
+    )
+    return mol, mm_ff, numpy.full(3, length)
+
+
+def _sorted(pairs):
+    return pairs[numpy.lexsort(pairs.T[::-1])]
+
+
+@pytest.mark.parametrize("periodic", [True, False])
+def test_domain_contacts(periodic):
+    mol, _, box = _fluid()
+    kwargs = {"box": box} if periodic else {}
+    ref = neighbor_pairs(mol.geometry, 5.0, **kwargs)
+    ref = _sorted(numpy.stack([ref.i, ref.j], -1))
+    for ndomains in (1, 4, (3, 1, 2)):
+        dd = DomainDecomposition(mol.geometry, 5.0, ndomains, **kwargs)
+        owners = dd.owners()
+        assert numpy.array_equal(
+            numpy.bincount(owners, minlength=dd.ndomains),
+            [dd.view(k).nowned for k in range(dd.ndomains)],
+        )
+        found = _sorted(numpy.concatenate(dd.map(contacts, 5.0, processes=1)))
+        assert numpy.array_equal(found, ref)
+
+
+def test_domain_energy():
+    mol, mm_ff, box = _fluid()
+    model = ForceFieldEnergy(mol, mm_ff, cutoff=6.0, box=box)
+    energy, forces, terms = model.compute(mol.geometry)
+
+    with DomainDecomposition(mol.geometry, 6.0, 4, box=box) as dd:
+        results = dd.map(nonbonded, model, processes=2)
+        assert numpy.isclose(sum(e for e, _ in results), terms["lj"] + terms["coulomb"])
+        assert numpy.allclose(dd.accumulate([f for _, f in results]), forces)
+        serial = dd.map(nonbonded, model, processes=1)
+        assert [e for e, _ in serial] == [e for e, _ in results]
+
+
+def test_domain_pool():
+    mol, _, box = _fluid()
+    with DomainDecomposition(mol.geometry, 5.0, 4, box=box) as dd:
+        dd.map(contacts, 5.0, processes=2)
+        pool = dd._resources["pool"]
+
+        # The workers see positions updated in place
+        moved = (mol.geometry + [1.0, 7.0, -3.0]) % box
+        dd.update(moved)
+        found = _sorted(numpy.concatenate(dd.map(contacts, float("5"), processes=2)))
+        assert dd._resources["pool"] is pool
+        ref = neighbor_pairs(moved, 5.0, box)
+        assert numpy.array_equal(found, _sorted(numpy.stack([ref.i, ref.j], -1)))
+
+        # A new kernel or arguments restart the workers
+        dd.map(contacts, 4.0, processes=2)
+        assert dd._resources["pool"] is not pool
+    assert not dd._resources
+    assert numpy.array_equal(dd.geometry, moved)
+
+    # Updates never write to the positions the decomposition was built from
+    geometry = mol.geometry.copy()
+    dd = DomainDecomposition(mol.geometry, 5.0, 4, box=box)
+    dd.update(moved)
+    assert numpy.array_equal(mol.geometry, geometry)
+    assert numpy.array_equal(dd.geometry, moved)
+
+
+def test_domain_input():
+    mol, mm_ff, box = _fluid(100)
+    inputs = SimInput(
+        mol={"fluid": mol},
+        forcefield={"fluid": mm_ff},
+        cell=((0, 0, 0), tuple(box)),
+        boundary=("periodic", "periodic", "periodic"),
+    )
+    dd = DomainDecomposition.from_input(inputs, 5.0, ndomains=8)
+    assert dd.ndomains == 8 and dd.grid.periodic.all()
+    assert numpy.allclose(dd.grid.extent, box)
+    assert tuple(domain_grid(4, numpy.array([100.0, 10.0, 10.0]), 2.0)) == (4, 1, 1)
+    with pytest.raises(ValueError):
+        DomainDecomposition(mol.geometry, 20.0, (2, 1, 1), box=box)
@@ -0,0 +1,129 @@
+"""
+Molecular dynamics tests for the mmelemental package.
+"""
+import json
+import pytest
+import numpy
+from mmelemental.models.app.dynamics import DynamicsInput, DynamicsOutput
+from mmelemental.models.collect.mm_traj import Frame
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute import dynamics
+from mmelemental.components.sim.dynamics_component import DynamicsComponent
+from .test_energy import build_chain
+
+
+def oscillators(natoms=500, spring=100.0):
+    """ Independent 3D harmonic oscillators: fast forces for thermostat tests. """
+
+    def func(x):
+        return 0.5 * spring * float((x * x).sum()), -spring * x
+
+    return func, numpy.full(natoms, 12.0)
+
+
+def test_maxwell_boltzmann():
+    masses = numpy.random.rand(1000) * 20 + 1
+    vel = dynamics.maxwell_boltzmann(masses, 300.0, seed=42)
+    assert vel.shape == (1000, 3)
+    assert numpy.allclose(vel, dynamics.maxwell_boltzmann(masses, 300.0, seed=42))
+    assert not numpy.allclose(vel, dynamics.maxwell_boltzmann(masses, 300.0, seed=7))
+    assert numpy.allclose(masses @ vel, 0.0, atol=1e-10)
+    ke = dynamics.kinetic_energy(masses, vel)
+    assert numpy.isclose(dynamics.temperature(ke, 3 * 1000 - 3), 300.0)
+
+    # Unscaled velocities follow the distribution
+    vel = dynamics.maxwell_boltzmann(masses, 300.0, seed=1, exact=False)
+    ke = dynamics.kinetic_energy(masses, vel)
+    assert abs(dynamics.temperature(ke, 3 * 1000 - 3) - 300.0) < 20.0
+
+
+@pytest.mark.parametrize("method", ["velocity-verlet", "leapfrog"])
+def test_nve(method):
+    mol, mm_ff = build_chain(12)
+    model = ForceFieldEnergy(mol, mm_ff)
+    vel = dynamics.maxwell_boltzmann(model.masses, 300.0, seed=3)
+    md = dynamics.Dynamics(
+        lambda x: model.compute(x)[:2],
+        mol.geometry,
+        model.masses,
+        vel,
+        dt=0.5,
+        method=method,
+    )
+    states = list(md.run(1000, freq=100))
+    assert [state.step for state in states] == list(range(0, 1001, 100))
+    total = [state.pot_energy + state.kin_energy for state in states]
+    assert numpy.std(total) < 0.01 * numpy.mean([s.kin_energy for s in states])
+    # Snapshots own their arrays
+    assert not numpy.shares_memory(states[-1].geometry, md.geometry)
+
+    with pytest.raises(NotImplementedError):
+        dynamics.Dynamics(model.compute, mol.geometry, model.masses, method="rk4")
+
+
+@pytest.mark.parametrize("method", ["berendsen", "v-rescale", "langevin"])
+def test_thermostats(method):
+    func, masses = oscillators()
+    geom = numpy.zeros((len(masses), 3))
+    tau = 20.0
+    md = dynamics.Dynamics(
+        func,
+        geom,
+        masses,
+        dynamics.maxwell_boltzmann(masses, 50.0, seed=0),
+        dt=1.0,
+        thermostat=dynamics.thermostat(method, 300.0, tau=tau, seed=0),
+    )
+    temps = [state.temperature for state in md.run(3000, freq=10)]
+    # Equipartition: the kinetic temperature relaxes to the bath temperature
+    assert abs(numpy.mean(temps[100:]) - 300.0) < 15.0
+    assert dynamics.thermostat("no", 300.0) is None
+    with pytest.raises(NotImplementedError):
+        dynamics.thermostat("nose-hoover", 300.0)
+
+
+def _frames(path):
+    with open(path) as fp:
+        return [Frame(**json.loads(line)) for line in fp]
+
+
+def test_dynamics_component(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mol, mm_ff = build_chain(10)
+    inputs = DynamicsInput(
+        mol={"chain": mol},
+        forcefield={"chain": mm_ff},
+        march_method="leapfrog",
+        step_size=0.5,
+        nsteps=200,
+        freq=50,
+        gen_vel=[True],
+        gen_temp=[300.0],
+        gen_seed=[11],
+        temp=[300.0],
+        temp_method="v-rescale",
+    )
+    out = DynamicsComponent.compute(inputs)
+    assert isinstance(out, DynamicsOutput)
+    assert out.simInput.temp_method == "v-rescale"
+    assert numpy.allclose(out.observables["time"], [0, 25, 50, 75, 100])
+    assert out.mol["chain"].velocities.shape == mol.geometry.shape
+
+    # Frames are streamed to disk, to traj.jsonl by default, and not kept in the output
+    assert out.trajectory is None
+    frames = _frames("traj.jsonl")
+    assert len(frames) == 5
+    assert numpy.allclose(
+        numpy.asarray(frames[-1].geometry).reshape(-1, 3), out.mol["chain"].geometry
+    )
+
+    # Same seed, same trajectory
+    path = str(tmp_path / "chain.jsonl")
+    again = DynamicsComponent.compute(inputs.copy(update={"traj": path}))
+    assert numpy.allclose(again.mol["chain"].geometry, out.mol["chain"].geometry)
+    assert len(_frames(path)) == 5
+
+    with pytest.raises(NotImplementedError):
+        DynamicsComponent.compute(
+            inputs.copy(update={"press_method": "berendsen", "press": [1.0]})
+        )
@@ -0,0 +1,150 @@
+"""
+Electrostatics tests for the mmelemental package.
+"""
+import pytest
+import math
+import numpy
+from mmelemental.compute import electrostatics as es
+from mmelemental.compute import neighbors
+
+box = numpy.array([20.0, 22.0, 24.0])
+
+
+def random_system(natoms=150):
+    geom = numpy.random.rand(natoms, 3) * box
+    charges = numpy.random.randn(natoms)
+    return geom, charges - charges.mean()
+
+
+def numeric_forces(func, geom, atoms=(0, 7), h=1e-5):
+    forces = []
+    for atom in atoms:
+        for dim in range(3):
+            plus, minus = geom.copy(), geom.copy()
+            plus[atom, dim] += h
+            minus[atom, dim] -= h
+            forces.append(-(func(plus) - func(minus)) / (2 * h))
+    return numpy.array(forces).reshape(len(atoms), 3)
+
+
+def test_erfc():
+    x = numpy.linspace(-3, 8, 500)
+    ref = numpy.array([math.erfc(val) for val in x])
+    assert numpy.allclose(es.erfc(x), ref, rtol=2e-7, atol=0)
+
+
+@pytest.mark.parametrize("order", [4, 6])
+def test_pme_against_ewald(order):
+    geom, charges = random_system()
+    alpha = es.ewald_alpha(9.0, 1e-6)
+    ref_energy, ref_forces = es.ewald_reciprocal(charges, geom, box, alpha, kmax=14)
+
+    pme = es.PME(box, alpha, spacing=0.5, order=order)
+    energy, forces = pme.reciprocal(charges, geom)
+    tol = 1e-4 if order == 4 else 1e-6
+    assert abs(energy - ref_energy) < tol * abs(ref_energy)
+    assert numpy.abs(forces - ref_forces).max() < 10 * tol * numpy.abs(ref_forces).max()
+
+    # Forces are the exact gradient of the PME energy
+    atoms = (0, 7)
+    numeric = numeric_forces(lambda g: pme.reciprocal(charges, g)[0], geom, atoms)
+    assert numpy.allclose(forces[list(atoms)], numeric, rtol=1e-5, atol=1e-5)
+
+
+def test_madelung():
+    # Rock salt with a nearest-neighbor distance of 2 angstroms in a 3x3x3 supercell
+    grid = numpy.stack(
+        numpy.meshgrid(*(numpy.arange(6),) * 3, indexing="ij"), -1
+    ).reshape(-1, 3)
+    geom = 2.0 * grid.astype(float)
+    charges = numpy.where(grid.sum(axis=1) % 2, -1.0, 1.0)
+    cubic = numpy.full(3, 12.0)
+
+    for method in ("ewald", "pme"):
+        kwargs = {"kmax": 12} if method == "ewald" else {"spacing": 0.4, "order": 6}
+        energy, forces = es.electrostatic_energy(
+            charges, geom, method, rc=5.9, box=cubic, tolerance=1e-7, **kwargs
+        )
+        madelung = -2.0 * energy / len(charges) * 2.0 / es.COULOMB
+        assert abs(madelung - 1.747565) < 1e-4
+        assert numpy.abs(forces).max() < 1e-3
+
+
+@pytest.mark.parametrize("method", ["cutoff", "reaction-field", "pme"])
+def test_electrostatic_forces(method):
+    geom, charges = random_system(80)
+    pairs = neighbors.neighbor_pairs(geom, 9.0, box)
+    energy, forces = es.electrostatic_energy(charges, geom, method, rc=9.0, box=box)
+    assert numpy.isclose(
+        es.electrostatic_energy(charges, geom, method, rc=9.0, box=box, pairs=pairs)[0],
+        energy,
+    )
+
+    pme = es.PME(box, es.ewald_alpha(9.0)) if method == "pme" else None
+    numeric = numeric_forces(
+        lambda g: es.electrostatic_energy(charges, g, method, rc=9.0, box=box, pme=pme)[
+            0
+        ],
+        geom,
+    )
+    assert numpy.allclose(forces[[0, 7]], numeric, rtol=1e-4, atol=1e-3)
+
+
+def test_exclusions_and_charge_groups():
+    # Two neutral dipoles with excluded intramolecular pairs
+    geom = numpy.array([[5.0, 5, 5], [6.0, 5, 5], [10.0, 9, 8], [11.0, 9, 8]])
+    charges = numpy.array([0.5, -0.5, 0.5, -0.5])
+    keys = neighbors.exclusion_pairs([(0, 1, 1), (2, 3, 1)], 4, depth=1)
+    every = neighbors.neighbor_pairs(geom, 9.0, box)
+    pairs = neighbors.neighbor_pairs(geom, 9.0, box, exclusions=keys)
+    excluded = neighbors.PairList(
+        *(val[numpy.isin(every.i * 4 + every.j, keys)] for val in every)
+    )
+
+    # Excluding pairs removes exactly their full Coulomb interaction
+    full, _ = es.electrostatic_energy(
+        charges, geom, "pme", rc=9.0, box=box, pairs=every
+    )
+    energy, forces = es.electrostatic_energy(
+        charges, geom, "pme", rc=9.0, box=box, pairs=pairs, excluded=excluded
+    )
+    intra = 2 * es.COULOMB * 0.5 * -0.5 / 1.0
+    assert numpy.isclose(full - energy, intra)
+    # Pairs built from the geometry leave the excluded pairs out of the real-space sum
+    for method in ("cutoff", "pme"):
+        built, _ = es.electrostatic_energy(
+            charges, geom, method, rc=9.0, box=box, excluded=excluded
+        )
+        ref, _ = es.electrostatic_energy(
+            charges, geom, method, rc=9.0, box=box, pairs=pairs, excluded=excluded
+        )
+        assert numpy.isclose(built, ref)
+    # PME conserves momentum only up to the interpolation error
+    assert numpy.allclose(forces.sum(axis=0), 0, atol=1e-2)
+
+    # With charge groups, whole dipoles interact or not at all (atom distances span 6.4 to 7.8)
+    direct = sum(
+        es.COULOMB * charges[i] * charges[j] / numpy.linalg.norm(geom[i] - geom[j])
+        for i in (0, 1)
+        for j in (2, 3)
+    )
+    energy, _ = es.electrostatic_energy(
+        charges,
+        geom,
+        "cutoff",
+        rc=7.5,
+        box=box,
+        pairs=pairs,
+        charge_groups=[0, 0, 1, 1],
+    )
+    assert numpy.isclose(energy, direct)
+    energy, _ = es.electrostatic_energy(
+        charges,
+        geom,
+        "cutoff",
+        rc=7.0,
+        box=box,
+        pairs=pairs,
+        charge_groups=[0, 0, 1, 1],
+    )
+    assert energy == 0.0
@@ -0,0 +1,163 @@
+"""
+Force field energy tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.models import forcefield as ff
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.batch import BatchEnergy
+from mmelemental.compute.electrostatics import COULOMB, electrostatic_energy
+from mmelemental.compute.neighbors import neighbor_pairs
+
+
+def build_chain(natoms=8, charged=True):
+    """ Zig-zag chain with all bonds, angles, and dihedrals. """
+    geom = numpy.zeros((natoms, 3))
+    geom[:, 0] = numpy.arange(natoms) * 1.3
+    geom[1::2, 1] = 0.9
+    geom += 0.1 * numpy.random.rand(natoms, 3)
+    bonds = [(i, i + 1, 1.0) for i in range(natoms - 1)]
+    angles = [(i, i + 1, i + 2) for i in range(natoms - 2)]
+    dihedrals = [(i, i + 1, i + 2, i + 3, 1) for i in range(natoms - 3)]
+    mol = Molecule(
+        symbols=["C"] * natoms,
+        geometry=geom,
+        connectivity=bonds,
+        angles=angles,
+        dihedrals=dihedrals,
+    )
+
+    nbonds, nangles, ndihedrals = len(bonds), len(angles), len(dihedrals)
+    half = nbonds // 2
+    mm_ff = ff.ForceField(
+        nonbonded=ff.nonbonded.NonBonded(
+            params=ff.nonbonded.potentials.LennardJones(
+                epsilon=0.3 + 0.1 * numpy.random.rand(natoms),
+                sigma=numpy.full(natoms, 2.5),
+            )
+        ),
+        bonds=ff.bonded.Bonds(
+            params=[
+                ff.bonded.bonds.potentials.Harmonic(
+                    spring=numpy.full(half, 2000.0), lengths=numpy.full(half, 1.5)
+                ),
+                ff.bonded.bonds.potentials.Gromos96(
+                    spring=numpy.full(nbonds - half, 500.0),
+                    lengths=numpy.full(nbonds - half, 1.5),
+                ),
+            ]
+        ),
+        angles=ff.bonded.Angles(
+            params=ff.bonded.angles.potentials.Harmonic(
+                spring=numpy.full(nangles, 0.1), angles=numpy.full(nangles, 109.5)
+            )
+        ),
+        dihedrals=ff.bonded.Dihedrals(
+            params=ff.bonded.dihedrals.potentials.Harmonic(
+                spring=numpy.full(ndihedrals, 0.01),
+                angles=numpy.full(ndihedrals, 180.0),
+            )
+        ),
+        types=["CT"] * natoms,
+    )
+    if charged:
+        mm_ff = mm_ff.copy(update={"charges": numpy.random.uniform(-0.5, 0.5, natoms)})
+    return mol, mm_ff
+
+
+def numeric_forces(model, geom, h=1e-5):
+    forces = numpy.zeros_like(geom)
+    for atom in range(len(geom)):
+        for dim in range(3):
+            plus, minus = geom.copy(), geom.copy()
+            plus[atom, dim] += h
+            minus[atom, dim] -= h
+            forces[atom, dim] = -(model.energy(plus) - model.energy(minus)) / (2 * h)
+    return forces
+
+
+def test_energy_forces():
+    mol, mm_ff = build_chain()
+    model = ForceFieldEnergy(mol, mm_ff)
+    energy, forces, terms = model.compute(mol.geometry)
+
+    assert set(terms) == {"bonds", "angles", "dihedrals", "lj", "coulomb"}
+    assert numpy.isclose(energy, sum(terms.values()))
+    assert numpy.allclose(forces, numeric_forces(model, mol.geometry), atol=1e-4)
+    assert numpy.allclose(forces.sum(axis=0), 0, atol=1e-8)
+
+    # Bonded atoms (up to 1-4) are excluded from non-bonded pairs
+    pairs = model.pairs(mol.geometry)
+    assert numpy.all(pairs.j - pairs.i > 3)
+
+
+def test_energy_units():
+    mol, mm_ff = build_chain(charged=False)
+    energy = ForceFieldEnergy(mol, mm_ff).energy(mol.geometry)
+
+    params = mm_ff.angles.params
+    angles = ff.bonded.Angles(
+        params=ff.bonded.angles.potentials.Harmonic(
+            spring=params.spring * (180 / numpy.pi) ** 2,
+            spring_units="kJ/(mol*radians**2)",
+            angles=numpy.deg2rad(params.angles),
+            angles_units="radians",
+        )
+    )
+    mm_ff = mm_ff.copy(update={"angles": angles})
+    assert numpy.isclose(ForceFieldEnergy(mol, mm_ff).energy(mol.geometry), energy)
+
+
+def test_energy_cutoff():
+    natoms = 300
+    box = numpy.full(3, 18.0)
+    mol = Molecule(symbols=["Ar"] * natoms, geometry=numpy.random.rand(natoms, 3) * box)
+    mm_ff = ff.ForceField(
+        nonbonded=ff.nonbonded.NonBonded(
+            params=ff.nonbonded.potentials.LennardJones(
+                epsilon=numpy.full(natoms, 0.99), sigma=numpy.full(natoms, 3.4)
+            )
+        ),
+        types=["Ar"] * natoms,
+    )
+    model = ForceFieldEnergy(mol, mm_ff, cutoff=8.0, box=box, skin=1.0)
+    energy, forces, _ = model.compute(mol.geometry)
+
+    i, j = numpy.triu_indices(natoms, k=1)
+    d = mol.geometry[i] - mol.geometry[j]
+    d -= box * numpy.round(d / box)
+    r = numpy.linalg.norm(d, axis=1)
+    r = r[r < 8.0]
+    ref = (4 * 0.99 * ((3.4 / r) ** 12 - (3.4 / r) ** 6)).sum()
+    assert numpy.isclose(energy, ref)
+
+    # Small displacements reuse the buffered pair list
+    pairs = model._pairs
+    moved = mol.geometry + 0.1
+    assert numpy.isclose(model.energy(moved), energy)
+    assert model._pairs is pairs
+
+
+@pytest.mark.parametrize("method", ["ewald", "pme"])
+def test_energy_ewald_exclusions(method):
+    mol, mm_ff = build_chain()
+    box = numpy.full(3, 20.0)
+    model = ForceFieldEnergy(mol, mm_ff, cutoff=9.0, box=box, electrostatics=method)
+    _, forces, terms = model.compute(mol.geometry)
+
+    # Excluded (bonded) pairs lose their whole Coulomb interaction, reciprocal part included
+    charges, geom = model.charges, mol.geometry
+    full, _ = electrostatic_energy(
+        charges, geom, method, rc=9.0, box=box, pairs=neighbor_pairs(geom, 9.0, box)
+    )
+    i, j = numpy.divmod(model.exclusions, model.natoms)
+    r = numpy.linalg.norm(geom[i] - geom[j], axis=1)
+    assert numpy.isclose(
+        terms["coulomb"], full - (COULOMB * charges[i] * charges[j] / r).sum()
+    )
+
+    if method == "ewald":
+        assert numpy.allclose(forces, numeric_forces(model, geom), atol=1e-4)
+    energies, _ = BatchEnergy(model).compute(geom)
+    assert numpy.isclose(energies[0], model.energy(geom))
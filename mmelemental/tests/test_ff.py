@@ -114,3 +114,88 @@ def test_forcefield_hybrid():
     )
     mm_ff.to_file("forcefield.json")
     rewrite("forcefield.json")
+
+
+def test_forcefield_compress():
+    ntypes = 4
+    types = [f"T{i}" for i in numpy.random.randint(ntypes, size=natoms)]
+    type_ids = numpy.array([int(name[1:]) for name in types])
+    epsilon, sigma = numpy.random.rand(ntypes), numpy.random.rand(ntypes)
+    lj = ff.nonbonded.potentials.LennardJones(
+        epsilon=epsilon[type_ids], sigma=sigma[type_ids]
+    )
+    mm_ff = ff.ForceField(
+        nonbonded=ff.nonbonded.NonBonded(params=lj),
+        bonds=test_bonds_hybrid(),
+        angles=test_angles(),
+        charges=numpy.random.rand(natoms),
+        masses=(type_ids + 1.0) * 12,
+        types=types,
+        symbols=["C"] * natoms,
+    )
+
+    cff = mm_ff.compress()
+    assert cff.nonbonded.nrows == len(set(types))
+    assert cff.nonbonded.index.dtype == numpy.int16
+    assert sorted(cff.nonbonded.labels) == sorted(set(types))
+    assert cff.masses.nrows == len(set(types))
+    assert cff.symbols.nrows == 1
+    assert isinstance(cff.bonds, list)
+    assert numpy.allclose(cff.nonbonded.column("sigma"), lj.sigma)
+
+    expanded = cff.expand()
+    assert expanded.types == types
+    assert expanded.symbols == mm_ff.symbols
+    assert expanded.angles.params.angles_units == "radians"
+    assert numpy.allclose(expanded.nonbonded.params.epsilon, lj.epsilon)
+    assert numpy.allclose(expanded.charges, mm_ff.charges)
+    assert numpy.allclose(expanded.masses, mm_ff.masses)
+    assert expanded.bonds.form == ["Harmonic", "Gromos96"]
+
+    data = cff.json()
+    assert ff.CompressedForceField.parse_raw(data).expand() == expanded
+
+
+def test_forcefield_compress_fields():
+    types = ["CT", "HC", "HC", "HC", "HC"]
+    lj = ff.nonbonded.potentials.LennardJones(
+        epsilon=[0.1, 0.2, 0.2, 0.2, 0.2], sigma=[3.4, 2.6, 2.6, 2.6, 2.6]
+    )
+    mm_ff = ff.ForceField(
+        schema_version=1,
+        name="methane",
+        nonbonded=ff.nonbonded.NonBonded(params=lj),
+        charges=[-0.4, 0.1, 0.1, 0.1, 0.1],
+        masses=[12.011, 1.008, 1.008, 1.008, 1.008],
+        charge_groups=[0, 0, 0, 0, 0],
+        exclusions="3",
+        types=types,
+        symbols=["C", "H", "H", "H", "H"],
+        atomic_numbers=[6, 1, 1, 1, 1],
+        provenance={"creator": "test", "version": "1.0", "routine": "compress"},
+        extras={"source": "test"},
+    )
+    expanded = mm_ff.compress().expand()
+    # Every field set survives compression
+    for name in mm_ff.__fields__:
+        value = getattr(mm_ff, name)
+        if isinstance(value, numpy.ndarray):
+            assert numpy.array_equal(getattr(expanded, name), value), name
+            assert getattr(expanded, name).dtype == value.dtype, name
+        elif hasattr(value, "json"):
+            assert getattr(expanded, name).json() == value.json(), name
+        else:
+            assert getattr(expanded, name) == value, name
+
+
+def test_ff_dict_roundtrip():
+    mm_ff = ff.ForceField(
+        nonbonded=test_nonbonded(),
+        bonds=test_bonds_hybrid(),
+        angles=test_angles(),
+        dihedrals=test_dihedrals(),
+    )
+    data = mm_ff.dict()
+    assert isinstance(data["bonds"]["params"][0], dict)
+    assert ff.ForceField(**data) == mm_ff
+    assert ff.ForceField(**data).bonds.form == ["Harmonic", "Gromos96"]
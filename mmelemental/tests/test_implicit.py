@@ -0,0 +1,65 @@
+"""
+Implicit solvent tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.models.solvent.implicit import Solvent
+from mmelemental.models.app.base import SimInput
+from mmelemental.compute.electrostatics import COULOMB
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.implicit import GeneralizedBorn
+from .test_energy import build_chain, numeric_forces
+
+
+def test_born_ion():
+    solvent = Solvent(implicit=True, surface_tension=0)
+    gb = GeneralizedBorn.from_solvent(solvent, ["Na"], numpy.ones(1))
+    energy, forces, terms = gb.compute(numpy.zeros((1, 3)))
+    radius = 1.5 - 0.09
+    assert numpy.isclose(energy, -0.5 * COULOMB * (1 - 1 / 78.5) / radius)
+    assert set(terms) == {"gb"} and numpy.allclose(forces, 0)
+
+
+@pytest.mark.parametrize("model", ["hct", "obc1", "obc2"])
+def test_gb_forces(model):
+    mol, mm_ff = build_chain(12)
+    model = ForceFieldEnergy(mol, mm_ff, solvent=Solvent(implicit=True, model=model))
+    energy, forces, terms = model.compute(mol.geometry)
+    assert {"gb", "sa"} <= set(terms)
+    assert numpy.isclose(energy, sum(terms.values()))
+    assert numpy.allclose(forces, numeric_forces(model, mol.geometry), atol=1e-4)
+    assert numpy.allclose(forces.sum(axis=0), 0, atol=1e-8)
+
+
+def test_gb_cutoff():
+    mol, mm_ff = build_chain(20)
+    solvent = Solvent(implicit=True)
+    full = GeneralizedBorn.from_solvent(solvent, mol.symbols, mm_ff.charges)
+    cut = GeneralizedBorn.from_solvent(solvent, mol.symbols, mm_ff.charges, cutoff=50.0)
+    assert numpy.allclose(full.born_radii(mol.geometry), cut.born_radii(mol.geometry))
+    assert numpy.isclose(full.energy(mol.geometry), cut.energy(mol.geometry))
+
+    inputs = SimInput(mol={"chain": mol}, forcefield={"chain": mm_ff}, solvent=solvent)
+    _, _, model = ForceFieldEnergy.from_input(inputs)
+    assert "gb" in model.compute(mol.geometry)[2]
+
+
+def test_solvent_parameters():
+    mol = Molecule(
+        symbols=["N", "H", "C", "H", "O", "H"],
+        geometry=numpy.zeros((6, 3)),
+        connectivity=[(0, 1, 1.0), (0, 2, 1.0), (2, 3, 1.0), (2, 4, 1.0), (4, 5, 1.0)],
+    )
+    radii, screen = Solvent(implicit=True).parameters(mol.symbols, mol.connectivity)
+    assert numpy.allclose(radii, [1.55, 1.3, 1.7, 1.2, 1.5, 1.2])
+    assert numpy.allclose(screen, [0.79, 0.85, 0.72, 0.85, 0.85, 0.85])
+    radii, _ = Solvent(implicit=True, radii_set="mbondi").parameters(
+        mol.symbols, mol.connectivity
+    )
+    assert numpy.allclose(radii, [1.55, 1.3, 1.7, 1.3, 1.5, 0.8])
+
+    with pytest.raises(ValueError):
+        Solvent(implicit=True, model="gbn")
+    with pytest.raises(ValueError):
+        Solvent(implicit=True, radii=[1.5]).parameters(mol.symbols)
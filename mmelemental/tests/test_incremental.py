@@ -0,0 +1,56 @@
+"""
+Incremental energy tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.incremental import IncrementalEnergy, Move
+from .test_energy import build_chain
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"cutoff": 6.0}, {"cutoff": 6.0, "box": numpy.array([60.0, 15.0, 15.0])}],
+)
+def test_incremental_moves(kwargs):
+    mol, mm_ff = build_chain(30)
+    model = ForceFieldEnergy(mol, mm_ff, **kwargs)
+    inc = IncrementalEnergy(model, mol.geometry, rebuild=8)
+    assert numpy.isclose(inc.energy, model.energy(mol.geometry))
+
+    rng = numpy.random.default_rng(0)
+    for step in range(100):
+        atoms = rng.choice(30, size=rng.integers(1, 5), replace=False)
+        if step % 2:
+            move = Move.translate(inc.geometry, atoms, rng.normal(size=3) * 0.3)
+        else:
+            move = Move.rotate(inc.geometry, atoms, rng.normal(size=3), 0.3)
+        trial = inc.geometry.copy()
+        trial[move.atoms] = move.positions
+        delta = inc.propose(move)
+        assert numpy.isclose(delta, model.energy(trial) - inc.energy)
+        if delta < 5.0:
+            assert numpy.isclose(inc.accept(), model.energy(trial))
+        else:
+            before = inc.geometry.copy()
+            inc.reject()
+            assert numpy.array_equal(inc.geometry, before)
+
+    energy, _, terms = model.compute(inc.geometry)
+    assert numpy.isclose(inc.energy, energy)
+    for name, value in terms.items():
+        assert numpy.isclose(inc.terms[name], value)
+    assert numpy.isclose(inc.refresh(), energy)
+
+
+def test_incremental_errors():
+    mol, mm_ff = build_chain(10)
+    inc = IncrementalEnergy(ForceFieldEnergy(mol, mm_ff), mol.geometry)
+    with pytest.raises(ValueError):
+        inc.accept()
+
+    model = ForceFieldEnergy(
+        mol, mm_ff, cutoff=4.0, box=numpy.full(3, 20.0), electrostatics="pme"
+    )
+    with pytest.raises(NotImplementedError):
+        IncrementalEnergy(model, mol.geometry)
@@ -0,0 +1,105 @@
+"""
+Instrumentation tests for the mmelemental package.
+"""
+import json
+import logging
+import os
+import pytest
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util import instrument
+from .data import data_dir
+
+
+@pytest.fixture
+def alanine():
+    return Molecule.from_file(os.path.join(data_dir, "alanine.json"))
+
+
+def test_disabled(alanine):
+    assert not instrument.enabled()
+    assert instrument.span("Molecule.get_hash") is instrument.span("other")
+    alanine.get_hash()
+    assert instrument.summary() == {}
+
+
+def test_memory_sink(alanine, tmp_path):
+    filename = str(tmp_path / "alanine.json")
+    with instrument.instrument() as stats:
+        assert instrument.enabled()
+        for _ in range(5):
+            alanine.get_hash()
+        alanine.to_file(filename)
+        mol = Molecule.from_file(filename)
+    assert not instrument.enabled()
+
+    summary = stats.summary()
+    assert summary["Molecule.get_hash"]["count"] == 5
+    assert summary["Molecule.get_hash"]["nbytes"] > 0
+    assert summary["Molecule.__init__"]["count"] == 1
+    nbytes = os.path.getsize(filename)
+    assert summary["Molecule.to_file.json"]["nbytes"] == nbytes
+    assert summary["Molecule.from_file.json"]["nbytes"] == nbytes
+    for entry in summary.values():
+        assert 0 <= entry["p50"] <= entry["p90"] <= entry["p99"] <= entry["max"]
+        assert entry["total"] >= entry["max"]
+    assert mol == alanine
+
+    # Percentiles of a bounded reservoir
+    sink = instrument.MemorySink(maxsamples=10)
+    for k in range(1000):
+        sink.write("path", float(k), 1)
+    entry = sink.summary()["path"]
+    assert entry["count"] == 1000 and entry["nbytes"] == 1000
+    assert entry["max"] == 999.0 and entry["p50"] > 10
+
+
+def test_jsonl_and_logging_sinks(alanine, tmp_path, caplog):
+    path = str(tmp_path / "trace.jsonl")
+    with caplog.at_level(logging.DEBUG, logger="mmelemental.instrument"):
+        with instrument.instrument(
+            instrument.JSONLinesSink(path), instrument.LoggingSink()
+        ):
+            alanine.get_hash()
+            alanine.get_hash()
+
+    with open(path) as fp:
+        records = [json.loads(line) for line in fp]
+    assert [r["name"] for r in records] == ["Molecule.get_hash"] * 2
+    assert all(r["seconds"] >= 0 and r["nbytes"] > 0 for r in records)
+    assert sum("Molecule.get_hash" in r.message for r in caplog.records) == 2
+
+
+def test_instrumented_decorator():
+    @instrument.instrumented("double", nbytes=lambda result, x: 8 * len(x))
+    def double(x):
+        return [2 * v for v in x]
+
+    assert double([1, 2]) == [2, 4]
+    with instrument.instrument() as stats:
+        double([1, 2, 3])
+    assert stats.summary()["double"]["count"] == 1
+    assert stats.summary()["double"]["nbytes"] == 24
+
+    # Failing calls are recorded as by span
+    with instrument.instrument() as stats:
+        with pytest.raises(TypeError):
+            double(None)
+        with pytest.raises(TypeError), instrument.span("span"):
+            raise TypeError
+    assert stats.summary()["double"]["count"] == 1
+    assert stats.summary()["double"]["nbytes"] == 0
+    assert stats.summary()["span"]["count"] == 1
+
+
+def test_env(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    sinks = instrument._from_env(f"memory, logging, jsonl:{path}")
+    assert [type(s) for s in sinks] == [
+        instrument.MemorySink,
+        instrument.LoggingSink,
+        instrument.JSONLinesSink,
+    ]
+    sinks[2].close()
+    assert instrument._from_env("0") == []
+    with pytest.raises(ValueError):
+        instrument._from_env("bogus")
@@ -0,0 +1,47 @@
+"""
+Memory usage tests for the mmelemental package.
+"""
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.models.app.base import SimInput
+from mmelemental.models.collect.mm_traj import Frame, Trajectory
+from mmelemental.util.memory import memory_usage
+
+
+def test_molecule():
+    system = synthetic.water_box(100, seed=0)
+    mol = system.mol
+    usage = mol.memory_usage()
+    assert usage.total == mol.nbytes
+    assert usage.total == usage.arrays + usage.strings + usage.python
+    assert usage.total == usage.owned + usage.shared
+    assert usage.fields["geometry"] >= mol.geometry.nbytes
+    assert usage.fields["symbols"] >= mol.symbols.nbytes
+    # The list of tuples costs more than the array of the same bonds would
+    assert usage.fields["connectivity_"] > 3 * 8 * len(mol.connectivity)
+    assert usage.strings >= mol.symbols.nbytes
+    assert system.ff.nbytes > system.ff.charges.nbytes
+
+
+def test_shared():
+    coords = numpy.random.default_rng(0).random((10, 1000, 3))
+    frames = [Frame(geometry=coords[i]) for i in range(len(coords))]
+    traj = Trajectory(frames=frames)
+    usage = traj.memory_usage()
+    assert usage.shared >= coords.nbytes
+    assert usage.owned < coords.nbytes
+
+    frames = [Frame(geometry=coords[i].copy()) for i in range(len(coords))]
+    usage = Trajectory(frames=frames).memory_usage()
+    assert usage.shared == 0
+    assert usage.owned >= coords.nbytes
+
+
+def test_counted_once():
+    mol = synthetic.water_box(100, seed=0).mol
+    nbytes = memory_usage([mol, mol]).total
+    assert nbytes < 2 * mol.nbytes
+    assert SimInput(mol={"a": mol, "b": mol}).nbytes < 2 * mol.nbytes
+
+    x = numpy.zeros(1000)
+    assert memory_usage([x, x, x[:10]]).arrays == x.nbytes
@@ -0,0 +1,83 @@
+"""
+Energy minimization tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.models.app.optim import OptimInput, OptimOutput
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.compute.minimize import minimize, lbfgs, fire
+from mmelemental.components.sim.minimize_component import MinimizeComponent
+from .test_energy import build_chain
+
+
+def test_quadratic():
+    center = numpy.array([[1.0, -2.0, 0.5], [0.0, 3.0, 1.0]])
+
+    def func(x):
+        return 0.5 * float(((x - center) ** 2).sum()), -(x - center)
+
+    for method in (lbfgs, fire):
+        result = method(func, numpy.zeros((2, 3)), tol=1e-6, nsteps=10000)
+        assert result.converged
+        assert numpy.allclose(result.x, center, atol=1e-5)
+
+    with pytest.raises(ValueError):
+        minimize(func, numpy.zeros((2, 3)), method="steepest")
+
+
+@pytest.mark.parametrize("method", ["lbfgs", "fire"])
+def test_minimize_chain(method):
+    mol, mm_ff = build_chain(12)
+    model = ForceFieldEnergy(mol, mm_ff)
+    result = minimize(
+        lambda x: model.compute(x)[:2], mol.geometry, method=method, tol=0.1
+    )
+    assert result.converged
+    assert result.energy < result.energies[0]
+    assert result.max_forces[-1] < 0.1
+    assert numpy.isclose(result.energy, model.energy(result.x))
+
+
+@pytest.mark.parametrize("method", ["lbfgs", "fire"])
+def test_minimize_component(method):
+    mol, mm_ff = build_chain(10)
+    inputs = OptimInput(
+        mol={"ligand": mol},
+        forcefield={"ligand": mm_ff},
+        march_method=method,
+        tol=0.5,
+        nsteps=2000,
+    )
+    out = MinimizeComponent.compute(inputs)
+    assert isinstance(out, OptimOutput)
+    assert out.converged and out.simInput.tol == 0.5
+    final = out.mol["ligand"]
+    assert final.symbols.tolist() == mol.symbols.tolist()
+    assert final.geometry.shape == mol.geometry.shape
+    energies = out.observables["pot_energy"]
+    assert energies[-1] < energies[0]
+    assert out.pot_energy == [energies[-1]]
+    assert out.observables["max_force"][-1] < 0.5
+    assert numpy.isclose(
+        ForceFieldEnergy(final, mm_ff).energy(final.geometry), energies[-1]
+    )
+
+
+def test_minimize_component_unconverged():
+    mol, mm_ff = build_chain(10)
+    inputs = OptimInput(
+        mol={"ligand": mol}, forcefield={"ligand": mm_ff}, tol=1e-6, nsteps=2
+    )
+    out = MinimizeComponent.compute(inputs)
+    assert not out.converged
+    assert len(out.observables["pot_energy"]) == 3
+    assert OptimOutput(**out.dict()).converged is False
+
+
+def test_minimize_component_multiple():
+    mol, mm_ff = build_chain(6)
+    inputs = OptimInput(
+        mol={"a": mol, "b": mol}, forcefield={"a": mm_ff, "b": mm_ff}, tol=1.0
+    )
+    with pytest.raises(NotImplementedError):
+        MinimizeComponent.compute(inputs)
@@ -0,0 +1,93 @@
+"""
+Lennard-Jones mixing table tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.models import forcefield as ff
+from mmelemental.compute import mixing
+
+natoms, ntypes = 50, 5
+
+
+def build_ff(units="kJ/mol"):
+    type_ids = numpy.random.randint(ntypes, size=natoms)
+    epsilon, sigma = numpy.random.rand(ntypes), 2 + numpy.random.rand(ntypes)
+    lj = ff.nonbonded.potentials.LennardJones(
+        epsilon=epsilon[type_ids], sigma=sigma[type_ids], epsilon_units=units
+    )
+    return ff.ForceField(
+        nonbonded=ff.nonbonded.NonBonded(params=lj),
+        types=[f"T{i}" for i in type_ids],
+    )
+
+
+@pytest.mark.parametrize("rule", ["lorentz-berthelot", "geometric", "waldman-hagler"])
+def test_mixing_lookup(rule):
+    mm_ff = build_ff()
+    table = mixing.mixing_table(mm_ff, rule=rule)
+    assert table.ntypes == len(set(mm_ff.types))
+
+    i, j = numpy.triu_indices(natoms, k=1)
+    eps, sig = mm_ff.nonbonded.params.epsilon, mm_ff.nonbonded.params.sigma
+    eps_ij, sig_ij = mixing.combine(eps[i], sig[i], eps[j], sig[j], rule)
+
+    assert numpy.allclose(table.lookup_params(i, j), (eps_ij, sig_ij))
+    c6, c12 = table.lookup(i, j)
+    assert numpy.allclose(c6, 4 * eps_ij * sig_ij ** 6)
+    assert numpy.allclose(c12, 4 * eps_ij * sig_ij ** 12)
+
+    r2 = numpy.full(len(i), 9.0)
+    assert numpy.allclose(
+        table.energy(i, j, r2), 4 * eps_ij * ((sig_ij / 3) ** 12 - (sig_ij / 3) ** 6)
+    )
+
+
+def test_mixing_overrides():
+    mm_ff = build_ff()
+    type_i, type_j = mm_ff.types[0], mm_ff.types[-1]
+    table = mixing.mixing_table(mm_ff, overrides={(type_i, type_j): (9.0, 1.5)})
+
+    eps, sig = table.lookup_params(
+        numpy.array([0, natoms - 1]), numpy.array([natoms - 1, 0])
+    )
+    assert numpy.allclose(eps, 9.0) and numpy.allclose(sig, 1.5)
+
+    with pytest.raises(KeyError):
+        mixing.mixing_table(mm_ff, overrides={("X", "Y"): (1.0, 1.0)})
+
+
+def test_mixing_cached():
+    mm_ff = build_ff()
+    table = mixing.mixing_table(mm_ff)
+    assert mixing.mixing_table(mm_ff) is table
+    # The compressed force field has the same parameters and hence the same table
+    assert mixing.mixing_table(mm_ff.compress()) is table
+
+    # A different rule, pair override, or units build a different table
+    type_i = mm_ff.types[0]
+    others = [
+        mixing.mixing_table(mm_ff, rule="geometric"),
+        mixing.mixing_table(mm_ff, overrides={(type_i, type_i): (9.0, 1.5)}),
+        mixing.mixing_table(
+            mm_ff.copy(
+                update={
+                    "nonbonded": ff.nonbonded.NonBonded(
+                        params=mm_ff.nonbonded.params.copy(
+                            update={"epsilon_units": "kcal/mol"}
+                        )
+                    )
+                }
+            )
+        ),
+    ]
+    assert len({id(other) for other in others + [table]}) == 4
+    assert not numpy.allclose(others[0].sigma, table.sigma)
+    assert numpy.allclose(others[1].lookup_params(0, 0), (9.0, 1.5))
+    assert numpy.allclose(others[2].epsilon, 4.184 * table.epsilon)
+
+
+def test_mixing_units():
+    mm_ff = build_ff(units="kcal/mol")
+    table = mixing.mixing_table(mm_ff)
+    eps = mm_ff.nonbonded.params.epsilon
+    assert numpy.isclose(table.lookup_params(0, 0)[0], eps[0] * 4.184)
@@ -0,0 +1,75 @@
+"""
+Neighbor search tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.compute import neighbors, pbc
+
+
+def brute_force(geom, cutoff, box=None, periodic=None):
+    i, j = numpy.triu_indices(len(geom), k=1)
+    d = geom[i] - geom[j]
+    if box is not None:
+        pbc.minimum_image(d, box, periodic)
+    r = numpy.linalg.norm(d, axis=1)
+    return set(zip(i[r < cutoff], j[r < cutoff]))
+
+
+@pytest.mark.parametrize(
+    "box, periodic",
+    [
+        (None, None),
+        (numpy.array([20.0, 25.0, 30.0]), None),
+        (numpy.array([20.0, 25.0, 30.0]), numpy.array([True, False, True])),
+        (numpy.array([10.0, 25.0, 30.0]), None),  # fewer than 3 cells along x
+    ],
+)
+def test_neighbor_pairs(box, periodic):
+    natoms, cutoff = 400, 4.5
+    geom = numpy.random.rand(natoms, 3) * ([20.0, 25.0, 30.0] if box is None else box)
+    pairs = neighbors.neighbor_pairs(geom, cutoff, box, periodic)
+
+    assert numpy.all(pairs.i < pairs.j)
+    assert set(zip(pairs.i, pairs.j)) == brute_force(geom, cutoff, box, periodic)
+    assert numpy.allclose(numpy.linalg.norm(pairs.d, axis=1), pairs.r)
+    assert numpy.all(pairs.r < cutoff)
+
+    with pytest.raises(ValueError):
+        neighbors.neighbor_pairs(geom, 16.0, numpy.array([20.0, 25.0, 30.0]))
+
+
+def test_exclusion_pairs():
+    # Linear chain 0-1-2-3-4 with a branch 2-5
+    conn = [(0, 1, 1), (1, 2, 1), (2, 3, 1), (3, 4, 1), (2, 5, 1)]
+    natoms = 6
+    keys = neighbors.exclusion_pairs(conn, natoms, depth=2)
+    pairs = {(key // natoms, key % natoms) for key in keys}
+    assert pairs == {
+        (0, 1),
+        (1, 2),
+        (2, 3),
+        (3, 4),
+        (2, 5),
+        (0, 2),
+        (1, 3),
+        (2, 4),
+        (1, 5),
+        (3, 5),
+    }
+    assert len(neighbors.exclusion_pairs(conn, natoms, depth=3)) == len(pairs) + 4
+
+    geom = numpy.arange(natoms * 3, dtype=float).reshape(natoms, 3) * 0.1
+    found = neighbors.neighbor_pairs(geom, 10.0, exclusions=keys)
+    assert len(found.i) == natoms * (natoms - 1) // 2 - len(pairs)
+
+    assert neighbors.exclusion_depth("1-4") == 3
+    assert neighbors.exclusion_depth("scaled1-4") == 2
+    assert neighbors.exclusion_depth(None) == 0
+
+
+def test_pair_forces():
+    geom = numpy.array([[0.0, 0.0, 0.0], [1.5, 0.0, 0.0]])
+    pairs = neighbors.neighbor_pairs(geom, 2.0)
+    forces = neighbors.pair_forces(pairs, numpy.array([2.0]), 2)
+    # Positive dE/dr pulls the atoms together
+    assert numpy.allclose(forces, [[2.0, 0, 0], [-2.0, 0, 0]])
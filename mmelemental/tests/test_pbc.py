@@ -0,0 +1,186 @@
+"""
+Periodic boundary condition tests for the mmelemental package.
+"""
+from itertools import product
+import pytest
+import numpy
+from mmelemental.compute import pbc, synthetic
+from mmelemental.compute.domains import DomainDecomposition
+from mmelemental.compute.energy import ForceFieldEnergy
+from mmelemental.models.cell import Cell
+from mmelemental.models.app.base import SimInput
+from mmelemental.models.collect.mm_traj import Frame
+
+
+lengths, angles = numpy.array([20.0, 22.0, 25.0]), numpy.array([75.0, 100.0, 65.0])
+
+
+def brute_force(d, vectors, periodic=(True, True, True)):
+    """ Nearest images among all lattice translations up to 2 cells away. """
+    shifts = numpy.array(
+        [
+            n
+            for n in product(range(-2, 3), repeat=3)
+            if all(p or not k for p, k in zip(periodic, n))
+        ],
+        dtype=float,
+    )
+    s = d @ numpy.linalg.inv(vectors)
+    s[:, list(periodic)] -= numpy.round(s[:, list(periodic)])
+    images = (s @ vectors)[:, None, :] + shifts @ vectors
+    return images[numpy.arange(len(d)), (images ** 2).sum(-1).argmin(-1)]
+
+
+def random_chains(nchains, length, rng, bond=1.5):
+    """ Random walks of the given bond length and their connectivity. """
+    steps = rng.normal(size=(nchains, length, 3))
+    steps *= bond / numpy.linalg.norm(steps, axis=-1, keepdims=True)
+    steps[:, 0] = rng.random((nchains, 3)) * 20.0
+    geom = numpy.cumsum(steps, axis=1).reshape(-1, 3)
+    i = numpy.arange(nchains * length).reshape(nchains, length)
+    conn = [(a, b, 1.0) for a, b in zip(i[:, :-1].ravel(), i[:, 1:].ravel())]
+    return geom, conn
+
+
+def test_cell_parameters():
+    vectors = pbc.cell_vectors(lengths, angles)
+    assert numpy.allclose(vectors[0, 1:], 0) and vectors[1, 2] == 0
+    assert numpy.allclose(pbc.cell_parameters(vectors), (lengths, angles))
+    assert numpy.allclose(
+        pbc.cell_widths(numpy.diag(lengths)), lengths
+    )  # orthorhombic widths are the edges
+
+    cell = Cell.from_lengths_angles(lengths, angles)
+    assert not cell.orthorhombic and cell.nframes is None
+    assert numpy.isclose(cell.volume, abs(numpy.linalg.det(vectors)))
+    assert numpy.allclose(Cell.parse_raw(cell.json()).vectors, cell.vectors)
+
+    ortho = Cell.from_bounds(
+        ((1, 2, 3), (11, 22, 33)), ("periodic", "fixed", "periodic")
+    )
+    assert ortho.orthorhombic and ortho.periodic == (True, False, True)
+    assert numpy.allclose(ortho.lengths, [10, 20, 30])
+    with pytest.raises(ValueError):
+        Cell(vectors=[[1, 0, 0], [2, 0, 0], [0, 0, 1]])
+
+
+@pytest.mark.parametrize(
+    "angles, periodic",
+    [(angles, (True, True, True)), ((90.0, 90.0, 65.0), (True, True, False))],
+)
+def test_minimum_image_triclinic(angles, periodic, monkeypatch):
+    # Small chunks exercise the chunked in-place transform
+    monkeypatch.setattr(pbc, "_chunk_rows", 97)
+    vectors = pbc.cell_vectors(lengths, angles)
+    d = (numpy.random.rand(1000, 3) - 0.5) * 80.0
+    ref = brute_force(d, vectors, periodic)
+    out = pbc.minimum_image_triclinic(d, vectors, numpy.array(periodic))
+    assert out is d
+    assert numpy.allclose(numpy.linalg.norm(d, axis=1), numpy.linalg.norm(ref, axis=1))
+
+    # Orthorhombic cells reduce to the per-dimension minimum image
+    d = (numpy.random.rand(100, 3) - 0.5) * 80.0
+    ref = pbc.minimum_image(d.copy(), lengths, numpy.array(periodic))
+    pbc.minimum_image_triclinic(d, numpy.diag(lengths), numpy.array(periodic))
+    assert numpy.allclose(d, ref)
+
+
+def test_wrap_triclinic():
+    cell = Cell.from_lengths_angles(lengths, angles, origin=[-5.0, 1.0, 2.0])
+    geom = (numpy.random.rand(500, 3) - 0.5) * 100.0
+    wrapped = cell.wrap(geom.copy())
+    s = (wrapped - cell.origin) @ numpy.linalg.inv(cell.vectors)
+    assert numpy.all((s >= 0) & (s < 1))
+    # Atoms move by whole lattice vectors
+    n = (wrapped - geom) @ numpy.linalg.inv(cell.vectors)
+    assert numpy.allclose(n, numpy.round(n))
+
+
+def test_make_whole():
+    rng = numpy.random.default_rng(7)
+    cell = Cell.from_lengths_angles(lengths, angles)
+    geom, conn = random_chains(20, 30, rng)
+    broken = cell.wrap(geom.copy())
+    i, j = numpy.array(conn)[:, :2].astype(int).T
+    assert numpy.linalg.norm(broken[j] - broken[i], axis=1).max() > 2.0
+
+    whole = cell.make_whole(broken, conn)
+    assert numpy.allclose(whole[j] - whole[i], geom[j] - geom[i])
+    # Every molecule is translated as a whole by a lattice vector
+    n = ((whole - geom) @ numpy.linalg.inv(cell.vectors)).reshape(20, 30, 3)
+    assert numpy.allclose(n, n[:, :1]) and numpy.allclose(n, numpy.round(n))
+
+    levels = pbc.bond_tree(conn, len(geom))
+    assert len(levels) == 29
+    assert sum(len(child) for child, _ in levels) == len(geom) - 20
+
+
+def test_per_frame_cell():
+    rng = numpy.random.default_rng(3)
+    nframes = 4
+    scale = numpy.linspace(1.0, 1.1, nframes)[:, None]
+    cell = Cell.from_lengths_angles(lengths * scale, angles)
+    assert cell.nframes == nframes and cell.vectors.shape == (nframes, 3, 3)
+    assert numpy.allclose(
+        cell.frame(2).vectors, pbc.cell_vectors(lengths * scale[2], angles)
+    )
+
+    geom, conn = random_chains(5, 10, rng)
+    frames = numpy.stack([geom * s for s in scale[:, 0]])
+    broken = cell.wrap(frames.copy())
+    whole = cell.make_whole(broken, conn)
+    i, j = numpy.array(conn)[:, :2].astype(int).T
+    assert numpy.allclose(whole[:, j] - whole[:, i], frames[:, j] - frames[:, i])
+
+    d = (rng.random((nframes, 50, 3)) - 0.5) * 80.0
+    ref = [brute_force(d[k], cell.vectors[k]) for k in range(nframes)]
+    cell.minimum_image(d)
+    assert numpy.allclose(
+        numpy.linalg.norm(d, axis=-1), numpy.linalg.norm(ref, axis=-1)
+    )
+
+    frame = Frame(geometry=frames[0], cell=cell.frame(0))
+    assert numpy.allclose(frame.cell.vectors, cell.vectors[0])
+    with pytest.raises(ValueError):
+        cell.wrap(geom.copy())
+
+
+def test_siminput_cell():
+    bounds = ((0.0, 0.0, 0.0), (20.0, 22.0, 25.0))
+    ortho = SimInput(cell=Cell.from_bounds(bounds))
+    assert isinstance(ortho.cell, Cell)
+    assert numpy.allclose(
+        pbc.box_from_cell(ortho.cell)[1], pbc.box_from_cell(bounds)[1]
+    )
+    assert SimInput(cell=bounds).cell == bounds
+
+    with pytest.raises(NotImplementedError):
+        pbc.box_from_cell(SimInput(cell=Cell.from_lengths_angles(lengths, angles)).cell)
+
+
+def test_siminput_cell_units():
+    # A slab cell in nm, non-periodic along z
+    cell = Cell.from_lengths_angles(
+        [2, 3, 4], vectors_units="nm", origin=[0.1, 0, 0], periodic=(True, True, False)
+    )
+    origin, box = pbc.box_from_cell(cell)
+    assert numpy.allclose(box, [20.0, 30.0, 40.0])
+    assert numpy.allclose(origin, [1.0, 0.0, 0.0])
+    assert pbc.cell_periodic(cell).tolist() == [True, True, False]
+
+    system = synthetic.water_box(20, seed=0)
+    inputs = SimInput(
+        mol={"water": system.mol},
+        forcefield={"water": system.ff},
+        cell=cell,
+        boundary=("periodic",) * 3,
+    )
+    _, _, model = ForceFieldEnergy.from_input(inputs)
+    assert numpy.allclose(model.box, box)
+    assert model.periodic.tolist() == [True, True, False]
+    assert model.cutoff == 10.0
+
+    dd = DomainDecomposition.from_input(inputs, halo=5.0, ndomains=2)
+    assert dd.grid.periodic.tolist() == [True, True, False]
+    assert numpy.allclose(dd.grid.lo[:2], origin[:2])
+    assert numpy.allclose(dd.grid.extent[:2], box[:2])
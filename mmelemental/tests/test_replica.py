@@ -0,0 +1,77 @@
+"""
+Replica exchange tests for the mmelemental package.
+"""
+import json
+import pytest
+import numpy
+from mmelemental.models.app.dynamics import DynamicsInput
+from mmelemental.models.app.base import SimOutput
+from mmelemental.compute.replica import ReplicaExchange, metropolis
+from .test_energy import build_chain
+
+
+def _replicas(temps, nsteps=40, **kwargs):
+    mol, mm_ff = build_chain(8)
+    return [
+        DynamicsInput(
+            mol={"chain": mol},
+            forcefield={"chain": mm_ff},
+            step_size=0.5,
+            nsteps=nsteps,
+            freq=10,
+            gen_vel=[True],
+            gen_temp=[temp],
+            temp=[temp],
+            temp_method="langevin",
+            **kwargs,
+        )
+        for temp in temps
+    ]
+
+
+def test_metropolis():
+    rng = numpy.random.default_rng(0)
+    beta = numpy.ones(4)
+    # Identical states always exchange, large energy penalties never do
+    i, accepted = metropolis(numpy.zeros((4, 3)), beta, 0, rng)
+    assert i.tolist() == [0, 2] and accepted.all()
+    energies = numpy.zeros((4, 3))
+    energies[:, 1:] = 1e3
+    i, accepted = metropolis(energies, beta, 1, rng)
+    assert i.tolist() == [1] and not accepted.any()
+
+
+def test_replica_exchange(tmp_path):
+    replicas = _replicas([300.0, 300.0, 300.0])
+    log = str(tmp_path / "exchange.jsonl")
+    remd = ReplicaExchange(replicas, interval=10, processes=1, seed=3, log=log)
+    outputs = remd.run()
+
+    assert len(outputs) == 3 and all(isinstance(out, SimOutput) for out in outputs)
+    assert numpy.allclose(outputs[0].observables["time"], [0, 5, 10, 15, 20])
+    assert len(outputs[0].trajectory.frames) == 5
+    # Identical Hamiltonians and temperatures: every exchange is accepted
+    assert (
+        remd.stats.attempts.sum() == 3
+        and (remd.stats.accepted == remd.stats.attempts).all()
+    )
+    records = [json.loads(line) for line in open(log)]
+    assert [rec["pairs"] for rec in records] == [[0], [1], [0]]
+    assert sorted(remd.stats.permutation) == [0, 1, 2]
+
+
+def test_replica_processes(tmp_path):
+    temps = [300.0, 340.0, 390.0]
+    base = _replicas(temps)
+    serial = ReplicaExchange(base, interval=10, processes=1, seed=5).run()
+    trajs = [str(tmp_path / f"state{k}.jsonl") for k in range(3)]
+    replicas = [inputs.copy(update={"traj": traj}) for inputs, traj in zip(base, trajs)]
+    remd = ReplicaExchange(replicas, interval=10, processes=3, seed=5)
+    parallel = remd.run()
+    for a, b in zip(serial, parallel):
+        assert numpy.allclose(a.observables["pot_energy"], b.observables["pot_energy"])
+    assert parallel[0].trajectory is None
+    assert all(len(open(traj).readlines()) == 5 for traj in trajs)
+
+    with pytest.raises(ValueError):
+        ReplicaExchange(_replicas([300.0]))
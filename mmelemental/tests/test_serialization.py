@@ -0,0 +1,193 @@
+"""
+JSON and msgpack serialization tests for the mmelemental package.
+"""
+import json
+import pytest
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.models.app.base import SimInput
+from mmelemental.models.collect.mm_traj import Frame, Trajectory
+from mmelemental.models.collect.sm_ensem import Ensemble, Microstate
+from mmelemental.models.forcefield import ForceField
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util import serialization
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def codec(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_schema(codec):
+    system = synthetic.random_protein(20, seed=0)
+    for model in (
+        system.mol,
+        system.ff,
+        SimInput(mol={"protein": system.mol}, forcefield={"protein": system.ff}),
+    ):
+        assert json.loads(serialization.json_dumps(model)) == json.loads(model.json())
+
+
+def test_roundtrip(codec, tmp_path):
+    system = synthetic.water_box(50, seed=0)
+    filename = str(tmp_path / "mol.json")
+    system.mol.to_file(filename)
+    mol = Molecule.from_file(filename)
+    assert mol.get_hash() == system.mol.get_hash()
+    assert mol.connectivity == system.mol.connectivity
+
+    filename = str(tmp_path / "ff.json")
+    system.ff.to_file(filename)
+    mm_ff = ForceField.from_file(filename)
+    assert mm_ff.get_hash() == system.ff.get_hash()
+    numpy.testing.assert_array_equal(mm_ff.charges, system.ff.charges)
+
+
+def test_data(codec):
+    data = {"a": numpy.arange(6).reshape(2, 3), "b": None, "c": numpy.array(["x", "y"])}
+    assert json.loads(serialization.json_dumps(data)) == {
+        "a": [0, 1, 2, 3, 4, 5],
+        "b": None,
+        "c": ["x", "y"],
+    }
+
+
+def test_decode_arrays():
+    data = {"symbols": ["O", "H"], "geometry": [0, 0, 0, 1, 0, 0], "name": "oh"}
+    data = serialization.decode_arrays(Molecule, data)
+    assert data["geometry"].dtype == float
+    assert data["symbols"].dtype.kind == "U"
+    assert data["name"] == "oh"
+
+
+def test_decode_nested_arrays():
+    geometry = [0.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+    mol = {"symbols": ["O", "H"], "geometry": geometry}
+    data = serialization.decode_arrays(
+        Trajectory, {"mol": [mol], "frames": [{"geometry": geometry, "cell": None}]}
+    )
+    assert isinstance(data["mol"][0]["geometry"], numpy.ndarray)
+    assert isinstance(data["frames"][0]["geometry"], numpy.ndarray)
+
+    data = serialization.decode_arrays(
+        Ensemble, {"states": {"a": [{"geometry": geometry}]}}
+    )
+    assert data["states"]["a"][0]["geometry"].dtype == float
+    data = serialization.decode_arrays(SimInput, {"mol": {"a": dict(mol)}})
+    assert data["mol"]["a"]["geometry"].dtype == float
+
+
+@pytest.mark.parametrize("ext", ["json", "msgpack", "json.gz"])
+def test_load_model(ext, tmp_path):
+    if ext == "msgpack":
+        pytest.importorskip("msgpack")
+    system = synthetic.water_box(10, seed=0)
+    sim = SimInput(mol={"water": system.mol}, forcefield={"water": system.ff}, nsteps=1)
+    ensemble = Ensemble(
+        states={"water": [Microstate(geometry=system.mol.geometry)] * 2}
+    )
+    filename = str(tmp_path / f"model.{ext}")
+    serialization.dump_model(sim, filename)
+    copy = serialization.load_model(SimInput, filename)
+    assert copy.mol["water"].get_hash() == system.mol.get_hash()
+    assert copy.forcefield["water"].get_hash() == system.ff.get_hash()
+    serialization.dump_model(ensemble, filename)
+    states = serialization.load_model(Ensemble, filename).states["water"]
+    numpy.testing.assert_array_equal(
+        states[1].geometry.ravel(), system.mol.geometry.ravel()
+    )
+    assert states[1].geometry.dtype == float
+
+    # kwargs take precedence over the file for every model
+    filename = str(tmp_path / f"sim.{ext}")
+    sim.to_file(filename)
+    assert SimInput.from_file(filename, nsteps=2).nsteps == 2
+    filename = str(tmp_path / f"ff.{ext}")
+    system.ff.to_file(filename)
+    assert ForceField.from_file(filename, name="other").name == "other"
+
+    with pytest.raises(NotImplementedError):
+        serialization.load_model(SimInput, str(tmp_path / "sim.pdb"))
+
+
+def test_msgpack_arrays():
+    pytest.importorskip("msgpack")
+    data = {
+        "x": numpy.arange(12.0).reshape(3, 4),
+        "y": numpy.arange(10)[::3],
+        "s": numpy.array(["ab", "c"]),
+        "n": 3,
+    }
+    decoded = serialization.msgpack_loads(serialization.msgpack_dumps(data))
+    for key in ("x", "y", "s"):
+        numpy.testing.assert_array_equal(decoded[key], data[key])
+        assert decoded[key].dtype == data[key].dtype
+    assert decoded["x"].flags.writeable
+    assert decoded["n"] == 3
+
+
+def test_msgpack_models(tmp_path):
+    pytest.importorskip("msgpack")
+    system = synthetic.random_protein(20, seed=0)
+
+    filename = str(tmp_path / "mol.msgpack")
+    system.mol.to_file(filename)
+    mol = Molecule.from_file(filename)
+    assert mol.get_hash() == system.mol.get_hash()
+    assert mol.residues == system.mol.residues
+    assert len(open(filename, "rb").read()) < len(serialization.json_dumps(mol))
+
+    filename = str(tmp_path / "ff.msgpack")
+    system.ff.to_file(filename)
+    assert ForceField.from_file(filename).get_hash() == system.ff.get_hash()
+
+    frames = [Frame(geometry=system.mol.geometry, timestep=i) for i in range(3)]
+    filename = str(tmp_path / "traj.msgpack")
+    Trajectory(mol=system.mol, frames=frames).to_file(filename)
+    traj = Trajectory.from_file(filename)
+    assert traj.mol.get_hash() == system.mol.get_hash()
+    numpy.testing.assert_array_equal(traj.frames[2].geometry, frames[2].geometry)
+
+    sim = SimInput(mol={"protein": system.mol}, forcefield={"protein": system.ff})
+    for ext in ("json", "msgpack"):
+        filename = str(tmp_path / f"sim.{ext}")
+        sim.to_file(filename)
+        copy = SimInput.from_file(filename)
+        assert copy.mol["protein"].get_hash() == system.mol.get_hash()
+        assert copy.forcefield["protein"].get_hash() == system.ff.get_hash()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_json_load_stream(codec, chunk_size, tmp_path, monkeypatch):
+    system = synthetic.random_protein(20, seed=0)
+    filename = str(tmp_path / "mol.json")
+    system.mol.to_file(filename)
+    data = serialization.json_load_stream(filename, Molecule, chunk_size=chunk_size)
+    assert isinstance(data["geometry"], numpy.ndarray)
+    mol = Molecule(**data)
+    assert mol.get_hash() == system.mol.get_hash()
+    assert mol.connectivity == system.mol.connectivity
+
+    # Nested arrays, escapes, and brackets within strings
+    raw = {
+        "symbols": ["O", "H", "H"],
+        "geometry": [[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+        "masses": [16.0, 1, 1e0],
+        "name": 'w[a]t}e"r\\',
+        "extras": {"a": [1, {"b": "]"}], "c": [], "d": {}},
+    }
+    filename = str(tmp_path / "water.json")
+    with open(filename, "w") as fp:
+        json.dump(raw, fp, indent=2)
+    data = serialization.json_load_stream(filename, Molecule, chunk_size=chunk_size)
+    assert data["geometry"].shape == (3, 3)
+    numpy.testing.assert_array_equal(data["masses"], [16, 1, 1])
+    assert data["name"] == raw["name"]
+    assert data["extras"] == raw["extras"]
+
+    monkeypatch.setattr(serialization, "stream_threshold", 0)
+    assert Molecule.from_file(filename).name == raw["name"]
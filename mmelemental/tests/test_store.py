@@ -0,0 +1,126 @@
+"""
+Content-addressed model store tests for the mmelemental package.
+"""
+import os
+import pytest
+from mmelemental.compute import synthetic
+from mmelemental.models.app.base import SimInput
+from mmelemental.util import serialization
+from mmelemental.util.store import ModelStore
+
+
+@pytest.fixture(params=["msgpack", "json"])
+def store(request, tmp_path):
+    if request.param == "msgpack":
+        pytest.importorskip("msgpack")
+    with ModelStore(str(tmp_path / "store"), codec=request.param) as store:
+        yield store
+
+
+def test_put_get(store):
+    system = synthetic.water_box(20, seed=0)
+    key = store.put(system.mol)
+    assert key == system.mol.get_hash()
+    assert store.exists(key) and key in store
+    assert store.get(key).get_hash() == key
+    assert store.put(system.mol) == key
+    assert len(store) == 1
+
+    key = store.put(system.ff)
+    assert store.get(key).get_hash() == system.ff.get_hash()
+    assert store.get("0" * 40) is None
+    with pytest.raises(ValueError):
+        store.get("../index")
+
+    payloads = [
+        name
+        for _, _, files in os.walk(os.path.join(store.root, "objects"))
+        for name in files
+    ]
+    assert len(payloads) == 2
+    assert not any(name.startswith(".tmp") for name in payloads)
+
+
+def test_shared(store):
+    system = synthetic.water_box(20, seed=0)
+    sims = [
+        SimInput(mol={"water": system.mol}, forcefield={"water": system.ff}, nsteps=i)
+        for i in range(3)
+    ]
+    keys = store.put_many(sims)
+    # The molecule and force field are stored once
+    assert len(store) == 5
+    assert store.exists_many(keys + ["0" * 40]) == [True] * 3 + [False]
+
+    sim = store.get_many(keys)[2]
+    assert sim.nsteps == 2
+    assert sim.mol["water"].get_hash() == system.mol.get_hash()
+    assert sim.forcefield["water"].get_hash() == system.ff.get_hash()
+
+    for key in keys[:2]:
+        assert store.decref(key) == 0
+    store.gc()
+    assert store.exists_many(keys) == [False, False, True]
+    assert store.exists(system.mol.get_hash())
+
+    # Releasing the last model holding them collects the molecule and force field
+    store.decref(keys[2])
+    assert store.gc() > 0
+    assert len(store) == 0 and store.nbytes == 0
+
+
+def test_lru(tmp_path):
+    mols = [synthetic.water_box(10, seed=i).mol for i in range(4)]
+    store = ModelStore(str(tmp_path / "store"))
+    keys = store.put_many(mols, pin=False)
+    size = store.nbytes // len(mols)
+    store.get(keys[0])
+    store.maxbytes = 3 * size + size // 2
+    store.put(synthetic.water_box(10, seed=9).mol)
+    # The least recently used unpinned molecules are collected
+    assert store.exists_many(keys) == [True, False, False, True]
+    assert store.info()["size"] == 3
+    store.close()
+
+
+def _payloads(store):
+    return sorted(
+        name
+        for _, _, files in os.walk(os.path.join(store.root, "objects"))
+        for name in files
+    )
+
+
+def test_gc_files(tmp_path, monkeypatch):
+    mols = [synthetic.water_box(10, seed=i).mol for i in range(2)]
+    store = ModelStore(str(tmp_path / "store"))
+
+    # Payloads of a rolled back put are removed
+    with pytest.raises(AttributeError):
+        store.put_many([mols[0], None])
+    assert len(store) == 0 and _payloads(store) == []
+
+    # Orphaned payloads and temporary files of interrupted writes are swept
+    key = store.put(mols[0])
+    shard = os.path.join(store.root, "objects", key[:2])
+    for name in ("f" * 38, ".tmp-crashed"):
+        open(os.path.join(shard, name), "wb").close()
+    store.gc()
+    assert _payloads(store) == [key[2:]]
+
+    # An object stored again while it is collected keeps its payload
+    key = store.put(mols[1], pin=False)
+    transaction = store._transaction
+    calls = []
+
+    def concurrent_put():
+        calls.append(None)
+        if len(calls) == 2:  # once the index deletion is committed
+            store.put(mols[1])
+        return transaction()
+
+    monkeypatch.setattr(store, "_transaction", concurrent_put)
+    store.gc()
+    monkeypatch.undo()
+    assert store.get(key).get_hash() == key
+    store.close()
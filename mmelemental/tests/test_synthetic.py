@@ -0,0 +1,86 @@
+"""
+Synthetic system generator tests for the mmelemental package.
+"""
+import pytest
+import numpy
+from mmelemental.compute import synthetic
+from mmelemental.compute.energy import ForceFieldEnergy
+
+
+def bonded_energies(system):
+    _, _, terms = ForceFieldEnergy(system.mol, system.ff, cutoff=9.0).compute(
+        system.mol.geometry
+    )
+    return [terms[name] for name in ("bonds", "angles", "dihedrals") if name in terms]
+
+
+def test_topology_terms():
+    # Butane-like chain 0-1-2-3 with a branch 1-4
+    angles, dihedrals = synthetic.topology_terms([[0, 1], [1, 2], [2, 3], [1, 4]], 5)
+    assert {tuple(sorted((a[0], a[2]))) + (a[1],) for a in angles} == {
+        (0, 2, 1),
+        (0, 4, 1),
+        (2, 4, 1),
+        (1, 3, 2),
+    }
+    assert {min(tuple(d), tuple(d[::-1])) for d in dihedrals} == {
+        (0, 1, 2, 3),
+        (3, 2, 1, 4),
+    }
+
+
+def test_topology_ring():
+    ring = [[i, (i + 1) % 6] for i in range(6)]
+    angles, dihedrals = synthetic.topology_terms(ring, 6)
+    assert len(angles) == 6
+    assert len(dihedrals) == 6
+
+
+def test_water_box():
+    system = synthetic.water_box(100, seed=1)
+    mol = system.mol
+    assert len(mol.symbols) == 300
+    assert list(mol.symbols[:3]) == ["O", "H", "H"]
+    assert len(mol.connectivity) == 200
+    assert numpy.isclose(system.ff.charges.sum(), 0.0)
+    assert system.cell is not None
+    numpy.testing.assert_allclose(bonded_energies(system), 0.0, atol=1e-8)
+
+
+def test_deterministic():
+    a, b = synthetic.water_box(50, seed=3), synthetic.water_box(50, seed=3)
+    numpy.testing.assert_array_equal(a.mol.geometry, b.mol.geometry)
+    assert a.mol.get_hash() == b.mol.get_hash()
+    c = synthetic.water_box(50, seed=4)
+    assert not numpy.array_equal(a.mol.geometry, c.mol.geometry)
+
+
+def test_polymer_chains():
+    system = synthetic.polymer_chains(4, 20, seed=0)
+    mol = system.mol
+    assert len(mol.symbols) == 80
+    assert len(mol.connectivity) == 4 * 19
+    assert len(mol.angles) == 4 * 18
+    assert len(mol.dihedrals) == 4 * 17
+    assert system.cell.periodic == (False, True, True)
+    numpy.testing.assert_allclose(bonded_energies(system), 0.0, atol=1e-8)
+
+
+def test_random_protein():
+    system = synthetic.random_protein(30, seed=0)
+    mol = system.mol
+    assert len(mol.residues) == len(mol.symbols)
+    assert len({resid for _, resid in mol.residues}) == 30
+    assert len(system.ff.charges) == len(mol.symbols)
+    numpy.testing.assert_allclose(bonded_energies(system), 0.0, atol=1e-8)
+    with pytest.raises(ValueError):
+        synthetic.random_protein(5, residues=["XYZ"])
+
+
+def test_ligand_library():
+    library = synthetic.ligand_library(10, natoms=(8, 16), seed=0)
+    assert len(library) == 10
+    assert all(8 <= len(system.mol.symbols) <= 16 for system in library)
+    assert all(system.cell is None for system in library)
+    for system in library[:3]:
+        numpy.testing.assert_allclose(bonded_energies(system), 0.0, atol=1e-8)
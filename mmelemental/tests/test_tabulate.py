@@ -0,0 +1,103 @@
+"""
+Tabulated potential tests for the mmelemental package.
+"""
+import pytest
+import time
+import numpy
+from mmelemental.models import forcefield as ff
+from mmelemental.compute import mixing, tabulate
+
+
+def build_lj_ff(natoms=20, ntypes=3):
+    type_ids = numpy.arange(natoms) % ntypes
+    epsilon, sigma = 0.5 + numpy.random.rand(ntypes), 3 + numpy.random.rand(ntypes)
+    lj = ff.nonbonded.potentials.LennardJones(
+        epsilon=epsilon[type_ids], sigma=sigma[type_ids]
+    )
+    return ff.ForceField(
+        nonbonded=ff.nonbonded.NonBonded(params=lj),
+        types=[f"T{i}" for i in type_ids],
+    )
+
+
+@pytest.mark.parametrize("uniform", [True, False])
+def test_spline_accuracy(uniform):
+    x = numpy.linspace(0, numpy.pi, 400)
+    if not uniform:
+        x = numpy.pi * numpy.sort(numpy.random.rand(400))
+        x[0], x[-1] = 0, numpy.pi
+    spline = tabulate.CubicSpline.from_values(x, [numpy.sin(x), numpy.cos(x)])
+
+    r = numpy.random.uniform(0.2, numpy.pi - 0.2, 1000)
+    val, der = spline.evaluate(r, column=1)
+    assert numpy.allclose(val, numpy.cos(r), atol=1e-6)
+    assert numpy.allclose(der, -numpy.sin(r), atol=1e-4)
+    assert numpy.allclose(spline(r), numpy.sin(r), atol=1e-6)
+    assert numpy.allclose(spline(x), numpy.sin(x))
+
+
+def test_lennard_jones_table():
+    mm_ff = build_lj_ff()
+    table = tabulate.lennard_jones_table(mm_ff, rmin=2.5, rmax=12.0, npoints=4000)
+    assert tabulate.lennard_jones_table(mm_ff, 2.5, 12.0, 4000).spline is table.spline
+
+    i, j = numpy.triu_indices(20, k=1)
+    r = numpy.random.uniform(2.5, 12.0, len(i))
+    c6, c12 = mixing.mixing_table(mm_ff).lookup(i, j)
+    energy, dedr = table.evaluate(i, j, r)
+
+    assert numpy.allclose(energy, c12 / r ** 12 - c6 / r ** 6, rtol=1e-6, atol=1e-9)
+    assert numpy.allclose(
+        dedr, -12 * c12 / r ** 13 + 6 * c6 / r ** 7, rtol=1e-4, atol=1e-7
+    )
+    assert numpy.allclose(table.energy(i, j, r), energy)
+    assert not table.energy(i, j, numpy.full(len(i), 13.0)).any()
+
+
+def test_eam_table():
+    dr, drho = 0.01, 0.01
+    r, rho = numpy.arange(1000) * dr, numpy.arange(1000) * drho
+    pair = numpy.array([numpy.exp(-2 * r), 2 * numpy.exp(-2 * r)])
+    params = ff.nonbonded.potentials.EAM(
+        embed=-numpy.sqrt(rho), density=numpy.exp(-r), pair=pair
+    )
+    table = tabulate.eam_table(params, dr=dr, drho=drho)
+    assert tabulate.eam_table(params, dr=dr, drho=drho) is table
+
+    natoms = 10
+    geom = numpy.random.rand(natoms, 3) * 4
+    i, j = numpy.triu_indices(natoms, k=1)
+    dist = numpy.linalg.norm(geom[i] - geom[j], axis=1)
+    dist = numpy.clip(dist, 0.5, 5.0)
+
+    rho_i = numpy.bincount(i, numpy.exp(-dist), minlength=natoms) + numpy.bincount(
+        j, numpy.exp(-dist), minlength=natoms
+    )
+    ref = -numpy.sqrt(rho_i).sum() + 2 * numpy.exp(-2 * dist).sum()
+    energy, dedr = table.evaluate(i, j, dist, natoms, pair_index=1)
+    assert numpy.isclose(energy, ref, rtol=1e-5)
+
+    # dE/dr against central finite differences
+    k, h = 3, 1e-4
+    plus, minus = dist.copy(), dist.copy()
+    plus[k] += h
+    minus[k] -= h
+    numeric = (
+        table.energy(i, j, plus, natoms, 1) - table.energy(i, j, minus, natoms, 1)
+    ) / (2 * h)
+    assert numpy.isclose(dedr[k], numeric, rtol=1e-4)
+
+
+def test_tabulate_throughput():
+    mm_ff = build_lj_ff()
+    table = tabulate.lennard_jones_table(mm_ff, rmin=2.5, rmax=12.0)
+    npairs = 10 ** 6
+    i = numpy.random.randint(20, size=npairs)
+    j = numpy.random.randint(20, size=npairs)
+    r = numpy.random.uniform(2.5, 12.0, npairs)
+
+    start = time.perf_counter()
+    table.evaluate(i, j, r)
+    elapsed = time.perf_counter() - start
+    # Generous bound: a few tens of ms are expected for a million pairs
+    assert elapsed < 2.0
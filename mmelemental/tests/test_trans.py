@@ -0,0 +1,84 @@
+"""
+Translator resolution tests for the mmelemental package.
+"""
+import pytest
+import importlib
+import sys
+import types
+import numpy
+from mmelemental.models.molecule.mm_mol import Molecule
+from mmelemental.util import trans
+
+
+class FakeToolkitMol:
+    def __init__(self, mol):
+        self.mol = mol
+
+    @classmethod
+    def from_schema(cls, mol):
+        return cls(mol)
+
+
+class FakeTransComponent:
+    calls = 0
+
+    @classmethod
+    def find_trans(cls, dtype):
+        cls.calls += 1
+        return "fake_translator" if dtype == "fake" else None
+
+    find_molwrite_tk = find_trans
+
+
+@pytest.fixture
+def fake_translator(monkeypatch):
+    mod = types.ModuleType("fake_translator")
+    mod.__spec__ = importlib.machinery.ModuleSpec("fake_translator", None)
+    mod._classes_map = {"Molecule": FakeToolkitMol}
+    monkeypatch.setitem(sys.modules, "fake_translator", mod)
+    monkeypatch.setattr(trans, "TransComponent", FakeTransComponent)
+    FakeTransComponent.calls = 0
+    trans.invalidate()
+    yield mod
+    trans.invalidate()
+
+
+def test_resolve_cached(fake_translator):
+    mol = Molecule(symbols=["C", "H"], geometry=numpy.random.rand(2, 3))
+
+    for _ in range(10):
+        tkmol = mol.to_data(dtype="fake")
+        assert isinstance(tkmol, FakeToolkitMol)
+
+    assert FakeTransComponent.calls == 1
+    assert trans.cache_info() == {"hits": 9, "misses": 1, "size": 1}
+
+    assert trans.resolve("data", None, "Molecule", translator="fake_translator") == (
+        "fake_translator",
+        FakeToolkitMol,
+    )
+
+
+def test_resolve_invalidate(fake_translator):
+    trans.resolve("data", "fake", "Molecule")
+    trans.resolve("molwrite", ".fake", "Molecule")
+    assert trans.cache_info()["size"] == 1  # molwrite lookup failed and was not stored
+
+    trans.invalidate("other_translator")
+    assert trans.cache_info()["size"] == 1
+
+    trans.invalidate("fake_translator")
+    assert trans.cache_info()["size"] == 0
+
+    trans.resolve("data", "fake", "Molecule")
+    assert FakeTransComponent.calls == 3
+
+
+def test_resolve_missing(fake_translator):
+    assert trans.resolve("data", "other", "Molecule") == (None, None)
+    assert trans.resolve("data", "fake", "ForceField") == ("fake_translator", None)
+    assert trans.cache_info()["size"] == 0
+
+    mol = Molecule(symbols=["C"], geometry=[0, 0, 0])
+    with pytest.raises(NotImplementedError):
+        mol.to_data(translator="not_a_translator")
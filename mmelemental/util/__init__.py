@@ -1 +1,11 @@
-from . import decorators
+from . import (
+    decorators,
+    instrument,
+    cache,
+    memory,
+    serialization,
+    compression,
+    store,
+    database,
+    trans,
+)
@@ -0,0 +1,191 @@
+""" Bounded caches used by MMElemental """
+
+__all__ = [
+    "LRUCache",
+    "cached_from_schema",
+    "content_key",
+    "model_nbytes",
+    "tkmodel_cache",
+]
+
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Dict, Hashable, Optional
+import hashlib
+import json
+import threading
+import numpy
+
+
+class LRUCache:
+    """A thread-safe least-recently-used cache bounded by the number of entries and by
+    the (estimated) number of bytes stored.
+    Parameters
+    ----------
+    maxsize: int, optional
+        Maximum number of entries. Defaults to 128.
+    maxbytes: int, optional
+        Maximum total size in bytes of all entries as estimated by the caller. Unbounded if unset.
+    """
+
+    def __init__(self, maxsize: int = 128, maxbytes: Optional[int] = None):
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ Returns the value stored for key and marks it as most recently used. """
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, nbytes: int = 0) -> bool:
+        """Stores value for key, evicting least recently used entries as needed. Returns
+        False if the value alone exceeds the memory limit and was not stored."""
+        if self.maxbytes is not None and nbytes > self.maxbytes:
+            return False
+
+        with self._lock:
+            self.pop(key)
+            self._data[key] = (value, nbytes)
+            self.nbytes += nbytes
+            self._evict()
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """ Removes key from the cache and returns its value. """
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self.nbytes -= entry[1]
+            return entry[0]
+
+    def resize(
+        self, maxsize: Optional[int] = None, maxbytes: Optional[int] = None
+    ) -> None:
+        """ Updates the cache limits, evicting entries if the new limits are exceeded. """
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if maxbytes is not None:
+                self.maxbytes = maxbytes
+            self._evict()
+
+    def clear(self) -> None:
+        """ Removes all entries and resets the counters. """
+        with self._lock:
+            self._data.clear()
+            self.nbytes = self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> Dict[str, Any]:
+        """ Returns the cache statistics and limits. """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "nbytes": self.nbytes,
+            "maxsize": self.maxsize,
+            "maxbytes": self.maxbytes,
+        }
+
+    def _evict(self) -> None:
+        while len(self._data) > self.maxsize or (
+            self.maxbytes is not None and self.nbytes > self.maxbytes
+        ):
+            _, (_, nbytes) = self._data.popitem(last=False)
+            self.nbytes -= nbytes
+            self.evictions += 1
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, numpy.ndarray):
+        return obj.ravel().tolist()
+    elif hasattr(obj, "dict"):
+        return obj.dict()
+    return str(obj)
+
+
+def content_key(model: "ProtoModel") -> str:
+    """Returns a digest that identifies all the data stored in a model. Combines
+    ``model.get_hash()`` with the fields not covered by ``model.hash_fields``. Models being
+    immutable, the digest is computed once per instance: arrays modified in place are not seen."""
+    key = getattr(model, "_content_key", None)
+    if key is not None:
+        return key
+
+    data = model.dict()
+    data.pop("provenance", None)
+    for field in model.hash_fields:
+        data.pop(field, None)
+
+    m = hashlib.sha1(model.get_hash().encode("utf-8"))
+    m.update(json.dumps(data, sort_keys=True, default=_json_default).encode("utf-8"))
+    key = m.hexdigest()
+    if hasattr(model, "_content_key"):
+        model._content_key = key
+    return key
+
+
+def model_nbytes(obj: Any) -> int:
+    """ Returns the number of bytes held by the array buffers of a (nested) model. """
+    if isinstance(obj, numpy.ndarray):
+        return obj.nbytes
+    elif hasattr(obj, "__fields__"):
+        return sum(model_nbytes(val) for val in obj.__dict__.values())
+    elif isinstance(obj, (list, tuple)):
+        return sum(model_nbytes(val) for val in obj)
+    elif isinstance(obj, dict):
+        return sum(model_nbytes(val) for val in obj.values())
+    return 0
+
+
+# Toolkit objects built by Molecule.to_data and ForceField.to_data
+tkmodel_cache = LRUCache(maxsize=32, maxbytes=2 ** 30)
+
+
+def cached_from_schema(
+    tk_class: Any, model: "ProtoModel", translator: str, copy: bool = True
+) -> Any:
+    """Returns ``tk_class.from_schema(model)``, reusing the toolkit object stored in
+    ``tkmodel_cache`` if the same model was already converted with the same translator.
+    Parameters
+    ----------
+    tk_class: Any
+        Toolkit-specific class e.g. a ``ToolkitModel`` subclass.
+    model: ProtoModel
+        MMSchema model to convert e.g. :class:``Molecule`` or :class:``ForceField``.
+    translator: str
+        Name of the translator that defines ``tk_class``.
+    copy: bool, optional
+        Returns a deep copy of the cached object so it can be safely modified. Defaults to True.
+    Returns
+    -------
+    Any
+        Toolkit-specific object.
+    """
+    key = (model.__class__.__name__, translator, content_key(model))
+    tkmodel = tkmodel_cache.get(key)
+    if tkmodel is None:
+        tkmodel = tk_class.from_schema(model)
+        # Toolkit objects cannot be sized generically so the model arrays are used as an estimate
+        tkmodel_cache.put(key, tkmodel, nbytes=model_nbytes(model))
+    return deepcopy(tkmodel) if copy else tkmodel
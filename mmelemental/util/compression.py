@@ -0,0 +1,77 @@
+""" Transparent compression of model files """
+
+__all__ = ["suffixes", "split_ext", "open_file"]
+
+from pathlib import Path
+from typing import IO, List, Optional, Tuple
+import bz2
+import gzip
+import lzma
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression levels used by default, trading a little size for much faster compression than
+# the maximum levels
+_default_levels = {".gz": 6, ".bz2": 9, ".xz": 6, ".zst": 3}
+
+
+def suffixes() -> List[str]:
+    """ Returns the compressed file suffixes supported with the installed codecs. """
+    return [ext for ext in _default_levels if ext != ".zst" or zstandard is not None]
+
+
+def split_ext(filename: str) -> Tuple[str, Optional[str]]:
+    """Returns the extension of the file contents and the compression suffix (None if not
+    compressed) of a filename e.g. (".json", ".gz") for mol.json.gz."""
+    path = Path(filename)
+    if path.suffix in _default_levels:
+        return Path(path.stem).suffix, path.suffix
+    return path.suffix, None
+
+
+def open_file(
+    filename: str, mode: str = "rb", level: Optional[int] = None, threads: int = 0
+) -> IO:
+    """Opens a file in binary or text mode, streaming (de)compression if its name ends with .gz,
+    .bz2, .xz, or .zst (requires zstandard).
+    Parameters
+    ----------
+    filename: str
+        File to open.
+    mode: str, optional
+        Mode as for open e.g. rb, w, or at. Defaults to rb.
+    level: int, optional
+        Compression level when writing. Defaults to 6 for gzip and xz, 9 for bzip2, and 3 for zstd.
+    threads: int, optional
+        Number of compression threads, only supported by zstd (-1 uses all the cores). Defaults to
+        0, compressing in the calling thread.
+    Returns
+    -------
+    IO
+        File object.
+    """
+    _, compression = split_ext(filename)
+    if compression is None:
+        return open(filename, mode)
+
+    writing = any(char in mode for char in "wax")
+    level = _default_levels[compression] if level is None else level
+    if "b" not in mode and "t" not in mode:
+        mode += "t"
+
+    if compression == ".gz":
+        return gzip.open(filename, mode, compresslevel=level)
+    elif compression == ".bz2":
+        return bz2.open(filename, mode, compresslevel=level)
+    elif compression == ".xz":
+        return lzma.open(filename, mode, preset=level if writing else None)
+
+    if zstandard is None:
+        raise ModuleNotFoundError("Could not find or import zstandard.")
+    if writing:
+        cctx = zstandard.ZstdCompressor(level=level, threads=threads)
+        return zstandard.open(filename, mode, cctx=cctx)
+    return zstandard.open(filename, mode)
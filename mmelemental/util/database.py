@@ -0,0 +1,288 @@
+""" SQLite database of molecules indexed by their metadata """
+
+__all__ = ["MoleculeDatabase"]
+
+from collections import Counter
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+import numbers
+import sqlite3
+import threading
+from . import serialization
+
+# Rows fetched at a time when streaming query results
+_fetch_size = 256
+
+# Indexed columns queried by equality
+_columns = frozenset(("hash", "name", "formula", "smiles", "inchi"))
+
+_schema = """
+CREATE TABLE IF NOT EXISTS molecules (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    name TEXT,
+    formula TEXT NOT NULL,
+    natoms INTEGER NOT NULL,
+    smiles TEXT,
+    inchi TEXT,
+    codec TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS molecules_name ON molecules (name);
+CREATE INDEX IF NOT EXISTS molecules_formula ON molecules (formula);
+CREATE INDEX IF NOT EXISTS molecules_natoms ON molecules (natoms);
+CREATE INDEX IF NOT EXISTS molecules_smiles ON molecules (smiles);
+CREATE INDEX IF NOT EXISTS molecules_inchi ON molecules (inchi);
+CREATE TABLE IF NOT EXISTS residues (
+    residue TEXT NOT NULL,
+    molecule INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (residue, molecule)
+) WITHOUT ROWID;
+"""
+
+
+def _code(identifiers: Any, name: str) -> Optional[str]:
+    """ Returns an identifier of a molecule as a string e.g. its smiles. """
+    value = getattr(identifiers, name, None) if identifiers is not None else None
+    return getattr(value, "code", value)
+
+
+class MoleculeDatabase:
+    """A local SQLite database of molecules, stored as msgpack (or JSON) payloads next to indexed
+    metadata columns: hash, name, molecular formula, number of atoms, smiles, inchi, and residue
+    names, so that large collections can be queried without loading them. Molecules are unique by
+    ``get_hash()``. The database is in WAL mode so that any number of readers, e.g. databases
+    opened read-only in other threads or processes, run concurrently with a writer.
+    Parameters
+    ----------
+    path: str
+        Database file, created if needed.
+    codec: str, optional
+        Payload format of new molecules, msgpack (the default if installed) or json.
+    readonly: bool, optional
+        Opens an existing database for queries only. Defaults to False.
+    """
+
+    def __init__(self, path: str, codec: Optional[str] = None, readonly: bool = False):
+        self.codec = codec or ("msgpack" if serialization.msgpack else "json")
+        if self.codec not in ("msgpack", "json"):
+            raise ValueError(
+                f"Codec {self.codec} not supported, only msgpack and json."
+            )
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.RLock()
+        if readonly:
+            self._db = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            # Transactions are started explicitly by add_many
+            self._db = sqlite3.connect(
+                path, timeout=60, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # Durable as of the last checkpoint only, which WAL keeps consistent
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(f"BEGIN IMMEDIATE; {_schema} COMMIT;")
+
+    def close(self) -> None:
+        """ Closes the database. """
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "MoleculeDatabase":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __contains__(self, hash: str) -> bool:
+        return self.count(hash=hash) > 0
+
+    # Writing
+    def add(self, mol: "Molecule") -> bool:
+        """ Adds a molecule unless already stored. Returns whether it was added. """
+        return self.add_many([mol]) == 1
+
+    def add_many(self, mols: Iterable["Molecule"], batch_size: int = 10000) -> int:
+        """Adds molecules unless already stored, in a transaction per batch of batch_size
+        molecules, so that iterables of any length can be streamed in. Returns the number of
+        molecules added."""
+        added, batch = 0, []
+        for mol in mols:
+            batch.append(mol)
+            if len(batch) == batch_size:
+                added += self._insert(batch)
+                batch = []
+        if batch:
+            added += self._insert(batch)
+        return added
+
+    def _insert(self, mols: List["Molecule"]) -> int:
+        rows = []
+        for mol in mols:
+            if self.codec == "msgpack":
+                payload = serialization.msgpack_dumps(mol)
+            else:
+                payload = serialization.json_dumps(mol).encode("utf-8")
+            residues = Counter(name for name, _ in set(mol.residues or ()))
+            row = (
+                mol.get_hash(),
+                mol.name,
+                mol.get_molecular_formula(),
+                len(mol.symbols),
+                _code(mol.identifiers, "smiles"),
+                _code(mol.identifiers, "inchi"),
+                self.codec,
+                payload,
+            )
+            rows.append((row, residues))
+
+        added = 0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for row, residues in rows:
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO molecules (hash, name, formula, natoms, smiles, "
+                        "inchi, codec, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    added += cursor.rowcount
+                    if cursor.rowcount and residues:
+                        self._db.executemany(
+                            "INSERT INTO residues VALUES (?, ?, ?)",
+                            [
+                                (name, cursor.lastrowid, n)
+                                for name, n in residues.items()
+                            ],
+                        )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return added
+
+    # Reading
+    def get(self, hash: str) -> Optional["Molecule"]:
+        """ Returns the molecule of a hash, None if not stored. """
+        return next(self.query(hash=hash), None)
+
+    def count(self, **filters: Any) -> int:
+        """ Returns the number of molecules matching the filters. See :meth:``query``. """
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._db.execute(
+                f"SELECT COUNT(*) FROM molecules{where}", params
+            ).fetchone()[0]
+
+    def hashes(self, **filters: Any) -> Iterator[str]:
+        """ Yields the hashes of the molecules matching the filters. See :meth:``query``. """
+        for (hash,) in self._select("hash", **filters):
+            yield hash
+
+    def query(
+        self,
+        hash: Optional[str] = None,
+        name: Optional[str] = None,
+        formula: Optional[str] = None,
+        natoms: Optional[Union[int, Tuple[int, int]]] = None,
+        smiles: Optional[str] = None,
+        inchi: Optional[str] = None,
+        residues: Optional[Union[str, Iterable[str]]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator["Molecule"]:
+        """Yields the molecules matching all the filters set, in insertion order, loading them
+        a few at a time.
+        Parameters
+        ----------
+        hash: str, optional
+            Hash of the molecule i.e. ``get_hash()``.
+        name: str, optional
+            Name of the molecule.
+        formula: str, optional
+            Molecular formula in alphabetical order e.g. C2H6O, see ``get_molecular_formula()``.
+        natoms: Union[int, Tuple[int, int]], optional
+            Number of atoms, or inclusive range of numbers of atoms.
+        smiles: str, optional
+            SMILES identifier.
+        inchi: str, optional
+            InChI identifier.
+        residues: Union[str, Iterable[str]], optional
+            Residue name(s) the molecule must all contain e.g. ALA.
+        limit: int, optional
+            Maximum number of molecules yielded.
+        Returns
+        -------
+        Iterator[Molecule]
+            Matching molecules.
+        """
+        from mmelemental.models.molecule.mm_mol import Molecule
+
+        rows = self._select(
+            "codec, payload",
+            hash=hash,
+            name=name,
+            formula=formula,
+            natoms=natoms,
+            smiles=smiles,
+            inchi=inchi,
+            residues=residues,
+            limit=limit,
+        )
+        for codec, payload in rows:
+            if codec == "msgpack":
+                data = serialization.msgpack_loads(payload)
+            else:
+                data = serialization.decode_arrays(
+                    Molecule, serialization.json_loads(payload)
+                )
+            yield Molecule(**data)
+
+    def _select(
+        self, columns: str, limit: Optional[int] = None, **filters: Any
+    ) -> Iterator[tuple]:
+        where, params = self._where(**filters)
+        sql = f"SELECT {columns} FROM molecules{where} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(_fetch_size)
+            if not rows:
+                return
+            yield from rows
+
+    @staticmethod
+    def _where(
+        natoms: Optional[Union[int, Tuple[int, int]]] = None,
+        residues: Optional[Union[str, Iterable[str]]] = None,
+        **filters: Any,
+    ) -> Tuple[str, list]:
+        """ Returns the WHERE clause of filters and its parameters. """
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in _columns:
+                raise TypeError(f"Unexpected filter {column}.")
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if isinstance(natoms, numbers.Integral):
+            clauses.append("natoms = ?")
+            params.append(int(natoms))  # NumPy integers are not bound as integers
+        elif natoms is not None:
+            clauses.append("natoms BETWEEN ? AND ?")
+            params += map(int, natoms)
+        if isinstance(residues, str):
+            residues = [residues]
+        for residue in residues or ():
+            clauses.append("id IN (SELECT molecule FROM residues WHERE residue = ?)")
+            params.append(residue)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
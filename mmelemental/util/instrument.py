@@ -0,0 +1,305 @@
+""" Opt-in instrumentation of MMElemental hot paths """
+
+__all__ = [
+    "enabled",
+    "enable",
+    "disable",
+    "instrument",
+    "instrumented",
+    "span",
+    "record",
+    "summary",
+    "MemorySink",
+    "JSONLinesSink",
+    "LoggingSink",
+]
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import numpy
+
+# Environment variable enabling instrumentation at import: a comma-separated list of sinks among
+# memory (also 1, true, yes), logging, and jsonl:<path>.
+ENV_VAR = "MMELEMENTAL_INSTRUMENT"
+
+# Active sinks. Instrumented code only checks that this list is empty when disabled.
+_sinks: List[Any] = []
+_lock = threading.Lock()
+
+
+class MemorySink:
+    """Aggregates call counts, timings, and bytes processed per hot path in memory. Timing
+    percentiles are estimated from a uniform reservoir sample of bounded size.
+    Parameters
+    ----------
+    maxsamples: int, optional
+        Maximum number of timings kept per hot path for percentiles. Defaults to 10000.
+    """
+
+    def __init__(self, maxsamples: int = 10000):
+        self.maxsamples = maxsamples
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+
+    def write(self, name: str, seconds: float, nbytes: int) -> None:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "nbytes": 0,
+                    "samples": [],
+                }
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["nbytes"] += nbytes
+            samples = stats["samples"]
+            if len(samples) < self.maxsamples:
+                samples.append(seconds)
+            else:
+                k = self._rng.randrange(stats["count"])
+                if k < self.maxsamples:
+                    samples[k] = seconds
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns the call count, total/mean/max time and median/90th/99th percentile times in
+        seconds, and total bytes processed of every hot path."""
+        with self._lock:
+            out = {}
+            for name, stats in self._stats.items():
+                p50, p90, p99 = numpy.percentile(stats["samples"], (50, 90, 99))
+                out[name] = {
+                    "count": stats["count"],
+                    "total": stats["total"],
+                    "mean": stats["total"] / stats["count"],
+                    "p50": float(p50),
+                    "p90": float(p90),
+                    "p99": float(p99),
+                    "max": stats["max"],
+                    "nbytes": stats["nbytes"],
+                }
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def close(self) -> None:
+        pass
+
+
+class JSONLinesSink:
+    """Appends every record as a JSON line {"name", "time", "seconds", "nbytes"} to a file.
+    Parameters
+    ----------
+    path: str
+        Output filename.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fp = open(path, "a")
+        self._lock = threading.Lock()
+
+    def write(self, name: str, seconds: float, nbytes: int) -> None:
+        line = json.dumps(
+            {"name": name, "time": time.time(), "seconds": seconds, "nbytes": nbytes}
+        )
+        with self._lock:
+            self._fp.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fp.closed:
+                self._fp.close()
+
+
+class LoggingSink:
+    """Emits every record through the Python logging module.
+    Parameters
+    ----------
+    logger: str or logging.Logger, optional
+        Logger or logger name. Defaults to mmelemental.instrument.
+    level: int, optional
+        Logging level of the records. Defaults to logging.DEBUG.
+    """
+
+    def __init__(
+        self, logger: Any = "mmelemental.instrument", level: int = logging.DEBUG
+    ):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+
+    def write(self, name: str, seconds: float, nbytes: int) -> None:
+        self.logger.log(
+            self.level,
+            "%s: %.6f s, %d bytes",
+            name,
+            seconds,
+            nbytes,
+            extra={"instrument": {"name": name, "seconds": seconds, "nbytes": nbytes}},
+        )
+
+    def close(self) -> None:
+        pass
+
+
+def enabled() -> bool:
+    """ Returns whether any sink is recording. """
+    return bool(_sinks)
+
+
+def enable(*sinks: Any) -> Any:
+    """Starts recording to the given sinks, a new :class:``MemorySink`` by default, and returns the
+    first sink. A sink is any object with ``write(name, seconds, nbytes)`` and ``close()`` methods."""
+    global _sinks
+    sinks = sinks or (MemorySink(),)
+    with _lock:
+        # Rebinding instead of mutating lets instrumented code read the list without locking
+        _sinks = _sinks + list(sinks)
+    return sinks[0]
+
+
+def disable(*sinks: Any) -> None:
+    """ Stops recording to and closes the given sinks, or all sinks if none are given. """
+    global _sinks
+    with _lock:
+        removed = list(sinks) if sinks else _sinks
+        _sinks = [sink for sink in _sinks if not any(sink is s for s in removed)]
+    for sink in removed:
+        sink.close()
+
+
+@contextmanager
+def instrument(*sinks: Any) -> Iterator[Any]:
+    """Context manager recording hot paths within its scope to the given sinks (a new
+    :class:``MemorySink`` by default). Yields the first sink e.g.
+    >>> with instrument() as stats:
+    ...     mol.to_file("mol.json")
+    >>> stats.summary()["Molecule.to_file.json"]["count"]
+    1
+    """
+    sinks = sinks or (MemorySink(),)
+    enable(*sinks)
+    try:
+        yield sinks[0]
+    finally:
+        disable(*sinks)
+
+
+def summary() -> Dict[str, Dict[str, float]]:
+    """ Returns the merged summaries of all active memory sinks e.g. enabled by ENV_VAR. """
+    out = {}
+    for sink in _sinks:
+        if isinstance(sink, MemorySink):
+            out.update(sink.summary())
+    return out
+
+
+def record(name: str, seconds: float, nbytes: int = 0) -> None:
+    """ Sends a timing of a hot path to all active sinks. """
+    for sink in _sinks:
+        sink.write(name, seconds, nbytes)
+
+
+class _Span:
+    __slots__ = ("name", "nbytes", "_start")
+
+    def __init__(self, name: str):
+        self.name, self.nbytes = name, 0
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        record(self.name, time.perf_counter() - self._start, self.nbytes)
+
+
+class _NullSpan:
+    __slots__ = ("nbytes",)
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+_null_span = _NullSpan()
+
+
+def span(name: str) -> Any:
+    """Returns a context manager timing its block as the hot path ``name``. The bytes processed can
+    be reported by setting its ``nbytes`` attribute. A shared no-op is returned when disabled."""
+    return _Span(name) if _sinks else _null_span
+
+
+def instrumented(
+    name: str, nbytes: Optional[Callable[..., int]] = None
+) -> Callable[[Callable], Callable]:
+    """Decorator recording the calls of a function as the hot path ``name``, including calls that
+    raise. When disabled, the only overhead is the check for active sinks.
+    Parameters
+    ----------
+    name: str
+        Name of the hot path e.g. Molecule.get_hash.
+    nbytes: Callable, optional
+        Function of the result and of the call arguments returning the number of bytes processed.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                # Failed calls are recorded too, without bytes, as by span
+                record(name, time.perf_counter() - start)
+                raise
+            seconds = time.perf_counter() - start
+            record(name, seconds, nbytes(result, *args, **kwargs) if nbytes else 0)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _from_env(value: Optional[str]) -> List[Any]:
+    """ Returns the sinks requested by the value of ENV_VAR. """
+    sinks = []
+    for spec in (value or "").split(","):
+        spec = spec.strip()
+        if not spec or spec.lower() in ("0", "false", "no"):
+            continue
+        if spec.lower() in ("1", "true", "yes", "memory"):
+            sinks.append(MemorySink())
+        elif spec.lower() == "logging":
+            sinks.append(LoggingSink())
+        elif spec.lower().startswith("jsonl:"):
+            sinks.append(JSONLinesSink(spec[len("jsonl:") :]))
+        else:
+            raise ValueError(
+                f"{ENV_VAR}={value} not understood. Use memory, logging, or jsonl:<path>."
+            )
+    return sinks
+
+
+_env_sinks = _from_env(os.environ.get(ENV_VAR))
+if _env_sinks:
+    enable(*_env_sinks)
@@ -0,0 +1,196 @@
+""" Memory footprint of MMElemental models """
+
+__all__ = ["MemoryUsage", "memory_usage"]
+
+from typing import Any, Dict, NamedTuple
+import sys
+import numpy
+
+
+class MemoryUsage(NamedTuple):
+    """Bytes held by a model, counted once per object or buffer. The total is broken down both by
+    kind (arrays + strings + python) and by ownership (owned + shared).
+    Parameters
+    ----------
+    total: int
+        All the bytes reachable from the model.
+    arrays: int
+        Buffers of numeric (and object) arrays.
+    strings: int
+        Buffers of string arrays and Python str objects.
+    python: int
+        Python objects: models, containers such as the ``connectivity_`` list of tuples, numbers,
+        and array headers.
+    owned: int
+        Bytes held by the model alone, freed with it.
+    shared: int
+        Array buffers also referenced outside the model e.g. slices of arrays owned by other
+        objects, memory maps, or shared memory blocks. Only the memory viewed is counted.
+    fields: Dict[str, int]
+        Total of every top-level field. An object reachable from several fields is counted in the
+        first one only.
+    """
+
+    total: int
+    arrays: int
+    strings: int
+    python: int
+    owned: int
+    shared: int
+    fields: Dict[str, int]
+
+
+# Singletons never counted against a model
+_immortal = (type(None), bool, type(Ellipsis), type(NotImplemented))
+
+
+class _Walker:
+    """ Visits every object reachable from a model once, collecting the array buffers by owner. """
+
+    def __init__(self):
+        self.seen = set()
+        self.strings = 0
+        self.python = 0
+        # id of the ndarray (or other object) owning the memory -> buffer record
+        self.buffers: Dict[int, Dict[str, Any]] = {}
+        self.field = None
+        self.fields: Dict[str, int] = {}
+
+    def _python(self, nbytes: int, string: bool = False) -> None:
+        if string:
+            self.strings += nbytes
+        else:
+            self.python += nbytes
+        self.fields[self.field] = self.fields.get(self.field, 0) + nbytes
+
+    def visit(self, obj: Any) -> None:
+        if isinstance(obj, _immortal) or id(obj) in self.seen:
+            return
+        self.seen.add(id(obj))
+
+        if isinstance(obj, numpy.ndarray):
+            self._array(obj)
+        elif isinstance(obj, (str, bytes)):
+            self._python(sys.getsizeof(obj), string=True)
+        elif hasattr(obj, "__fields__"):
+            self._python(sys.getsizeof(obj) + sys.getsizeof(obj.__dict__))
+            for val in obj.__dict__.values():
+                self.visit(val)
+        elif isinstance(obj, dict):
+            self._python(sys.getsizeof(obj))
+            for key, val in obj.items():
+                self.visit(key)
+                self.visit(val)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            self._python(sys.getsizeof(obj))
+            for val in obj:
+                self.visit(val)
+        else:
+            self._python(sys.getsizeof(obj))
+
+    def _array(self, arr: numpy.ndarray) -> None:
+        # Follow the views down to the array holding the memory, and to the foreign object (e.g.
+        # bytes or a memory map) providing it if any
+        chain = [arr]
+        while isinstance(chain[-1], numpy.ndarray) and chain[-1].base is not None:
+            chain.append(chain[-1].base)
+        while isinstance(chain[-1], memoryview) and chain[-1].obj is not None:
+            chain.append(chain[-1].obj)
+        owner = chain[-1]
+        root = next(node for node in reversed(chain) if isinstance(node, numpy.ndarray))
+        buffer = self.buffers.get(id(owner))
+        if buffer is None:
+            buffer = self.buffers[id(owner)] = {
+                "size": root.nbytes,
+                "allocated": root is owner,
+                "direct": False,
+                "views": 0,
+                "nodes": {},
+                "links": set(),
+                "string": arr.dtype.kind in "US",
+                "field": self.field,
+            }
+        # References to the arrays and objects below arr made from within the model
+        nodes = buffer["nodes"]
+        if arr is root:
+            buffer["direct"] = True
+            nodes.setdefault(id(arr), [arr, 0])[1] += 1
+        else:
+            buffer["views"] += arr.nbytes
+        for child, parent in zip(chain, chain[1:]):
+            if id(child) in buffer["links"]:
+                break
+            buffer["links"].add(id(child))
+            nodes.setdefault(id(parent), [parent, 0])[1] += 1
+
+        # Array header, plus the elements of object arrays
+        self._python(sys.getsizeof(arr) - (arr.nbytes if arr.flags.owndata else 0))
+        if arr.dtype.kind == "O":
+            for val in arr.flat:
+                self.visit(val)
+
+    def result(self) -> MemoryUsage:
+        arrays = strings = owned = shared = 0
+        for buffer in self.buffers.values():
+            # The buffer is owned if the model holds the array allocating it, or the only references
+            # to the arrays (and foreign object) it goes through. getrefcount also counts its
+            # argument, the loop variable, and the nodes entry.
+            external = False
+            for node, count in buffer["nodes"].values():
+                external = external or sys.getrefcount(node) - 3 > count
+            if (buffer["direct"] and buffer["allocated"]) or not external:
+                nbytes = buffer["size"]
+                owned += nbytes
+            elif buffer["direct"]:
+                nbytes = buffer["size"]
+                shared += nbytes
+            else:
+                # Views only: the memory viewed, at most the whole buffer
+                nbytes = min(buffer["views"], buffer["size"])
+                shared += nbytes
+            buffer["nodes"].clear()
+            if buffer["string"]:
+                strings += nbytes
+            else:
+                arrays += nbytes
+            self.fields[buffer["field"]] = self.fields.get(buffer["field"], 0) + nbytes
+
+        strings += self.strings
+        owned += self.strings + self.python
+        fields = {key: val for key, val in self.fields.items() if key is not None}
+        return MemoryUsage(
+            total=owned + shared,
+            arrays=arrays,
+            strings=strings,
+            python=self.python,
+            owned=owned,
+            shared=shared,
+            fields=fields,
+        )
+
+
+def memory_usage(obj: Any) -> MemoryUsage:
+    """Returns the memory held by a (nested) model or container, recursively summing array buffers,
+    string arrays, and the overhead of Python objects. Every object and array buffer is counted
+    once however many times it is referenced, and buffers the model only views or that are also
+    referenced elsewhere are reported as shared rather than owned.
+    Parameters
+    ----------
+    obj: Any
+        Model e.g. :class:``Molecule`` or :class:``Trajectory``, or any Python object.
+    Returns
+    -------
+    MemoryUsage
+        Bytes by kind, by ownership, and by top-level field.
+    """
+    walker = _Walker()
+    if hasattr(obj, "__fields__"):
+        walker.seen.add(id(obj))
+        walker._python(sys.getsizeof(obj) + sys.getsizeof(obj.__dict__))
+        for key, val in obj.__dict__.items():
+            walker.field = key
+            walker.visit(val)
+        walker.field = None
+    else:
+        walker.visit(obj)
+    return walker.result()
@@ -0,0 +1,592 @@
+""" Fast JSON and msgpack serialization of MMElemental models """
+
+__all__ = [
+    "json_dumps",
+    "json_loads",
+    "msgpack_dumps",
+    "msgpack_loads",
+    "model_dict",
+    "decode_arrays",
+    "json_load_stream",
+    "load_model",
+    "dump_model",
+]
+
+from itertools import chain
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+import functools
+import json
+import re
+import warnings
+import numpy
+from pydantic import BaseModel
+from pydantic.fields import (
+    MAPPING_LIKE_SHAPES,
+    SHAPE_SINGLETON,
+    SHAPE_TUPLE,
+    ModelField,
+)
+from pydantic.json import pydantic_encoder
+from . import compression
+from .instrument import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Types serialized as is
+_scalars = frozenset((int, float, str, bool, type(None)))
+
+# Array dtypes orjson serializes natively from the buffer
+_native = frozenset("fiub")
+
+# msgpack extension type of NumPy arrays: header length (1 byte), msgpack header (dtype, shape),
+# and the raw C-ordered buffer
+MSGPACK_ARRAY = 1
+
+# JSON files of at least this size are read by Molecule.from_file with json_load_stream
+stream_threshold = 64 << 20
+
+# Bytes read at a time by json_load_stream
+_chunk_size = 1 << 20
+
+_space = re.compile(rb"\s*")
+_string = re.compile(rb'"(?:[^"\\]|\\.)*"', re.S)
+_scalar = re.compile(rb"[^\s,\]}]+")
+_structural = re.compile(rb'["\[\]{}]')
+_brackets = re.compile(rb"[\[\]]")
+
+
+def _default(obj: Any) -> Any:
+    """ Encodes the objects neither orjson nor json handle e.g. string arrays or enums. """
+    if isinstance(obj, numpy.ndarray):
+        return obj.ravel().tolist() if obj.shape else obj.tolist()
+    elif isinstance(obj, numpy.generic):
+        return obj.item()
+    return pydantic_encoder(obj)
+
+
+@functools.lru_cache(maxsize=None)
+def _plain_dict(cls: Type[BaseModel]) -> bool:
+    """Returns whether the dict of a model class is the one of :class:``ProtoModel`` i.e. all the
+    fields by alias without None values, which is then built directly. Models overriding dict
+    e.g. to exclude their provenance go through their dict."""
+    config = cls.__config__
+    if getattr(config, "force_skip_defaults", False) or not hasattr(
+        config, "serialize_default_excludes"
+    ):
+        return False
+    owner = next(klass for klass in cls.__mro__ if "dict" in vars(klass))
+    return owner.__module__ == "mmelemental.models.base"
+
+
+def _json_array(value: numpy.ndarray) -> Any:
+    """ Flattens an array as in the JSON schema, keeping the buffer if orjson can write it. """
+    if orjson is not None and value.dtype.kind in _native and value.shape:
+        return numpy.ascontiguousarray(value.ravel()).astype(
+            value.dtype.newbyteorder("="), copy=False
+        )
+    return _default(value)
+
+
+def _msgpack_array(value: numpy.ndarray) -> Any:
+    """ Packs an array as an extension type holding its dtype, shape, and raw bytes. """
+    if value.dtype.kind == "O" or not value.shape:
+        return value.tolist()
+    value = numpy.ascontiguousarray(value)
+    header = msgpack.packb((value.dtype.str, value.shape))
+    raw = value.reshape(-1).view(numpy.uint8)
+    return msgpack.ExtType(
+        MSGPACK_ARRAY, b"".join((bytes((len(header),)), header, raw))
+    )
+
+
+def _prepare(value: Any, array: Callable = _json_array, strip: bool = False) -> Any:
+    """Returns value with models replaced by dicts of their fields by alias without None values,
+    and arrays encoded by array, leaving lists and tuples of scalars untouched. None values of
+    dicts are dropped if strip i.e. within models."""
+    if isinstance(value, numpy.ndarray):
+        return array(value)
+    elif isinstance(value, BaseModel):
+        if not _plain_dict(type(value)):
+            return _prepare(value.dict(), array)
+        fields = value.__fields__
+        excludes = value.__config__.serialize_default_excludes
+        return {
+            fields[key].alias: _prepare(val, array, True)
+            for key, val in value.__dict__.items()
+            if val is not None and key not in excludes
+        }
+    elif isinstance(value, dict):
+        return {
+            key: _prepare(val, array, strip)
+            for key, val in value.items()
+            if val is not None or not strip
+        }
+    elif isinstance(value, (list, tuple)):
+        # Lists of scalars or of tuples of scalars e.g. connectivity are checked at C speed
+        types = set(map(type, value))
+        if types <= _scalars or (
+            types == {tuple} and set(map(type, chain.from_iterable(value))) <= _scalars
+        ):
+            return value
+        return value.__class__(_prepare(val, array, strip) for val in value)
+    return value
+
+
+def model_dict(model: BaseModel) -> Dict[str, Any]:
+    """Returns the same dict as ``model.dict()`` i.e. the fields by alias without None values,
+    but with flattened arrays as in the JSON schema, and without copying lists of scalars.
+    Parameters
+    ----------
+    model: BaseModel
+        Model e.g. :class:``Molecule`` or :class:``ForceField``.
+    Returns
+    -------
+    Dict[str, Any]
+        Fields of the model ready for serialization.
+    """
+    return _prepare(model)
+
+
+def json_dumps(data: Any) -> str:
+    """Serializes a model or any data holding arrays to JSON, with orjson if installed (arrays are
+    then written directly from their buffers) and with the standard library otherwise. Arrays are
+    flattened as in the JSON schema of the models.
+    Parameters
+    ----------
+    data: Any
+        Model, dict, or any encodable object.
+    Returns
+    -------
+    str
+        JSON representation of the data.
+    """
+    data = _prepare(data, _json_array)
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY
+        ).decode("utf-8")
+    return json.dumps(data, default=_default)
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """ Parses JSON with orjson if installed, and with the standard library otherwise. """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def msgpack_dumps(data: Any) -> bytes:
+    """Serializes a model or any data holding arrays to msgpack. Arrays keep their shape and are
+    packed as extension types carrying their dtype and raw bytes, without per-element encoding.
+    Parameters
+    ----------
+    data: Any
+        Model, dict, or any encodable object.
+    Returns
+    -------
+    bytes
+        msgpack representation of the data.
+    """
+    if msgpack is None:
+        raise ModuleNotFoundError("Could not find or import msgpack.")
+    return msgpack.packb(
+        _prepare(data, _msgpack_array), default=_default, use_bin_type=True
+    )
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code != MSGPACK_ARRAY:
+        return msgpack.ExtType(code, data)
+    size = data[0] + 1
+    dtype, shape = msgpack.unpackb(data[1:size])
+    # Copied so that the array is writable and does not hold the whole message
+    return numpy.frombuffer(data, dtype=dtype, offset=size).reshape(shape).copy()
+
+
+def msgpack_loads(data: bytes) -> Any:
+    """ Parses msgpack written by :func:``msgpack_dumps``, decoding arrays from their raw bytes. """
+    if msgpack is None:
+        raise ModuleNotFoundError("Could not find or import msgpack.")
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def decode_arrays(cls: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts in place the lists of the array fields of a model (and of its nested models, also
+    in lists and dicts of models) in decoded data into NumPy arrays of the field dtypes, which
+    validation then uses as is.
+    Parameters
+    ----------
+    cls: Type[BaseModel]
+        Model class the data is for e.g. :class:``Molecule``.
+    data: Dict[str, Any]
+        Decoded fields by alias.
+    Returns
+    -------
+    Dict[str, Any]
+        The data.
+    """
+    for field in cls.__fields__.values():
+        value = data.get(field.alias)
+        if isinstance(value, (list, dict)):
+            data[field.alias] = _decode_field(field, value)
+    return data
+
+
+def _sequence(field: ModelField) -> bool:
+    """Returns whether the values of a field are decoded from JSON lists."""
+    if field.shape == SHAPE_SINGLETON and not field.sub_fields:
+        return getattr(field.type_, "_dtype", None) is not None
+    return field.shape not in MAPPING_LIKE_SHAPES
+
+
+def _decode_field(field: ModelField, value: Any) -> Any:
+    """Returns the decoded value of a field with its arrays converted, see :func:``decode_arrays``."""
+    if not isinstance(value, (list, dict)):
+        return value
+    if field.shape == SHAPE_SINGLETON:
+        if field.sub_fields:  # Union, decoded as its first member of the same JSON type
+            for sub in field.sub_fields:
+                if _sequence(sub) == isinstance(value, list):
+                    return _decode_field(sub, value)
+            return value
+        dtype = getattr(field.type_, "_dtype", None)
+        if dtype is not None and isinstance(value, list):
+            try:
+                return numpy.asarray(value, dtype=dtype)
+            except (TypeError, ValueError):
+                return value  # left to validation to report
+        if (
+            isinstance(value, dict)
+            and isinstance(field.type_, type)
+            and issubclass(field.type_, BaseModel)
+        ):
+            decode_arrays(field.type_, value)
+        return value
+    if not field.sub_fields or field.shape == SHAPE_TUPLE:
+        return value
+    sub = field.sub_fields[0]
+    if field.shape in MAPPING_LIKE_SHAPES and isinstance(value, dict):
+        for key, item in value.items():
+            value[key] = _decode_field(sub, item)
+    elif value and isinstance(value, list) and isinstance(value[0], (list, dict)):
+        value[:] = [_decode_field(sub, item) for item in value]
+    return value
+
+
+class _JSONStream:
+    """Incremental reader of the fields of a JSON object from a binary file, holding at most a
+    chunk of the file besides the values kept."""
+
+    def __init__(self, fp, chunk_size: int = _chunk_size):
+        self.fp, self.chunk_size = fp, chunk_size
+        self.buf, self.pos = b"", 0
+        # Start in buf of the value being kept, copied to kept when the buffer is refilled
+        self.mark, self.kept = None, bytearray()
+
+    def _fill(self) -> None:
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            raise ValueError("Unexpected end of JSON file.")
+        if self.mark is not None:
+            self.kept += memoryview(self.buf)[self.mark : self.pos]
+            self.mark = 0
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+
+    def peek(self) -> bytes:
+        """ Skips whitespace and returns the next character. """
+        while True:
+            self.pos = _space.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos : self.pos + 1]
+            self._fill()
+
+    def _expect(self, chars: bytes) -> bytes:
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars.decode()} in JSON, got {char!r}.")
+        self.pos += 1
+        return char
+
+    def _string(self) -> bytes:
+        if self.peek() != b'"':
+            raise ValueError("Expected a string in JSON.")
+        while True:
+            match = _string.match(self.buf, self.pos)
+            if match:
+                self.pos = match.end()
+                return match.group()
+            self._fill()
+
+    def keys(self):
+        """ Yields the keys of the object, whose values must be read in between. """
+        self._expect(b"{")
+        if self.peek() == b"}":
+            return
+        while True:
+            key = json.loads(self._string())
+            self._expect(b":")
+            yield key
+            if self._expect(b",}") == b"}":
+                return
+
+    def _skip(self) -> None:
+        """ Moves past the next value. """
+        char = self.peek()
+        if char == b'"':
+            self._string()
+            return
+        elif char not in b"[{":
+            while True:
+                match = _scalar.match(self.buf, self.pos)
+                if match and match.end() < len(self.buf):
+                    self.pos = match.end()
+                    return
+                self._fill()
+
+        depth = 0
+        while True:
+            if self.buf.find(b"\\", self.pos) < 0:
+                depth = self._scan(depth)
+            else:
+                depth = self._tokens(depth)
+            if depth == 0:
+                return
+            self._fill()
+
+    def _scan(self, depth: int) -> int:
+        """Moves past the end of the array or object at the given depth in the buffer, or to the
+        end of the buffer (or of its last complete string) if it does not close there, and returns
+        the depth reached. Strings are found from the parity of the quotes, so the buffer must be
+        free of escapes, and brackets within them are masked before summing the depth."""
+        buf, pos = self.buf, self.pos
+        chars = numpy.frombuffer(buf, dtype=numpy.uint8, offset=pos)
+        quoted = numpy.logical_xor.accumulate(chars == ord('"'))
+        steps = ((chars == ord("[")) | (chars == ord("{"))).astype(numpy.int16)
+        steps -= (chars == ord("]")) | (chars == ord("}"))
+        steps[quoted] = 0
+        depths = numpy.cumsum(steps, dtype=numpy.int16)
+        depths += depth
+        closed = depths == 0
+        end = int(closed.argmax())
+        if closed[end]:
+            self.pos = pos + end + 1
+            return 0
+        self.pos = buf.rfind(b'"') if quoted[-1] else len(buf)
+        return int(depths[-1])
+
+    def _tokens(self, depth: int) -> int:
+        """ Same as :meth:``_scan`` token by token, handling strings with escapes. """
+        while True:
+            match = _structural.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                return depth
+            char = match.group()
+            if char == b'"':
+                string = _string.match(self.buf, match.start())
+                if string is None:  # cut at the end of the buffer
+                    self.pos = match.start()
+                    return depth
+                self.pos = string.end()
+                continue
+            self.pos = match.end()
+            depth += 1 if char in b"[{" else -1
+            if depth == 0:
+                return 0
+
+    def value(self, keep: bool = True) -> Any:
+        """ Returns the next value decoded, or skips it if not keep. """
+        if not keep:
+            self._skip()
+            return None
+        self.peek()
+        self.mark, self.kept = self.pos, bytearray()
+        try:
+            self._skip()
+            self.kept += memoryview(self.buf)[self.mark : self.pos]
+        finally:
+            self.mark = None
+        raw, self.kept = self.kept, bytearray()
+        return json_loads(raw)
+
+    @staticmethod
+    def _parse(segment: bytes, out: Optional[numpy.ndarray], count: int) -> int:
+        segment = segment.strip(b" \t\r\n,")
+        if not segment:
+            return count
+        size = segment.count(b",") + 1
+        if out is not None:
+            with warnings.catch_warnings():
+                # Raised by fromstring for numbers it cannot parse e.g. 1.0 for integers
+                warnings.simplefilter("ignore", DeprecationWarning)
+                values = numpy.fromstring(segment, dtype=out.dtype, sep=",")
+            if values.size != size:
+                values = json_loads(b"[" + segment + b"]")
+            out[count : count + size] = values
+        return count + size
+
+    def numbers(self, out: Optional[numpy.ndarray] = None) -> Tuple[int, bool]:
+        """Reads the next value, an array of numbers possibly nested, into the flat buffer out
+        chunk by chunk, or only counts the numbers if out is None. Returns the count of numbers
+        and whether the array is nested."""
+        self._expect(b"[")
+        depth, count, nested = 1, 0, False
+        while True:
+            match = _brackets.search(self.buf, self.pos)
+            if match is None:
+                end = self.buf.rfind(b",", self.pos)
+                if end >= 0:
+                    count = self._parse(self.buf[self.pos : end], out, count)
+                    self.pos = end + 1
+                # The number possibly cut at the end of the chunk is kept
+                self._fill()
+                continue
+            count = self._parse(self.buf[self.pos : match.start()], out, count)
+            self.pos = match.end()
+            if match.group() == b"[":
+                depth, nested = depth + 1, True
+            else:
+                depth -= 1
+            if depth == 0:
+                return count, nested
+
+
+def json_load_stream(
+    filename: str, cls: Type[BaseModel], chunk_size: int = _chunk_size
+) -> Dict[str, Any]:
+    """Reads a JSON file of a model incrementally, decoding the numeric array fields e.g. geometry
+    directly into preallocated NumPy buffers rather than lists of Python floats, so that the peak
+    memory stays close to the size of the model. The file is read twice, first to count the
+    numbers of each array. Other fields are decoded as by :func:``json_loads`` and
+    :func:``decode_arrays``.
+    Parameters
+    ----------
+    filename: str
+        JSON file, possibly compressed (see :func:``mmelemental.util.compression.open_file``).
+    cls: Type[BaseModel]
+        Model class the file is for e.g. :class:``Molecule``.
+    chunk_size: int, optional
+        Bytes read at a time.
+    Returns
+    -------
+    Dict[str, Any]
+        Decoded fields by alias, with numeric arrays flattened.
+    """
+    dtypes = {}
+    for field in cls.__fields__.values():
+        dtype = getattr(field.type_, "_dtype", None)
+        if dtype is not None and numpy.dtype(dtype).kind in "fiu":
+            dtypes[field.alias] = numpy.dtype(dtype)
+
+    sizes = {}
+    with compression.open_file(filename, "rb") as fp:
+        reader = _JSONStream(fp, chunk_size)
+        for key in reader.keys():
+            if key in dtypes and reader.peek() == b"[":
+                size, nested = reader.numbers()
+                if not nested:
+                    sizes[key] = size
+            else:
+                reader.value(keep=False)
+
+    data = {}
+    with compression.open_file(filename, "rb") as fp:
+        reader = _JSONStream(fp, chunk_size)
+        for key in reader.keys():
+            if key in sizes:
+                data[key] = numpy.empty(sizes.pop(key), dtype=dtypes[key])
+                reader.numbers(data[key])
+            else:
+                data[key] = reader.value()
+    return decode_arrays(cls, data)
+
+
+def _file_dtype(filename: str, dtype: Optional[str]) -> str:
+    dtype = dtype or compression.split_ext(filename)[0].strip(".")
+    if dtype not in ("json", "msgpack"):
+        raise NotImplementedError(f"File extension .{dtype} not supported.")
+    return dtype
+
+
+def load_model(
+    cls: Type[BaseModel], filename: str, dtype: Optional[str] = None, **kwargs: Any
+) -> BaseModel:
+    """Constructs a model from a JSON or msgpack file e.g. written by :func:``dump_model``,
+    decompressed on the fly if it ends with .gz, .bz2, .xz, or .zst. The arrays of JSON files are
+    decoded by :func:``decode_arrays``.
+    Parameters
+    ----------
+    cls: Type[BaseModel]
+        Model class to construct e.g. :class:``Ensemble``.
+    filename: str
+        Input filename with a .json or .msgpack extension.
+    dtype: str, optional
+        File type, json or msgpack. Inferred from the filename if unset.
+    **kwargs: Any, optional
+        Additional fields, taking precedence over the file.
+    Returns
+    -------
+    BaseModel
+        A constructed model of class ``cls``.
+    """
+    dtype = _file_dtype(filename, dtype)
+    with span(f"{cls.__name__}.from_file.{dtype}") as timer, compression.open_file(
+        filename, "rb"
+    ) as fp:
+        raw = fp.read()
+        timer.nbytes = len(raw)
+        if dtype == "json":
+            data = decode_arrays(cls, json_loads(raw))
+        else:
+            data = msgpack_loads(raw)
+    data.update(kwargs)
+    return cls(**data)
+
+
+def dump_model(
+    model: BaseModel,
+    filename: str,
+    dtype: Optional[str] = None,
+    compresslevel: Optional[int] = None,
+    threads: int = 0,
+    mode: Optional[str] = None,
+    **kwargs: Any,
+) -> None:
+    """Writes a model to a JSON or msgpack file, compressed if the filename ends with .gz, .bz2,
+    .xz, or .zst e.g. ensemble.msgpack.zst. Array fields are flattened in JSON files.
+    Parameters
+    ----------
+    model: BaseModel
+        Model to write.
+    filename: str
+        Output filename with a .json or .msgpack extension.
+    dtype: str, optional
+        File type, json or msgpack. Inferred from the filename if unset.
+    compresslevel: int, optional
+        Compression level of compressed files. See :func:``mmelemental.util.compression.open_file``.
+    threads: int, optional
+        Number of compression threads, for zstd only. Defaults to 0 i.e. the calling thread.
+    mode: str, optional
+        File mode. Defaults to w for JSON and wb for msgpack files.
+    **kwargs: Any, optional
+        Arguments of the model ``dict`` method e.g. exclude, in which case the dict is written.
+    """
+    dtype = _file_dtype(filename, dtype)
+    with span(f"{type(model).__name__}.to_file.{dtype}") as timer:
+        obj = model.dict(**kwargs) if kwargs else model
+        if dtype == "json":
+            data, mode = json_dumps(obj), mode or "w"
+        else:
+            data, mode = msgpack_dumps(obj), mode or "wb"
+        timer.nbytes = len(data)
+    with compression.open_file(filename, mode, compresslevel, threads) as fp:
+        fp.write(data)
@@ -0,0 +1,449 @@
+""" Content-addressed on-disk store of MMElemental models """
+
+__all__ = ["ModelStore"]
+
+from typing import Any, Iterable, List, Optional, Tuple
+import contextlib
+import functools
+import hashlib
+import importlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from . import serialization
+
+# Keys are hexadecimal digests e.g. sha1 of get_hash, checked before being used in paths
+_key = re.compile(r"[0-9a-f]{8,128}")
+
+# Maximum number of keys per query, below the SQLite limit of host parameters
+_batch = 500
+
+_schema = """
+CREATE TABLE IF NOT EXISTS objects (
+    key TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL,
+    atime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_lru ON objects (refs, atime);
+CREATE TABLE IF NOT EXISTS links (parent TEXT NOT NULL, child TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS links_parent ON links (parent);
+CREATE TABLE IF NOT EXISTS usage (nbytes INTEGER NOT NULL);
+INSERT INTO usage SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM usage);
+CREATE TRIGGER IF NOT EXISTS objects_insert AFTER INSERT ON objects
+BEGIN UPDATE usage SET nbytes = nbytes + new.size; END;
+CREATE TRIGGER IF NOT EXISTS objects_delete AFTER DELETE ON objects
+BEGIN UPDATE usage SET nbytes = nbytes - old.size; END;
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_types() -> Tuple[type, ...]:
+    """ Models stored as objects of their own when held by another model e.g. a SimInput. """
+    from mmelemental.models.molecule.mm_mol import Molecule
+    from mmelemental.models.forcefield import ForceField
+
+    return (Molecule, ForceField)
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_fields(cls: type) -> frozenset:
+    """ Fields of a model class holding shared models, possibly in dicts or lists. """
+    return frozenset(
+        name
+        for name, field in cls.__fields__.items()
+        if isinstance(field.type_, type) and issubclass(field.type_, _shared_types())
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _import_type(name: str) -> type:
+    module, _, qualname = name.rpartition(".")
+    return getattr(importlib.import_module(module), qualname)
+
+
+def _is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and "$ref" in value
+
+
+class ModelStore:
+    """A content-addressed store of models on disk, keyed by ``get_hash()`` (or by the digest of
+    the stored data for models without one e.g. :class:``SimInput``), so that identical models are
+    stored once and retrieved by hash. Molecules and force fields held by other models are stored
+    as objects of their own and shared by all the models holding them.
+
+    Payloads are msgpack (or JSON) files in a directory per first two hex digits of the key,
+    written to temporary files renamed into place so that readers never see partial files. An
+    SQLite index next to them counts the references to each object: its pins by :meth:``put``
+    (released by :meth:``decref``) and the stored models holding it. Unreferenced objects are
+    collected least recently used first by :meth:``gc``, automatically once maxbytes is exceeded.
+    Parameters
+    ----------
+    root: str
+        Directory of the store, created if needed.
+    maxbytes: int, optional
+        Size of the payloads above which unreferenced objects are collected after every put.
+        Referenced objects are kept even if the store exceeds it. Unbounded if unset.
+    codec: str, optional
+        Payload format of new objects, msgpack (the default if installed) or json.
+    fsync: bool, optional
+        Flushes payloads to disk before they are renamed into place, so that they survive power
+        losses, at the cost of write speed. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        maxbytes: Optional[int] = None,
+        codec: Optional[str] = None,
+        fsync: bool = False,
+    ):
+        self.codec = codec or ("msgpack" if serialization.msgpack else "json")
+        if self.codec not in ("msgpack", "json"):
+            raise ValueError(
+                f"Codec {self.codec} not supported, only msgpack and json."
+            )
+        self.root = os.path.abspath(root)
+        self.maxbytes = maxbytes
+        self.fsync = fsync
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+
+        self._lock = threading.RLock()
+        # Payloads written in the current transaction
+        self._written = []
+        # Transactions are started explicitly, see _transaction
+        self._db = sqlite3.connect(
+            os.path.join(self.root, "index.sqlite"),
+            timeout=60,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._lock:
+            self._db.executescript(f"BEGIN IMMEDIATE; {_schema} COMMIT;")
+
+    def close(self) -> None:
+        """ Closes the index. """
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "ModelStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.exists(key)
+
+    @property
+    def nbytes(self) -> int:
+        """ Total size of the payloads in bytes. """
+        with self._lock:
+            return self._db.execute("SELECT nbytes FROM usage").fetchone()[0]
+
+    def info(self) -> dict:
+        """ Returns the number of objects, the unreferenced ones, and the size of the store. """
+        with self._lock:
+            unreferenced = self._db.execute(
+                "SELECT COUNT(*) FROM objects WHERE refs = 0"
+            ).fetchone()[0]
+        return {
+            "size": len(self),
+            "unreferenced": unreferenced,
+            "nbytes": self.nbytes,
+            "maxbytes": self.maxbytes,
+        }
+
+    # Writing
+    def put(self, model: Any, pin: bool = True) -> str:
+        """Stores a model unless already stored and returns its key.
+        Parameters
+        ----------
+        model: ProtoModel
+            Model to store e.g. :class:``Molecule``, :class:``ForceField``, or :class:``SimInput``.
+        pin: bool, optional
+            References the object so that it is not collected until released by :meth:``decref``.
+            Defaults to True.
+        Returns
+        -------
+        str
+            Key of the object.
+        """
+        return self.put_many([model], pin=pin)[0]
+
+    def put_many(self, models: Iterable[Any], pin: bool = True) -> List[str]:
+        """ Stores models in a single transaction and returns their keys. See :meth:``put``. """
+        with self._transaction() as db:
+            keys = [self._put(db, model, int(pin)) for model in models]
+        if self.maxbytes is not None:
+            self.gc(sweep=False)
+        return keys
+
+    def incref(self, key: str) -> int:
+        """ Pins an object and returns its number of references. """
+        return self._addref(key, 1)
+
+    def decref(self, key: str) -> int:
+        """Releases a pin of an object and returns its number of references, the object being
+        collected by :meth:``gc`` once unreferenced."""
+        return self._addref(key, -1)
+
+    def gc(self, maxbytes: Optional[int] = None, sweep: bool = True) -> int:
+        """Deletes unreferenced objects, least recently used first, until the store holds at most
+        maxbytes (defaults to the maxbytes of the store, and to deleting them all if unset).
+        Objects only held by deleted ones become unreferenced and are collected in turn.
+        Payload files missing from the index e.g. left by crashed writers are removed too if
+        sweep, which lists the whole store. Returns the number of bytes freed."""
+        maxbytes = self.maxbytes if maxbytes is None else maxbytes
+        deleted, freed = [], 0
+        with self._transaction() as db:
+            nbytes = db.execute("SELECT nbytes FROM usage").fetchone()[0]
+            while maxbytes is None or nbytes - freed > maxbytes:
+                row = db.execute(
+                    "SELECT key, size FROM objects WHERE refs = 0 ORDER BY atime LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    break
+                key, size = row
+                db.execute(
+                    "UPDATE objects SET refs = refs - 1 WHERE key IN "
+                    "(SELECT child FROM links WHERE parent = ?)",
+                    (key,),
+                )
+                db.execute("DELETE FROM links WHERE parent = ?", (key,))
+                db.execute("DELETE FROM objects WHERE key = ?", (key,))
+                deleted.append(key)
+                freed += size
+        # Payloads are removed once their deletion from the index is committed, holding the write
+        # lock again so that no concurrent put of the same key writes them meanwhile, and only if
+        # no such put stored them again in between
+        with self._transaction() as db:
+            if sweep:
+                deleted = self._orphans(db)
+            else:
+                stored = {key for key, _, _ in self._lookup(deleted)}
+                deleted = [key for key in deleted if key not in stored]
+            for key in deleted:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._path(key))
+        return freed
+
+    # Reading
+    def exists(self, key: str) -> bool:
+        """ Returns whether an object is stored for key. """
+        return self.exists_many([key])[0]
+
+    def exists_many(self, keys: Iterable[str]) -> List[bool]:
+        """ Returns whether an object is stored for each key. """
+        keys = list(keys)
+        found = {key for key, _, _ in self._lookup(keys)}
+        return [key in found for key in keys]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the model stored for key, or default if not stored, and marks it as most
+        recently used."""
+        return self.get_many([key], default)[0]
+
+    def get_many(self, keys: Iterable[str], default: Any = None) -> List[Any]:
+        """ Returns the models stored for keys, default for the ones not stored. See :meth:``get``. """
+        keys = list(keys)
+        rows = {key: row for key, *row in self._lookup(keys)}
+        with self._lock:
+            now = time.time()
+            self._db.executemany(
+                "UPDATE objects SET atime = ? WHERE key = ?",
+                [(now, key) for key in rows],
+            )
+        models = []
+        for key in keys:
+            try:
+                models.append(self._read(key, *rows[key]) if key in rows else default)
+            except FileNotFoundError:  # collected meanwhile by another process
+                models.append(default)
+        return models
+
+    # Internals
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._written = []
+            try:
+                yield self._db
+            except BaseException:
+                # Payloads of the rolled back objects are removed while holding the write lock
+                for key in self._written:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(self._path(key))
+                self._db.execute("ROLLBACK")
+                raise
+            finally:
+                self._written = []
+            self._db.execute("COMMIT")
+
+    def _orphans(self, db: sqlite3.Connection) -> List[str]:
+        """Returns the keys of the payload files missing from the index, removing the temporary
+        files of interrupted writes, which no writer can be making while the write lock is held."""
+        keys = []
+        objects = os.path.join(self.root, "objects")
+        for shard in os.listdir(objects):
+            for name in os.listdir(os.path.join(objects, shard)):
+                if name.startswith(".tmp-"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(objects, shard, name))
+                elif _key.fullmatch(shard + name):
+                    keys.append(shard + name)
+        stored = {key for key, _, _ in self._lookup(keys)}
+        return [key for key in keys if key not in stored]
+
+    def _path(self, key: str) -> str:
+        if not _key.fullmatch(key):
+            raise ValueError(f"Invalid key {key!r}, expected a hexadecimal digest.")
+        return os.path.join(self.root, "objects", key[:2], key[2:])
+
+    def _lookup(self, keys: List[str]) -> List[Tuple[str, str, str]]:
+        """ Returns the key, type, and codec of the stored objects among keys. """
+        invalid = next((key for key in keys if not _key.fullmatch(key)), None)
+        if invalid is not None:
+            raise ValueError(f"Invalid key {invalid!r}, expected a hexadecimal digest.")
+        rows = []
+        with self._lock:
+            for start in range(0, len(keys), _batch):
+                batch = keys[start : start + _batch]
+                rows += self._db.execute(
+                    "SELECT key, type, codec FROM objects WHERE key IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+        return rows
+
+    def _addref(self, key: str, count: int) -> int:
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE objects SET refs = MAX(refs + ?, 0) WHERE key = ?", (count, key)
+            )
+            row = db.execute(
+                "SELECT refs FROM objects WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def _put(self, db: sqlite3.Connection, model: Any, pin: int) -> str:
+        now = time.time()
+        key = model.get_hash() if hasattr(model, "get_hash") else None
+        if (
+            key is not None
+            and db.execute(
+                "UPDATE objects SET refs = refs + ?, atime = ? WHERE key = ?",
+                (pin, now, key),
+            ).rowcount
+        ):
+            return key
+
+        children, data, shared = [], model, _shared_fields(type(model))
+        if shared:
+            # Fields as in the serialized model, with the shared models replaced by references
+            fields = model.__fields__
+            excludes = getattr(model.__config__, "serialize_default_excludes", ())
+            data = {
+                fields[name].alias: self._link(db, value, children)
+                if name in shared
+                else value
+                for name, value in model.__dict__.items()
+                if value is not None and name not in excludes
+            }
+
+        if self.codec == "msgpack":
+            payload = serialization.msgpack_dumps(data)
+        else:
+            payload = serialization.json_dumps(data).encode("utf-8")
+
+        if key is None:
+            key = hashlib.sha1(payload).hexdigest()
+            if db.execute(
+                "UPDATE objects SET refs = refs + ?, atime = ? WHERE key = ?",
+                (pin, now, key),
+            ).rowcount:
+                return key
+
+        self._write(key, payload)
+        self._written.append(key)
+        cls = type(model)
+        db.execute(
+            "INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                f"{cls.__module__}.{cls.__qualname__}",
+                self.codec,
+                len(payload),
+                pin,
+                now,
+            ),
+        )
+        db.executemany("INSERT INTO links VALUES (?, ?)", [(key, c) for c in children])
+        db.executemany(
+            "UPDATE objects SET refs = refs + 1 WHERE key = ?", [(c,) for c in children]
+        )
+        return key
+
+    def _link(self, db: sqlite3.Connection, value: Any, children: List[str]) -> Any:
+        """ Stores the shared models in a field value and replaces them with references. """
+        if isinstance(value, _shared_types()):
+            key = self._put(db, value, 0)
+            children.append(key)
+            return {"$ref": key}
+        elif isinstance(value, dict):
+            return {k: self._link(db, val, children) for k, val in value.items()}
+        elif isinstance(value, (list, tuple)):
+            return [self._link(db, val, children) for val in value]
+        return value
+
+    def _write(self, key: str, payload: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(payload)
+                if self.fsync:
+                    fp.flush()
+                    os.fsync(fp.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+
+    def _read(self, key: str, type_name: str, codec: str) -> Any:
+        cls = _import_type(type_name)
+        with open(self._path(key), "rb") as fp:
+            payload = fp.read()
+        if codec == "msgpack":
+            data = serialization.msgpack_loads(payload)
+        else:
+            data = serialization.decode_arrays(cls, serialization.json_loads(payload))
+
+        for name, value in data.items():
+            if _is_ref(value):
+                data[name] = self.get(value["$ref"])
+            elif isinstance(value, dict) and any(map(_is_ref, value.values())):
+                data[name] = {
+                    k: self.get(val["$ref"]) if _is_ref(val) else val
+                    for k, val in value.items()
+                }
+            elif isinstance(value, list) and any(map(_is_ref, value)):
+                data[name] = [
+                    self.get(val["$ref"]) if _is_ref(val) else val for val in value
+                ]
+        return cls(**data)
@@ -0,0 +1,148 @@
+""" Cached resolution of mmic translators used for MMElemental I/O """
+
+__all__ = ["resolve", "invalidate", "cache_info"]
+
+import importlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Generic translator component
+try:
+    from mmic_translator.components import TransComponent
+except Exception:
+    TransComponent = None
+
+_trans_nfound_msg = "MMElemental translation requires mmic_translator. \
+Solve by: pip install mmic_translator"
+
+# Maps resolution direction to the TransComponent method that finds a translator
+_finders = {
+    "molread": "find_molread_tk",
+    "molwrite": "find_molwrite_tk",
+    "ffread": "find_ffread_tk",
+    "ffwrite": "find_ffwrite_tk",
+    "data": "find_trans",
+}
+
+# (direction, dtype, top_ext, model, translator) -> (translator, toolkit class)
+_table: Dict[Tuple, Tuple[str, Any]] = {}
+_stats = {"hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def resolve(
+    direction: str,
+    dtype: str,
+    model: str,
+    top_ext: Optional[str] = None,
+    translator: Optional[str] = None,
+) -> Tuple[Optional[str], Any]:
+    """Returns the translator name and toolkit-specific class for reading/writing/converting
+    an MMSchema model. Successful resolutions are stored in a process-wide table so repeated
+    calls with the same arguments reduce to a single dictionary lookup.
+    Parameters
+    ----------
+    direction: str
+        One of molread, molwrite, ffread, ffwrite, or data.
+    dtype: str
+        File extension (e.g. .pdb) for file I/O or data type (e.g. parmed) for data conversion.
+    model: str
+        Name of the MMSchema model the toolkit class must wrap e.g. Molecule or ForceField.
+    top_ext: str, optional
+        Topology file extension the translator must also be able to read (molread only).
+    translator: str, optional
+        Translator name e.g. mmic_parmed. If supplied, no translator search is performed.
+    Returns
+    -------
+    Tuple[Optional[str], Any]
+        The translator name (None if no translator was found) and the toolkit class
+        (None if the translator does not define one for ``model``).
+    """
+    key = (direction, dtype, top_ext, model, translator)
+
+    entry = _table.get(key)
+    if entry is not None:
+        _stats["hits"] += 1
+        return entry
+
+    with _lock:
+        _stats["misses"] += 1
+        entry = _table.get(key)
+        if entry is None:
+            entry = _resolve(direction, dtype, model, top_ext, translator)
+            # Failed resolutions are not cached so newly installed translators are found
+            if entry[0] and entry[1]:
+                _table[key] = entry
+
+    return entry
+
+
+def invalidate(translator: Optional[str] = None) -> None:
+    """Removes entries from the resolution table.
+    Parameters
+    ----------
+    translator: str, optional
+        Only removes entries resolved to this translator. If unset, the whole table is cleared.
+    """
+    with _lock:
+        if translator is None:
+            _table.clear()
+            _stats["hits"] = _stats["misses"] = 0
+        else:
+            for key in [key for key, val in _table.items() if val[0] == translator]:
+                del _table[key]
+
+
+def cache_info() -> Dict[str, int]:
+    """Returns the number of table hits, misses, and stored entries."""
+    return {**_stats, "size": len(_table)}
+
+
+def _import(translator: str) -> Optional[Any]:
+    try:
+        if importlib.util.find_spec(translator):
+            return importlib.import_module(translator)
+    except (ImportError, ValueError):
+        pass
+    return None
+
+
+def _resolve(
+    direction: str,
+    dtype: str,
+    model: str,
+    top_ext: Optional[str],
+    translator: Optional[str],
+) -> Tuple[Optional[str], Any]:
+    if translator:
+        mod = _import(translator)
+        if mod is None:
+            return None, None
+        return translator, mod._classes_map.get(model)
+
+    if not TransComponent:
+        raise ModuleNotFoundError(_trans_nfound_msg)
+
+    finder = getattr(TransComponent, _finders[direction])
+
+    if not top_ext:
+        translator = finder(dtype)
+        mod = _import(translator) if translator else None
+        if mod is None:
+            return None, None
+        return translator, mod._classes_map.get(model)
+
+    # Look for a translator that can read both the coordinates and the topology files
+    from mmic_translator.components.supported import reg_trans
+
+    candidates: List[str] = list(reg_trans)
+    while candidates:
+        translator = finder(dtype, trans=candidates)
+        if not translator:
+            break
+        mod = _import(translator)
+        if mod is not None and top_ext in mod.ffread_ext_maps:
+            return translator, mod._classes_map.get(model)
+        candidates.remove(translator)
+
+    return None, None